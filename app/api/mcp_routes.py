@@ -11,6 +11,7 @@ Fecha: Mayo 2025
 
 import os
 import json
+import time
 import logging
 from typing import Dict, Any, List, Optional
 from fastapi import APIRouter, Depends, HTTPException, Body, Query, Path
@@ -18,8 +19,14 @@ from fastapi.responses import JSONResponse
 from pydantic import BaseModel, Field
 
 # Importar servicios MCP
-from app.services.mcp_service import execute_tool_operation, initialize_mcp
+from app.services.mcp_service import (
+    execute_tool_operation,
+    execute_tool_batch,
+    error_status_code,
+    initialize_mcp
+)
 from app.mcp_client.mcp_client_extended import get_mcp_client
+from app.mcp_client.client import mcp_client_instance
 
 # Configurar logging
 logging.basicConfig(level=logging.INFO)
@@ -70,12 +77,41 @@ class TwitterTokenRequest(BaseModel):
 class OperationRequest(BaseModel):
     arguments: Dict[str, Any] = Field(default_factory=dict, description="Argumentos para la operación")
 
+class BatchOperation(BaseModel):
+    service: str = Field(..., description="Servicio (github, notion, slack, etc.)")
+    operation: str = Field(..., description="Operación a ejecutar")
+    arguments: Dict[str, Any] = Field(default_factory=dict, description="Argumentos para la operación")
+
+class BatchRequest(BaseModel):
+    operations: List[BatchOperation] = Field(..., description="Operaciones a ejecutar en paralelo")
+
 class ServerStatus(BaseModel):
     name: str
     status: str
     running: bool
     pid: Optional[int] = None
     uptime: Optional[float] = None
+    restarts: int = 0
+    crashes: int = 0
+    last_exit_code: Optional[int] = None
+    last_error: Optional[str] = None
+
+# Función para obtener el ID de usuario actual
+async def get_current_user_id():
+    """
+    Obtiene el ID del usuario actual.
+    En una implementación real, esto se obtendría del token JWT.
+    """
+    # TODO: Implementar autenticación real
+    return "test_user_001"
+
+def operation_http_error(e: Exception, message: str) -> HTTPException:
+    """
+    Traduce el error de una operación MCP a la respuesta HTTP correspondiente.
+    """
+    if isinstance(e, HTTPException):
+        return e
+    return HTTPException(status_code=error_status_code(e), detail=f"{message}: {str(e)}")
 
 # Endpoints de conexión
 @router.get("/connections", response_model=ConnectionResponse)
@@ -117,8 +153,9 @@ async def connect_github(token_request: TokenRequest, user_id: str = Depends(get
         if result:
             # Verificar token con una operación simple
             try:
-                response = await client.execute_github_operation(
+                response = await execute_tool_operation(
                     user_id=user_id,
+                    service="github",
                     operation="get_me",
                     arguments={}
                 )
@@ -133,6 +170,8 @@ async def connect_github(token_request: TokenRequest, user_id: str = Depends(get
                 raise HTTPException(status_code=400, detail=f"Token inválido: {str(e)}")
         else:
             raise HTTPException(status_code=500, detail="Error al guardar token")
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error al conectar GitHub: {e}")
         raise HTTPException(status_code=500, detail=f"Error al conectar GitHub: {str(e)}")
@@ -153,8 +192,9 @@ async def connect_notion(token_request: TokenRequest, user_id: str = Depends(get
         if result:
             # Verificar token con una operación simple
             try:
-                response = await client.execute_notion_operation(
+                response = await execute_tool_operation(
                     user_id=user_id,
+                    service="notion",
                     operation="search",
                     arguments={"query": ""}
                 )
@@ -169,6 +209,8 @@ async def connect_notion(token_request: TokenRequest, user_id: str = Depends(get
                 raise HTTPException(status_code=400, detail=f"Token inválido: {str(e)}")
         else:
             raise HTTPException(status_code=500, detail="Error al guardar token")
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error al conectar Notion: {e}")
         raise HTTPException(status_code=500, detail=f"Error al conectar Notion: {str(e)}")
@@ -192,8 +234,9 @@ async def connect_slack(token_request: SlackTokenRequest, user_id: str = Depends
         if result:
             # Verificar tokens con una operación simple
             try:
-                response = await client.execute_slack_operation(
+                response = await execute_tool_operation(
                     user_id=user_id,
+                    service="slack",
                     operation="get_channels",
                     arguments={}
                 )
@@ -208,6 +251,8 @@ async def connect_slack(token_request: SlackTokenRequest, user_id: str = Depends
                 raise HTTPException(status_code=400, detail=f"Tokens inválidos: {str(e)}")
         else:
             raise HTTPException(status_code=500, detail="Error al guardar tokens")
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error al conectar Slack: {e}")
         raise HTTPException(status_code=500, detail=f"Error al conectar Slack: {str(e)}")
@@ -237,8 +282,9 @@ async def connect_google_workspace(token_request: GoogleTokenRequest, user_id: s
         if result:
             # Verificar tokens con una operación simple
             try:
-                response = await client.execute_google_workspace_operation(
+                response = await execute_tool_operation(
                     user_id=user_id,
+                    service="google_workspace",
                     operation="list_files",
                     arguments={"pageSize": 1}
                 )
@@ -253,6 +299,8 @@ async def connect_google_workspace(token_request: GoogleTokenRequest, user_id: s
                 raise HTTPException(status_code=400, detail=f"Tokens inválidos: {str(e)}")
         else:
             raise HTTPException(status_code=500, detail="Error al guardar tokens")
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error al conectar Google Workspace: {e}")
         raise HTTPException(status_code=500, detail=f"Error al conectar Google Workspace: {str(e)}")
@@ -277,8 +325,9 @@ async def connect_instagram(token_request: InstagramTokenRequest, user_id: str =
         if result:
             # Verificar tokens con una operación simple
             try:
-                response = await client.execute_instagram_operation(
+                response = await execute_tool_operation(
                     user_id=user_id,
+                    service="instagram",
                     operation="get_recent_messages",
                     arguments={"limit": 1}
                 )
@@ -293,6 +342,8 @@ async def connect_instagram(token_request: InstagramTokenRequest, user_id: str =
                 raise HTTPException(status_code=400, detail=f"Tokens inválidos: {str(e)}")
         else:
             raise HTTPException(status_code=500, detail="Error al guardar tokens")
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error al conectar Instagram: {e}")
         raise HTTPException(status_code=500, detail=f"Error al conectar Instagram: {str(e)}")
@@ -321,8 +372,9 @@ async def connect_trello(token_request: TrelloTokenRequest, user_id: str = Depen
         if result:
             # Verificar tokens con una operación simple
             try:
-                response = await client.execute_trello_operation(
+                response = await execute_tool_operation(
                     user_id=user_id,
+                    service="trello",
                     operation="get_boards",
                     arguments={}
                 )
@@ -337,6 +389,8 @@ async def connect_trello(token_request: TrelloTokenRequest, user_id: str = Depen
                 raise HTTPException(status_code=400, detail=f"Tokens inválidos: {str(e)}")
         else:
             raise HTTPException(status_code=500, detail="Error al guardar tokens")
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error al conectar Trello: {e}")
         raise HTTPException(status_code=500, detail=f"Error al conectar Trello: {str(e)}")
@@ -362,8 +416,9 @@ async def connect_twitter_x(token_request: TwitterTokenRequest, user_id: str = D
         if result:
             # Verificar tokens con una operación simple
             try:
-                response = await client.execute_twitter_x_operation(
+                response = await execute_tool_operation(
                     user_id=user_id,
+                    service="twitter_x",
                     operation="get_home_timeline",
                     arguments={"limit": 1}
                 )
@@ -378,6 +433,8 @@ async def connect_twitter_x(token_request: TwitterTokenRequest, user_id: str = D
                 raise HTTPException(status_code=400, detail=f"Tokens inválidos: {str(e)}")
         else:
             raise HTTPException(status_code=500, detail="Error al guardar tokens")
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error al conectar Twitter/X: {e}")
         raise HTTPException(status_code=500, detail=f"Error al conectar Twitter/X: {str(e)}")
@@ -427,10 +484,27 @@ async def execute_operation(
         }
     except Exception as e:
         logger.error(f"Error al ejecutar operación {operation} en {service}: {e}")
-        raise HTTPException(
-            status_code=500,
-            detail=f"Error al ejecutar operación {operation} en {service}: {str(e)}"
+        raise operation_http_error(e, f"Error al ejecutar operación {operation} en {service}")
+
+@router.post("/batch", response_model=dict)
+async def execute_batch(request: BatchRequest = Body(...), user_id: str = Depends(get_current_user_id)):
+    """
+    Ejecuta varias operaciones en paralelo y devuelve sus resultados en el mismo orden.
+    """
+    started = time.monotonic()
+    try:
+        results = await execute_tool_batch(
+            user_id=user_id,
+            operations=[operation.model_dump() for operation in request.operations]
         )
+        return {
+            "status": "success",
+            "results": results,
+            "duration": time.monotonic() - started
+        }
+    except Exception as e:
+        logger.error(f"Error al ejecutar lote de operaciones: {e}")
+        raise operation_http_error(e, "Error al ejecutar lote de operaciones")
 
 # Endpoints específicos por servicio
 @router.get("/github/repos", response_model=dict)
@@ -452,10 +526,7 @@ async def get_github_repos(user_id: str = Depends(get_current_user_id)):
         }
     except Exception as e:
         logger.error(f"Error al obtener repositorios de GitHub: {e}")
-        raise HTTPException(
-            status_code=500,
-            detail=f"Error al obtener repositorios de GitHub: {str(e)}"
-        )
+        raise operation_http_error(e, "Error al obtener repositorios de GitHub")
 
 @router.get("/notion/search", response_model=dict)
 async def search_notion(
@@ -479,10 +550,7 @@ async def search_notion(
         }
     except Exception as e:
         logger.error(f"Error al buscar en Notion: {e}")
-        raise HTTPException(
-            status_code=500,
-            detail=f"Error al buscar en Notion: {str(e)}"
-        )
+        raise operation_http_error(e, "Error al buscar en Notion")
 
 @router.get("/google/files", response_model=dict)
 async def list_google_files(
@@ -511,10 +579,7 @@ async def list_google_files(
         }
     except Exception as e:
         logger.error(f"Error al listar archivos de Google Drive: {e}")
-        raise HTTPException(
-            status_code=500,
-            detail=f"Error al listar archivos de Google Drive: {str(e)}"
-        )
+        raise operation_http_error(e, "Error al listar archivos de Google Drive")
 
 @router.get("/instagram/messages", response_model=dict)
 async def get_instagram_messages(
@@ -538,10 +603,7 @@ async def get_instagram_messages(
         }
     except Exception as e:
         logger.error(f"Error al obtener mensajes de Instagram: {e}")
-        raise HTTPException(
-            status_code=500,
-            detail=f"Error al obtener mensajes de Instagram: {str(e)}"
-        )
+        raise operation_http_error(e, "Error al obtener mensajes de Instagram")
 
 @router.get("/trello/lists", response_model=dict)
 async def get_trello_lists(
@@ -569,10 +631,7 @@ async def get_trello_lists(
         }
     except Exception as e:
         logger.error(f"Error al obtener listas de Trello: {e}")
-        raise HTTPException(
-            status_code=500,
-            detail=f"Error al obtener listas de Trello: {str(e)}"
-        )
+        raise operation_http_error(e, "Error al obtener listas de Trello")
 
 @router.get("/twitter/timeline", response_model=dict)
 async def get_twitter_timeline(
@@ -596,10 +655,22 @@ async def get_twitter_timeline(
         }
     except Exception as e:
         logger.error(f"Error al obtener timeline de Twitter/X: {e}")
-        raise HTTPException(
-            status_code=500,
-            detail=f"Error al obtener timeline de Twitter/X: {str(e)}"
-        )
+        raise operation_http_error(e, "Error al obtener timeline de Twitter/X")
+
+@router.get("/tools/{service}", response_model=dict)
+async def list_service_tools(service: str = Path(...), user_id: str = Depends(get_current_user_id)):
+    """
+    Obtiene las operaciones de un servicio y el esquema de sus argumentos.
+    """
+    try:
+        client = await get_mcp_client()
+        return {
+            "service": service,
+            "tools": await client.list_tools(service)
+        }
+    except Exception as e:
+        logger.error(f"Error al obtener las operaciones de {service}: {e}")
+        raise operation_http_error(e, f"Error al obtener las operaciones de {service}")
 
 # Endpoints de estado del sistema
 @router.get("/status", response_model=List[ServerStatus])
@@ -609,7 +680,7 @@ async def get_system_status(user_id: str = Depends(get_current_user_id)):
     """
     try:
         client = await get_mcp_client()
-        status = client.orchestrator.get_server_status()
+        status = await client.get_server_status()
         
         result = []
         for name, server_status in status.items():
@@ -618,7 +689,11 @@ async def get_system_status(user_id: str = Depends(get_current_user_id)):
                 "status": server_status.get("status", "unknown"),
                 "running": server_status.get("running", False),
                 "pid": server_status.get("pid"),
-                "uptime": server_status.get("uptime")
+                "uptime": server_status.get("uptime"),
+                "restarts": server_status.get("restarts", 0),
+                "crashes": server_status.get("crashes", 0),
+                "last_exit_code": server_status.get("last_exit_code"),
+                "last_error": server_status.get("last_error")
             })
         
         return result
@@ -629,11 +704,62 @@ async def get_system_status(user_id: str = Depends(get_current_user_id)):
             detail=f"Error al obtener estado del sistema: {str(e)}"
         )
 
-# Función para obtener el ID de usuario actual
-async def get_current_user_id():
+@router.get("/remote", response_model=dict)
+async def get_remote_status(user_id: str = Depends(get_current_user_id)):
     """
-    Obtiene el ID del usuario actual.
-    En una implementación real, esto se obtendría del token JWT.
+    Obtiene el estado de los servidores MCP remotos (OpenAI, Twilio, Stripe):
+    circuit breaker y pool de conexiones.
     """
-    # TODO: Implementar autenticación real
-    return "test_user_001"
+    try:
+        return {
+            "servers": mcp_client_instance.get_remote_status(),
+            "http": mcp_client_instance.get_pool_metrics()
+        }
+    except Exception as e:
+        logger.error(f"Error al obtener estado de los servidores MCP remotos: {e}")
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error al obtener estado de los servidores MCP remotos: {str(e)}"
+        )
+
+@router.get("/logs/{server}", response_model=dict)
+async def get_server_logs(
+    server: str = Path(...),
+    lines: int = Query(100, ge=1, le=1000),
+    user_id: str = Depends(get_current_user_id)
+):
+    """
+    Obtiene las últimas líneas de salida (stdout/stderr) de un servidor MCP.
+    """
+    try:
+        client = await get_mcp_client()
+        return {
+            "server": server,
+            "lines": await client.get_server_logs(server, lines)
+        }
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error al obtener logs de {server}: {e}")
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error al obtener logs de {server}: {str(e)}"
+        )
+
+@router.get("/metrics", response_model=dict)
+async def get_system_metrics(user_id: str = Depends(get_current_user_id)):
+    """
+    Obtiene las métricas de rendimiento de la capa MCP.
+    """
+    try:
+        client = await get_mcp_client()
+        metrics = await client.get_metrics()
+        # Pools de conexiones HTTP con los servidores MCP remotos
+        metrics["http"] = mcp_client_instance.get_pool_metrics()
+        return metrics
+    except Exception as e:
+        logger.error(f"Error al obtener métricas MCP: {e}")
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error al obtener métricas MCP: {str(e)}"
+        )
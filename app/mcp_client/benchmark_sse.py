@@ -0,0 +1,114 @@
+"""
+Micro-benchmark del parser SSE de MCPClient
+
+Este script compara, sobre un stream SSE sintético en memoria, el parser
+anterior de `request_mcp_server` (líneas de texto, `json.loads` doble sin
+línea `event:`, validación Pydantic y `model_dump_json` para el log) con
+el actual (`SSEDecoder` sobre bytes y un único parseo y validación por
+evento con `model_validate_json`). Muestra eventos por segundo de cada uno.
+
+Uso:
+    python app/mcp_client/benchmark_sse.py --events 50000 --text-size 200
+
+Autor: GENIA Team
+Fecha: Mayo 2025
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import logging
+
+import pydantic
+
+# Configurar path para importar módulos
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from app.mcp_client.client import MCPClient, SimpleMessage, SSEDecoder
+
+# Sin salida de logs durante la medición
+logging.disable(logging.WARNING)
+
+def build_stream(events: int, text_size: int) -> bytes:
+    """Stream SSE con la mitad de eventos con línea `event:` y la otra mitad sin ella."""
+    parts = []
+    for i in range(events):
+        data = json.dumps({
+            "role": "assistant",
+            "content": {"text": "x" * text_size},
+            "metadata": {"index": i, "model": "gpt-4o-mini"}
+        })
+        if i % 2:
+            parts.append(f"event: message\ndata: {data}\n\n")
+        else:
+            parts.append(f"data: {data}\n\n")
+    parts.append("event: end\ndata: {}\n\n")
+    return "".join(parts).encode()
+
+def legacy_parse(stream: bytes) -> int:
+    """Parser anterior: mismas operaciones por línea que el bucle original."""
+    count = 0
+    current_event = None
+    for line in stream.decode().split("\n"):
+        line = line.strip()
+        if not line:
+            current_event = None
+            continue
+        if line.startswith("event:"):
+            current_event = line.split(":", 1)[1].strip()
+        elif line.startswith("data:"):
+            data_str = line.split(":", 1)[1].strip()
+            if current_event is None:
+                try:
+                    temp_data = json.loads(data_str)
+                    current_event = 'error' if temp_data.get('role') == 'error' else 'message'
+                except Exception:
+                    pass
+            if current_event == "message" or current_event == "error":
+                message_data = json.loads(data_str)
+                response_msg = SimpleMessage(**message_data)
+                # El log original formateaba siempre el mensaje serializado
+                f"Recibido {current_event}: {response_msg.model_dump_json()}"
+                count += 1
+    return count
+
+def fast_parse(stream: bytes, chunk_size: int) -> int:
+    """Parser actual: SSEDecoder sobre fragmentos de bytes y `_decode_event`."""
+    count = 0
+    decoder = SSEDecoder()
+    for offset in range(0, len(stream), chunk_size):
+        for event, data in decoder.feed(stream[offset:offset + chunk_size]):
+            if MCPClient._decode_event("benchmark", event, data) is not None:
+                count += 1
+    for event, data in decoder.flush():
+        if MCPClient._decode_event("benchmark", event, data) is not None:
+            count += 1
+    return count
+
+def measure(name: str, func, *args) -> float:
+    """Ejecuta una función y muestra los eventos por segundo."""
+    started = time.perf_counter()
+    count = func(*args)
+    elapsed = time.perf_counter() - started
+    rate = count / elapsed
+    print(f"{name:<10} {count} eventos en {elapsed:.3f}s -> {rate:,.0f} eventos/s")
+    return rate
+
+def main():
+    parser = argparse.ArgumentParser(description="Micro-benchmark del parser SSE de MCPClient")
+    parser.add_argument("--events", type=int, default=50000, help="Eventos del stream")
+    parser.add_argument("--text-size", type=int, default=200, help="Caracteres de texto por evento")
+    parser.add_argument("--chunk-size", type=int, default=4096, help="Bytes por fragmento leído")
+    args = parser.parse_args()
+
+    stream = build_stream(args.events, args.text_size)
+    print(f"Stream de {len(stream) / 1024:.0f} KiB, Pydantic {pydantic.VERSION}")
+
+    before = measure("anterior", legacy_parse, stream)
+    after = measure("actual", fast_parse, stream, args.chunk_size)
+    print(f"Mejora: x{after / before:.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -1,14 +1,21 @@
 # /home/ubuntu/genia_backendMPC/app/mcp_client/client.py
 
 import os
+import time
 import asyncio
 import json
 import httpx
 import logging
-from typing import Dict, Any, AsyncGenerator, Optional
-from pydantic import BaseModel # Usaremos Pydantic si está disponible en el backend
+from typing import Dict, Any, AsyncGenerator, AsyncIterator, Optional, List, Tuple
+from contextlib import asynccontextmanager
+from urllib.parse import urlsplit
+from pydantic import BaseModel, ValidationError # Usaremos Pydantic si está disponible en el backend
 from dotenv import load_dotenv
 
+from app.mcp_client.mcp_circuit import MCPCircuitBreaker, MCPCircuitOpenError, STATE_OPEN, retry_delays
+from app.mcp_client.mcp_balancer import MCPLoadBalancer, MCPEndpoint
+from app.mcp_client.mcp_hedging import MCPHedgePolicy
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -26,89 +33,397 @@ class SimpleMessage(BaseModel):
     content: SimpleTextContent
     metadata: Optional[Dict[str, Any]] = None
 
+class SSEDecoder:
+    """
+    Decodificador SSE incremental sobre bytes.
+
+    Recibe los fragmentos del cuerpo tal como llegan y devuelve los eventos
+    completos (nombre, datos) al encontrar la línea en blanco que los cierra.
+    Como indica la especificación SSE, las líneas `data:` de un mismo evento
+    se unen con saltos de línea en un único dato. Los datos se devuelven en bytes sin decodificar para pasarlos una sola vez
+    al parser JSON de Pydantic (`model_validate_json`).
+    """
+
+    __slots__ = ("_buffer", "_event", "_data")
+
+    def __init__(self):
+        self._buffer = b""
+        self._event: Optional[str] = None
+        self._data: List[bytes] = []
+
+    def feed(self, chunk: bytes) -> List[Tuple[Optional[str], bytes]]:
+        """Procesa un fragmento; devuelve los eventos que completa."""
+        lines = (self._buffer + chunk if self._buffer else chunk).split(b"\n")
+        self._buffer = lines.pop()
+        events = []
+        for line in lines:
+            self._line(line, events)
+        return events
+
+    def flush(self) -> List[Tuple[Optional[str], bytes]]:
+        """Procesa lo pendiente al terminar el stream (evento sin línea en blanco final)."""
+        events = []
+        if self._buffer:
+            self._line(self._buffer, events)
+            self._buffer = b""
+        self._line(b"", events)
+        return events
+
+    def _line(self, line: bytes, events: List[Tuple[Optional[str], bytes]]):
+        if line.endswith(b"\r"):
+            line = line[:-1]
+        if not line:
+            if self._data or self._event is not None:
+                events.append((self._event, b"\n".join(self._data)))
+            self._event = None
+            self._data = []
+        elif line.startswith(b"data:"):
+            self._data.append(line[5:].strip())
+        elif line.startswith(b"event:"):
+            self._event = line[6:].strip().decode()
+        # Comentarios (":") y otros campos (id, retry) se ignoran
+
 # --- Configuración --- 
 # Leer URLs de servidores desde variables de entorno
 # Usar URLs de localhost como fallback para desarrollo local si no están definidas
+# Cada variable admite varias réplicas separadas por comas
 OPENAI_MCP_URL = os.getenv("OPENAI_MCP_URL", "http://localhost:8001/mcp")
 STRIPE_MCP_URL = os.getenv("STRIPE_MCP_URL", "http://localhost:8002/mcp") # Mantener por si se usa
 TWILIO_MCP_URL = os.getenv("TWILIO_MCP_URL", "http://localhost:8003/mcp")
 
-SERVER_URLS = {
-    "openai": OPENAI_MCP_URL,
-    "stripe": STRIPE_MCP_URL,
-    "twilio": TWILIO_MCP_URL
+def _split_urls(value: str) -> List[str]:
+    """URLs de las réplicas de un servidor (separadas por comas)."""
+    return [url.strip() for url in (value or "").split(",") if url.strip()]
+
+SERVER_URLS: Dict[str, List[str]] = {
+    "openai": _split_urls(OPENAI_MCP_URL),
+    "stripe": _split_urls(STRIPE_MCP_URL),
+    "twilio": _split_urls(TWILIO_MCP_URL)
 }
 
 logger.info(f"MCP Server URLs configured: {SERVER_URLS}")
 
+# Servidores cuyas solicitudes son idempotentes (sin efectos externos) y se
+# pueden reintentar si fallan antes de recibir respuesta; Twilio y Stripe no
+MCP_RETRY_IDEMPOTENT_SERVERS = {
+    name.strip() for name in os.getenv("MCP_RETRY_IDEMPOTENT_SERVERS", "openai").split(",") if name.strip()
+}
+
+# Respuestas que se reintentan (servidor arrancando, saturado o caído)
+_RETRYABLE_STATUS = {429, 502, 503, 504}
+# Errores de red que se reintentan: la solicitud no llegó a procesarse
+_RETRYABLE_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.RemoteProtocolError)
+
+# --- Pool de conexiones HTTP ---
+# Conexiones por servidor; se puede ajustar por servicio con
+# MCP_HTTP_MAX_CONNECTIONS_<SERVICIO> (p. ej. MCP_HTTP_MAX_CONNECTIONS_OPENAI)
+MCP_HTTP_MAX_CONNECTIONS = int(os.getenv("MCP_HTTP_MAX_CONNECTIONS", "100"))
+MCP_HTTP_MAX_KEEPALIVE = int(os.getenv("MCP_HTTP_MAX_KEEPALIVE", "20"))
+# Segundos que una conexión ociosa permanece abierta para reutilizarse
+MCP_HTTP_KEEPALIVE_EXPIRY = float(os.getenv("MCP_HTTP_KEEPALIVE_EXPIRY", "60"))
+# HTTP/2 (multiplexa las solicitudes sobre una conexión TLS; requiere `h2`)
+MCP_HTTP2 = os.getenv("MCP_HTTP2", "true").lower() == "true"
+# Conexiones abiertas por adelantado a cada servidor en `prewarm`
+MCP_HTTP_PREWARM_CONNECTIONS = int(os.getenv("MCP_HTTP_PREWARM_CONNECTIONS", "2"))
+
+try:
+    import h2  # noqa: F401 - soporte HTTP/2 de httpx (httpx[http2])
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+    if MCP_HTTP2:
+        logger.warning("Paquete 'h2' no instalado: los servidores MCP se usarán con HTTP/1.1")
+
+class MCPHttpPool:
+    """
+    Pools de conexiones HTTP, circuit breakers, balanceadores y políticas de
+    hedging compartidos por todas las instancias de MCPClient.
+
+    Cada servidor de SERVER_URLS tiene su propio `httpx.AsyncClient` (para
+    todas sus réplicas), con su tamaño de pool, keep-alive y HTTP/2, de modo que una ráfaga hacia un
+    servidor no agota las conexiones de los demás. Registra la ocupación del
+    pool, las conexiones nuevas y reutilizadas, el tiempo de conexión
+    (TCP + TLS) y la espera por una conexión libre.
+    """
+
+    def __init__(self):
+        self._clients: Dict[str, httpx.AsyncClient] = {}
+        self._stats: Dict[str, Dict[str, Any]] = {}
+        self._breakers: Dict[str, MCPCircuitBreaker] = {}
+        self._balancers: Dict[str, MCPLoadBalancer] = {}
+        self._hedge_policies: Dict[str, MCPHedgePolicy] = {}
+
+    def hedge_policy(self, server_name: str) -> MCPHedgePolicy:
+        """Política de hedging (umbrales y presupuesto) de un servidor."""
+        policy = self._hedge_policies.get(server_name)
+        if policy is None:
+            policy = self._hedge_policies[server_name] = MCPHedgePolicy(server_name)
+        return policy
+
+    def balancer(self, server_name: str) -> MCPLoadBalancer:
+        """Balanceador de las réplicas de un servidor de SERVER_URLS."""
+        balancer = self._balancers.get(server_name)
+        if balancer is None:
+            balancer = self._balancers[server_name] = MCPLoadBalancer(
+                server_name,
+                SERVER_URLS[server_name],
+                probe=lambda url: self._probe(server_name, url)
+            )
+        return balancer
+
+    async def _probe(self, server_name: str, url: str, timeout: float = 5.0) -> bool:
+        """Comprueba que una réplica responde (cualquier respuesta que no sea 5xx)."""
+        response = await self.get(server_name).head(_origin(url), timeout=timeout)
+        return response.status_code < 500
+
+    def breaker(self, url: str) -> MCPCircuitBreaker:
+        """Circuit breaker de una URL de servidor (compartido por todas las instancias)."""
+        breaker = self._breakers.get(url)
+        if breaker is None:
+            breaker = self._breakers[url] = MCPCircuitBreaker(url)
+        return breaker
+
+    @staticmethod
+    def max_connections(server_name: str) -> int:
+        """Tamaño del pool de un servidor."""
+        return int(os.getenv(f"MCP_HTTP_MAX_CONNECTIONS_{server_name.upper()}", str(MCP_HTTP_MAX_CONNECTIONS)))
+
+    def get(self, server_name: str) -> httpx.AsyncClient:
+        """Obtiene (o crea) el cliente HTTP de un servidor."""
+        client = self._clients.get(server_name)
+        if client is None or client.is_closed:
+            max_connections = self.max_connections(server_name)
+            client = httpx.AsyncClient(
+                limits=httpx.Limits(
+                    max_connections=max_connections,
+                    max_keepalive_connections=min(MCP_HTTP_MAX_KEEPALIVE, max_connections),
+                    keepalive_expiry=MCP_HTTP_KEEPALIVE_EXPIRY
+                ),
+                http2=MCP_HTTP2 and HTTP2_AVAILABLE
+            )
+            self._clients[server_name] = client
+            self._stats.setdefault(server_name, {
+                "requests": 0,
+                "in_flight": 0,
+                "peak_in_flight": 0,
+                "saturated": 0,
+                "new_connections": 0,
+                "reused_connections": 0,
+                "connect_time_total": 0.0,
+                "connect_time_max": 0.0,
+                "pool_wait_total": 0.0,
+                "pool_wait_max": 0.0,
+                "http_versions": {}
+            })
+        return client
+
+    def track(self, server_name: str) -> "_TrackedRequest":
+        """Contexto que mide una solicitud; su `trace` va en `extensions`."""
+        self.get(server_name)
+        return _TrackedRequest(self._stats[server_name], self.max_connections(server_name))
+
+    @asynccontextmanager
+    async def stream(self, server_name: str, method: str, url: str, **kwargs) -> AsyncIterator[httpx.Response]:
+        """`httpx.AsyncClient.stream` sobre el pool del servidor, con métricas."""
+        with self.track(server_name) as tracked:
+            async with self.get(server_name).stream(
+                method, url, extensions={"trace": tracked.trace}, **kwargs
+            ) as response:
+                yield response
+
+    async def prewarm(self, connections: int = MCP_HTTP_PREWARM_CONNECTIONS, timeout: float = 5.0):
+        """
+        Abre conexiones por adelantado con cada servidor de SERVER_URLS.
+
+        Las conexiones (TCP + TLS) quedan en el pool para que las primeras
+        solicitudes no paguen su establecimiento. Los fallos solo se registran.
+        """
+        async def warm(server_name: str, url: str):
+            origin = _origin(url)
+            try:
+                with self.track(server_name) as tracked:
+                    await self.get(server_name).head(
+                        origin, timeout=timeout, extensions={"trace": tracked.trace}
+                    )
+            except Exception as e:
+                logger.warning(f"No se pudo precalentar la conexión con {server_name} ({origin}): {e}")
+
+        await asyncio.gather(*[
+            warm(server_name, url)
+            for server_name, urls in SERVER_URLS.items()
+            for url in urls
+            for _ in range(max(connections, 0))
+        ])
+        logger.info(f"Conexiones precalentadas con los servidores MCP: {list(self._clients)}")
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Métricas del pool de cada servidor."""
+        metrics = {}
+        for server_name, stats in self._stats.items():
+            requests = max(stats["requests"], 1)
+            new_connections = max(stats["new_connections"], 1)
+            max_connections = self.max_connections(server_name)
+            metrics[server_name] = {
+                "max_connections": max_connections,
+                "in_flight": stats["in_flight"],
+                "peak_in_flight": stats["peak_in_flight"],
+                "utilization": stats["in_flight"] / max_connections,
+                "requests": stats["requests"],
+                "saturated_requests": stats["saturated"],
+                "new_connections": stats["new_connections"],
+                "reused_connections": stats["reused_connections"],
+                "connect_time_avg": stats["connect_time_total"] / new_connections,
+                "connect_time_max": stats["connect_time_max"],
+                "pool_wait_avg": stats["pool_wait_total"] / requests,
+                "pool_wait_max": stats["pool_wait_max"],
+                "http_versions": dict(stats["http_versions"]),
+                "http2": MCP_HTTP2 and HTTP2_AVAILABLE
+            }
+        return metrics
+
+    async def close(self):
+        """Cierra los clientes HTTP (se vuelven a crear al usarse) y los sondeos de réplicas."""
+        for balancer in self._balancers.values():
+            await balancer.close()
+        clients, self._clients = self._clients, {}
+        for client in clients.values():
+            if not client.is_closed:
+                await client.aclose()
+
+def _origin(url: str) -> str:
+    """Origen (esquema y host) de una URL."""
+    parts = urlsplit(url)
+    return f"{parts.scheme}://{parts.netloc}/"
+
+class _TrackedRequest:
+    """Mide una solicitud: ocupación del pool y eventos de conexión de httpcore."""
+
+    def __init__(self, stats: Dict[str, Any], max_connections: int):
+        self.stats = stats
+        self.max_connections = max_connections
+        self.started = 0.0
+        self.connect_started: Optional[float] = None
+        self.connect_time: Optional[float] = None
+        self.sent = False
+
+    def __enter__(self) -> "_TrackedRequest":
+        stats = self.stats
+        if stats["in_flight"] >= self.max_connections:
+            stats["saturated"] += 1
+        stats["requests"] += 1
+        stats["in_flight"] += 1
+        stats["peak_in_flight"] = max(stats["peak_in_flight"], stats["in_flight"])
+        self.started = time.monotonic()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stats["in_flight"] -= 1
+
+    async def trace(self, event_name: str, info: Dict[str, Any]):
+        """Extensión `trace` de httpcore."""
+        now = time.monotonic()
+        stats = self.stats
+        if event_name == "connection.connect_tcp.started":
+            self.connect_started = now
+        elif event_name in ("connection.connect_tcp.complete", "connection.start_tls.complete"):
+            if self.connect_started is not None:
+                self.connect_time = now - self.connect_started
+        elif event_name.endswith(".send_request_headers.started") and not self.sent:
+            self.sent = True
+            # Espera por una conexión: hasta empezar a conectar o a enviar
+            wait = (self.connect_started or now) - self.started
+            stats["pool_wait_total"] += wait
+            stats["pool_wait_max"] = max(stats["pool_wait_max"], wait)
+            if self.connect_started is None:
+                stats["reused_connections"] += 1
+            else:
+                stats["new_connections"] += 1
+                stats["connect_time_total"] += self.connect_time or 0.0
+                stats["connect_time_max"] = max(stats["connect_time_max"], self.connect_time or 0.0)
+            version = event_name.split(".", 1)[0]
+            stats["http_versions"][version] = stats["http_versions"].get(version, 0) + 1
+
+class _HedgeAttempt:
+    """Un intento de una solicitud con hedging: consume sus mensajes en una tarea y los encola."""
+
+    # Marca de fin del stream en la cola
+    END = object()
+
+    def __init__(self, tried: List[MCPEndpoint], messages: AsyncGenerator[SimpleMessage, None]):
+        """
+        Inicia el intento.
+
+        Args:
+            tried: Lista `tried` pasada a `_stream_messages`, donde se registra su réplica
+            messages: Mensajes del intento
+        """
+        self.queue: asyncio.Queue = asyncio.Queue()
+        self.started = time.monotonic()
+        self.tried = tried
+        self.task = asyncio.ensure_future(self._run(messages))
+
+    async def _run(self, messages: AsyncGenerator[SimpleMessage, None]):
+        try:
+            async for message in messages:
+                await self.queue.put(message)
+            await self.queue.put(self.END)
+        except Exception as e:
+            await self.queue.put(e)
+        finally:
+            await messages.aclose()
+
+# Pool compartido por todas las instancias de MCPClient
+http_pool = MCPHttpPool()
+
 # --- Cliente MCP Simplificado ---
 class MCPClient:
     def __init__(self, timeout: float = 30.0): # Increased timeout slightly
         self._timeout = httpx.Timeout(timeout, connect=timeout*2) # Timeout para conexión y lectura
-        self._http_client = httpx.AsyncClient(timeout=self._timeout)
+        # Las conexiones se comparten entre instancias a través de `http_pool`
+        self._pool = http_pool
+
+    async def request_mcp_server(self, server_name: str, request_message: SimpleMessage, idempotent: Optional[bool] = None, hedge_route: Optional[str] = None) -> AsyncGenerator[SimpleMessage, None]:
+        """
+        Envía una solicitud a un servidor MCP simplificado vía POST y devuelve un generador asíncrono de mensajes SSE.
 
-    async def request_mcp_server(self, server_name: str, request_message: SimpleMessage) -> AsyncGenerator[SimpleMessage, None]:
-        """Envía una solicitud a un servidor MCP simplificado vía POST y devuelve un generador asíncrono de mensajes SSE."""
-        if server_name not in SERVER_URLS or not SERVER_URLS[server_name]:
+        Si el circuito del servidor está abierto se lanza MCPCircuitOpenError (un
+        ConnectionError) sin enviar nada. Las solicitudes idempotentes (por defecto
+        las de MCP_RETRY_IDEMPOTENT_SERVERS) se reintentan con backoff si fallan
+        antes de recibir la respuesta. Si el servidor tiene varias réplicas,
+        cada intento va a la que elige su balanceador.
+
+        Con `hedge_route` (solo para solicitudes idempotentes, cortas y
+        deterministas) se activa el hedging: si no llega el primer evento
+        dentro del percentil de latencia de esa ruta, se envía un duplicado a
+        otra réplica y se usa la primera que responda (ver `mcp_hedging`).
+        """
+        if not SERVER_URLS.get(server_name):
             logger.error(f"URL para el servidor MCP 	'{server_name}'	 no configurada o vacía.")
             raise ValueError(f"URL para el servidor MCP 	'{server_name}'	 no configurada.")
+        if idempotent is None:
+            idempotent = server_name in MCP_RETRY_IDEMPOTENT_SERVERS
+
+        # Serializar una sola vez (en pydantic-core): el mismo cuerpo se envía y se registra
+        body = request_message.model_dump_json()
+        logger.info(f"Cliente Simplificado: Enviando POST a {server_name} ({len(body)} caracteres)")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f"Cliente Simplificado: Datos enviados a {server_name}: {body[:500]}")
 
-        server_url = SERVER_URLS[server_name]
-        # Use model_dump instead of model_dump_json for httpx content
-        request_data = request_message.model_dump(mode='json')
-        # Restaurado log simple para evitar NameError
-        logger.info(f"Cliente Simplificado: Enviando POST a {server_url} con datos: {json.dumps(request_data)[:500]}...") # Log truncado para evitar sobrecarga
+        if hedge_route and idempotent:
+            messages = self._hedged_messages(server_name, body, hedge_route)
+        else:
+            messages = self._stream_messages(server_name, body, idempotent)
 
         try:
-            async with self._http_client.stream("POST", server_url, json=request_data, headers={'Accept': 'text/event-stream'}) as response:
-                # Verificar si la conexión SSE fue exitosa
-                if response.status_code != 200:
-                     error_content = await response.aread()
-                     logger.error(f"Error al conectar con el servidor SSE {server_name}: {response.status_code} - {error_content.decode()}")
-                     raise ConnectionError(f"Error {response.status_code} al conectar con {server_name}: {error_content.decode()}")
-
-                logger.info(f"Cliente Simplificado: Conexión SSE establecida con {server_name}.")
-                
-                current_event = None # Initialize current_event
-                # Procesar el stream SSE
-                async for line in response.aiter_lines():
-                    line = line.strip()
-                    if not line:
-                        current_event = None # Reset event on empty line
-                        continue
-                        
-                    if line.startswith("event:"):
-                        current_event = line.split(":", 1)[1].strip()
-                    elif line.startswith("data:"):
-                        data_str = line.split(":", 1)[1].strip()
-                        # Assume event is 'message' or 'error' if not explicitly set (simple server might omit event line)
-                        if current_event is None:
-                            try:
-                                temp_data = json.loads(data_str)
-                                if temp_data.get('role') == 'error':
-                                    current_event = 'error'
-                                else:
-                                    current_event = 'message'
-                            except: # If parsing fails, assume it's not a standard message
-                                pass 
-                                
-                        if current_event == "message" or current_event == "error":
-                            try:
-                                message_data = json.loads(data_str)
-                                # Validate with Pydantic model before yielding
-                                response_msg = SimpleMessage(**message_data)
-                                logger.info(f"Cliente Simplificado: Recibido {current_event} de {server_name}: {response_msg.model_dump_json()}")
-                                yield response_msg
-                            except (json.JSONDecodeError, Exception) as parse_error:
-                                logger.error(f"Cliente Simplificado: Error al parsear mensaje {current_event} de {server_name}: {parse_error} - Data: {data_str}")
-                        elif current_event == "end":
-                             logger.info(f"Cliente Simplificado: Recibido evento 'end' de {server_name}.")
-                             # End event might contain data or just signal completion
-                             # break # Don't break here, process potential data first
-                        # Reset event only after processing data or on empty line
-                        # current_event = None 
-                    # else: ignore other lines for now
+            try:
+                async for message in messages:
+                    yield message
+            finally:
+                await messages.aclose()
 
+        except MCPCircuitOpenError as circuit_err:
+            logger.warning(f"Cliente Simplificado: {circuit_err}")
+            raise
         except httpx.RequestError as req_err:
             logger.error(f"Cliente Simplificado: Error de red al conectar con {server_name}: {req_err}", exc_info=True)
             raise ConnectionError(f"Error de red al conectar con {server_name}: {req_err}") from req_err
@@ -118,13 +433,226 @@ class MCPClient:
         finally:
              logger.info(f"Cliente Simplificado: Finalizada comunicación SSE con {server_name}.")
 
+    async def _stream_messages(self, server_name: str, body: str, idempotent: bool,
+                               tried: Optional[List[MCPEndpoint]] = None) -> AsyncGenerator[SimpleMessage, None]:
+        """Envía una solicitud y devuelve los mensajes de su stream SSE."""
+        async with self._open_stream(server_name, body, idempotent, tried) as response:
+            logger.info(f"Cliente Simplificado: Conexión SSE establecida con {server_name}.")
+
+            # Procesar el stream SSE por bytes, decodificando cada evento una vez
+            decoder = SSEDecoder()
+            async for chunk in response.aiter_bytes():
+                for event, data in decoder.feed(chunk):
+                    message = self._decode_event(server_name, event, data)
+                    if message is not None:
+                        yield message
+            for event, data in decoder.flush():
+                message = self._decode_event(server_name, event, data)
+                if message is not None:
+                    yield message
+
+    async def _hedged_messages(self, server_name: str, body: str, route: str) -> AsyncGenerator[SimpleMessage, None]:
+        """
+        Envía una solicitud con hedging y devuelve los mensajes de la que gane.
+
+        El primario se envía de inmediato; si no produce su primer evento
+        dentro del umbral de la ruta, hay otra réplica sin expulsar y con el
+        circuito no abierto y el presupuesto lo permite, se envía un duplicado
+        a esa réplica. Gana el primero que
+        produzca un evento (o termine); el otro se cancela y su conexión se
+        cierra. Si uno falla antes de responder se espera al otro.
+        """
+        policy = self._pool.hedge_policy(server_name)
+        delay = policy.start(route)
+        primary_tried: List[MCPEndpoint] = []
+        primary = _HedgeAttempt(primary_tried, self._stream_messages(server_name, body, True, primary_tried))
+        attempts = [primary]
+        getters = {asyncio.ensure_future(primary.queue.get()): primary}
+        hedged = False
+        try:
+            while True:
+                timeout = None if hedged else max(delay - (time.monotonic() - primary.started), 0.0)
+                done, _ = await asyncio.wait(getters, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    # Umbral vencido sin primer evento: un único duplicado como mucho,
+                    # y solo si hay otra réplica utilizable (si no, iría a la misma)
+                    hedged = True
+                    if not self._hedge_replicas(server_name, primary.tried):
+                        policy.skip()
+                    elif policy.try_hedge():
+                        logger.info(f"Cliente Simplificado: Duplicando solicitud '{route}' a {server_name} tras {delay:.2f}s sin respuesta")
+                        hedge_tried = list(primary.tried)
+                        hedge = _HedgeAttempt(hedge_tried, self._stream_messages(server_name, body, True, hedge_tried))
+                        attempts.append(hedge)
+                        getters[asyncio.ensure_future(hedge.queue.get())] = hedge
+                    continue
+
+                getter = done.pop()
+                attempt = getters.pop(getter)
+                item = getter.result()
+                if isinstance(item, BaseException) and getters:
+                    logger.warning(f"Cliente Simplificado: Intento de '{route}' a {server_name} fallido, se espera al otro: {item}")
+                    continue
+                break
+
+            for getter in getters:
+                getter.cancel()
+            for other in attempts:
+                if other is not attempt:
+                    other.task.cancel()
+            if isinstance(item, BaseException):
+                raise item
+            policy.record(route, time.monotonic() - attempt.started, attempt is not primary)
+
+            while item is not _HedgeAttempt.END:
+                if isinstance(item, BaseException):
+                    raise item
+                yield item
+                item = await attempt.queue.get()
+        finally:
+            for getter in getters:
+                getter.cancel()
+            for attempt in attempts:
+                attempt.task.cancel()
+
+    def _hedge_replicas(self, server_name: str, tried: List[MCPEndpoint]) -> List[MCPEndpoint]:
+        """Réplicas a las que puede ir un duplicado: no intentadas, sin expulsar y con el circuito no abierto."""
+        return [
+            endpoint for endpoint in self._pool.balancer(server_name).endpoints
+            if endpoint not in tried and not endpoint.ejected
+            and self._pool.breaker(endpoint.url).state != STATE_OPEN
+        ]
+
+    @asynccontextmanager
+    async def _open_stream(self, server_name: str, body: str, idempotent: bool,
+                           tried: Optional[List[MCPEndpoint]] = None) -> AsyncIterator[httpx.Response]:
+        """
+        Abre el stream SSE de una solicitud y entrega la respuesta 200.
+
+        Cada intento va a la réplica que elige el balanceador del servidor
+        (evitando las ya intentadas y las de circuito abierto) y pasa por el
+        circuit breaker de su URL, que registra los errores (de red, 5xx y
+        429) y la latencia hasta la respuesta. Si la solicitud es idempotente,
+        los errores reintentables se reintentan con esperas "decorrelated
+        jitter"; una vez entregada la respuesta ya no se reintenta.
+        """
+        balancer = self._pool.balancer(server_name)
+        delays = retry_delays() if idempotent else iter(())
+        # Réplicas ya intentadas (la lista del llamador, si la pasa, las recibe)
+        tried = [] if tried is None else tried
+        while True:
+            endpoint = balancer.choose(
+                exclude=tried,
+                available=lambda candidate: self._pool.breaker(candidate.url).state != STATE_OPEN
+            )
+            tried.append(endpoint)
+            server_url = endpoint.url
+            breaker = self._pool.breaker(server_url)
+            probe = breaker.before_call()
+            balancer.acquire(endpoint)
+            started = time.monotonic()
+            opened = False
+            recorded = False
+            try:
+                async with self._pool.stream(server_name, "POST", server_url, content=body, headers={'Content-Type': 'application/json', 'Accept': 'text/event-stream'}, timeout=self._timeout) as response:
+                    if response.status_code == 200:
+                        breaker.record_success(time.monotonic() - started)
+                        balancer.record_success(endpoint)
+                        opened = recorded = True
+                        yield response
+                        return
+
+                    # Verificar si la conexión SSE fue exitosa
+                    error_content = (await response.aread()).decode(errors="replace")
+                    logger.error(f"Error al conectar con el servidor SSE {server_name} ({server_url}): {response.status_code} - {error_content}")
+                    error = ConnectionError(f"Error {response.status_code} al conectar con {server_name}: {error_content}")
+                    if response.status_code >= 500 or response.status_code == 429:
+                        breaker.record_failure(f"HTTP {response.status_code}")
+                        balancer.record_failure(endpoint)
+                    else:
+                        # Error de la solicitud, no del servidor
+                        breaker.record_success(time.monotonic() - started)
+                        balancer.record_success(endpoint)
+                    recorded = True
+                    retryable = response.status_code in _RETRYABLE_STATUS
+            except httpx.RequestError as req_err:
+                if opened or isinstance(req_err, httpx.PoolTimeout):
+                    # Fallo durante el stream o pool local agotado: no es de la réplica
+                    raise
+                breaker.record_failure(f"{type(req_err).__name__}: {req_err}")
+                balancer.record_failure(endpoint)
+                recorded = True
+                error = req_err
+                retryable = isinstance(req_err, _RETRYABLE_ERRORS)
+            finally:
+                balancer.release(endpoint)
+                # Cancelada, pool local agotado u otro error antes del resultado
+                if probe and not recorded:
+                    breaker.release_probe()
+
+            delay = next(delays, None) if retryable else None
+            if delay is None:
+                raise error
+            logger.warning(f"Cliente Simplificado: Reintentando {server_name} en {delay:.2f}s tras error: {error}")
+            await asyncio.sleep(delay)
+
+    @staticmethod
+    def _decode_event(server_name: str, event: Optional[str], data: bytes) -> Optional[SimpleMessage]:
+        """
+        Convierte un evento SSE en SimpleMessage.
+
+        Sin línea `event:` el evento es `error` si su rol es "error" y
+        `message` en otro caso. Los eventos `end` y los desconocidos no
+        producen mensaje.
+        """
+        if event == "end":
+            logger.info(f"Cliente Simplificado: Recibido evento 'end' de {server_name}.")
+            return None
+        if event not in (None, "message", "error") or not data:
+            return None
+
+        # JSON y validación en una sola pasada de pydantic-core, sin dict intermedio
+        try:
+            message = SimpleMessage.model_validate_json(data)
+        except ValidationError as parse_error:
+            if event is not None:
+                logger.error(f"Cliente Simplificado: Error al parsear mensaje {event} de {server_name}: {parse_error} - Data: {data[:500]!r}")
+            return None
+        if event is None:
+            event = "error" if message.role == "error" else "message"
+
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f"Cliente Simplificado: Recibido {event} de {server_name}: {data[:500]!r}")
+        return message
+
+    async def prewarm(self):
+        """Abre por adelantado conexiones con los servidores MCP (ver `MCPHttpPool.prewarm`)."""
+        await self._pool.prewarm()
+
+    def get_pool_metrics(self) -> Dict[str, Any]:
+        """Métricas del pool de conexiones de cada servidor MCP."""
+        return self._pool.get_metrics()
+
+    def get_remote_status(self) -> Dict[str, Any]:
+        """Estado de las réplicas (balanceo y circuit breaker) de cada servidor MCP remoto."""
+        status = {}
+        for server_name, urls in SERVER_URLS.items():
+            if not urls:
+                continue
+            balancer = self._pool.balancer(server_name).get_status()
+            for endpoint in balancer["endpoints"]:
+                endpoint["circuit"] = self._pool.breaker(endpoint["url"]).get_status()
+            status[server_name] = {
+                "idempotent": server_name in MCP_RETRY_IDEMPOTENT_SERVERS,
+                **balancer,
+                "hedging": self._pool.hedge_policy(server_name).get_metrics()
+            }
+        return status
+
     async def close(self):
-        """Cierra el cliente HTTPX."""
-        if hasattr(self, '_http_client') and not self._http_client.is_closed:
-             await self._http_client.aclose()
-             logger.info("Cliente MCP Simplificado cerrado.")
-        else:
-             logger.info("Cliente MCP Simplificado ya estaba cerrado o no inicializado.")
+        """Cierra los clientes HTTPX del pool compartido."""
+        await self._pool.close()
+        logger.info("Cliente MCP Simplificado cerrado.")
 
 # Instancia global (o gestionada por dependencias FastAPI)
 mcp_client_instance = MCPClient()
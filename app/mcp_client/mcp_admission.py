@@ -0,0 +1,179 @@
+"""
+Control de admisión por servidor MCP para GENIA
+
+Este módulo limita las solicitudes concurrentes de cada servidor MCP y pone
+en una cola FIFO acotada las que exceden el límite. Cuando la cola está llena
+la solicitud se rechaza de inmediato, de modo que una integración saturada no
+acumula corrutinas sin límite ni arrastra al resto del backend.
+
+Autor: GENIA Team
+Fecha: Mayo 2025
+"""
+
+import os
+import time
+import asyncio
+import logging
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Dict, Any
+
+# Configurar logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger("mcp_admission")
+
+# Solicitudes en ejecución y en espera por servidor
+MCP_SERVER_MAX_CONCURRENT = int(os.getenv("MCP_SERVER_MAX_CONCURRENT", "16"))
+MCP_SERVER_MAX_QUEUED = int(os.getenv("MCP_SERVER_MAX_QUEUED", "64"))
+
+# Esperas recientes conservadas para los percentiles
+_WAIT_SAMPLES = 512
+
+class MCPServerBusyError(RuntimeError):
+    """El servidor MCP tiene la cola de espera llena o la espera venció."""
+
+class MCPAdmissionQueue:
+    """
+    Semáforo con cola FIFO acotada para las solicitudes de un servidor MCP.
+
+    Las plazas liberadas se entregan directamente a la solicitud más antigua
+    de la cola, por lo que el orden de llegada se respeta.
+    """
+
+    def __init__(self,
+                 name: str,
+                 max_concurrent: int = MCP_SERVER_MAX_CONCURRENT,
+                 max_queued: int = MCP_SERVER_MAX_QUEUED):
+        """
+        Inicializa la cola de admisión.
+
+        Args:
+            name: Nombre del servidor MCP
+            max_concurrent: Solicitudes en ejecución simultánea permitidas
+            max_queued: Solicitudes en espera permitidas (0 para rechazar sin esperar)
+        """
+        self.name = name
+        self.max_concurrent = max_concurrent
+        self.max_queued = max_queued
+        self.in_flight = 0
+        self._waiters: deque = deque()
+        self._waits: deque = deque(maxlen=_WAIT_SAMPLES)
+        self.metrics = {
+            "admitted": 0,
+            "queued": 0,
+            "rejected": 0,
+            "wait_timeouts": 0,
+            "max_queue_depth": 0
+        }
+
+    @property
+    def queue_depth(self) -> int:
+        """Número de solicitudes esperando plaza."""
+        return len(self._waiters)
+
+    @asynccontextmanager
+    async def slot(self, timeout: float = None):
+        """
+        Ocupa una plaza de ejecución durante el bloque `async with`.
+
+        Args:
+            timeout: Segundos máximos de espera en la cola
+
+        Yields:
+            Segundos esperados en la cola
+
+        Raises:
+            MCPServerBusyError: Si la cola está llena o la espera vence
+        """
+        waited = await self.acquire(timeout)
+        try:
+            yield waited
+        finally:
+            self.release()
+
+    async def acquire(self, timeout: float = None) -> float:
+        """
+        Espera una plaza de ejecución.
+
+        Args:
+            timeout: Segundos máximos de espera en la cola
+
+        Returns:
+            Segundos esperados en la cola
+        """
+        if self.in_flight < self.max_concurrent and not self._waiters:
+            self.in_flight += 1
+            self._record(0.0)
+            return 0.0
+
+        if len(self._waiters) >= self.max_queued:
+            self.metrics["rejected"] += 1
+            raise MCPServerBusyError(
+                f"Servidor MCP '{self.name}' ocupado: {self.in_flight} en ejecución "
+                f"y {len(self._waiters)} en espera"
+            )
+
+        started = time.monotonic()
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        self.metrics["queued"] += 1
+        self.metrics["max_queue_depth"] = max(self.metrics["max_queue_depth"], len(self._waiters))
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            if waiter.done() and not waiter.cancelled():
+                # La plaza llegó a la vez que la cancelación: devolverla
+                self.release()
+            else:
+                waiter.cancel()
+                try:
+                    self._waiters.remove(waiter)
+                except ValueError:
+                    pass
+            if isinstance(e, asyncio.CancelledError):
+                raise
+            self.metrics["wait_timeouts"] += 1
+            raise MCPServerBusyError(
+                f"Servidor MCP '{self.name}' ocupado: sin plaza tras {timeout}s en cola"
+            ) from None
+
+        waited = time.monotonic() - started
+        self._record(waited)
+        return waited
+
+    def release(self):
+        """Libera una plaza y la entrega a la primera solicitud en espera."""
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                # La plaza pasa directamente a la solicitud en espera
+                waiter.set_result(None)
+                return
+        self.in_flight -= 1
+
+    def _record(self, waited: float):
+        """Registra una admisión y su tiempo de espera."""
+        self.metrics["admitted"] += 1
+        self._waits.append(waited)
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """
+        Obtiene las métricas de admisión.
+
+        Returns:
+            Plazas ocupadas, profundidad de la cola, rechazos y tiempos de espera
+        """
+        waits = sorted(self._waits)
+        return {
+            **self.metrics,
+            "in_flight": self.in_flight,
+            "queue_depth": len(self._waiters),
+            "max_concurrent": self.max_concurrent,
+            "max_queued": self.max_queued,
+            "wait_avg": sum(waits) / len(waits) if waits else 0.0,
+            "wait_p95": waits[min(int(len(waits) * 0.95), len(waits) - 1)] if waits else 0.0,
+            "wait_max": waits[-1] if waits else 0.0
+        }
@@ -0,0 +1,228 @@
+"""
+Balanceo de carga entre réplicas de un servidor MCP remoto para GENIA
+
+Cada servicio de SERVER_URLS (OpenAI, Twilio, Stripe) puede tener varias
+réplicas. El balanceador elige la réplica de cada solicitud según sus
+solicitudes en curso:
+
+- p2c (power of two choices): compara dos réplicas al azar y elige la
+  menos ocupada; reparte casi tan bien como la mínima global sin que todas
+  las solicitudes simultáneas elijan la misma réplica.
+- least_outstanding: la réplica con menos solicitudes en curso.
+
+Una réplica con MCP_LB_EJECT_FAILURES fallos consecutivos se expulsa de
+forma pasiva y deja de recibir tráfico; una tarea en segundo plano la
+sondea cada MCP_LB_PROBE_INTERVAL segundos y la readmite cuando responde.
+
+Autor: GENIA Team
+Fecha: Mayo 2025
+"""
+
+import os
+import time
+import random
+import asyncio
+import logging
+from typing import Dict, Any, List, Optional, Callable, Awaitable, Iterable
+
+# Configurar logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger("mcp_balancer")
+
+# Estrategia de elección de réplica: p2c o least_outstanding
+MCP_LB_STRATEGY = os.getenv("MCP_LB_STRATEGY", "p2c")
+# Fallos consecutivos que expulsan una réplica
+MCP_LB_EJECT_FAILURES = int(os.getenv("MCP_LB_EJECT_FAILURES", "3"))
+# Segundos entre sondeos de las réplicas expulsadas
+MCP_LB_PROBE_INTERVAL = float(os.getenv("MCP_LB_PROBE_INTERVAL", "10"))
+
+STRATEGIES = ("p2c", "least_outstanding")
+
+Probe = Callable[[str], Awaitable[bool]]
+
+class MCPEndpoint:
+    """Réplica de un servidor MCP y sus contadores."""
+
+    def __init__(self, url: str):
+        """
+        Inicializa la réplica.
+
+        Args:
+            url: URL del endpoint MCP de la réplica
+        """
+        self.url = url
+        self.outstanding = 0
+        self.requests = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.ejected = False
+        self.ejected_at = 0.0
+        self.ejections = 0
+
+    def get_status(self) -> Dict[str, Any]:
+        """Estado y contadores de la réplica."""
+        return {
+            "url": self.url,
+            "outstanding": self.outstanding,
+            "requests": self.requests,
+            "failures": self.failures,
+            "ejected": self.ejected,
+            "ejected_for": time.monotonic() - self.ejected_at if self.ejected else 0.0,
+            "ejections": self.ejections
+        }
+
+class MCPLoadBalancer:
+    """
+    Réplicas de un servidor MCP con elección por carga y expulsión pasiva.
+    """
+
+    def __init__(self,
+                 name: str,
+                 urls: List[str],
+                 probe: Optional[Probe] = None,
+                 strategy: str = MCP_LB_STRATEGY,
+                 eject_failures: int = MCP_LB_EJECT_FAILURES,
+                 probe_interval: float = MCP_LB_PROBE_INTERVAL):
+        """
+        Inicializa el balanceador.
+
+        Args:
+            name: Nombre del servicio
+            urls: URLs de las réplicas
+            probe: Corrutina (url) -> bool que comprueba si una réplica responde;
+                   sin ella las réplicas expulsadas se readmiten tras `probe_interval`
+            strategy: p2c o least_outstanding
+            eject_failures: Fallos consecutivos que expulsan una réplica
+            probe_interval: Segundos entre sondeos de las réplicas expulsadas
+        """
+        if strategy not in STRATEGIES:
+            logger.warning(f"Estrategia de balanceo desconocida '{strategy}', se usa p2c")
+            strategy = "p2c"
+        self.name = name
+        self.endpoints = [MCPEndpoint(url) for url in urls]
+        self.probe = probe
+        self.strategy = strategy
+        self.eject_failures = eject_failures
+        self.probe_interval = probe_interval
+        self._probe_task: Optional[asyncio.Task] = None
+
+    def choose(self, exclude: Iterable[MCPEndpoint] = (),
+               available: Callable[[MCPEndpoint], bool] = None) -> MCPEndpoint:
+        """
+        Elige la réplica de una solicitud.
+
+        Se descartan las expulsadas, las de `exclude` (p. ej. ya intentadas)
+        y las que `available` rechace (p. ej. con el circuito abierto). Si no
+        queda ninguna se elige entre las no excluidas, y si tampoco, entre
+        todas: la solicitud fallará rápido en lugar de no enviarse.
+
+        Args:
+            exclude: Réplicas a evitar
+            available: Filtro adicional de réplicas utilizables
+
+        Returns:
+            Réplica elegida
+        """
+        excluded = set(id(endpoint) for endpoint in exclude)
+        allowed = [endpoint for endpoint in self.endpoints if id(endpoint) not in excluded] or self.endpoints
+        candidates = [
+            endpoint for endpoint in allowed
+            if not endpoint.ejected and (available is None or available(endpoint))
+        ] or allowed
+
+        if len(candidates) == 1:
+            return candidates[0]
+        if self.strategy == "least_outstanding":
+            least = min(endpoint.outstanding for endpoint in candidates)
+            return random.choice([endpoint for endpoint in candidates if endpoint.outstanding == least])
+        first, second = random.sample(candidates, 2)
+        return second if second.outstanding < first.outstanding else first
+
+    def acquire(self, endpoint: MCPEndpoint):
+        """Registra el inicio de una solicitud en la réplica."""
+        endpoint.outstanding += 1
+        endpoint.requests += 1
+
+    def release(self, endpoint: MCPEndpoint):
+        """Registra el fin de una solicitud en la réplica."""
+        endpoint.outstanding -= 1
+
+    def record_success(self, endpoint: MCPEndpoint):
+        """Registra una respuesta correcta de la réplica."""
+        endpoint.consecutive_failures = 0
+
+    def record_failure(self, endpoint: MCPEndpoint):
+        """
+        Registra un fallo de la réplica; la expulsa si acumula demasiados
+        seguidos y no es la última réplica sin expulsar.
+        """
+        endpoint.failures += 1
+        endpoint.consecutive_failures += 1
+        if (not endpoint.ejected and self.healthy_count() > 1
+                and endpoint.consecutive_failures >= self.eject_failures):
+            endpoint.ejected = True
+            endpoint.ejected_at = time.monotonic()
+            endpoint.ejections += 1
+            logger.warning(
+                f"Réplica {endpoint.url} de {self.name} expulsada tras "
+                f"{endpoint.consecutive_failures} fallos consecutivos"
+            )
+            self._ensure_probing()
+
+    def healthy_count(self) -> int:
+        """Réplicas no expulsadas; la última nunca se expulsa."""
+        return sum(1 for endpoint in self.endpoints if not endpoint.ejected)
+
+    def _ensure_probing(self):
+        """Inicia la tarea de sondeo de réplicas expulsadas si no está en marcha."""
+        if self._probe_task is None or self._probe_task.done():
+            self._probe_task = asyncio.get_running_loop().create_task(self._probe_loop())
+
+    async def _probe_loop(self):
+        """Sondea las réplicas expulsadas hasta readmitirlas todas."""
+        while True:
+            await asyncio.sleep(self.probe_interval)
+            ejected = [endpoint for endpoint in self.endpoints if endpoint.ejected]
+            if not ejected:
+                return
+            results = await asyncio.gather(*[self._check(endpoint) for endpoint in ejected])
+            for endpoint, healthy in zip(ejected, results):
+                if healthy:
+                    endpoint.ejected = False
+                    endpoint.consecutive_failures = 0
+                    logger.info(f"Réplica {endpoint.url} de {self.name} readmitida")
+
+    async def _check(self, endpoint: MCPEndpoint) -> bool:
+        """Comprueba una réplica expulsada con la función de sondeo."""
+        if self.probe is None:
+            return True
+        try:
+            return await self.probe(endpoint.url)
+        except Exception as e:
+            logger.debug(f"Sondeo de {endpoint.url} fallido: {e}")
+            return False
+
+    async def close(self):
+        """Detiene la tarea de sondeo."""
+        if self._probe_task is not None and not self._probe_task.done():
+            self._probe_task.cancel()
+            try:
+                await self._probe_task
+            except asyncio.CancelledError:
+                pass
+        self._probe_task = None
+
+    def get_status(self) -> Dict[str, Any]:
+        """
+        Obtiene el estado del balanceador.
+
+        Returns:
+            Estrategia y estado de cada réplica
+        """
+        return {
+            "strategy": self.strategy,
+            "endpoints": [endpoint.get_status() for endpoint in self.endpoints]
+        }
@@ -0,0 +1,462 @@
+"""
+Broker local de servidores MCP para varios workers
+
+Con varios workers de uvicorn cada proceso crearía su propio orquestador y
+sus propios contenedores docker/npx. En modo broker un único proceso es dueño
+de los subprocesos MCP (pool, caché, admisión) y el resto de workers le envía
+las solicitudes por un socket Unix con la misma API del orquestador.
+
+Modos (MCP_BROKER_MODE):
+    off     Cada proceso tiene su propio orquestador (por defecto)
+    server  Este proceso es el broker
+    client  Este proceso delega en el broker
+    auto    El primer proceso que toma el candado del socket es el broker y
+            el resto son clientes
+
+Autor: GENIA Team
+Fecha: Mayo 2025
+"""
+
+import os
+import json
+import fcntl
+import socket
+import asyncio
+import inspect
+import logging
+from typing import Dict, List, Any, Optional
+
+from .mcp_transport import (
+    StdioJSONRPCTransport,
+    MCPTransportError,
+    MCPTimeoutError,
+    MCPMessageTooLargeError,
+    MCP_MAX_MESSAGE_BYTES
+)
+from .mcp_admission import MCPServerBusyError
+from .mcp_schemas import MCPToolValidationError, MCPUnknownToolError
+from .mcp_orchestrator import MCPOrchestrator, MCPServerQuarantinedError
+
+# Configurar logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger("mcp_broker")
+
+# Modos del broker
+BROKER_OFF = "off"
+BROKER_SERVER = "server"
+BROKER_CLIENT = "client"
+BROKER_AUTO = "auto"
+
+MCP_BROKER_MODE = os.getenv("MCP_BROKER_MODE", BROKER_OFF).lower()
+MCP_BROKER_SOCKET = os.getenv("MCP_BROKER_SOCKET", "/tmp/genia-mcp-broker.sock")
+
+# Tiempo máximo para conectar con el broker (puede estar arrancando)
+MCP_BROKER_CONNECT_TIMEOUT = float(os.getenv("MCP_BROKER_CONNECT_TIMEOUT", "30"))
+
+# Solicitudes simultáneas de un worker al broker (la admisión la aplica el broker)
+_BROKER_MAX_IN_FLIGHT = 1024
+
+# Métodos del orquestador que el broker expone
+BROKER_METHODS = frozenset({
+    "send_request",
+    "call_tool",
+    "save_user_tokens",
+    "load_user_tokens",
+    "delete_user_tokens",
+    "start_server",
+    "stop_server",
+    "prewarm",
+    "get_server_status",
+    "get_server_logs",
+    "get_pool_metrics",
+    "get_cache_metrics",
+    "get_admission_metrics",
+    "get_tool_metrics",
+    "get_lifecycle_report",
+    "list_tools"
+})
+
+# Excepciones que se reconstruyen en el cliente con su tipo original
+_ERROR_TYPES = {
+    "MCPTimeoutError": MCPTimeoutError,
+    "MCPMessageTooLargeError": MCPMessageTooLargeError,
+    "MCPTransportError": MCPTransportError,
+    "MCPServerBusyError": MCPServerBusyError,
+    "MCPServerQuarantinedError": MCPServerQuarantinedError,
+    "MCPUnknownToolError": MCPUnknownToolError,
+    "MCPToolValidationError": MCPToolValidationError,
+    "ValueError": ValueError
+}
+
+# Código JSON-RPC de los errores de aplicación
+_APPLICATION_ERROR = -32000
+
+# Candado del modo auto (se mantiene abierto mientras viva el proceso)
+_broker_lock_fd: Optional[int] = None
+
+def resolve_broker_mode(mode: str = None, socket_path: str = None) -> str:
+    """
+    Determina el papel de este proceso.
+
+    En modo `auto` el primer proceso que obtiene el candado exclusivo junto al
+    socket es el broker; el candado se libera solo al terminar el proceso, de
+    modo que el siguiente worker en arrancar ocupa su lugar.
+
+    Args:
+        mode: Modo configurado (por defecto MCP_BROKER_MODE)
+        socket_path: Ruta del socket (por defecto MCP_BROKER_SOCKET)
+
+    Returns:
+        BROKER_OFF, BROKER_SERVER o BROKER_CLIENT
+    """
+    global _broker_lock_fd
+    mode = (mode or MCP_BROKER_MODE).lower()
+    if mode != BROKER_AUTO:
+        return mode if mode in (BROKER_SERVER, BROKER_CLIENT) else BROKER_OFF
+
+    if _broker_lock_fd is not None:
+        return BROKER_SERVER
+
+    fd = os.open((socket_path or MCP_BROKER_SOCKET) + ".lock", os.O_CREAT | os.O_RDWR, 0o600)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        os.close(fd)
+        return BROKER_CLIENT
+
+    _broker_lock_fd = fd
+    return BROKER_SERVER
+
+class MCPBrokerServer:
+    """
+    Expone un orquestador por un socket Unix.
+
+    El protocolo es JSON-RPC 2.0 delimitado por saltos de línea: `method` es el
+    nombre del método del orquestador y `params` sus argumentos por nombre.
+    Cada conexión admite varias solicitudes simultáneas.
+    """
+
+    def __init__(self, orchestrator: MCPOrchestrator, socket_path: str = MCP_BROKER_SOCKET):
+        """
+        Inicializa el broker.
+
+        Args:
+            orchestrator: Orquestador dueño de los subprocesos MCP
+            socket_path: Ruta del socket Unix
+        """
+        self.orchestrator = orchestrator
+        self.socket_path = socket_path
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._connections: set = set()
+        self.metrics = {
+            "connections": 0,
+            "requests": 0,
+            "errors": 0
+        }
+
+    async def start(self):
+        """Empieza a aceptar conexiones en el socket."""
+        _remove_stale_socket(self.socket_path)
+        # El socket sirve tokens de usuario: se crea ya solo accesible por el
+        # propietario (un chmod posterior dejaría una ventana con permisos por defecto)
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        previous_umask = os.umask(0o177)
+        try:
+            sock.bind(self.socket_path)
+        except OSError:
+            sock.close()
+            raise
+        finally:
+            os.umask(previous_umask)
+        self._server = await asyncio.start_unix_server(
+            self._handle_connection,
+            sock=sock,
+            limit=MCP_MAX_MESSAGE_BYTES
+        )
+        logger.info(f"Broker MCP escuchando en {self.socket_path}")
+
+    async def close(self):
+        """Deja de aceptar conexiones y cierra las existentes."""
+        if self._server is None:
+            return
+        self._server.close()
+        for writer in list(self._connections):
+            writer.close()
+        await self._server.wait_closed()
+        self._server = None
+        try:
+            os.unlink(self.socket_path)
+        except FileNotFoundError:
+            pass
+        logger.info("Broker MCP detenido")
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """Atiende las solicitudes de un worker hasta que cierra la conexión."""
+        self._connections.add(writer)
+        self.metrics["connections"] += 1
+        write_lock = asyncio.Lock()
+        tasks: Dict[Any, asyncio.Task] = {}
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    message = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                if not isinstance(message, dict):
+                    continue
+
+                if message.get("method") == "notifications/cancelled":
+                    # El worker dejó de esperar: cancelar la solicitud en el broker
+                    task = tasks.get((message.get("params") or {}).get("requestId"))
+                    if task is not None:
+                        task.cancel()
+                    continue
+                if "id" not in message:
+                    continue
+
+                request_id = message["id"]
+                task = asyncio.create_task(self._handle_message(message, writer, write_lock))
+                tasks[request_id] = task
+                task.add_done_callback(lambda _, request_id=request_id: tasks.pop(request_id, None))
+        except Exception as e:
+            logger.debug(f"Conexión con worker cerrada: {e}")
+        finally:
+            for task in list(tasks.values()):
+                task.cancel()
+            self._connections.discard(writer)
+            writer.close()
+
+    async def _handle_message(self,
+                              message: Dict[str, Any],
+                              writer: asyncio.StreamWriter,
+                              write_lock: asyncio.Lock):
+        """Ejecuta una solicitud en el orquestador y escribe su respuesta."""
+        self.metrics["requests"] += 1
+        response: Dict[str, Any] = {"jsonrpc": "2.0", "id": message["id"]}
+        method = message.get("method")
+        try:
+            if method not in BROKER_METHODS:
+                raise ValueError(f"Método de broker no soportado: {method}")
+            result = getattr(self.orchestrator, method)(**(message.get("params") or {}))
+            if inspect.isawaitable(result):
+                result = await result
+            response["result"] = result
+        except Exception as e:
+            self.metrics["errors"] += 1
+            response["error"] = {
+                "code": _APPLICATION_ERROR,
+                "message": str(e),
+                "data": {"type": type(e).__name__}
+            }
+
+        data = json.dumps(response, default=str).encode('utf-8') + b"\n"
+        try:
+            async with write_lock:
+                writer.write(data)
+                await writer.drain()
+        except ConnectionError as e:
+            logger.debug(f"No se pudo responder al worker: {e}")
+
+class MCPBrokerOrchestrator:
+    """
+    Orquestador de un worker que delega en el broker.
+
+    Ofrece la misma API asíncrona que `MCPOrchestrator` para las solicitudes
+    y los tokens; los métodos de estado y métricas son asíncronos porque
+    consultan al broker. El registro de servidores es local y no tiene efecto:
+    los servidores los registra el proceso broker.
+    """
+
+    def __init__(self, socket_path: str = MCP_BROKER_SOCKET):
+        """
+        Inicializa el cliente del broker.
+
+        Args:
+            socket_path: Ruta del socket Unix del broker
+        """
+        self.socket_path = socket_path
+        self.servers: Dict[str, Dict[str, Any]] = {}
+        self._transport: Optional[StdioJSONRPCTransport] = None
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._connect_lock = asyncio.Lock()
+
+    def register_server(self, name: str, command: List[str], env_vars: Dict[str, str] = None, **kwargs) -> bool:
+        """Registra el nombre del servidor (el broker gestiona el proceso)."""
+        self.servers[name] = {"command": command}
+        return True
+
+    async def connect(self, timeout: float = MCP_BROKER_CONNECT_TIMEOUT):
+        """
+        Conecta con el broker, reintentando mientras arranca.
+
+        Args:
+            timeout: Segundos máximos de espera
+        """
+        async with self._connect_lock:
+            if self._transport is not None and not self._transport.closed:
+                return
+
+            deadline = asyncio.get_running_loop().time() + timeout
+            delay = 0.1
+            while True:
+                try:
+                    reader, writer = await asyncio.open_unix_connection(
+                        self.socket_path, limit=MCP_MAX_MESSAGE_BYTES
+                    )
+                    break
+                except (FileNotFoundError, ConnectionRefusedError) as e:
+                    if asyncio.get_running_loop().time() + delay > deadline:
+                        raise MCPTransportError(f"Broker MCP no disponible en {self.socket_path}: {e}") from e
+                    await asyncio.sleep(delay)
+                    delay = min(delay * 2, 2.0)
+
+            self._writer = writer
+            self._transport = StdioJSONRPCTransport(
+                "broker", reader, writer, max_in_flight=_BROKER_MAX_IN_FLIGHT
+            )
+            self._transport.start()
+            logger.info(f"Conectado al broker MCP en {self.socket_path}")
+
+    async def close(self):
+        """Cierra la conexión con el broker."""
+        if self._transport is not None:
+            await self._transport.close()
+            self._transport = None
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+    async def _call(self, method: str, **params) -> Any:
+        """Ejecuta un método del orquestador en el broker."""
+        if self._transport is None or self._transport.closed:
+            await self.connect()
+
+        response = await self._transport.request({"method": method, "params": params})
+        if "error" in response:
+            error = response["error"]
+            error_type = (error.get("data") or {}).get("type")
+            raise _ERROR_TYPES.get(error_type, RuntimeError)(error.get("message"))
+        return response.get("result")
+
+    async def send_request(self,
+                           server_name: str,
+                           request: Dict[str, Any],
+                           env_vars: Dict[str, str] = None,
+                           command: List[str] = None,
+                           timeout: float = None,
+                           on_progress=None) -> Dict[str, Any]:
+        """Envía una solicitud a un servidor MCP a través del broker."""
+        if on_progress is not None:
+            logger.debug("Las notificaciones de progreso no se reenvían a través del broker")
+        return await self._call(
+            "send_request",
+            server_name=server_name,
+            request=request,
+            env_vars=env_vars,
+            command=command,
+            timeout=timeout
+        )
+
+    async def call_tool(self,
+                        server_name: str,
+                        operation: str,
+                        arguments: Dict[str, Any] = None,
+                        user_id: str = None,
+                        env_vars: Dict[str, str] = None,
+                        command: List[str] = None,
+                        timeout: float = None,
+                        use_cache: bool = True) -> Dict[str, Any]:
+        """Ejecuta una herramienta a través del broker (y de su caché)."""
+        return await self._call(
+            "call_tool",
+            server_name=server_name,
+            operation=operation,
+            arguments=arguments,
+            user_id=user_id,
+            env_vars=env_vars,
+            command=command,
+            timeout=timeout,
+            use_cache=use_cache
+        )
+
+    async def save_user_tokens(self, user_id: str, tokens: Dict[str, str], service: str) -> bool:
+        """Guarda tokens de usuario (el broker invalida su caché)."""
+        return await self._call("save_user_tokens", user_id=user_id, tokens=tokens, service=service)
+
+    async def load_user_tokens(self, user_id: str, service: str = None) -> Optional[Dict[str, str]]:
+        """Carga tokens de usuario."""
+        return await self._call("load_user_tokens", user_id=user_id, service=service)
+
+    async def delete_user_tokens(self, user_id: str, service: str = None) -> bool:
+        """Elimina tokens de usuario."""
+        return await self._call("delete_user_tokens", user_id=user_id, service=service)
+
+    async def start_server(self, name: str) -> bool:
+        """Inicia un servidor MCP en el broker."""
+        return await self._call("start_server", name=name)
+
+    async def stop_server(self, name: str) -> bool:
+        """Detiene un servidor MCP en el broker."""
+        return await self._call("stop_server", name=name)
+
+    async def prewarm(self) -> Dict[str, bool]:
+        """El precalentamiento lo hace el broker; en el worker solo se conecta."""
+        await self.connect()
+        return {}
+
+    async def stop_all_servers(self) -> Dict[str, bool]:
+        """Cierra la conexión; los servidores siguen en el broker para el resto de workers."""
+        await self.close()
+        return {}
+
+    async def get_server_status(self) -> Dict[str, Dict[str, Any]]:
+        """Obtiene el estado de los servidores del broker."""
+        return await self._call("get_server_status")
+
+    async def get_server_logs(self, name: str, lines: int = 100) -> List[Dict[str, Any]]:
+        """Obtiene las últimas líneas de salida de un servidor del broker."""
+        return await self._call("get_server_logs", name=name, lines=lines)
+
+    async def get_pool_metrics(self) -> Dict[str, Any]:
+        """Obtiene las métricas del pool del broker."""
+        return await self._call("get_pool_metrics")
+
+    async def get_cache_metrics(self) -> Dict[str, Any]:
+        """Obtiene las métricas de la caché del broker."""
+        return await self._call("get_cache_metrics")
+
+    async def get_admission_metrics(self) -> Dict[str, Dict[str, Any]]:
+        """Obtiene las métricas de admisión del broker."""
+        return await self._call("get_admission_metrics")
+
+    async def get_lifecycle_report(self) -> Dict[str, Dict[str, Any]]:
+        """Obtiene los informes de arranque y parada del broker."""
+        return await self._call("get_lifecycle_report")
+    
+    async def get_tool_metrics(self) -> Dict[str, Any]:
+        """Obtiene las métricas del catálogo de herramientas del broker."""
+        return await self._call("get_tool_metrics")
+    
+    async def list_tools(self, server_name: str) -> List[Dict[str, Any]]:
+        """Obtiene las herramientas conocidas de un servidor del broker."""
+        return await self._call("list_tools", server_name=server_name)
+
+def _remove_stale_socket(socket_path: str):
+    """Elimina un socket que ya no tiene ningún broker escuchando."""
+    if not os.path.exists(socket_path):
+        return
+    probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        probe.connect(socket_path)
+    except (ConnectionRefusedError, FileNotFoundError):
+        os.unlink(socket_path)
+        return
+    finally:
+        probe.close()
+    raise MCPTransportError(f"Ya hay un broker MCP escuchando en {socket_path}")
@@ -0,0 +1,313 @@
+"""
+Caché de lectura para operaciones MCP idempotentes
+
+Este módulo implementa una caché read-through con TTL por operación para las
+operaciones de solo lectura de los servidores MCP (perfil de GitHub, listados
+de repositorios, búsquedas de Notion, listas de Trello...), de forma que los
+endpoints de panel se respondan desde memoria sin ir y volver por stdio.
+
+Autor: GENIA Team
+Fecha: Mayo 2025
+"""
+
+import os
+import json
+import time
+import asyncio
+import logging
+from collections import OrderedDict
+from typing import Dict, Any, Optional, Tuple, Callable, Awaitable
+from .mcp_services import MCP_SERVICES
+
+# Configurar logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger("mcp_cache")
+
+# Configuración de la caché
+MCP_CACHE_ENABLED = os.getenv("MCP_CACHE_ENABLED", "true").lower() == "true"
+MCP_CACHE_MAX_ENTRIES = int(os.getenv("MCP_CACHE_MAX_ENTRIES", "1000"))
+
+# TTL en segundos de las operaciones de lectura cacheables (tabla de servicios)
+DEFAULT_CACHE_TTLS: Dict[Tuple[str, str], float] = {
+    (spec.name, operation): ttl
+    for spec in MCP_SERVICES.values()
+    for operation, ttl in spec.cache_ttls.items()
+}
+
+# TTL adicionales o sustitutos ({"servidor.operacion": segundos})
+MCP_CACHE_TTLS: Dict[str, float] = json.loads(os.getenv("MCP_CACHE_TTLS", "{}"))
+
+# Prefijos de operaciones que modifican datos del servicio
+WRITE_OPERATION_PREFIXES = (
+    "create", "update", "delete", "remove", "add", "edit", "set", "patch",
+    "post", "send", "reply", "comment", "upload", "write", "append", "insert",
+    "move", "archive", "close", "merge", "push", "fork", "like", "retweet",
+    "follow", "unfollow", "batch"
+)
+
+CacheKey = Tuple[str, str, str, str]
+
+def canonical_arguments(arguments: Optional[Dict[str, Any]]) -> str:
+    """
+    Serializa los argumentos de forma canónica (claves ordenadas).
+
+    Args:
+        arguments: Argumentos de la operación
+
+    Returns:
+        JSON canónico de los argumentos
+    """
+    return json.dumps(arguments or {}, sort_keys=True, separators=(",", ":"), default=str)
+
+def is_write_operation(operation: str) -> bool:
+    """
+    Indica si una operación modifica datos del servicio.
+
+    Args:
+        operation: Nombre de la operación
+
+    Returns:
+        True si el nombre empieza por un verbo de escritura
+    """
+    verb = operation.replace("-", "_").split("_", 1)[0].lower()
+    return verb in WRITE_OPERATION_PREFIXES
+
+class MCPResponseCache:
+    """
+    Caché LRU con TTL por operación de respuestas MCP.
+
+    Las claves son (servicio, operación, argumentos canónicos, usuario), por
+    lo que un usuario nunca recibe datos obtenidos con las credenciales de
+    otro. Las solicitudes simultáneas a la misma clave comparten una única
+    llamada al servidor. Las respuestas cacheadas se comparten entre
+    llamadores y no deben modificarse.
+    """
+
+    def __init__(self,
+                 max_entries: int = MCP_CACHE_MAX_ENTRIES,
+                 ttls: Dict[Tuple[str, str], float] = None,
+                 enabled: bool = MCP_CACHE_ENABLED):
+        """
+        Inicializa la caché.
+
+        Args:
+            max_entries: Número máximo de respuestas almacenadas
+            ttls: TTL por (servicio, operación); por defecto la tabla del módulo
+            enabled: Activa o desactiva la caché
+        """
+        self.max_entries = max_entries
+        self.enabled = enabled
+        self.ttls: Dict[Tuple[str, str], float] = dict(DEFAULT_CACHE_TTLS if ttls is None else ttls)
+        if ttls is None:
+            for key, seconds in MCP_CACHE_TTLS.items():
+                if "." in key:
+                    self.ttls[tuple(key.split(".", 1))] = float(seconds)
+
+        self._entries: "OrderedDict[CacheKey, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._in_flight: Dict[CacheKey, asyncio.Future] = {}
+        self._generations: Dict[str, int] = {}
+        self._user_generations: Dict[str, int] = {}
+        self.metrics = {
+            "hits": 0,
+            "misses": 0,
+            "coalesced": 0,
+            "stores": 0,
+            "evictions": 0,
+            "expirations": 0,
+            "invalidations": 0
+        }
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def set_ttl(self, service: str, operation: str, ttl: float):
+        """
+        Configura el TTL de una operación (0 la deja fuera de la caché).
+
+        Args:
+            service: Nombre del servicio MCP
+            operation: Nombre de la operación
+            ttl: TTL en segundos
+        """
+        self.ttls[(service, operation)] = ttl
+
+    def ttl_for(self, service: str, operation: str) -> float:
+        """Obtiene el TTL de una operación (0 si no es cacheable)."""
+        return self.ttls.get((service, operation), 0)
+
+    async def get_or_call(self,
+                          service: str,
+                          operation: str,
+                          arguments: Optional[Dict[str, Any]],
+                          user_id: Optional[str],
+                          call: Callable[[], Awaitable[Dict[str, Any]]],
+                          refresh: bool = False) -> Dict[str, Any]:
+        """
+        Devuelve la respuesta cacheada o ejecuta la llamada y la almacena.
+
+        Las operaciones de escritura invalidan la caché del servicio antes de
+        ejecutarse; las que no tienen TTL se ejecutan sin caché.
+
+        Args:
+            service: Nombre del servicio MCP
+            operation: Nombre de la operación
+            arguments: Argumentos de la operación
+            user_id: ID del usuario cuyas credenciales se usan
+            call: Corrutina que ejecuta la operación en el servidor
+            refresh: Ignorar la respuesta cacheada y sustituirla por una nueva
+
+        Returns:
+            Respuesta del servidor MCP
+        """
+        if is_write_operation(operation):
+            self.invalidate(service)
+            return await call()
+
+        ttl = self.ttl_for(service, operation)
+        if not self.enabled or ttl <= 0:
+            return await call()
+
+        key = (service, operation, canonical_arguments(arguments), user_id or "")
+        cached = None if refresh else self._get(key)
+        if cached is not None:
+            self.metrics["hits"] += 1
+            return cached
+
+        while not refresh:
+            in_flight = self._in_flight.get(key)
+            if in_flight is None:
+                break
+            self.metrics["coalesced"] += 1
+            try:
+                return await asyncio.shield(in_flight)
+            except asyncio.CancelledError:
+                if not in_flight.cancelled():
+                    raise
+                # Se canceló el llamador que ejecutaba la operación (p. ej. cliente
+                # desconectado), no esta solicitud: repetirla como nueva
+                logger.debug(f"Llamada compartida a '{service}.{operation}' cancelada; se repite")
+
+        self.metrics["misses"] += 1
+        generation = self._generation(service, user_id)
+        future = asyncio.get_running_loop().create_future()
+        self._in_flight[key] = future
+        try:
+            response = await call()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Evitar avisos de excepción no recuperada si nadie más esperaba
+            future.exception()
+            raise
+        finally:
+            if self._in_flight.get(key) is future:
+                del self._in_flight[key]
+
+        future.set_result(response)
+        # No almacenar si hubo una escritura durante la llamada o si falló
+        if self._generation(service, user_id) == generation and _is_cacheable(response):
+            self._store(key, ttl, response)
+        return response
+
+    def _generation(self, service: str, user_id: Optional[str]) -> Tuple[int, int]:
+        """Generación de invalidaciones del servicio y del usuario."""
+        return self._generations.get(service, 0), self._user_generations.get(user_id or "", 0)
+
+    def _get(self, key: CacheKey) -> Optional[Dict[str, Any]]:
+        """Obtiene una entrada vigente y la marca como usada recientemente."""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, response = entry
+        if time.monotonic() >= expires_at:
+            del self._entries[key]
+            self.metrics["expirations"] += 1
+            return None
+        self._entries.move_to_end(key)
+        return response
+
+    def _store(self, key: CacheKey, ttl: float, response: Dict[str, Any]):
+        """Almacena una respuesta y expulsa las menos usadas si se supera el máximo."""
+        self._entries[key] = (time.monotonic() + ttl, response)
+        self._entries.move_to_end(key)
+        self.metrics["stores"] += 1
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.metrics["evictions"] += 1
+
+    def invalidate(self, service: str, user_id: Optional[str] = None) -> int:
+        """
+        Elimina las respuestas cacheadas de un servicio.
+
+        Args:
+            service: Nombre del servicio MCP
+            user_id: Limitar a las respuestas de un usuario
+
+        Returns:
+            Número de entradas eliminadas
+        """
+        # Las llamadas en curso no deben almacenar datos previos a la invalidación
+        if user_id is None:
+            self._generations[service] = self._generations.get(service, 0) + 1
+        else:
+            self._user_generations[user_id] = self._user_generations.get(user_id, 0) + 1
+        keys = [
+            key for key in self._entries
+            if key[0] == service and (user_id is None or key[3] == user_id)
+        ]
+        for key in keys:
+            del self._entries[key]
+        if keys:
+            self.metrics["invalidations"] += len(keys)
+            logger.debug(f"Invalidadas {len(keys)} respuestas cacheadas de '{service}'")
+        return len(keys)
+
+    def invalidate_user(self, user_id: str) -> int:
+        """
+        Elimina todas las respuestas cacheadas de un usuario (p. ej. al cambiar sus tokens).
+
+        Args:
+            user_id: ID del usuario
+
+        Returns:
+            Número de entradas eliminadas
+        """
+        # Las llamadas en curso con los tokens anteriores no deben almacenar su respuesta
+        self._user_generations[user_id] = self._user_generations.get(user_id, 0) + 1
+        keys = [key for key in self._entries if key[3] == user_id]
+        for key in keys:
+            del self._entries[key]
+        self.metrics["invalidations"] += len(keys)
+        return len(keys)
+
+    def clear(self):
+        """Vacía la caché."""
+        self._entries.clear()
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """
+        Obtiene las métricas de la caché.
+
+        Returns:
+            Aciertos, fallos, llamadas compartidas, expulsiones, invalidaciones, tamaño y ratio de aciertos
+        """
+        lookups = self.metrics["hits"] + self.metrics["misses"] + self.metrics["coalesced"]
+        return {
+            **self.metrics,
+            "enabled": self.enabled,
+            "size": len(self._entries),
+            "max_entries": self.max_entries,
+            "hit_ratio": self.metrics["hits"] / lookups if lookups else 0.0
+        }
+
+def _is_cacheable(response: Dict[str, Any]) -> bool:
+    """Indica si una respuesta es un resultado correcto que puede cachearse."""
+    if not isinstance(response, dict) or "error" in response:
+        return False
+    result = response.get("result")
+    return not (isinstance(result, dict) and result.get("isError"))
@@ -0,0 +1,547 @@
+"""
+Índice local de eventos de Google Calendar por usuario
+
+Este módulo mantiene en memoria los eventos de calendario de cada usuario
+para responder `list_events` sin ir al servidor MCP. Los eventos se indexan
+por intervalo (inicio ordenado más la duración máxima conocida), de modo que
+una consulta por rango es una búsqueda binaria. El índice recuerda qué
+ventanas de tiempo ha descargado y solo pide al servidor las que faltan.
+
+Si el servidor devuelve `nextSyncToken`, el índice se mantiene al día con
+sincronizaciones incrementales; si no, las ventanas descargadas caducan
+pasados GOOGLE_CALENDAR_INDEX_TTL segundos y se vuelven a pedir. Las
+escrituras del cliente (crear, actualizar, eliminar) se aplican al índice
+en cuanto el servidor las confirma.
+
+Autor: GENIA Team
+Fecha: Mayo 2025
+"""
+
+import os
+import json
+import time
+import bisect
+import asyncio
+import logging
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Dict, List, Any, Optional, Tuple, Callable, Awaitable
+
+# Configurar logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger("mcp_calendar_index")
+
+# Configuración del índice
+GOOGLE_CALENDAR_INDEX_ENABLED = os.getenv("GOOGLE_CALENDAR_INDEX_ENABLED", "true").lower() == "true"
+GOOGLE_CALENDAR_INDEX_MAX_USERS = int(os.getenv("GOOGLE_CALENDAR_INDEX_MAX_USERS", "1000"))
+# Segundos entre sincronizaciones incrementales de un usuario
+GOOGLE_CALENDAR_SYNC_INTERVAL = float(os.getenv("GOOGLE_CALENDAR_SYNC_INTERVAL", "30"))
+# Validez de una ventana descargada cuando el servidor no da sync tokens
+GOOGLE_CALENDAR_INDEX_TTL = float(os.getenv("GOOGLE_CALENDAR_INDEX_TTL", "300"))
+# Eventos pedidos por ventana; si se alcanza, la ventana no se da por completa
+GOOGLE_CALENDAR_INDEX_FETCH_MAX = int(os.getenv("GOOGLE_CALENDAR_INDEX_FETCH_MAX", "2500"))
+
+# Las ventanas se descargan en días completos (UTC) para que las consultas
+# "desde ahora" de un mismo día no dejen huecos
+_DAY = 86400.0
+
+Execute = Callable[[str, Dict[str, Any]], Awaitable[Dict[str, Any]]]
+
+def parse_event_time(value: Any) -> Optional[float]:
+    """
+    Convierte una fecha de Google Calendar a segundos desde la época (UTC).
+
+    Args:
+        value: {"dateTime": ISO}, {"date": "AAAA-MM-DD"} o una cadena ISO
+
+    Returns:
+        Timestamp, o None si no se puede interpretar
+    """
+    if isinstance(value, dict):
+        value = value.get("dateTime") or value.get("date")
+    if not isinstance(value, str) or not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
+
+def format_event_time(timestamp: float) -> str:
+    """Timestamp a ISO 8601 en UTC con sufijo Z."""
+    return datetime.fromtimestamp(timestamp, timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+def extract_payload(response: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Obtiene el contenido de la respuesta de una operación del servidor.
+
+    Acepta resultados estructurados (`structuredContent` o el propio
+    resultado) y contenido de texto con JSON.
+
+    Args:
+        response: Resultado de `execute_operation` del orquestador
+
+    Returns:
+        Diccionario con el contenido (vacío si no hay)
+    """
+    result = (response.get("response") or {}).get("result") or {}
+    if not isinstance(result, dict):
+        return {}
+    if isinstance(result.get("structuredContent"), dict):
+        return result["structuredContent"]
+    for item in result.get("content") or []:
+        if isinstance(item, dict) and item.get("type") == "text":
+            try:
+                payload = json.loads(item.get("text") or "")
+            except ValueError:
+                continue
+            if isinstance(payload, dict):
+                return payload
+            if isinstance(payload, list):
+                return {"events": payload}
+    return result
+
+def events_of(payload: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Lista de eventos de un contenido (`events` o `items` de la API de Google)."""
+    events = payload.get("events", payload.get("items"))
+    return [event for event in events or [] if isinstance(event, dict) and event.get("id")]
+
+def merge_intervals(intervals: List[Tuple[float, float]]) -> List[Tuple[float, float]]:
+    """Fusiona intervalos solapados o contiguos; devuelve la lista ordenada."""
+    merged: List[Tuple[float, float]] = []
+    for start, end in sorted(intervals):
+        if merged and start <= merged[-1][1]:
+            if end > merged[-1][1]:
+                merged[-1] = (merged[-1][0], end)
+        else:
+            merged.append((start, end))
+    return merged
+
+def busy_intervals(events: List[Dict[str, Any]], start: float, end: float) -> List[Tuple[float, float]]:
+    """
+    Intervalos ocupados por unos eventos dentro de [start, end), fusionados.
+
+    No ocupan tiempo los eventos cancelados, los marcados como disponibles
+    (`transparency: transparent`) ni los que el propio usuario ha rechazado.
+
+    Args:
+        events: Eventos de Google Calendar
+        start: Inicio de la ventana
+        end: Fin de la ventana
+
+    Returns:
+        Intervalos (inicio, fin) ordenados y sin solapes
+    """
+    spans = []
+    for event in events:
+        if event.get("status") == "cancelled" or event.get("transparency") == "transparent":
+            continue
+        if any(isinstance(attendee, dict) and attendee.get("self") and attendee.get("responseStatus") == "declined"
+               for attendee in event.get("attendees") or []):
+            continue
+        event_start = parse_event_time(event.get("start"))
+        event_end = parse_event_time(event.get("end"))
+        if event_start is None or event_end is None:
+            continue
+        event_start = max(event_start, start)
+        event_end = min(event_end, end)
+        if event_end > event_start:
+            spans.append((event_start, event_end))
+    return merge_intervals(spans)
+
+def free_slots(busy: List[Tuple[float, float]], start: float, end: float, duration: float) -> List[Tuple[float, float]]:
+    """
+    Huecos libres de [start, end) de al menos `duration` segundos.
+
+    Args:
+        busy: Intervalos ocupados, ordenados y fusionados (ver `merge_intervals`)
+        start: Inicio de la ventana
+        end: Fin de la ventana
+        duration: Duración mínima del hueco en segundos
+
+    Returns:
+        Huecos (inicio, fin) ordenados
+    """
+    slots = []
+    cursor = start
+    for busy_start, busy_end in busy:
+        if busy_start - cursor >= duration:
+            slots.append((cursor, min(busy_start, end)))
+        cursor = max(cursor, busy_end)
+        if cursor >= end:
+            break
+    if end - cursor >= duration:
+        slots.append((cursor, end))
+    return slots
+
+class UserCalendarIndex:
+    """
+    Eventos de un usuario indexados por intervalo y ventanas descargadas.
+    """
+
+    def __init__(self):
+        """Inicializa un índice vacío."""
+        self.events: Dict[str, Dict[str, Any]] = {}
+        self._spans: Dict[str, Tuple[float, float]] = {}
+        self._starts: List[Tuple[float, str]] = []
+        self._max_duration = 0.0
+        # Ventanas descargadas: (inicio, fin, momento de la descarga)
+        self.windows: List[Tuple[float, float, float]] = []
+        self.sync_token: Optional[str] = None
+        self.last_sync = 0.0
+        self.lock = asyncio.Lock()
+
+    def upsert(self, event: Dict[str, Any]):
+        """Inserta o sustituye un evento."""
+        event_id = event["id"]
+        self.remove(event_id)
+        self.events[event_id] = event
+        span = self._span(event)
+        if span is None:
+            return
+        self._spans[event_id] = span
+        bisect.insort(self._starts, (span[0], event_id))
+        self._max_duration = max(self._max_duration, span[1] - span[0])
+
+    def bulk_update(self, upserts: List[Dict[str, Any]], removals: List[str]):
+        """
+        Inserta y elimina varios eventos reordenando el índice una sola vez.
+
+        Args:
+            upserts: Eventos a insertar o sustituir
+            removals: IDs de los eventos a eliminar
+        """
+        changed = set(removals) | {event["id"] for event in upserts}
+        for event_id in changed:
+            self.events.pop(event_id, None)
+            self._spans.pop(event_id, None)
+        self._starts = [entry for entry in self._starts if entry[1] not in changed]
+        for event in upserts:
+            event_id = event["id"]
+            self.events[event_id] = event
+            span = self._span(event)
+            if span is None:
+                continue
+            self._spans[event_id] = span
+            self._starts.append((span[0], event_id))
+            self._max_duration = max(self._max_duration, span[1] - span[0])
+        self._starts.sort()
+
+    @staticmethod
+    def _span(event: Dict[str, Any]) -> Optional[Tuple[float, float]]:
+        """Intervalo (inicio, fin) de un evento, o None si no tiene inicio."""
+        start = parse_event_time(event.get("start"))
+        if start is None:
+            return None
+        end = parse_event_time(event.get("end"))
+        return start, start if end is None or end < start else end
+
+    def remove(self, event_id: str) -> bool:
+        """Elimina un evento; devuelve True si estaba indexado."""
+        if self.events.pop(event_id, None) is None:
+            return False
+        span = self._spans.pop(event_id, None)
+        if span is not None:
+            position = bisect.bisect_left(self._starts, (span[0], event_id))
+            if position < len(self._starts) and self._starts[position] == (span[0], event_id):
+                del self._starts[position]
+        return True
+
+    def query(self, start: float, end: float) -> List[Dict[str, Any]]:
+        """
+        Eventos que se solapan con [start, end), ordenados por inicio.
+
+        Solo hace falta recorrer los que empiezan entre `start` menos la
+        duración máxima y `end`.
+        """
+        position = bisect.bisect_left(self._starts, (start - self._max_duration, ""))
+        events = []
+        for event_start, event_id in self._starts[position:]:
+            if event_start >= end:
+                break
+            event_end = self._spans[event_id][1]
+            if event_end > start or event_start == event_end >= start:
+                events.append(self.events[event_id])
+        return events
+
+    def replace_window(self, start: float, end: float, events: List[Dict[str, Any]], complete: bool):
+        """
+        Sustituye los eventos de una ventana por los recién descargados.
+
+        Args:
+            start: Inicio de la ventana
+            end: Fin de la ventana
+            events: Eventos devueltos por el servidor para la ventana
+            complete: Si la ventana contiene todos sus eventos (se da por cubierta)
+        """
+        if complete:
+            for event in self.query(start, end):
+                self.remove(event["id"])
+        for event in events:
+            self.upsert(event)
+        if complete:
+            self.windows.append((start, end, time.monotonic()))
+
+    def expire_windows(self, ttl: float):
+        """Olvida las ventanas descargadas hace más de `ttl` segundos."""
+        limit = time.monotonic() - ttl
+        self.windows = [window for window in self.windows if window[2] >= limit]
+
+    def gaps(self, start: float, end: float) -> List[Tuple[float, float]]:
+        """Tramos de [start, end) que no cubre ninguna ventana descargada."""
+        gaps = []
+        cursor = start
+        for window_start, window_end, _ in sorted(self.windows):
+            if window_end <= cursor:
+                continue
+            if window_start >= end:
+                break
+            if window_start > cursor:
+                gaps.append((cursor, window_start))
+            cursor = max(cursor, window_end)
+            if cursor >= end:
+                break
+        if cursor < end:
+            gaps.append((cursor, end))
+        return gaps
+
+    def invalidate(self):
+        """Descarta todas las ventanas y el sync token (se volverá a descargar todo)."""
+        self.windows = []
+        self.sync_token = None
+
+class CalendarEventIndex:
+    """
+    Índices de eventos de los usuarios, con expulsión LRU.
+
+    `list_events` responde desde el índice cuando la ventana pedida está
+    cubierta; si no, descarga solo los tramos que faltan mediante la
+    función `execute` del cliente.
+    """
+
+    def __init__(self,
+                 max_users: int = GOOGLE_CALENDAR_INDEX_MAX_USERS,
+                 sync_interval: float = GOOGLE_CALENDAR_SYNC_INTERVAL,
+                 ttl: float = GOOGLE_CALENDAR_INDEX_TTL,
+                 fetch_max: int = GOOGLE_CALENDAR_INDEX_FETCH_MAX):
+        """
+        Inicializa los índices.
+
+        Args:
+            max_users: Usuarios con índice en memoria
+            sync_interval: Segundos entre sincronizaciones incrementales
+            ttl: Validez de una ventana cuando no hay sync token
+            fetch_max: Eventos pedidos por ventana descargada
+        """
+        self.max_users = max_users
+        self.sync_interval = sync_interval
+        self.ttl = ttl
+        self.fetch_max = fetch_max
+        self._users: "OrderedDict[str, UserCalendarIndex]" = OrderedDict()
+        self.metrics = {
+            "local_hits": 0,
+            "window_fetches": 0,
+            "incremental_syncs": 0,
+            "sync_resets": 0,
+            "write_through": 0,
+            "evictions": 0
+        }
+
+    def _get(self, user_id: str) -> UserCalendarIndex:
+        """Obtiene (o crea) el índice de un usuario."""
+        index = self._users.get(user_id)
+        if index is None:
+            index = self._users[user_id] = UserCalendarIndex()
+            while len(self._users) > self.max_users:
+                self._users.popitem(last=False)
+                self.metrics["evictions"] += 1
+        self._users.move_to_end(user_id)
+        return index
+
+    def drop(self, user_id: str):
+        """Elimina el índice de un usuario (p. ej. al desconectar su cuenta)."""
+        self._users.pop(user_id, None)
+
+    async def list_events(self,
+                          user_id: str,
+                          time_min: str,
+                          time_max: str,
+                          max_results: Optional[int],
+                          execute: Execute) -> Dict[str, Any]:
+        """
+        Lista los eventos de una ventana, desde el índice siempre que sea posible.
+
+        Args:
+            user_id: ID del usuario
+            time_min: Inicio de la ventana (ISO)
+            time_max: Fin de la ventana (ISO)
+            max_results: Número máximo de eventos devueltos (None para todos)
+            execute: Corrutina (operación, argumentos) que llama al servidor
+
+        Returns:
+            Resultado con el mismo formato que `execute_operation`
+        """
+        start = parse_event_time(time_min)
+        end = parse_event_time(time_max)
+        if start is None or end is None:
+            # Ventana no interpretable: consulta directa sin índice
+            return await execute("list_events", {
+                "time_min": time_min, "time_max": time_max, "max_results": max_results or self.fetch_max
+            })
+
+        index = self._get(user_id)
+        async with index.lock:
+            if index.sync_token:
+                if time.monotonic() - index.last_sync >= self.sync_interval:
+                    error = await self._sync(index, execute)
+                    if error is not None:
+                        return error
+            else:
+                index.expire_windows(self.ttl)
+
+            gaps = index.gaps(start, end)
+            if not gaps:
+                self.metrics["local_hits"] += 1
+            for gap_start, gap_end in gaps:
+                error = await self._fetch_window(index, gap_start, gap_end, execute)
+                if error is not None:
+                    return error
+
+            events = index.query(start, end)[:max_results]
+        return {
+            "status": "success",
+            "response": {"result": {"events": events}},
+            "source": "remote" if gaps else "index"
+        }
+
+    async def _fetch_window(self,
+                            index: UserCalendarIndex,
+                            start: float,
+                            end: float,
+                            execute: Execute) -> Optional[Dict[str, Any]]:
+        """Descarga una ventana (ampliada a días completos); devuelve el error si falla."""
+        start = start // _DAY * _DAY
+        end = -(-end // _DAY) * _DAY
+        result = await execute("list_events", {
+            "time_min": format_event_time(start),
+            "time_max": format_event_time(end),
+            "max_results": self.fetch_max
+        })
+        if result.get("status") != "success":
+            return result
+
+        self.metrics["window_fetches"] += 1
+        payload = extract_payload(result)
+        events = events_of(payload)
+        complete = len(events) < self.fetch_max and not payload.get("nextPageToken")
+        index.replace_window(start, end, events, complete)
+        if payload.get("nextSyncToken") and complete and index.sync_token is None:
+            # Con un token ya adoptado se conserva: el nuevo empezaría en esta
+            # descarga y `_sync` perdería los cambios de las ventanas anteriores
+            # ocurridos desde la última sincronización. Por lo mismo, al adoptar
+            # el primero solo queda cubierta la ventana recién descargada
+            index.sync_token = payload["nextSyncToken"]
+            index.last_sync = time.monotonic()
+            index.windows = index.windows[-1:]
+        return None
+
+    async def _sync(self, index: UserCalendarIndex, execute: Execute) -> Optional[Dict[str, Any]]:
+        """Aplica los cambios desde el último sync token; devuelve el error si falla."""
+        result = await execute("list_events", {"sync_token": index.sync_token})
+        if result.get("status") != "success":
+            # Token caducado (410) u otro fallo: descargar de nuevo lo que se pida
+            logger.info(f"Sincronización incremental fallida, se reinicia el índice: {result.get('error')}")
+            index.invalidate()
+            self.metrics["sync_resets"] += 1
+            return None
+
+        payload = extract_payload(result)
+        for event in events_of(payload):
+            if event.get("status") == "cancelled":
+                index.remove(event["id"])
+            else:
+                index.upsert(event)
+        index.sync_token = payload.get("nextSyncToken")
+        if index.sync_token is None:
+            # El servidor dejó de dar tokens: pasar a caducidad por TTL
+            index.windows = []
+        index.last_sync = time.monotonic()
+        self.metrics["incremental_syncs"] += 1
+        return None
+
+    def apply_write(self, user_id: str, operation: str, arguments: Dict[str, Any], result: Dict[str, Any]):
+        """
+        Aplica al índice una escritura confirmada por el servidor.
+
+        Args:
+            user_id: ID del usuario
+            operation: create_event, update_event o delete_event
+            arguments: Argumentos enviados
+            result: Resultado de la operación
+        """
+        self.apply_writes(user_id, [(operation, arguments, result)])
+
+    def apply_writes(self, user_id: str, writes: List[Tuple[str, Dict[str, Any], Dict[str, Any]]]):
+        """
+        Aplica al índice varias escrituras en una sola pasada.
+
+        Las escrituras fallidas se ignoran; si alguna confirmada no devuelve
+        el evento, el índice del usuario se invalida.
+
+        Args:
+            user_id: ID del usuario
+            writes: Lista de (operación, argumentos, resultado)
+        """
+        index = self._users.get(user_id)
+        if index is None:
+            return
+
+        upserts: Dict[str, Dict[str, Any]] = {}
+        removals: List[str] = []
+        for operation, arguments, result in writes:
+            if result.get("status") != "success":
+                continue
+            self.metrics["write_through"] += 1
+
+            if operation == "delete_event":
+                event_id = arguments.get("event_id")
+                upserts.pop(event_id, None)
+                removals.append(event_id)
+                continue
+
+            event = extract_payload(result)
+            if not event.get("id"):
+                # Respuesta sin el evento: no se puede aplicar con seguridad
+                index.invalidate()
+                continue
+            previous = upserts.get(event["id"]) or index.events.get(event["id"])
+            if operation == "update_event" and previous is not None:
+                # Las actualizaciones parciales conservan los campos no devueltos
+                event = {**previous, **event}
+            upserts[event["id"]] = event
+
+        if len(upserts) + len(removals) == 1:
+            for event in upserts.values():
+                index.upsert(event)
+            for event_id in removals:
+                index.remove(event_id)
+        elif upserts or removals:
+            index.bulk_update(list(upserts.values()), removals)
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """
+        Obtiene las métricas del índice.
+
+        Returns:
+            Consultas locales, descargas, sincronizaciones y usuarios indexados
+        """
+        return {
+            **self.metrics,
+            "users": len(self._users),
+            "events": sum(len(index.events) for index in self._users.values())
+        }
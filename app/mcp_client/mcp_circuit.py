@@ -0,0 +1,246 @@
+"""
+Circuit breaker y reintentos para los servidores MCP remotos de GENIA
+
+Este módulo protege las llamadas a los servidores MCP por HTTP (OpenAI,
+Twilio, Stripe). Cada URL tiene un circuit breaker con tres estados:
+
+- closed: las solicitudes pasan y se registra su resultado y latencia.
+- open: la tasa de errores o de llamadas lentas superó el umbral; las
+  solicitudes fallan de inmediato durante MCP_BREAKER_OPEN_SECONDS.
+- half_open: pasado ese tiempo se dejan pasar unas pocas solicitudes de
+  prueba; si todas van bien el circuito se cierra y si alguna falla se
+  vuelve a abrir.
+
+Los reintentos usan backoff exponencial con "decorrelated jitter", de modo
+que los clientes que fallan a la vez no reintentan a la vez.
+
+Autor: GENIA Team
+Fecha: Mayo 2025
+"""
+
+import os
+import time
+import random
+import logging
+from collections import deque
+from typing import Dict, Any, Optional
+
+# Configurar logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger("mcp_circuit")
+
+# Llamadas recientes consideradas y mínimo para evaluar las tasas
+MCP_BREAKER_WINDOW = int(os.getenv("MCP_BREAKER_WINDOW", "20"))
+MCP_BREAKER_MIN_CALLS = int(os.getenv("MCP_BREAKER_MIN_CALLS", "5"))
+# Fracción de errores o de llamadas lentas que abre el circuito
+MCP_BREAKER_FAILURE_RATE = float(os.getenv("MCP_BREAKER_FAILURE_RATE", "0.5"))
+MCP_BREAKER_SLOW_RATE = float(os.getenv("MCP_BREAKER_SLOW_RATE", "0.8"))
+# Segundos a partir de los cuales una llamada cuenta como lenta
+MCP_BREAKER_SLOW_CALL_SECONDS = float(os.getenv("MCP_BREAKER_SLOW_CALL_SECONDS", "15"))
+# Segundos que el circuito permanece abierto antes de probar de nuevo
+MCP_BREAKER_OPEN_SECONDS = float(os.getenv("MCP_BREAKER_OPEN_SECONDS", "30"))
+# Solicitudes de prueba permitidas en half_open
+MCP_BREAKER_HALF_OPEN_CALLS = int(os.getenv("MCP_BREAKER_HALF_OPEN_CALLS", "2"))
+
+# Reintentos de solicitudes idempotentes
+MCP_RETRY_ATTEMPTS = int(os.getenv("MCP_RETRY_ATTEMPTS", "2"))
+MCP_RETRY_BASE_DELAY = float(os.getenv("MCP_RETRY_BASE_DELAY", "0.2"))
+MCP_RETRY_MAX_DELAY = float(os.getenv("MCP_RETRY_MAX_DELAY", "2"))
+
+STATE_CLOSED = "closed"
+STATE_OPEN = "open"
+STATE_HALF_OPEN = "half_open"
+
+class MCPCircuitOpenError(ConnectionError):
+    """El circuito del servidor MCP está abierto: la solicitud no se envía."""
+
+    def __init__(self, message: str, retry_after: float):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+class MCPCircuitBreaker:
+    """
+    Circuit breaker de un servidor MCP, por tasa de errores y de latencia.
+    """
+
+    def __init__(self,
+                 name: str,
+                 window: int = MCP_BREAKER_WINDOW,
+                 min_calls: int = MCP_BREAKER_MIN_CALLS,
+                 failure_rate: float = MCP_BREAKER_FAILURE_RATE,
+                 slow_rate: float = MCP_BREAKER_SLOW_RATE,
+                 slow_call_seconds: float = MCP_BREAKER_SLOW_CALL_SECONDS,
+                 open_seconds: float = MCP_BREAKER_OPEN_SECONDS,
+                 half_open_calls: int = MCP_BREAKER_HALF_OPEN_CALLS):
+        """
+        Inicializa el circuit breaker (cerrado).
+
+        Args:
+            name: Servidor protegido (URL)
+            window: Llamadas recientes consideradas
+            min_calls: Llamadas mínimas en la ventana para poder abrir
+            failure_rate: Fracción de errores que abre el circuito
+            slow_rate: Fracción de llamadas lentas que abre el circuito
+            slow_call_seconds: Duración a partir de la cual una llamada es lenta
+            open_seconds: Segundos abierto antes de pasar a half_open
+            half_open_calls: Solicitudes de prueba en half_open
+        """
+        self.name = name
+        self.min_calls = min_calls
+        self.failure_rate = failure_rate
+        self.slow_rate = slow_rate
+        self.slow_call_seconds = slow_call_seconds
+        self.open_seconds = open_seconds
+        self.half_open_calls = half_open_calls
+
+        self.state = STATE_CLOSED
+        # Resultados recientes: (fallida, lenta)
+        self._calls: deque = deque(maxlen=window)
+        self._opened_at = 0.0
+        self._probes = 0
+        self._probe_successes = 0
+        self.opened = 0
+        self.rejected = 0
+        self.last_failure: Optional[str] = None
+
+    @property
+    def retry_after(self) -> float:
+        """Segundos hasta que el circuito abierto admita solicitudes de prueba."""
+        if self.state != STATE_OPEN:
+            return 0.0
+        return max(self._opened_at + self.open_seconds - time.monotonic(), 0.0)
+
+    def before_call(self) -> bool:
+        """
+        Comprueba si una solicitud puede enviarse.
+
+        Returns:
+            True si la solicitud ocupa una plaza de prueba (half_open); si
+            termina sin registrar resultado debe liberarla con `release_probe`
+
+        Raises:
+            MCPCircuitOpenError: Si el circuito está abierto o ya hay
+                suficientes solicitudes de prueba en curso
+        """
+        if self.state == STATE_OPEN:
+            if self.retry_after > 0:
+                self.rejected += 1
+                raise MCPCircuitOpenError(
+                    f"Circuito abierto para {self.name}; reintentar en {self.retry_after:.1f}s",
+                    self.retry_after
+                )
+            self._transition(STATE_HALF_OPEN)
+
+        if self.state == STATE_HALF_OPEN:
+            if self._probes >= self.half_open_calls:
+                self.rejected += 1
+                raise MCPCircuitOpenError(
+                    f"Circuito de {self.name} en prueba; solicitud rechazada",
+                    self.open_seconds
+                )
+            self._probes += 1
+            return True
+        return False
+
+    def release_probe(self):
+        """
+        Libera la plaza de una solicitud de prueba que terminó sin resultado
+        (cancelada o sin llegar a la réplica), para que el circuito no quede
+        en half_open rechazando todas las solicitudes.
+        """
+        if self.state == STATE_HALF_OPEN and self._probes > 0:
+            self._probes -= 1
+
+    def record_success(self, duration: float):
+        """Registra una llamada correcta y su duración en segundos."""
+        slow = duration >= self.slow_call_seconds
+        if self.state == STATE_HALF_OPEN:
+            if slow:
+                self._open("llamada de prueba lenta")
+                return
+            self._probe_successes += 1
+            if self._probe_successes >= self.half_open_calls:
+                self._transition(STATE_CLOSED)
+            return
+        self._calls.append((False, slow))
+        self._evaluate()
+
+    def record_failure(self, error: str):
+        """Registra una llamada fallida (error de red, 5xx o 429)."""
+        self.last_failure = error
+        if self.state == STATE_HALF_OPEN:
+            self._open(f"llamada de prueba fallida: {error}")
+            return
+        self._calls.append((True, False))
+        self._evaluate()
+
+    def _evaluate(self):
+        """Abre el circuito si la ventana supera alguno de los umbrales."""
+        calls = len(self._calls)
+        if self.state != STATE_CLOSED or calls < self.min_calls:
+            return
+        failures = sum(1 for failed, _ in self._calls if failed)
+        slow = sum(1 for _, is_slow in self._calls if is_slow)
+        if failures / calls >= self.failure_rate:
+            self._open(f"{failures} de {calls} llamadas fallidas")
+        elif slow / calls >= self.slow_rate:
+            self._open(f"{slow} de {calls} llamadas lentas")
+
+    def _open(self, reason: str):
+        logger.warning(f"Circuito abierto para {self.name}: {reason}")
+        self.opened += 1
+        self._opened_at = time.monotonic()
+        self._transition(STATE_OPEN)
+
+    def _transition(self, state: str):
+        if state != self.state and state != STATE_OPEN:
+            logger.info(f"Circuito de {self.name}: {self.state} -> {state}")
+        self.state = state
+        self._probes = 0
+        self._probe_successes = 0
+        if state == STATE_CLOSED:
+            self._calls.clear()
+
+    def get_status(self) -> Dict[str, Any]:
+        """
+        Obtiene el estado del circuit breaker.
+
+        Returns:
+            Estado, tasas de la ventana, aperturas, rechazos y último error
+        """
+        calls = len(self._calls)
+        return {
+            "state": self.state,
+            "retry_after": self.retry_after,
+            "window_calls": calls,
+            "failure_rate": sum(1 for failed, _ in self._calls if failed) / calls if calls else 0.0,
+            "slow_rate": sum(1 for _, slow in self._calls if slow) / calls if calls else 0.0,
+            "opened": self.opened,
+            "rejected": self.rejected,
+            "last_failure": self.last_failure
+        }
+
+def retry_delays(attempts: int = MCP_RETRY_ATTEMPTS,
+                 base: float = MCP_RETRY_BASE_DELAY,
+                 cap: float = MCP_RETRY_MAX_DELAY):
+    """
+    Esperas entre reintentos con backoff "decorrelated jitter".
+
+    Cada espera es aleatoria entre `base` y el triple de la anterior, con
+    `cap` como máximo.
+
+    Args:
+        attempts: Número de reintentos
+        base: Espera mínima en segundos
+        cap: Espera máxima en segundos
+
+    Yields:
+        Segundos de espera antes de cada reintento
+    """
+    delay = base
+    for _ in range(attempts):
+        delay = min(cap, random.uniform(base, delay * 3))
+        yield delay
@@ -13,7 +13,7 @@ import json
 import asyncio
 import logging
 from typing import Dict, List, Any, Optional, Union
-from .mcp_orchestrator import MCPOrchestrator
+from .mcp_orchestrator import MCPOrchestrator, PREWARM_LAZY
 
 # Configurar logging
 logging.basicConfig(
@@ -48,25 +48,32 @@ class MCPClient:
         
         try:
             # Registrar servidores predefinidos (sin tokens)
-            # Los tokens se proporcionarán al ejecutar las operaciones
+            # Los tokens se proporcionarán al ejecutar las operaciones, cada una
+            # en el proceso de las credenciales del usuario: no se precalientan
             self.orchestrator.register_server(
                 name="github",
                 command=["docker", "run", "-i", "--rm", "-e", "GITHUB_PERSONAL_ACCESS_TOKEN", "ghcr.io/github/github-mcp-server"],
-                env_vars={}
+                env_vars={},
+                prewarm_policy=PREWARM_LAZY
             )
             
             self.orchestrator.register_server(
                 name="notion",
                 command=["docker", "run", "-i", "--rm", "-e", "OPENAPI_MCP_HEADERS", "mcp/notion"],
-                env_vars={}
+                env_vars={},
+                prewarm_policy=PREWARM_LAZY
             )
             
             self.orchestrator.register_server(
                 name="slack",
                 command=["npx", "-y", "slack-mcp-server@latest", "--transport", "stdio"],
-                env_vars={}
+                env_vars={},
+                prewarm_policy=PREWARM_LAZY
             )
             
+            # Iniciar los servidores según su política de precalentamiento
+            await self.orchestrator.prewarm()
+            
             self.initialized = True
             logger.info("Cliente MCP inicializado correctamente")
             return True
@@ -94,31 +101,24 @@ class MCPClient:
             await self.initialize()
         
         # Cargar tokens del usuario
-        tokens = self.orchestrator.load_user_tokens(user_id)
+        tokens = await self.orchestrator.load_user_tokens(user_id)
         if not tokens or "github" not in tokens:
             raise ValueError(f"No se encontró token de GitHub para usuario {user_id}")
         
-        # Configurar servidor con token del usuario
-        github_server = self.orchestrator.servers["github"]
-        github_server.env_vars = {
+        # Credenciales del usuario: la operación se ejecuta en un proceso
+        # del pool reservado para ellas, nunca en uno compartido
+        env_vars = {
             "GITHUB_PERSONAL_ACCESS_TOKEN": tokens["github"]
         }
         
-        # Iniciar servidor si no está en ejecución
-        if not github_server.running:
-            await self.orchestrator.start_server("github")
-        
-        # Preparar solicitud MCP
-        request = {
-            "type": "function",
-            "function": {
-                "name": operation,
-                "arguments": json.dumps(arguments or {})
-            }
-        }
-        
-        # Enviar solicitud y devolver respuesta
-        return await self.orchestrator.send_request("github", request)
+        # Enviar solicitud (las lecturas pueden responderse desde la caché)
+        return await self.orchestrator.call_tool(
+            "github",
+            operation,
+            arguments,
+            user_id=user_id,
+            env_vars=env_vars
+        )
     
     async def execute_notion_operation(self, 
                                       user_id: str, 
@@ -139,31 +139,24 @@ class MCPClient:
             await self.initialize()
         
         # Cargar tokens del usuario
-        tokens = self.orchestrator.load_user_tokens(user_id)
+        tokens = await self.orchestrator.load_user_tokens(user_id)
         if not tokens or "notion" not in tokens:
             raise ValueError(f"No se encontró token de Notion para usuario {user_id}")
         
-        # Configurar servidor con token del usuario
-        notion_server = self.orchestrator.servers["notion"]
-        notion_server.env_vars = {
+        # Credenciales del usuario: la operación se ejecuta en un proceso
+        # del pool reservado para ellas, nunca en uno compartido
+        env_vars = {
             "OPENAPI_MCP_HEADERS": f'{{"Authorization": "Bearer {tokens["notion"]}", "Notion-Version": "2022-06-28" }}'
         }
         
-        # Iniciar servidor si no está en ejecución
-        if not notion_server.running:
-            await self.orchestrator.start_server("notion")
-        
-        # Preparar solicitud MCP
-        request = {
-            "type": "function",
-            "function": {
-                "name": operation,
-                "arguments": json.dumps(arguments or {})
-            }
-        }
-        
-        # Enviar solicitud y devolver respuesta
-        return await self.orchestrator.send_request("notion", request)
+        # Enviar solicitud (las lecturas pueden responderse desde la caché)
+        return await self.orchestrator.call_tool(
+            "notion",
+            operation,
+            arguments,
+            user_id=user_id,
+            env_vars=env_vars
+        )
     
     async def execute_slack_operation(self, 
                                      user_id: str, 
@@ -184,32 +177,25 @@ class MCPClient:
             await self.initialize()
         
         # Cargar tokens del usuario
-        tokens = self.orchestrator.load_user_tokens(user_id)
+        tokens = await self.orchestrator.load_user_tokens(user_id)
         if not tokens or "slack_xoxc" not in tokens or "slack_xoxd" not in tokens:
             raise ValueError(f"No se encontraron tokens de Slack para usuario {user_id}")
         
-        # Configurar servidor con tokens del usuario
-        slack_server = self.orchestrator.servers["slack"]
-        slack_server.env_vars = {
+        # Credenciales del usuario: la operación se ejecuta en un proceso
+        # del pool reservado para ellas, nunca en uno compartido
+        env_vars = {
             "SLACK_MCP_XOXC_TOKEN": tokens["slack_xoxc"],
             "SLACK_MCP_XOXD_TOKEN": tokens["slack_xoxd"]
         }
         
-        # Iniciar servidor si no está en ejecución
-        if not slack_server.running:
-            await self.orchestrator.start_server("slack")
-        
-        # Preparar solicitud MCP
-        request = {
-            "type": "function",
-            "function": {
-                "name": operation,
-                "arguments": json.dumps(arguments or {})
-            }
-        }
-        
-        # Enviar solicitud y devolver respuesta
-        return await self.orchestrator.send_request("slack", request)
+        # Enviar solicitud (las lecturas pueden responderse desde la caché)
+        return await self.orchestrator.call_tool(
+            "slack",
+            operation,
+            arguments,
+            user_id=user_id,
+            env_vars=env_vars
+        )
     
     async def save_user_tokens(self, 
                               user_id: str, 
@@ -229,23 +215,47 @@ class MCPClient:
         if not self.initialized:
             await self.initialize()
         
-        # Cargar tokens existentes
-        existing_tokens = self.orchestrator.load_user_tokens(user_id) or {}
-        
-        # Actualizar tokens para el servicio
+        # Tokens del servicio (cada servicio se guarda por separado)
+        service_tokens = {}
         if service == "github":
-            existing_tokens["github"] = tokens.get("token")
+            service_tokens["github"] = tokens.get("token")
         elif service == "notion":
-            existing_tokens["notion"] = tokens.get("token")
+            service_tokens["notion"] = tokens.get("token")
         elif service == "slack":
-            existing_tokens["slack_xoxc"] = tokens.get("xoxc_token")
-            existing_tokens["slack_xoxd"] = tokens.get("xoxd_token")
+            service_tokens["slack_xoxc"] = tokens.get("xoxc_token")
+            service_tokens["slack_xoxd"] = tokens.get("xoxd_token")
         else:
             logger.warning(f"Servicio desconocido: {service}")
             return False
         
         # Guardar tokens actualizados
-        return self.orchestrator.save_user_tokens(user_id, existing_tokens)
+        return await self.orchestrator.save_user_tokens(user_id, service_tokens, service=service)
+    
+    async def load_user_tokens(self, user_id: str, service: str = None) -> Optional[Dict[str, str]]:
+        """
+        Carga los tokens de un usuario.
+        
+        Args:
+            user_id: ID único del usuario
+            service: Nombre del servicio; sin él se devuelven los de todos los servicios
+            
+        Returns:
+            Diccionario de tokens, o None si no se encontraron
+        """
+        return await self.orchestrator.load_user_tokens(user_id, service)
+    
+    async def delete_user_tokens(self, user_id: str, service: str = None) -> bool:
+        """
+        Elimina los tokens de un usuario.
+        
+        Args:
+            user_id: ID único del usuario
+            service: Nombre del servicio; sin él se eliminan los de todos los servicios
+            
+        Returns:
+            True si la eliminación fue exitosa, False en caso contrario
+        """
+        return await self.orchestrator.delete_user_tokens(user_id, service)
     
     async def shutdown(self) -> bool:
         """
@@ -10,10 +10,22 @@ Fecha: Mayo 2025
 
 import os
 import json
+import time
 import asyncio
+import inspect
 import logging
 from typing import Dict, List, Any, Optional, Union
 from .mcp_orchestrator_extended import MCPOrchestrator
+from .mcp_orchestrator import PREWARM_LAZY
+from .mcp_services import MCP_SERVICES, MCPOperationStats, get_service_spec
+from .mcp_broker import (
+    MCPBrokerServer,
+    MCPBrokerOrchestrator,
+    resolve_broker_mode,
+    BROKER_SERVER,
+    BROKER_CLIENT,
+    MCP_BROKER_SOCKET
+)
 
 # Configurar logging
 logging.basicConfig(
@@ -34,6 +46,11 @@ class MCPClient:
         """Inicializa el cliente MCP."""
         self.orchestrator = MCPOrchestrator()
         self.initialized = False
+        self.stats = MCPOperationStats()
+        
+        # Modo broker (MCP_BROKER_MODE): un único proceso es dueño de los servidores
+        self.broker_mode = None
+        self.broker: Optional[MCPBrokerServer] = None
     
     async def initialize(self) -> bool:
         """
@@ -47,58 +64,33 @@ class MCPClient:
             return True
         
         try:
-            # Registrar servidores predefinidos (sin tokens)
-            # Los tokens se proporcionarán al ejecutar las operaciones
-            
-            # Servidores originales
-            self.orchestrator.register_server(
-                name="github",
-                command=["docker", "run", "-i", "--rm", "-e", "GITHUB_PERSONAL_ACCESS_TOKEN", "ghcr.io/github/github-mcp-server"],
-                env_vars={}
-            )
-            
-            self.orchestrator.register_server(
-                name="notion",
-                command=["docker", "run", "-i", "--rm", "-e", "OPENAPI_MCP_HEADERS", "mcp/notion"],
-                env_vars={}
-            )
-            
-            self.orchestrator.register_server(
-                name="slack",
-                command=["npx", "-y", "slack-mcp-server@latest", "--transport", "stdio"],
-                env_vars={}
-            )
-            
-            # Servidores adicionales
-            self.orchestrator.register_server(
-                name="google_workspace",
-                command=["mcp-google", "drive", "--access-token", "placeholder"],
-                env_vars={}
-            )
-            
-            self.orchestrator.register_server(
-                name="google_sheets",
-                command=["mcp-google", "sheets", "--access-token", "placeholder"],
-                env_vars={}
-            )
+            self.broker_mode = resolve_broker_mode()
+            if self.broker_mode == BROKER_CLIENT:
+                # Las solicitudes se delegan en el proceso broker
+                self.orchestrator = MCPBrokerOrchestrator(MCP_BROKER_SOCKET)
             
-            self.orchestrator.register_server(
-                name="instagram",
-                command=["npx", "-y", "instagram-dm-mcp", "start"],
-                env_vars={}
-            )
+            # Registrar los servidores de la tabla de servicios (sin tokens);
+            # los tokens se proporcionarán al ejecutar las operaciones. Cada
+            # operación usa el proceso de las credenciales del usuario, así que
+            # precalentar el proceso compartido o sus reservas no serviría de nada
+            for spec in MCP_SERVICES.values():
+                self.orchestrator.register_server(
+                    name=spec.name,
+                    command=spec.command,
+                    env_vars={},
+                    prewarm_policy=PREWARM_LAZY,
+                    max_concurrent=spec.max_concurrent,
+                    max_queued=spec.max_queued,
+                    request_timeout=spec.timeout
+                )
             
-            self.orchestrator.register_server(
-                name="trello",
-                command=["npx", "-y", "@delorenj/mcp-server-trello"],
-                env_vars={}
-            )
+            if self.broker_mode == BROKER_SERVER:
+                # Aceptar solicitudes de otros workers antes de precalentar
+                self.broker = MCPBrokerServer(self.orchestrator, MCP_BROKER_SOCKET)
+                await self.broker.start()
             
-            self.orchestrator.register_server(
-                name="twitter_x",
-                command=["node", "x-mcp-server/build/index.js"],
-                env_vars={}
-            )
+            # Iniciar los servidores según su política de precalentamiento
+            await self.orchestrator.prewarm()
             
             self.initialized = True
             logger.info("Cliente MCP inicializado correctamente")
@@ -108,55 +100,82 @@ class MCPClient:
             logger.error(f"Error al inicializar cliente MCP: {e}")
             return False
     
-    async def execute_github_operation(self, 
-                                      user_id: str, 
-                                      operation: str, 
-                                      arguments: Dict[str, Any] = None) -> Dict[str, Any]:
+    async def execute_operation(self,
+                                user_id: str,
+                                service: str,
+                                operation: str,
+                                arguments: Dict[str, Any] = None,
+                                timeout: float = None,
+                                use_cache: bool = True) -> Dict[str, Any]:
         """
-        Ejecuta una operación en GitHub.
+        Ejecuta una operación en cualquier servicio de la tabla de servicios.
+        
+        Las credenciales del usuario se traducen a entorno y comando con los
+        constructores precompilados del servicio y la operación se ejecuta en
+        un proceso del pool reservado para ellas, nunca en uno compartido.
         
         Args:
             user_id: ID único del usuario
+            service: Nombre del servicio (github, notion, slack, etc.)
             operation: Nombre de la operación a ejecutar
             arguments: Argumentos para la operación
+            timeout: Plazo en segundos (por defecto el de la operación o del servicio)
+            use_cache: False para ignorar la respuesta cacheada y refrescarla
             
         Returns:
             Respuesta de la operación
+            
+        Raises:
+            MCPUnknownServiceError: Si el servicio no existe
+            MCPCredentialsError: Si el usuario no tiene las credenciales del servicio
         """
         if not self.initialized:
             await self.initialize()
         
-        # Cargar tokens del usuario
-        tokens = self.orchestrator.load_user_tokens(user_id)
-        if not tokens or "github" not in tokens:
-            raise ValueError(f"No se encontró token de GitHub para usuario {user_id}")
-        
-        # Configurar servidor con token del usuario
-        github_server = self.orchestrator.servers["github"]
-        github_server.env_vars = {
-            "GITHUB_PERSONAL_ACCESS_TOKEN": tokens["github"]
-        }
-        
-        # Iniciar servidor si no está en ejecución
-        if not github_server.running:
-            await self.orchestrator.start_server("github")
-        
-        # Preparar solicitud MCP
-        request = {
-            "type": "function",
-            "function": {
-                "name": operation,
-                "arguments": json.dumps(arguments or {})
-            }
-        }
+        spec = get_service_spec(service)
+        started = time.monotonic()
+        try:
+            tokens = spec.check_credentials(
+                user_id, await self.orchestrator.load_user_tokens(user_id, spec.token_service)
+            )
+            # Enviar solicitud (las lecturas pueden responderse desde la caché)
+            response = await self.orchestrator.call_tool(
+                service,
+                operation,
+                arguments,
+                user_id=user_id,
+                env_vars=spec.build_env(tokens),
+                command=spec.build_command(tokens),
+                timeout=timeout,
+                use_cache=use_cache
+            )
+        except Exception as e:
+            self.stats.record(service, time.monotonic() - started, e)
+            raise
+        self.stats.record(service, time.monotonic() - started)
+        return response
+    
+    async def execute_github_operation(self, 
+                                       user_id: str, 
+                                       operation: str, 
+                                       arguments: Dict[str, Any] = None) -> Dict[str, Any]:
+        """
+        Ejecuta una operación en GitHub.
         
-        # Enviar solicitud y devolver respuesta
-        return await self.orchestrator.send_request("github", request)
+        Args:
+            user_id: ID único del usuario
+            operation: Nombre de la operación a ejecutar
+            arguments: Argumentos para la operación
+            
+        Returns:
+            Respuesta de la operación
+        """
+        return await self.execute_operation(user_id, "github", operation, arguments)
     
     async def execute_notion_operation(self, 
-                                      user_id: str, 
-                                      operation: str, 
-                                      arguments: Dict[str, Any] = None) -> Dict[str, Any]:
+                                       user_id: str, 
+                                       operation: str, 
+                                       arguments: Dict[str, Any] = None) -> Dict[str, Any]:
         """
         Ejecuta una operación en Notion.
         
@@ -168,40 +187,12 @@ class MCPClient:
         Returns:
             Respuesta de la operación
         """
-        if not self.initialized:
-            await self.initialize()
-        
-        # Cargar tokens del usuario
-        tokens = self.orchestrator.load_user_tokens(user_id)
-        if not tokens or "notion" not in tokens:
-            raise ValueError(f"No se encontró token de Notion para usuario {user_id}")
-        
-        # Configurar servidor con token del usuario
-        notion_server = self.orchestrator.servers["notion"]
-        notion_server.env_vars = {
-            "OPENAPI_MCP_HEADERS": f'{{"Authorization": "Bearer {tokens["notion"]}", "Notion-Version": "2022-06-28" }}'
-        }
-        
-        # Iniciar servidor si no está en ejecución
-        if not notion_server.running:
-            await self.orchestrator.start_server("notion")
-        
-        # Preparar solicitud MCP
-        request = {
-            "type": "function",
-            "function": {
-                "name": operation,
-                "arguments": json.dumps(arguments or {})
-            }
-        }
-        
-        # Enviar solicitud y devolver respuesta
-        return await self.orchestrator.send_request("notion", request)
+        return await self.execute_operation(user_id, "notion", operation, arguments)
     
     async def execute_slack_operation(self, 
-                                     user_id: str, 
-                                     operation: str, 
-                                     arguments: Dict[str, Any] = None) -> Dict[str, Any]:
+                                      user_id: str, 
+                                      operation: str, 
+                                      arguments: Dict[str, Any] = None) -> Dict[str, Any]:
         """
         Ejecuta una operación en Slack.
         
@@ -213,43 +204,12 @@ class MCPClient:
         Returns:
             Respuesta de la operación
         """
-        if not self.initialized:
-            await self.initialize()
-        
-        # Cargar tokens del usuario
-        tokens = self.orchestrator.load_user_tokens(user_id)
-        if not tokens or "slack_xoxc" not in tokens or "slack_xoxd" not in tokens:
-            raise ValueError(f"No se encontraron tokens de Slack para usuario {user_id}")
-        
-        # Configurar servidor con tokens del usuario
-        slack_server = self.orchestrator.servers["slack"]
-        slack_server.env_vars = {
-            "SLACK_MCP_XOXC_TOKEN": tokens["slack_xoxc"],
-            "SLACK_MCP_XOXD_TOKEN": tokens["slack_xoxd"]
-        }
-        
-        # Iniciar servidor si no está en ejecución
-        if not slack_server.running:
-            await self.orchestrator.start_server("slack")
-        
-        # Preparar solicitud MCP
-        request = {
-            "type": "function",
-            "function": {
-                "name": operation,
-                "arguments": json.dumps(arguments or {})
-            }
-        }
-        
-        # Enviar solicitud y devolver respuesta
-        return await self.orchestrator.send_request("slack", request)
-    
-    # Nuevos métodos para servidores MCP adicionales
+        return await self.execute_operation(user_id, "slack", operation, arguments)
     
     async def execute_google_workspace_operation(self, 
-                                               user_id: str, 
-                                               operation: str, 
-                                               arguments: Dict[str, Any] = None) -> Dict[str, Any]:
+                                                 user_id: str, 
+                                                 operation: str, 
+                                                 arguments: Dict[str, Any] = None) -> Dict[str, Any]:
         """
         Ejecuta una operación en Google Workspace (Drive).
         
@@ -261,48 +221,12 @@ class MCPClient:
         Returns:
             Respuesta de la operación
         """
-        if not self.initialized:
-            await self.initialize()
-        
-        # Cargar tokens del usuario
-        tokens = self.orchestrator.load_user_tokens(user_id)
-        if not tokens or "google_access_token" not in tokens:
-            raise ValueError(f"No se encontró token de Google Workspace para usuario {user_id}")
-        
-        # Configurar servidor con tokens del usuario
-        google_workspace_server = self.orchestrator.servers["google_workspace"]
-        google_workspace_server.env_vars = {
-            "GOOGLE_ACCESS_TOKEN": tokens["google_access_token"],
-            "GOOGLE_CLIENT_ID": tokens.get("google_client_id", ""),
-            "GOOGLE_CLIENT_SECRET": tokens.get("google_client_secret", ""),
-            "GOOGLE_REFRESH_TOKEN": tokens.get("google_refresh_token", "")
-        }
-        
-        # Actualizar comando con token de acceso
-        google_workspace_server.command = [
-            "mcp-google", "drive", "--access-token", tokens["google_access_token"]
-        ]
-        
-        # Iniciar servidor si no está en ejecución
-        if not google_workspace_server.running:
-            await self.orchestrator.start_server("google_workspace")
-        
-        # Preparar solicitud MCP
-        request = {
-            "type": "function",
-            "function": {
-                "name": operation,
-                "arguments": json.dumps(arguments or {})
-            }
-        }
-        
-        # Enviar solicitud y devolver respuesta
-        return await self.orchestrator.send_request("google_workspace", request)
+        return await self.execute_operation(user_id, "google_workspace", operation, arguments)
     
     async def execute_google_sheets_operation(self, 
-                                            user_id: str, 
-                                            operation: str, 
-                                            arguments: Dict[str, Any] = None) -> Dict[str, Any]:
+                                              user_id: str, 
+                                              operation: str, 
+                                              arguments: Dict[str, Any] = None) -> Dict[str, Any]:
         """
         Ejecuta una operación en Google Sheets.
         
@@ -314,48 +238,12 @@ class MCPClient:
         Returns:
             Respuesta de la operación
         """
-        if not self.initialized:
-            await self.initialize()
-        
-        # Cargar tokens del usuario
-        tokens = self.orchestrator.load_user_tokens(user_id)
-        if not tokens or "google_access_token" not in tokens:
-            raise ValueError(f"No se encontró token de Google Sheets para usuario {user_id}")
-        
-        # Configurar servidor con tokens del usuario
-        google_sheets_server = self.orchestrator.servers["google_sheets"]
-        google_sheets_server.env_vars = {
-            "GOOGLE_ACCESS_TOKEN": tokens["google_access_token"],
-            "GOOGLE_CLIENT_ID": tokens.get("google_client_id", ""),
-            "GOOGLE_CLIENT_SECRET": tokens.get("google_client_secret", ""),
-            "GOOGLE_REFRESH_TOKEN": tokens.get("google_refresh_token", "")
-        }
-        
-        # Actualizar comando con token de acceso
-        google_sheets_server.command = [
-            "mcp-google", "sheets", "--access-token", tokens["google_access_token"]
-        ]
-        
-        # Iniciar servidor si no está en ejecución
-        if not google_sheets_server.running:
-            await self.orchestrator.start_server("google_sheets")
-        
-        # Preparar solicitud MCP
-        request = {
-            "type": "function",
-            "function": {
-                "name": operation,
-                "arguments": json.dumps(arguments or {})
-            }
-        }
-        
-        # Enviar solicitud y devolver respuesta
-        return await self.orchestrator.send_request("google_sheets", request)
+        return await self.execute_operation(user_id, "google_sheets", operation, arguments)
     
     async def execute_instagram_operation(self, 
-                                         user_id: str, 
-                                         operation: str, 
-                                         arguments: Dict[str, Any] = None) -> Dict[str, Any]:
+                                          user_id: str, 
+                                          operation: str, 
+                                          arguments: Dict[str, Any] = None) -> Dict[str, Any]:
         """
         Ejecuta una operación en Instagram.
         
@@ -367,42 +255,12 @@ class MCPClient:
         Returns:
             Respuesta de la operación
         """
-        if not self.initialized:
-            await self.initialize()
-        
-        # Cargar tokens del usuario
-        tokens = self.orchestrator.load_user_tokens(user_id)
-        if not tokens or "instagram_session_id" not in tokens:
-            raise ValueError(f"No se encontraron credenciales de Instagram para usuario {user_id}")
-        
-        # Configurar servidor con tokens del usuario
-        instagram_server = self.orchestrator.servers["instagram"]
-        instagram_server.env_vars = {
-            "INSTAGRAM_SESSION_ID": tokens["instagram_session_id"],
-            "INSTAGRAM_CSRF_TOKEN": tokens["instagram_csrf_token"],
-            "INSTAGRAM_DS_USER_ID": tokens["instagram_ds_user_id"]
-        }
-        
-        # Iniciar servidor si no está en ejecución
-        if not instagram_server.running:
-            await self.orchestrator.start_server("instagram")
-        
-        # Preparar solicitud MCP
-        request = {
-            "type": "function",
-            "function": {
-                "name": operation,
-                "arguments": json.dumps(arguments or {})
-            }
-        }
-        
-        # Enviar solicitud y devolver respuesta
-        return await self.orchestrator.send_request("instagram", request)
+        return await self.execute_operation(user_id, "instagram", operation, arguments)
     
     async def execute_trello_operation(self, 
-                                      user_id: str, 
-                                      operation: str, 
-                                      arguments: Dict[str, Any] = None) -> Dict[str, Any]:
+                                       user_id: str, 
+                                       operation: str, 
+                                       arguments: Dict[str, Any] = None) -> Dict[str, Any]:
         """
         Ejecuta una operación en Trello.
         
@@ -414,42 +272,12 @@ class MCPClient:
         Returns:
             Respuesta de la operación
         """
-        if not self.initialized:
-            await self.initialize()
-        
-        # Cargar tokens del usuario
-        tokens = self.orchestrator.load_user_tokens(user_id)
-        if not tokens or "trello_api_key" not in tokens or "trello_token" not in tokens:
-            raise ValueError(f"No se encontraron credenciales de Trello para usuario {user_id}")
-        
-        # Configurar servidor con tokens del usuario
-        trello_server = self.orchestrator.servers["trello"]
-        trello_server.env_vars = {
-            "TRELLO_API_KEY": tokens["trello_api_key"],
-            "TRELLO_TOKEN": tokens["trello_token"],
-            "TRELLO_BOARD_ID": tokens.get("trello_board_id", "")
-        }
-        
-        # Iniciar servidor si no está en ejecución
-        if not trello_server.running:
-            await self.orchestrator.start_server("trello")
-        
-        # Preparar solicitud MCP
-        request = {
-            "type": "function",
-            "function": {
-                "name": operation,
-                "arguments": json.dumps(arguments or {})
-            }
-        }
-        
-        # Enviar solicitud y devolver respuesta
-        return await self.orchestrator.send_request("trello", request)
+        return await self.execute_operation(user_id, "trello", operation, arguments)
     
     async def execute_twitter_x_operation(self, 
-                                         user_id: str, 
-                                         operation: str, 
-                                         arguments: Dict[str, Any] = None) -> Dict[str, Any]:
+                                          user_id: str, 
+                                          operation: str, 
+                                          arguments: Dict[str, Any] = None) -> Dict[str, Any]:
         """
         Ejecuta una operación en Twitter/X.
         
@@ -461,38 +289,7 @@ class MCPClient:
         Returns:
             Respuesta de la operación
         """
-        if not self.initialized:
-            await self.initialize()
-        
-        # Cargar tokens del usuario
-        tokens = self.orchestrator.load_user_tokens(user_id)
-        if not tokens or "twitter_api_key" not in tokens:
-            raise ValueError(f"No se encontraron credenciales de Twitter/X para usuario {user_id}")
-        
-        # Configurar servidor con tokens del usuario
-        twitter_x_server = self.orchestrator.servers["twitter_x"]
-        twitter_x_server.env_vars = {
-            "TWITTER_API_KEY": tokens["twitter_api_key"],
-            "TWITTER_API_SECRET": tokens["twitter_api_secret"],
-            "TWITTER_ACCESS_TOKEN": tokens["twitter_access_token"],
-            "TWITTER_ACCESS_SECRET": tokens["twitter_access_secret"]
-        }
-        
-        # Iniciar servidor si no está en ejecución
-        if not twitter_x_server.running:
-            await self.orchestrator.start_server("twitter_x")
-        
-        # Preparar solicitud MCP
-        request = {
-            "type": "function",
-            "function": {
-                "name": operation,
-                "arguments": json.dumps(arguments or {})
-            }
-        }
-        
-        # Enviar solicitud y devolver respuesta
-        return await self.orchestrator.send_request("twitter_x", request)
+        return await self.execute_operation(user_id, "twitter_x", operation, arguments)
     
     async def save_user_tokens(self, 
                               user_id: str, 
@@ -512,41 +309,99 @@ class MCPClient:
         if not self.initialized:
             await self.initialize()
         
-        # Cargar tokens existentes
-        existing_tokens = self.orchestrator.load_user_tokens(user_id) or {}
-        
-        # Actualizar tokens para el servicio
-        if service == "github":
-            existing_tokens["github"] = tokens.get("token")
-        elif service == "notion":
-            existing_tokens["notion"] = tokens.get("token")
-        elif service == "slack":
-            existing_tokens["slack_xoxc"] = tokens.get("xoxc_token")
-            existing_tokens["slack_xoxd"] = tokens.get("xoxd_token")
-        elif service == "google_workspace":
-            existing_tokens["google_access_token"] = tokens.get("access_token")
-            existing_tokens["google_client_id"] = tokens.get("client_id")
-            existing_tokens["google_client_secret"] = tokens.get("client_secret")
-            existing_tokens["google_refresh_token"] = tokens.get("refresh_token")
-        elif service == "instagram":
-            existing_tokens["instagram_session_id"] = tokens.get("session_id")
-            existing_tokens["instagram_csrf_token"] = tokens.get("csrf_token")
-            existing_tokens["instagram_ds_user_id"] = tokens.get("ds_user_id")
-        elif service == "trello":
-            existing_tokens["trello_api_key"] = tokens.get("api_key")
-            existing_tokens["trello_token"] = tokens.get("token")
-            existing_tokens["trello_board_id"] = tokens.get("board_id")
-        elif service == "twitter_x":
-            existing_tokens["twitter_api_key"] = tokens.get("api_key")
-            existing_tokens["twitter_api_secret"] = tokens.get("api_secret")
-            existing_tokens["twitter_access_token"] = tokens.get("access_token")
-            existing_tokens["twitter_access_secret"] = tokens.get("access_secret")
-        else:
+        # Tokens del servicio (cada servicio se guarda por separado)
+        spec = MCP_SERVICES.get(service)
+        if spec is None or not spec.token_fields:
             logger.warning(f"Servicio desconocido: {service}")
             return False
+        service_tokens = spec.map_tokens(tokens)
         
-        # Guardar tokens actualizados
-        return self.orchestrator.save_user_tokens(user_id, existing_tokens)
+        # Guardar tokens donde los busca `execute_operation` (p. ej. Google Sheets usa los de Workspace)
+        return await self.orchestrator.save_user_tokens(user_id, service_tokens, service=spec.token_service)
+    
+    async def load_user_tokens(self, user_id: str, service: str = None) -> Optional[Dict[str, str]]:
+        """
+        Carga los tokens de un usuario.
+        
+        Args:
+            user_id: ID único del usuario
+            service: Nombre del servicio; sin él se devuelven los de todos los servicios
+            
+        Returns:
+            Diccionario de tokens, o None si no se encontraron
+        """
+        return await self.orchestrator.load_user_tokens(user_id, service)
+    
+    async def delete_user_tokens(self, user_id: str, service: str = None) -> bool:
+        """
+        Elimina los tokens de un usuario.
+        
+        Args:
+            user_id: ID único del usuario
+            service: Nombre del servicio; sin él se eliminan los de todos los servicios
+            
+        Returns:
+            True si la eliminación fue exitosa, False en caso contrario
+        """
+        return await self.orchestrator.delete_user_tokens(user_id, service)
+    
+    async def list_tools(self, service: str) -> List[Dict[str, Any]]:
+        """
+        Obtiene las operaciones conocidas de un servicio (catálogo `tools/list`).
+        
+        Args:
+            service: Nombre del servicio
+            
+        Returns:
+            Nombre, descripción y esquema de entrada de cada operación
+        """
+        if not self.initialized:
+            await self.initialize()
+        
+        get_service_spec(service)
+        return await _resolve(self.orchestrator.list_tools(service))
+    
+    async def get_server_status(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Obtiene el estado de los servidores MCP (locales o del broker).
+        
+        Returns:
+            Diccionario con el estado de cada servidor
+        """
+        return await _resolve(self.orchestrator.get_server_status())
+    
+    async def get_server_logs(self, name: str, lines: int = 100) -> List[Dict[str, Any]]:
+        """
+        Obtiene las últimas líneas de salida de un servidor MCP.
+        
+        Args:
+            name: Nombre del servidor MCP
+            lines: Número de líneas a devolver
+            
+        Returns:
+            Lista de líneas, de la más antigua a la más reciente
+        """
+        return await _resolve(self.orchestrator.get_server_logs(name, lines))
+    
+    async def get_metrics(self) -> Dict[str, Any]:
+        """
+        Obtiene las métricas de la capa MCP (locales o del broker).
+        
+        Returns:
+            Métricas del pool, la caché, la admisión, el ciclo de vida, el catálogo de herramientas y las operaciones
+        """
+        return {
+            "pool": await _resolve(self.orchestrator.get_pool_metrics()),
+            "cache": await _resolve(self.orchestrator.get_cache_metrics()),
+            "admission": await _resolve(self.orchestrator.get_admission_metrics()),
+            "lifecycle": await _resolve(self.orchestrator.get_lifecycle_report()),
+            "tools": await _resolve(self.orchestrator.get_tool_metrics()),
+            "operations": self.stats.get_metrics(),
+            "broker": {
+                "mode": self.broker_mode,
+                **(self.broker.metrics if self.broker else {})
+            }
+        }
     
     async def shutdown(self) -> bool:
         """
@@ -560,7 +415,11 @@ class MCPClient:
             return True
         
         try:
-            # Detener todos los servidores
+            if self.broker:
+                await self.broker.close()
+                self.broker = None
+            
+            # Detener todos los servidores (en modo cliente solo se cierra la conexión)
             await self.orchestrator.stop_all_servers()
             self.initialized = False
             logger.info("Cliente MCP apagado correctamente")
@@ -570,6 +429,12 @@ class MCPClient:
             logger.error(f"Error al apagar cliente MCP: {e}")
             return False
 
+async def _resolve(value: Any) -> Any:
+    """Espera el resultado si es asíncrono (orquestador del broker) o lo devuelve tal cual."""
+    if inspect.isawaitable(value):
+        return await value
+    return value
+
 # Instancia global del cliente MCP
 _mcp_client = None
 
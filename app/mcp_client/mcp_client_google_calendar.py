@@ -17,6 +17,11 @@ from datetime import datetime, timedelta
 
 # Importar orquestador de Google Calendar
 from app.mcp_client.mcp_orchestrator_google_calendar import MCPOrchestratorGoogleCalendar
+from app.mcp_client.mcp_calendar_index import (
+    CalendarEventIndex, GOOGLE_CALENDAR_INDEX_ENABLED, GOOGLE_CALENDAR_INDEX_FETCH_MAX,
+    parse_event_time, format_event_time, extract_payload, events_of,
+    busy_intervals, merge_intervals, free_slots
+)
 
 # Importar cliente Supabase
 from app.services.supabase_service import get_supabase_client
@@ -25,6 +30,12 @@ from app.services.supabase_service import get_supabase_client
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("mcp_client_google_calendar")
 
+# Operaciones en vuelo a la vez dentro de un lote (create_events, etc.)
+GOOGLE_CALENDAR_BATCH_CONCURRENCY = int(os.getenv("GOOGLE_CALENDAR_BATCH_CONCURRENCY", "8"))
+
+# Campos opcionales de un evento que se envían al servidor si tienen valor
+EVENT_FIELDS = ("summary", "start", "end", "description", "location", "attendees")
+
 class GoogleCalendarMCPClient:
     """
     Cliente MCP para Google Calendar.
@@ -41,6 +52,9 @@ class GoogleCalendarMCPClient:
             orchestrator: Orquestador MCP de Google Calendar
         """
         self.orchestrator = orchestrator or MCPOrchestratorGoogleCalendar()
+        
+        # Índice local de eventos por usuario (None si está desactivado)
+        self.index = CalendarEventIndex() if GOOGLE_CALENDAR_INDEX_ENABLED else None
         logger.info("Cliente MCP de Google Calendar inicializado")
     
     async def save_user_tokens(self, user_id: str, tokens: Dict[str, Any]) -> bool:
@@ -81,6 +95,10 @@ class GoogleCalendarMCPClient:
             # También guardar credenciales en el sistema de archivos para el orquestador
             await self.orchestrator.save_user_credentials(user_id, tokens)
             
+            # Las credenciales pueden ser de otra cuenta: descartar el índice
+            if self.index is not None:
+                self.index.drop(user_id)
+            
             logger.info(f"Tokens de Google Calendar guardados para el usuario {user_id}")
             return True
         
@@ -144,6 +162,9 @@ class GoogleCalendarMCPClient:
             # Eliminar credenciales del sistema de archivos
             await self.orchestrator.delete_user_credentials(user_id)
             
+            if self.index is not None:
+                self.index.drop(user_id)
+            
             logger.info(f"Tokens de Google Calendar eliminados para el usuario {user_id}")
             return True
         
@@ -164,14 +185,6 @@ class GoogleCalendarMCPClient:
         Returns:
             Resultado de la operación con los eventos
         """
-        # Verificar si existen tokens para el usuario
-        tokens = await self.load_user_tokens(user_id)
-        if not tokens:
-            return {
-                "status": "error",
-                "error": "No existen tokens de Google Calendar para el usuario"
-            }
-        
         # Preparar argumentos
         if not time_min:
             # Por defecto, desde ahora
@@ -181,6 +194,13 @@ class GoogleCalendarMCPClient:
             # Por defecto, una semana desde ahora
             time_max = (datetime.utcnow() + timedelta(days=7)).isoformat() + "Z"
         
+        if self.index is not None:
+            # Desde el índice local; solo se piden al servidor las ventanas que falten
+            return await self.index.list_events(
+                user_id, time_min, time_max, max_results,
+                lambda operation, arguments: self._execute(user_id, operation, arguments)
+            )
+        
         arguments = {
             "time_min": time_min,
             "time_max": time_max,
@@ -188,7 +208,122 @@ class GoogleCalendarMCPClient:
         }
         
         # Ejecutar operación
-        result = await self.orchestrator.execute_operation(user_id, "list_events", arguments)
+        return await self._execute(user_id, "list_events", arguments)
+    
+    async def find_free_slots(self, user_ids: List[str], time_min: str, time_max: str,
+                              duration_minutes: int = 30, max_results: int = None) -> Dict[str, Any]:
+        """
+        Busca huecos libres comunes a varios usuarios en una ventana de tiempo.
+        
+        Los intervalos ocupados de todos los usuarios se obtienen del índice
+        local (descargando solo las ventanas que falten) y se fusionan con un
+        barrido ordenado, de modo que una reunión con N asistentes no cuesta
+        N consultas al servidor cada vez.
+        
+        Args:
+            user_ids: IDs de los usuarios que deben estar libres
+            time_min: Inicio de la ventana (formato ISO)
+            time_max: Fin de la ventana (formato ISO)
+            duration_minutes: Duración mínima del hueco en minutos
+            max_results: Número máximo de huecos devueltos
+        
+        Returns:
+            Resultado de la operación con los huecos libres (`slots`) y los
+            intervalos ocupados (`busy`)
+        """
+        start = parse_event_time(time_min)
+        end = parse_event_time(time_max)
+        if start is None or end is None or end <= start:
+            return {"status": "error", "error": "Ventana de tiempo no válida"}
+        if duration_minutes <= 0:
+            return {"status": "error", "error": "La duración debe ser mayor que cero"}
+        
+        user_ids = list(dict.fromkeys(user_ids or []))
+        if not user_ids:
+            return {"status": "error", "error": "No se indicaron usuarios"}
+        
+        results = await asyncio.gather(*[
+            self._list_window(user_id, time_min, time_max) for user_id in user_ids
+        ])
+        
+        busy = []
+        for user_id, result in zip(user_ids, results):
+            if result.get("status") != "success":
+                return {
+                    "status": "error",
+                    "error": f"No se pudieron obtener los eventos del usuario {user_id}: {result.get('error')}"
+                }
+            busy.extend(busy_intervals(events_of(extract_payload(result)), start, end))
+        busy = merge_intervals(busy)
+        
+        slots = free_slots(busy, start, end, duration_minutes * 60)[:max_results]
+        return {
+            "status": "success",
+            "response": {
+                "result": {
+                    "slots": [
+                        {"start": {"dateTime": format_event_time(slot_start)},
+                         "end": {"dateTime": format_event_time(slot_end)}}
+                        for slot_start, slot_end in slots
+                    ],
+                    "busy": [
+                        {"start": {"dateTime": format_event_time(busy_start)},
+                         "end": {"dateTime": format_event_time(busy_end)}}
+                        for busy_start, busy_end in busy
+                    ]
+                }
+            }
+        }
+    
+    async def _list_window(self, user_id: str, time_min: str, time_max: str) -> Dict[str, Any]:
+        """
+        Obtiene todos los eventos de un usuario en una ventana de tiempo.
+        
+        Args:
+            user_id: ID del usuario
+            time_min: Inicio de la ventana (formato ISO)
+            time_max: Fin de la ventana (formato ISO)
+        
+        Returns:
+            Resultado de la operación con los eventos
+        """
+        if self.index is not None:
+            return await self.index.list_events(
+                user_id, time_min, time_max, None,
+                lambda operation, arguments: self._execute(user_id, operation, arguments)
+            )
+        
+        return await self._execute(user_id, "list_events", {
+            "time_min": time_min,
+            "time_max": time_max,
+            "max_results": GOOGLE_CALENDAR_INDEX_FETCH_MAX
+        })
+    
+    async def _execute(self, user_id: str, operation: str, arguments: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Ejecuta una operación en el servidor tras comprobar los tokens del usuario.
+        
+        Las escrituras confirmadas se aplican también al índice local.
+        
+        Args:
+            user_id: ID del usuario
+            operation: Nombre de la operación
+            arguments: Argumentos para la operación
+        
+        Returns:
+            Resultado de la operación
+        """
+        # Verificar si existen tokens para el usuario
+        tokens = await self.load_user_tokens(user_id)
+        if not tokens:
+            return {
+                "status": "error",
+                "error": "No existen tokens de Google Calendar para el usuario"
+            }
+        
+        result = await self.orchestrator.execute_operation(user_id, operation, arguments)
+        if self.index is not None and operation in ("create_event", "update_event", "delete_event"):
+            self.index.apply_write(user_id, operation, arguments, result)
         return result
     
     async def create_event(self, user_id: str, summary: str, start: Dict[str, Any], end: Dict[str, Any], 
@@ -208,14 +343,6 @@ class GoogleCalendarMCPClient:
         Returns:
             Resultado de la operación con el evento creado
         """
-        # Verificar si existen tokens para el usuario
-        tokens = await self.load_user_tokens(user_id)
-        if not tokens:
-            return {
-                "status": "error",
-                "error": "No existen tokens de Google Calendar para el usuario"
-            }
-        
         # Preparar argumentos
         arguments = {
             "summary": summary,
@@ -233,8 +360,7 @@ class GoogleCalendarMCPClient:
             arguments["attendees"] = attendees
         
         # Ejecutar operación
-        result = await self.orchestrator.execute_operation(user_id, "create_event", arguments)
-        return result
+        return await self._execute(user_id, "create_event", arguments)
     
     async def update_event(self, user_id: str, event_id: str, summary: str = None, start: Dict[str, Any] = None, 
                           end: Dict[str, Any] = None, description: str = None, location: str = None, 
@@ -255,14 +381,6 @@ class GoogleCalendarMCPClient:
         Returns:
             Resultado de la operación con el evento actualizado
         """
-        # Verificar si existen tokens para el usuario
-        tokens = await self.load_user_tokens(user_id)
-        if not tokens:
-            return {
-                "status": "error",
-                "error": "No existen tokens de Google Calendar para el usuario"
-            }
-        
         # Preparar argumentos
         arguments = {
             "event_id": event_id
@@ -287,8 +405,7 @@ class GoogleCalendarMCPClient:
             arguments["attendees"] = attendees
         
         # Ejecutar operación
-        result = await self.orchestrator.execute_operation(user_id, "update_event", arguments)
-        return result
+        return await self._execute(user_id, "update_event", arguments)
     
     async def delete_event(self, user_id: str, event_id: str) -> Dict[str, Any]:
         """
@@ -301,34 +418,93 @@ class GoogleCalendarMCPClient:
         Returns:
             Resultado de la operación
         """
-        # Verificar si existen tokens para el usuario
-        tokens = await self.load_user_tokens(user_id)
-        if not tokens:
-            return {
-                "status": "error",
-                "error": "No existen tokens de Google Calendar para el usuario"
-            }
-        
         # Preparar argumentos
         arguments = {
             "event_id": event_id
         }
         
         # Ejecutar operación
-        result = await self.orchestrator.execute_operation(user_id, "delete_event", arguments)
-        return result
+        return await self._execute(user_id, "delete_event", arguments)
     
-    async def get_calendars(self, user_id: str) -> Dict[str, Any]:
+    async def create_events(self, user_id: str, events: List[Dict[str, Any]]) -> Dict[str, Any]:
         """
-        Obtiene la lista de calendarios del usuario.
+        Crea varios eventos en el calendario del usuario.
         
         Args:
             user_id: ID del usuario
+            events: Eventos con los mismos campos que `create_event`
+                    (summary, start y end obligatorios)
         
         Returns:
-            Resultado de la operación con los calendarios
+            Resultado del lote con un resultado por evento, en orden
         """
-        # Verificar si existen tokens para el usuario
+        items = []
+        for event in events:
+            missing = [field for field in ("summary", "start", "end") if not event.get(field)]
+            if missing:
+                items.append(f"Faltan campos obligatorios: {', '.join(missing)}")
+            else:
+                items.append(_event_arguments(event))
+        
+        return await self._execute_batch(user_id, "create_event", items)
+    
+    async def update_events(self, user_id: str, updates: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Actualiza varios eventos del calendario del usuario.
+        
+        Args:
+            user_id: ID del usuario
+            updates: Cambios con `event_id` y los mismos campos que `update_event`
+        
+        Returns:
+            Resultado del lote con un resultado por evento, en orden
+        """
+        items = []
+        for update in updates:
+            if not update.get("event_id"):
+                items.append("Falta el campo obligatorio: event_id")
+            else:
+                items.append({"event_id": update["event_id"], **_event_arguments(update)})
+        
+        return await self._execute_batch(user_id, "update_event", items)
+    
+    async def delete_events(self, user_id: str, event_ids: List[str]) -> Dict[str, Any]:
+        """
+        Elimina varios eventos del calendario del usuario.
+        
+        Args:
+            user_id: ID del usuario
+            event_ids: IDs de los eventos a eliminar
+        
+        Returns:
+            Resultado del lote con un resultado por evento, en orden
+        """
+        items = [{"event_id": event_id} if event_id else "Falta el campo obligatorio: event_id"
+                 for event_id in event_ids]
+        
+        return await self._execute_batch(user_id, "delete_event", items)
+    
+    async def _execute_batch(self, user_id: str, operation: str, items: List[Any]) -> Dict[str, Any]:
+        """
+        Ejecuta una operación de escritura para varios elementos.
+        
+        Los tokens se comprueban una sola vez y las operaciones comparten la
+        sesión del servidor con como mucho GOOGLE_CALENDAR_BATCH_CONCURRENCY
+        en vuelo. Los resultados se aplican al índice local de una vez.
+        
+        Args:
+            user_id: ID del usuario
+            operation: create_event, update_event o delete_event
+            items: Argumentos de cada elemento, o el mensaje de error si no
+                   son válidos
+        
+        Returns:
+            Resultado del lote: estado (success, partial o error), número de
+            elementos correctos y fallidos, y un resultado por elemento
+        """
+        if not items:
+            return {"status": "success", "succeeded": 0, "failed": 0, "results": []}
+        
         tokens = await self.load_user_tokens(user_id)
         if not tokens:
             return {
@@ -336,9 +512,47 @@ class GoogleCalendarMCPClient:
                 "error": "No existen tokens de Google Calendar para el usuario"
             }
         
+        semaphore = asyncio.Semaphore(GOOGLE_CALENDAR_BATCH_CONCURRENCY)
+        
+        async def run(arguments: Any) -> Dict[str, Any]:
+            if isinstance(arguments, str):
+                return {"status": "error", "error": arguments}
+            async with semaphore:
+                return await self.orchestrator.execute_operation(user_id, operation, arguments)
+        
+        results = await asyncio.gather(*[run(arguments) for arguments in items])
+        
+        if self.index is not None:
+            self.index.apply_writes(user_id, [
+                (operation, arguments, result)
+                for arguments, result in zip(items, results)
+                if isinstance(arguments, dict)
+            ])
+        
+        succeeded = sum(1 for result in results if result.get("status") == "success")
+        failed = len(results) - succeeded
+        if failed:
+            logger.warning(f"Lote {operation} del usuario {user_id}: {failed} de {len(results)} fallidos")
+        
+        return {
+            "status": "success" if not failed else "partial" if succeeded else "error",
+            "succeeded": succeeded,
+            "failed": failed,
+            "results": list(results)
+        }
+    
+    async def get_calendars(self, user_id: str) -> Dict[str, Any]:
+        """
+        Obtiene la lista de calendarios del usuario.
+        
+        Args:
+            user_id: ID del usuario
+        
+        Returns:
+            Resultado de la operación con los calendarios
+        """
         # Ejecutar operación
-        result = await self.orchestrator.execute_operation(user_id, "get_calendars", {})
-        return result
+        return await self._execute(user_id, "get_calendars", {})
     
     async def get_server_status(self) -> Dict[str, Any]:
         """
@@ -349,6 +563,17 @@ class GoogleCalendarMCPClient:
         """
         return await self.orchestrator.get_status()
     
+    def get_index_metrics(self) -> Dict[str, Any]:
+        """
+        Obtiene las métricas del índice local de eventos.
+        
+        Returns:
+            Consultas locales, descargas, sincronizaciones y usuarios indexados
+        """
+        if self.index is None:
+            return {"enabled": False}
+        return {"enabled": True, **self.index.get_metrics()}
+    
     async def start_server(self) -> bool:
         """
         Inicia el servidor MCP de Google Calendar.
@@ -376,6 +601,10 @@ class GoogleCalendarMCPClient:
         """
         return await self.orchestrator.restart_server()
 
+def _event_arguments(fields: Dict[str, Any]) -> Dict[str, Any]:
+    """Argumentos de un evento con los campos de EVENT_FIELDS que tienen valor."""
+    return {field: fields[field] for field in EVENT_FIELDS if fields.get(field)}
+
 # Instancia global del cliente
 _google_calendar_client = None
 
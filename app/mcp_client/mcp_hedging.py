@@ -0,0 +1,156 @@
+"""
+Política de "hedging" de solicitudes a los servidores MCP remotos de GENIA
+
+Para llamadas cortas y deterministas (clasificaciones, puntuaciones) una
+sola respuesta lenta del servidor domina la latencia que ve el usuario. Con
+hedging, si una solicitud no ha recibido su primer evento pasado el
+percentil MCP_HEDGE_PERCENTILE del tiempo hasta el primer evento de su
+ruta, se envía un duplicado a otra réplica y gana la primera que responda.
+Sin otra réplica disponible (sin expulsar y con el circuito no abierto) no
+se duplica: el duplicado iría a la misma réplica lenta.
+
+El presupuesto de hedging limita la carga extra: cada solicitud con hedging
+aporta MCP_HEDGE_BUDGET fichas (hasta MCP_HEDGE_BUDGET_BURST) y cada
+duplicado consume una, de modo que a largo plazo los duplicados no superan
+esa fracción de las solicitudes.
+
+Autor: GENIA Team
+Fecha: Mayo 2025
+"""
+
+import os
+import logging
+from collections import deque
+from typing import Dict, Any
+
+# Configurar logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger("mcp_hedging")
+
+# Percentil del tiempo hasta el primer evento tras el que se envía el duplicado
+MCP_HEDGE_PERCENTILE = float(os.getenv("MCP_HEDGE_PERCENTILE", "0.95"))
+# Muestras necesarias para usar el percentil; antes se usa MCP_HEDGE_DEFAULT_DELAY
+MCP_HEDGE_MIN_SAMPLES = int(os.getenv("MCP_HEDGE_MIN_SAMPLES", "20"))
+MCP_HEDGE_DEFAULT_DELAY = float(os.getenv("MCP_HEDGE_DEFAULT_DELAY", "2"))
+# Espera mínima antes de un duplicado (evita duplicar casi todo con rutas muy rápidas)
+MCP_HEDGE_MIN_DELAY = float(os.getenv("MCP_HEDGE_MIN_DELAY", "0.05"))
+# Fracción de solicitudes que pueden duplicarse y ráfaga máxima de duplicados
+MCP_HEDGE_BUDGET = float(os.getenv("MCP_HEDGE_BUDGET", "0.1"))
+MCP_HEDGE_BUDGET_BURST = float(os.getenv("MCP_HEDGE_BUDGET_BURST", "5"))
+
+# Tiempos recientes conservados por ruta
+_LATENCY_SAMPLES = 256
+
+class MCPHedgePolicy:
+    """
+    Umbrales por ruta y presupuesto de duplicados de un servidor MCP.
+    """
+
+    def __init__(self,
+                 name: str,
+                 percentile: float = MCP_HEDGE_PERCENTILE,
+                 min_samples: int = MCP_HEDGE_MIN_SAMPLES,
+                 default_delay: float = MCP_HEDGE_DEFAULT_DELAY,
+                 min_delay: float = MCP_HEDGE_MIN_DELAY,
+                 budget: float = MCP_HEDGE_BUDGET,
+                 burst: float = MCP_HEDGE_BUDGET_BURST):
+        """
+        Inicializa la política.
+
+        Args:
+            name: Nombre del servidor
+            percentile: Percentil del tiempo hasta el primer evento (0-1)
+            min_samples: Muestras necesarias para usar el percentil
+            default_delay: Espera antes del duplicado sin muestras suficientes
+            min_delay: Espera mínima antes del duplicado
+            budget: Fichas que aporta cada solicitud (fracción duplicable)
+            burst: Fichas máximas acumuladas
+        """
+        self.name = name
+        self.percentile = percentile
+        self.min_samples = min_samples
+        self.default_delay = default_delay
+        self.min_delay = min_delay
+        self.budget = budget
+        self.burst = burst
+        self._tokens = burst
+        self._latencies: Dict[str, deque] = {}
+        self.metrics = {
+            "requests": 0,
+            "hedges": 0,
+            "hedge_wins": 0,
+            "budget_exhausted": 0,
+            "no_replica": 0
+        }
+
+    def start(self, route: str) -> float:
+        """
+        Registra una solicitud con hedging y devuelve la espera antes del duplicado.
+
+        Args:
+            route: Ruta de la solicitud (p. ej. "command_interpreter")
+
+        Returns:
+            Segundos a esperar el primer evento antes de duplicar
+        """
+        self.metrics["requests"] += 1
+        self._tokens = min(self.burst, self._tokens + self.budget)
+        return self.threshold(route)
+
+    def threshold(self, route: str) -> float:
+        """Espera antes del duplicado: percentil de la ruta o el valor por defecto."""
+        samples = self._latencies.get(route)
+        if samples is None or len(samples) < self.min_samples:
+            return self.default_delay
+        ordered = sorted(samples)
+        position = min(int(len(ordered) * self.percentile), len(ordered) - 1)
+        return max(ordered[position], self.min_delay)
+
+    def try_hedge(self) -> bool:
+        """Consume una ficha para enviar un duplicado; False si no hay presupuesto."""
+        if self._tokens < 1:
+            self.metrics["budget_exhausted"] += 1
+            return False
+        self._tokens -= 1
+        self.metrics["hedges"] += 1
+        return True
+
+    def skip(self):
+        """Registra un duplicado no enviado por no haber otra réplica utilizable (no gasta presupuesto)."""
+        self.metrics["no_replica"] += 1
+
+    def record(self, route: str, latency: float, hedge_won: bool):
+        """
+        Registra el tiempo hasta el primer evento de la solicitud ganadora.
+
+        Args:
+            route: Ruta de la solicitud
+            latency: Segundos desde el envío de la ganadora hasta su primer evento
+            hedge_won: Si ganó el duplicado
+        """
+        samples = self._latencies.get(route)
+        if samples is None:
+            samples = self._latencies[route] = deque(maxlen=_LATENCY_SAMPLES)
+        samples.append(latency)
+        if hedge_won:
+            self.metrics["hedge_wins"] += 1
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """
+        Obtiene las métricas de hedging.
+
+        Returns:
+            Solicitudes, duplicados, victorias del duplicado, presupuesto y
+            umbral actual de cada ruta
+        """
+        return {
+            **self.metrics,
+            "budget_tokens": self._tokens,
+            "routes": {
+                route: {"samples": len(samples), "threshold": self.threshold(route)}
+                for route, samples in self._latencies.items()
+            }
+        }
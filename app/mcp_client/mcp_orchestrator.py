@@ -11,12 +11,24 @@ Fecha: Mayo 2025
 
 import os
 import json
+import time
 import asyncio
 import logging
-import subprocess
-from typing import Dict, List, Any, Optional, Tuple
-import aiohttp
-from aiohttp import ClientSession
+from typing import Dict, List, Any, Optional, Tuple, Callable
+
+from .mcp_transport import (
+    StdioJSONRPCTransport,
+    MCPTransportError,
+    MCPTimeoutError,
+    build_jsonrpc_message,
+    DEFAULT_MAX_IN_FLIGHT
+)
+from .mcp_pool import MCPProcessPool
+from .mcp_cache import MCPResponseCache
+from .mcp_admission import MCPAdmissionQueue, MCPServerBusyError
+from .mcp_token_store import MCPTokenStore
+from .mcp_schemas import MCPToolCatalog
+from .mcp_output import MCPOutputBuffer, drain_stream
 
 # Configurar logging
 logging.basicConfig(
@@ -25,14 +37,137 @@ logging.basicConfig(
 )
 logger = logging.getLogger("mcp_orchestrator")
 
+# Solicitudes concurrentes permitidas por proceso MCP
+MCP_MAX_IN_FLIGHT = int(os.getenv("MCP_MAX_IN_FLIGHT", str(DEFAULT_MAX_IN_FLIGHT)))
+
+# Tiempo máximo de espera del handshake `initialize` (docker/npx pueden tardar)
+MCP_READY_TIMEOUT = float(os.getenv("MCP_READY_TIMEOUT", "30"))
+
+# Políticas de precalentamiento de servidores. Solo calientan el proceso
+# compartido (sin credenciales): las solicitudes con `env_vars` usan el pool
+# por credenciales y nunca adoptan estos procesos ni sus reservas
+PREWARM_LAZY = "lazy"          # Iniciar con la primera solicitud
+PREWARM_STARTUP = "startup"    # Iniciar al arrancar la aplicación
+PREWARM_SPARES = "spares"      # Iniciar al arrancar y mantener N procesos de reserva
+MCP_PREWARM_POLICY = os.getenv("MCP_PREWARM_POLICY", PREWARM_LAZY)
+MCP_PREWARM_SPARES = int(os.getenv("MCP_PREWARM_SPARES", "1"))
+
+# Supervisión: reinicios automáticos con backoff exponencial y presupuesto
+MCP_RESTART_MAX = int(os.getenv("MCP_RESTART_MAX", "5"))                      # Reinicios permitidos...
+MCP_RESTART_WINDOW = float(os.getenv("MCP_RESTART_WINDOW", "300"))            # ...por ventana (s)
+MCP_RESTART_BACKOFF_BASE = float(os.getenv("MCP_RESTART_BACKOFF_BASE", "1"))
+MCP_RESTART_BACKOFF_MAX = float(os.getenv("MCP_RESTART_BACKOFF_MAX", "60"))
+MCP_RESTART_STABLE_AFTER = float(os.getenv("MCP_RESTART_STABLE_AFTER", "60")) # Uptime que reinicia el backoff
+
+# Plazos de respuesta: por defecto y por operación ({"servidor.operacion": segundos})
+MCP_REQUEST_TIMEOUT = float(os.getenv("MCP_REQUEST_TIMEOUT", "60"))
+MCP_OPERATION_TIMEOUTS: Dict[str, float] = json.loads(os.getenv("MCP_OPERATION_TIMEOUTS", "{}"))
+
+# Cuarentena tras timeouts consecutivos
+MCP_QUARANTINE_THRESHOLD = int(os.getenv("MCP_QUARANTINE_THRESHOLD", "3"))
+MCP_QUARANTINE_SECONDS = float(os.getenv("MCP_QUARANTINE_SECONDS", "30"))
+
+# Arranque y parada en paralelo de todos los servidores
+MCP_LIFECYCLE_CONCURRENCY = int(os.getenv("MCP_LIFECYCLE_CONCURRENCY", "4"))
+MCP_START_TIMEOUT = float(os.getenv("MCP_START_TIMEOUT", "120"))
+MCP_STOP_TIMEOUT = float(os.getenv("MCP_STOP_TIMEOUT", "5"))
+
+# Segundos de espera del drenado de stderr tras terminar el proceso
+_DRAIN_TIMEOUT = 1.0
+
+# Estados de un servidor MCP
+STATUS_STOPPED = "stopped"
+STATUS_STARTING = "starting"
+STATUS_RUNNING = "running"
+STATUS_RESTARTING = "restarting"
+STATUS_CRASHED = "crashed"
+STATUS_FAILED = "failed"
+
+def _remaining(deadline: float) -> float:
+    """Segundos que quedan hasta `deadline` (reloj monotónico), con un mínimo positivo."""
+    return max(deadline - time.monotonic(), 0.001)
+
+class MCPServerQuarantinedError(RuntimeError):
+    """El servidor MCP está en cuarentena por timeouts repetidos."""
+
+class MCPQuarantine:
+    """
+    Cuarentena de un servidor MCP por timeouts consecutivos.
+    
+    Se comparte entre todos los procesos de un mismo servidor (compartido,
+    reservas y pool), ya que un servidor que no responde suele deberse al
+    servicio externo y no a un proceso concreto.
+    """
+    
+    def __init__(self,
+                 threshold: int = MCP_QUARANTINE_THRESHOLD,
+                 duration: float = MCP_QUARANTINE_SECONDS):
+        """
+        Inicializa la cuarentena.
+        
+        Args:
+            threshold: Timeouts consecutivos que activan la cuarentena
+            duration: Segundos que dura la cuarentena
+        """
+        self.threshold = threshold
+        self.duration = duration
+        self.consecutive_timeouts = 0
+        self.total_timeouts = 0
+        self.quarantines = 0
+        self._until = 0.0
+    
+    @property
+    def active(self) -> bool:
+        """Indica si la cuarentena está vigente."""
+        return time.monotonic() < self._until
+    
+    @property
+    def remaining(self) -> float:
+        """Segundos restantes de cuarentena."""
+        return max(self._until - time.monotonic(), 0.0)
+    
+    def record_success(self):
+        """Registra una respuesta a tiempo."""
+        self.consecutive_timeouts = 0
+    
+    def record_timeout(self) -> bool:
+        """
+        Registra un timeout.
+        
+        Returns:
+            True si este timeout activa la cuarentena
+        """
+        self.consecutive_timeouts += 1
+        self.total_timeouts += 1
+        if self.consecutive_timeouts >= self.threshold and not self.active:
+            self._until = time.monotonic() + self.duration
+            self.consecutive_timeouts = 0
+            self.quarantines += 1
+            return True
+        return False
+
 class MCPServer:
-    """Clase que representa un servidor MCP y gestiona su ciclo de vida."""
+    """
+    Clase que representa un servidor MCP y gestiona su ciclo de vida.
+    
+    Cada proceso en ejecución tiene una tarea supervisora que detecta su
+    terminación; si el servidor no se detuvo a propósito y `auto_restart`
+    está activo, se reinicia con backoff exponencial dentro de un
+    presupuesto de reinicios por ventana de tiempo.
+    """
     
     def __init__(self, 
                  name: str, 
                  command: List[str], 
                  env_vars: Dict[str, str] = None,
-                 server_type: str = "stdio"):
+                 server_type: str = "stdio",
+                 max_in_flight: int = MCP_MAX_IN_FLIGHT,
+                 ready_timeout: float = MCP_READY_TIMEOUT,
+                 auto_restart: bool = True,
+                 output: MCPOutputBuffer = None,
+                 request_timeout: float = MCP_REQUEST_TIMEOUT,
+                 quarantine: MCPQuarantine = None,
+                 cwd: str = None):
         """
         Inicializa un servidor MCP.
         
@@ -41,21 +176,128 @@ class MCPServer:
             command: Comando y argumentos para iniciar el servidor
             env_vars: Variables de entorno necesarias
             server_type: Tipo de servidor (stdio, sse, etc.)
+            max_in_flight: Solicitudes concurrentes permitidas sobre el proceso
+            ready_timeout: Segundos máximos de espera del handshake `initialize`
+            auto_restart: Reiniciar el proceso si termina inesperadamente
+            output: Buffer de salida compartido (por defecto uno propio)
+            request_timeout: Plazo por defecto de cada solicitud en segundos
+            quarantine: Cuarentena compartida (por defecto una propia)
+            cwd: Directorio de trabajo del proceso (por defecto el actual)
         """
         self.name = name
         self.command = command
         self.env_vars = env_vars or {}
         self.server_type = server_type
+        self.cwd = cwd
+        self.max_in_flight = max_in_flight
+        self.ready_timeout = ready_timeout
+        self.auto_restart = auto_restart
         self.process = None
+        self.transport: Optional[StdioJSONRPCTransport] = None
+        self.server_info: Dict[str, Any] = {}
         self.running = False
+        self.status = STATUS_STOPPED
         self.last_error = None
+        
+        # Últimas líneas de stdout/stderr, conservadas entre reinicios
+        self.output = output or MCPOutputBuffer(name)
+        
+        # Plazos y cuarentena por timeouts repetidos
+        self.request_timeout = request_timeout
+        self.quarantine = quarantine or MCPQuarantine()
+        
+        # Supervisión
+        self.started_at: Optional[float] = None
+        self.restart_count = 0
+        self.crash_count = 0
+        self.last_exit_code: Optional[int] = None
+        self._restart_times: List[float] = []
+        self._consecutive_failures = 0
+        self._start_lock = asyncio.Lock()
+        self._supervisor_task: Optional[asyncio.Task] = None
+        self._drain_task: Optional[asyncio.Task] = None
+        self._recycle_task: Optional[asyncio.Task] = None
+        
+        # Función llamada cada vez que un proceso completa el handshake
+        self.on_ready: Optional[Callable[["MCPServer"], Any]] = None
+    
+    @property
+    def starting(self) -> bool:
+        """Indica si hay un arranque en curso."""
+        return self._start_lock.locked()
+    
+    @property
+    def pid(self) -> Optional[int]:
+        """PID del proceso en ejecución."""
+        return self.process.pid if self.running and self.process else None
+    
+    @property
+    def uptime(self) -> Optional[float]:
+        """Segundos desde que el proceso actual está listo."""
+        if not self.running or self.started_at is None:
+            return None
+        return time.monotonic() - self.started_at
+    
+    def clone(self, env_vars: Dict[str, str] = None, command: List[str] = None) -> "MCPServer":
+        """
+        Crea un servidor con la misma configuración pero otras credenciales.
+        
+        Los clones no se reinician solos: su propietario (pool o reservas)
+        los sustituye cuando terminan.
+        
+        Args:
+            env_vars: Variables de entorno del nuevo servidor
+            command: Comando del nuevo servidor (por defecto el mismo)
+            
+        Returns:
+            Nuevo servidor MCP, sin iniciar
+        """
+        clone = MCPServer(
+            self.name,
+            list(command or self.command),
+            dict(env_vars if env_vars is not None else self.env_vars),
+            self.server_type,
+            max_in_flight=self.max_in_flight,
+            ready_timeout=self.ready_timeout,
+            auto_restart=False,
+            output=self.output,
+            request_timeout=self.request_timeout,
+            quarantine=self.quarantine,
+            cwd=self.cwd
+        )
+        clone.on_ready = self.on_ready
+        return clone
     
     async def start(self) -> bool:
-        """Inicia el servidor MCP como un subproceso."""
-        if self.running:
-            logger.info(f"Servidor MCP '{self.name}' ya está en ejecución")
-            return True
+        """
+        Inicia el servidor MCP como un subproceso.
         
+        El servidor solo se marca en ejecución cuando responde al handshake
+        `initialize` de MCP dentro de `ready_timeout` segundos. Las llamadas
+        concurrentes comparten un único arranque.
+        """
+        async with self._start_lock:
+            if self.running:
+                logger.info(f"Servidor MCP '{self.name}' ya está en ejecución")
+                return True
+            
+            self.status = STATUS_STARTING
+            try:
+                started = await self._spawn()
+            except asyncio.CancelledError:
+                # Arranque abandonado (p. ej. por timeout): no dejar procesos huérfanos
+                self.last_error = "Arranque cancelado"
+                await self._abort_start()
+                self.status = STATUS_STOPPED
+                raise
+            if started:
+                self.status = STATUS_RUNNING
+            elif self.status == STATUS_STARTING:
+                self.status = STATUS_STOPPED
+            return started
+    
+    async def _spawn(self) -> bool:
+        """Lanza el proceso, espera al handshake e inicia su supervisión."""
         try:
             # Preparar entorno con variables específicas del servidor
             env = os.environ.copy()
@@ -68,93 +310,282 @@ class MCPServer:
                 stdin=asyncio.subprocess.PIPE,
                 stdout=asyncio.subprocess.PIPE,
                 stderr=asyncio.subprocess.PIPE,
-                env=env
+                env=env,
+                cwd=self.cwd
             )
             
-            self.running = True
-            logger.info(f"Servidor MCP '{self.name}' iniciado con PID {self.process.pid}")
+            # Un único lector enruta las respuestas por id a cada solicitud;
+            # stderr se drena en paralelo para que nunca llene la tubería
+            pid = self.process.pid
+            self.transport = StdioJSONRPCTransport(
+                self.name,
+                self.process.stdout,
+                self.process.stdin,
+                max_in_flight=self.max_in_flight,
+                on_output=lambda line: self.output.append("stdout", line, pid)
+            )
+            self.transport.start()
+            self._drain_task = asyncio.create_task(drain_stream(self.process.stderr, self.output, "stderr", pid))
             
-            # Iniciar tarea para capturar stderr
-            asyncio.create_task(self._log_stderr())
+            # Esperar a que el servidor esté listo para recibir solicitudes
+            self.server_info = await self.transport.initialize(self.ready_timeout)
+            
+            self.running = True
+            self.started_at = time.monotonic()
+            self._watch(self.process)
+            logger.info(f"Servidor MCP '{self.name}' listo con PID {self.process.pid}")
+            if self.on_ready is not None:
+                self.on_ready(self)
             
             return True
         
+        except asyncio.TimeoutError:
+            self.last_error = f"El servidor no respondió a initialize en {self.ready_timeout}s"
+            logger.error(f"Error al iniciar servidor MCP '{self.name}': {self.last_error}")
+            await self._abort_start()
+            return False
+        
         except Exception as e:
             self.last_error = str(e)
             logger.error(f"Error al iniciar servidor MCP '{self.name}': {e}")
+            await self._abort_start()
             return False
     
-    async def stop(self) -> bool:
-        """Detiene el servidor MCP."""
-        if not self.running or not self.process:
-            logger.info(f"Servidor MCP '{self.name}' no está en ejecución")
-            return True
-        
-        try:
-            logger.info(f"Deteniendo servidor MCP '{self.name}'")
-            self.process.terminate()
-            await asyncio.wait_for(self.process.wait(), timeout=5.0)
-            self.running = False
-            logger.info(f"Servidor MCP '{self.name}' detenido")
-            return True
+    def adopt(self, spare: "MCPServer"):
+        """
+        Toma el proceso ya iniciado de un servidor de reserva.
         
-        except asyncio.TimeoutError:
-            logger.warning(f"Timeout al detener servidor MCP '{self.name}', forzando terminación")
+        Args:
+            spare: Servidor de reserva listo, creado con `clone()`
+        """
+        spare._cancel_supervisor()
+        self.process = spare.process
+        self.transport = spare.transport
+        self.server_info = spare.server_info
+        self.running = spare.running
+        self.started_at = spare.started_at
+        self._drain_task = spare._drain_task
+        self.status = STATUS_RUNNING
+        spare._drain_task = None
+        spare.process = None
+        spare.transport = None
+        spare.running = False
+        spare.status = STATUS_STOPPED
+        self._watch(self.process)
+        logger.info(f"Servidor MCP '{self.name}' usa proceso de reserva con PID {self.process.pid}")
+    
+    async def _abort_start(self):
+        """Libera el proceso y el transporte de un arranque fallido."""
+        if self.transport:
+            await self.transport.close()
+            self.transport = None
+        if self.process and self.process.returncode is None:
             self.process.kill()
             await self.process.wait()
-            self.running = False
-            return True
-        
+        self.process = None
+        await self._finish_drain()
+    
+    async def _finish_drain(self):
+        """
+        Espera a que el drenado de stderr del proceso (ya terminado) recoja
+        sus últimas líneas; si se alarga lo cancela.
+        """
+        task, self._drain_task = self._drain_task, None
+        if task is None:
+            return
+        await asyncio.wait([task], timeout=_DRAIN_TIMEOUT)
+        if not task.done():
+            task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
         except Exception as e:
-            self.last_error = str(e)
-            logger.error(f"Error al detener servidor MCP '{self.name}': {e}")
-            return False
+            logger.error(f"Error al drenar stderr del servidor MCP '{self.name}': {e}")
+    
+    def _watch(self, process):
+        """Inicia la tarea supervisora del proceso indicado."""
+        self._cancel_supervisor()
+        self._supervisor_task = asyncio.create_task(self._supervise(process))
     
-    async def _log_stderr(self):
-        """Captura y registra la salida de error del servidor MCP."""
-        if not self.process or not self.process.stderr:
+    def _cancel_supervisor(self):
+        """Cancela la tarea supervisora (y cualquier reinicio pendiente)."""
+        task = self._supervisor_task
+        self._supervisor_task = None
+        if task and not task.done() and task is not asyncio.current_task():
+            task.cancel()
+    
+    async def _supervise(self, process):
+        """Espera la terminación del proceso y decide si reiniciarlo."""
+        returncode = await process.wait()
+        if self.process is not process:
             return
         
-        while True:
-            line = await self.process.stderr.readline()
-            if not line:
-                break
+        # Terminación inesperada
+        lifetime = time.monotonic() - self.started_at if self.started_at else 0.0
+        self.running = False
+        self.process = None
+        self.last_exit_code = returncode
+        self.crash_count += 1
+        self.last_error = f"El proceso terminó inesperadamente con código {returncode}"
+        logger.error(f"Servidor MCP '{self.name}': {self.last_error}")
+        await self._finish_drain()
+        if self.transport:
+            await self.transport.close()
+            self.transport = None
+        
+        # Un proceso que llevaba tiempo estable reinicia el backoff
+        if lifetime >= MCP_RESTART_STABLE_AFTER:
+            self._consecutive_failures = 0
+        else:
+            self._consecutive_failures += 1
+        
+        if not self.auto_restart:
+            self.status = STATUS_CRASHED
+            return
+        
+        await self._restart_with_backoff()
+    
+    async def _restart_with_backoff(self):
+        """Reinicia el proceso con backoff exponencial respetando el presupuesto."""
+        while not self.running:
+            now = time.monotonic()
+            self._restart_times = [t for t in self._restart_times if now - t < MCP_RESTART_WINDOW]
+            if len(self._restart_times) >= MCP_RESTART_MAX:
+                self.status = STATUS_FAILED
+                logger.error(
+                    f"Servidor MCP '{self.name}' superó {MCP_RESTART_MAX} reinicios en "
+                    f"{MCP_RESTART_WINDOW}s; no se reiniciará automáticamente"
+                )
+                return
             
-            error_line = line.decode('utf-8').strip()
-            if error_line:
-                logger.warning(f"[{self.name}] {error_line}")
+            delay = min(
+                MCP_RESTART_BACKOFF_BASE * (2 ** max(self._consecutive_failures - 1, 0)),
+                MCP_RESTART_BACKOFF_MAX
+            )
+            self.status = STATUS_RESTARTING
+            logger.info(f"Reiniciando servidor MCP '{self.name}' en {delay:.1f}s")
+            await asyncio.sleep(delay)
+            
+            self._restart_times.append(time.monotonic())
+            self.restart_count += 1
+            if await self.start():
+                return
+            self._consecutive_failures += 1
+    
+    async def _recycle(self):
+        """Sustituye el proceso actual (posiblemente colgado) por uno nuevo."""
+        await self.stop()
+        if self.auto_restart:
+            await self.start()
     
-    async def send_request(self, request: Dict[str, Any]) -> Dict[str, Any]:
+    async def stop(self) -> bool:
+        """Detiene el servidor MCP."""
+        async with self._start_lock:
+            # Una parada explícita cancela la supervisión y los reinicios pendientes
+            self._cancel_supervisor()
+            if (self._recycle_task and not self._recycle_task.done()
+                    and self._recycle_task is not asyncio.current_task()):
+                self._recycle_task.cancel()
+            
+            if not self.running or not self.process:
+                self.running = False
+                self.status = STATUS_STOPPED
+                logger.info(f"Servidor MCP '{self.name}' no está en ejecución")
+                return True
+            
+            process = self.process
+            try:
+                logger.info(f"Deteniendo servidor MCP '{self.name}'")
+                if self.transport:
+                    await self.transport.close()
+                    self.transport = None
+                process.terminate()
+                await asyncio.wait_for(process.wait(), timeout=MCP_STOP_TIMEOUT)
+                logger.info(f"Servidor MCP '{self.name}' detenido")
+                return True
+            
+            except asyncio.TimeoutError:
+                logger.warning(f"Timeout al detener servidor MCP '{self.name}', forzando terminación")
+                process.kill()
+                await process.wait()
+                return True
+            
+            except Exception as e:
+                self.last_error = str(e)
+                logger.error(f"Error al detener servidor MCP '{self.name}': {e}")
+                return False
+            
+            finally:
+                if process.returncode is not None:
+                    self.running = False
+                    self.process = None
+                    self.status = STATUS_STOPPED
+                    await self._finish_drain()
+    
+    async def send_request(self,
+                           request: Dict[str, Any],
+                           timeout: float = None,
+                           on_progress: Callable[[Dict[str, Any]], Any] = None) -> Dict[str, Any]:
         """
         Envía una solicitud al servidor MCP y espera la respuesta.
         
+        Se pueden tener varias solicitudes en vuelo sobre el mismo proceso;
+        cada respuesta se entrega a la solicitud con el mismo id.
+        
         Args:
             request: Solicitud en formato MCP
+            timeout: Plazo en segundos (por defecto `request_timeout`)
+            on_progress: Función que recibe los resultados parciales (`notifications/progress`)
             
         Returns:
             Respuesta del servidor MCP
+            
+        Raises:
+            MCPTimeoutError: Si la respuesta no llega dentro del plazo
+            MCPServerQuarantinedError: Si el servidor está en cuarentena
         """
-        if not self.running or not self.process:
+        if self.quarantine.active:
+            raise MCPServerQuarantinedError(
+                f"Servidor MCP '{self.name}' en cuarentena por timeouts "
+                f"({self.quarantine.remaining:.0f}s restantes)"
+            )
+        
+        if not self.running or not self.process or not self.transport:
             raise RuntimeError(f"Servidor MCP '{self.name}' no está en ejecución")
         
+        transport = self.transport
         try:
-            # Serializar la solicitud
-            request_json = json.dumps(request) + "\n"
-            request_bytes = request_json.encode('utf-8')
-            
-            # Enviar solicitud
-            self.process.stdin.write(request_bytes)
-            await self.process.stdin.drain()
-            
-            # Leer respuesta
-            response_line = await self.process.stdout.readline()
-            if not response_line:
-                raise RuntimeError(f"Servidor MCP '{self.name}' cerró la conexión")
-            
-            # Deserializar la respuesta
-            response = json.loads(response_line.decode('utf-8'))
+            # El transporte asigna el id y espera la respuesta correspondiente
+            response = await transport.request(
+                build_jsonrpc_message(request),
+                timeout=self.request_timeout if timeout is None else timeout,
+                on_progress=on_progress
+            )
+            self.quarantine.record_success()
             return response
         
+        except MCPTimeoutError as e:
+            self.last_error = str(e)
+            logger.warning(str(e))
+            if self.quarantine.record_timeout():
+                logger.error(
+                    f"Servidor MCP '{self.name}' en cuarentena durante {self.quarantine.duration}s "
+                    f"tras {self.quarantine.threshold} timeouts consecutivos"
+                )
+                if self._recycle_task is None or self._recycle_task.done():
+                    self._recycle_task = asyncio.create_task(self._recycle())
+            raise
+        
+        except MCPTransportError as e:
+            self.last_error = str(e)
+            logger.error(f"Error al comunicarse con servidor MCP '{self.name}': {e}")
+            if transport.closed and self.process and self.process.returncode is None:
+                # Transporte inutilizable con el proceso vivo: terminarlo para
+                # que el supervisor lo reinicie
+                self.process.kill()
+            raise
+        
         except Exception as e:
             self.last_error = str(e)
             logger.error(f"Error al comunicarse con servidor MCP '{self.name}': {e}")
@@ -172,16 +603,56 @@ class MCPOrchestrator:
         """Inicializa el orquestador MCP."""
         self.servers: Dict[str, MCPServer] = {}
         self.config_dir = os.path.join(os.path.dirname(__file__), "config")
-        self.user_tokens: Dict[str, Dict[str, str]] = {}
+        
+        # Plazos por operación: {(servidor, operación): segundos}
+        self.operation_timeouts: Dict[Tuple[str, str], float] = {
+            tuple(key.split(".", 1)): float(seconds)
+            for key, seconds in MCP_OPERATION_TIMEOUTS.items()
+            if "." in key
+        }
+        
+        # Procesos calientes por (servidor, credenciales de usuario)
+        self.pool = MCPProcessPool()
+        
+        # Caché de respuestas de operaciones de lectura
+        self.cache = MCPResponseCache()
+        
+        # Límite de solicitudes concurrentes y cola de espera por servidor
+        self.admission: Dict[str, MCPAdmissionQueue] = {}
+        
+        # Política de precalentamiento y procesos de reserva por servidor
+        self.prewarm_policies: Dict[str, Tuple[str, int]] = {}
+        
+        # Último informe de tiempos de cada operación de ciclo de vida
+        self.lifecycle_reports: Dict[str, Dict[str, Any]] = {}
+        self.spares: Dict[str, List[MCPServer]] = {}
+        self._spare_tasks: Dict[str, asyncio.Task] = {}
         
         # Crear directorio de configuración si no existe
         os.makedirs(self.config_dir, exist_ok=True)
+        
+        # Tokens de usuario en SQLite con caché de lectura (importa los ficheros JSON antiguos)
+        self.token_store = MCPTokenStore(
+            os.getenv("MCP_TOKEN_DB") or os.path.join(self.config_dir, "tokens.db"),
+            legacy_dir=self.config_dir
+        )
+        
+        # Herramientas y esquemas de cada servidor (persistidos entre arranques)
+        self.tools = MCPToolCatalog(
+            os.getenv("MCP_TOOL_SCHEMAS") or os.path.join(self.config_dir, "tool_schemas.json")
+        )
+        self._discovery_tasks: Dict[str, asyncio.Task] = {}
     
     def register_server(self, 
                        name: str, 
                        command: List[str], 
                        env_vars: Dict[str, str] = None,
-                       server_type: str = "stdio") -> bool:
+                       server_type: str = "stdio",
+                       prewarm_policy: str = None,
+                       spares: int = None,
+                       max_concurrent: int = None,
+                       max_queued: int = None,
+                       request_timeout: float = None) -> bool:
         """
         Registra un nuevo servidor MCP.
         
@@ -190,6 +661,16 @@ class MCPOrchestrator:
             command: Comando y argumentos para iniciar el servidor
             env_vars: Variables de entorno necesarias
             server_type: Tipo de servidor (stdio, sse, etc.)
+            prewarm_policy: Política de precalentamiento (lazy, startup, spares);
+                por defecto MCP_PREWARM_POLICY
+            spares: Procesos de reserva a mantener con la política `spares`;
+                por defecto MCP_PREWARM_SPARES
+            max_concurrent: Solicitudes simultáneas permitidas; por defecto
+                MCP_SERVER_MAX_CONCURRENT
+            max_queued: Solicitudes en espera permitidas; por defecto
+                MCP_SERVER_MAX_QUEUED
+            request_timeout: Plazo por defecto de sus solicitudes; por defecto
+                MCP_REQUEST_TIMEOUT
             
         Returns:
             True si el registro fue exitoso, False en caso contrario
@@ -198,8 +679,23 @@ class MCPOrchestrator:
             logger.warning(f"Servidor MCP '{name}' ya está registrado")
             return False
         
-        server = MCPServer(name, command, env_vars, server_type)
+        server = MCPServer(
+            name, command, env_vars, server_type,
+            request_timeout=MCP_REQUEST_TIMEOUT if request_timeout is None else request_timeout
+        )
+        server.on_ready = self._on_server_ready
         self.servers[name] = server
+        self.tools.bind(name, command)
+        self.prewarm_policies[name] = (
+            prewarm_policy or MCP_PREWARM_POLICY,
+            MCP_PREWARM_SPARES if spares is None else spares
+        )
+        limits = {}
+        if max_concurrent is not None:
+            limits["max_concurrent"] = max_concurrent
+        if max_queued is not None:
+            limits["max_queued"] = max_queued
+        self.admission[name] = MCPAdmissionQueue(name, **limits)
         logger.info(f"Servidor MCP '{name}' registrado")
         return True
     
@@ -218,6 +714,9 @@ class MCPOrchestrator:
             return False
         
         del self.servers[name]
+        self.admission.pop(name, None)
+        self.tools.forget(name)
+        self.prewarm_policies.pop(name, None)
         logger.info(f"Servidor MCP '{name}' eliminado del registro")
         return True
     
@@ -235,7 +734,17 @@ class MCPOrchestrator:
             logger.warning(f"Servidor MCP '{name}' no está registrado")
             return False
         
-        return await self.servers[name].start()
+        server = self.servers[name]
+        if not server.running and not server.starting:
+            # Si hay un proceso de reserva listo, usarlo en lugar de un arranque en frío
+            spares = [spare for spare in self.spares.get(name, []) if spare.running]
+            if spares:
+                server.adopt(spares.pop(0))
+                self.spares[name] = spares
+                self._schedule_spare_refill(name)
+                return True
+        
+        return await server.start()
     
     async def stop_server(self, name: str) -> bool:
         """
@@ -253,111 +762,461 @@ class MCPOrchestrator:
         
         return await self.servers[name].stop()
     
+    async def _run_lifecycle(self,
+                             action: str,
+                             names: List[str],
+                             operation: Callable[[str], Any],
+                             timeout: float) -> Dict[str, Any]:
+        """
+        Ejecuta una operación de ciclo de vida sobre varios servidores en paralelo.
+        
+        Como máximo MCP_LIFECYCLE_CONCURRENCY servidores a la vez, cada uno con
+        su propio plazo. El informe de tiempos se guarda en `lifecycle_reports`.
+        
+        Args:
+            action: Nombre de la operación (start, stop, prewarm)
+            names: Servidores sobre los que actuar
+            operation: Corrutina que recibe el nombre del servidor y devuelve bool
+            timeout: Plazo por servidor en segundos
+            
+        Returns:
+            Informe con la duración total y el resultado, duración y error de cada servidor
+        """
+        semaphore = asyncio.Semaphore(MCP_LIFECYCLE_CONCURRENCY)
+        started_at = time.monotonic()
+        
+        async def run(name: str) -> Tuple[str, Dict[str, Any]]:
+            async with semaphore:
+                started = time.monotonic()
+                error = None
+                try:
+                    ok = await asyncio.wait_for(operation(name), timeout)
+                except asyncio.TimeoutError:
+                    ok = False
+                    error = f"Sin completar en {timeout}s"
+                except Exception as e:
+                    ok = False
+                    error = str(e)
+                if not ok and error is None and name in self.servers:
+                    error = self.servers[name].last_error
+                return name, {
+                    "ok": ok,
+                    "duration": round(time.monotonic() - started, 3),
+                    "error": error
+                }
+        
+        servers = dict(await asyncio.gather(*[run(name) for name in names]))
+        slowest = max(servers, key=lambda name: servers[name]["duration"], default=None)
+        report = {
+            "action": action,
+            "total_duration": round(time.monotonic() - started_at, 3),
+            "concurrency": MCP_LIFECYCLE_CONCURRENCY,
+            "timeout": timeout,
+            "slowest": slowest,
+            "servers": servers
+        }
+        self.lifecycle_reports[action] = report
+        
+        failed = [name for name, result in servers.items() if not result["ok"]]
+        logger.info(
+            f"Operación '{action}' de {len(servers)} servidores MCP en {report['total_duration']}s "
+            f"(más lento: {slowest}, fallidos: {failed or 'ninguno'})"
+        )
+        return report
+    
     async def start_all_servers(self) -> Dict[str, bool]:
         """
-        Inicia todos los servidores MCP registrados.
+        Inicia todos los servidores MCP registrados en paralelo.
+        
+        El informe de tiempos queda en `lifecycle_reports["start"]`.
         
         Returns:
             Diccionario con el resultado del inicio de cada servidor
         """
-        results = {}
-        for name in self.servers:
-            results[name] = await self.start_server(name)
-        return results
+        report = await self._run_lifecycle("start", list(self.servers), self.start_server, MCP_START_TIMEOUT)
+        return {name: result["ok"] for name, result in report["servers"].items()}
     
     async def stop_all_servers(self) -> Dict[str, bool]:
         """
-        Detiene todos los servidores MCP en ejecución.
+        Detiene en paralelo todos los servidores MCP en ejecución.
+        
+        Los procesos de reserva y los del pool se detienen a la vez que los
+        servidores registrados. El informe de tiempos queda en
+        `lifecycle_reports["stop"]`.
         
         Returns:
             Diccionario con el resultado de la detención de cada servidor
         """
-        results = {}
-        for name in self.servers:
-            results[name] = await self.stop_server(name)
-        return results
+        for task in list(self._discovery_tasks.values()):
+            task.cancel()
+        
+        # stop() ya fuerza la terminación tras MCP_STOP_TIMEOUT
+        report, _, _ = await asyncio.gather(
+            self._run_lifecycle("stop", list(self.servers), self.stop_server, MCP_STOP_TIMEOUT * 2),
+            self._stop_spares(),
+            self.pool.close()
+        )
+        return {name: result["ok"] for name, result in report["servers"].items()}
+    
+    def get_lifecycle_report(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Obtiene el último informe de tiempos de arranque, precalentamiento y parada.
+        
+        Returns:
+            Diccionario con el informe de cada operación
+        """
+        return self.lifecycle_reports
     
-    async def send_request(self, server_name: str, request: Dict[str, Any]) -> Dict[str, Any]:
+    async def prewarm(self) -> Dict[str, bool]:
+        """
+        Aplica la política de precalentamiento de cada servidor registrado.
+        
+        Los servidores `startup` y `spares` se inician en paralelo; los `spares`
+        además dejan en marcha sus procesos de reserva. Los `lazy` se iniciarán
+        con su primera solicitud. Solo tiene sentido para servidores que se
+        usan sin credenciales; los que siempre reciben `env_vars` deben
+        registrarse como `lazy`.
+        
+        Returns:
+            Diccionario con el resultado del inicio de cada servidor precalentado
+        """
+        names = [
+            name for name, (policy, _) in self.prewarm_policies.items()
+            if policy in (PREWARM_STARTUP, PREWARM_SPARES)
+        ]
+        report = await self._run_lifecycle("prewarm", names, self.start_server, MCP_START_TIMEOUT)
+        
+        for name in names:
+            if self.prewarm_policies[name][0] == PREWARM_SPARES:
+                self._schedule_spare_refill(name)
+        
+        return {name: result["ok"] for name, result in report["servers"].items()}
+    
+    def _schedule_spare_refill(self, name: str):
+        """Repone en segundo plano los procesos de reserva de un servidor."""
+        policy, _ = self.prewarm_policies.get(name, (PREWARM_LAZY, 0))
+        if policy != PREWARM_SPARES:
+            return
+        task = self._spare_tasks.get(name)
+        if task is None or task.done():
+            self._spare_tasks[name] = asyncio.create_task(self._refill_spares(name))
+    
+    async def _refill_spares(self, name: str):
+        """Inicia procesos de reserva hasta alcanzar el número configurado."""
+        _, target = self.prewarm_policies[name]
+        spares = [spare for spare in self.spares.get(name, []) if spare.running]
+        self.spares[name] = spares
+        
+        while len(spares) < target and name in self.servers:
+            spare = self.servers[name].clone()
+            if not await spare.start():
+                logger.warning(f"No se pudo iniciar proceso de reserva para '{name}': {spare.last_error}")
+                return
+            spares.append(spare)
+        
+        logger.info(f"Servidor MCP '{name}' con {len(spares)} procesos de reserva")
+    
+    async def _stop_spares(self):
+        """Detiene los procesos de reserva y las tareas que los reponen."""
+        for task in self._spare_tasks.values():
+            task.cancel()
+        self._spare_tasks.clear()
+        
+        spares = [spare for spares in self.spares.values() for spare in spares]
+        self.spares.clear()
+        await asyncio.gather(*[spare.stop() for spare in spares])
+    
+    def _on_server_ready(self, server: MCPServer):
+        """Obtiene el catálogo de herramientas con el primer proceso listo de cada servidor."""
+        name = server.name
+        if name in self.tools.refreshed or name in self._discovery_tasks or name not in self.servers:
+            return
+        task = asyncio.create_task(self._discover_tools(name, server))
+        self._discovery_tasks[name] = task
+        task.add_done_callback(lambda _: self._discovery_tasks.pop(name, None))
+    
+    async def _discover_tools(self, name: str, server: MCPServer):
+        """
+        Pide `tools/list` (con paginación) a un proceso y actualiza el catálogo.
+        
+        Args:
+            name: Nombre del servidor MCP
+            server: Proceso ya iniciado del servidor (compartido o del pool)
+        """
+        tools: List[Dict[str, Any]] = []
+        cursor = None
+        try:
+            while True:
+                request = {"method": "tools/list", "params": {"cursor": cursor} if cursor else {}}
+                response = await server.send_request(request)
+                if "error" in response:
+                    raise RuntimeError(response["error"].get("message", response["error"]))
+                result = response.get("result") or {}
+                tools.extend(result.get("tools") or [])
+                cursor = result.get("nextCursor")
+                if not cursor:
+                    break
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning(f"No se pudo obtener el catálogo de herramientas de '{name}': {e}")
+            return
+        
+        if name in self.servers:
+            await self.tools.update(name, self.servers[name].command, tools)
+            logger.info(f"Catálogo de herramientas de '{name}' actualizado: {len(tools)} herramientas")
+    
+    def list_tools(self, server_name: str) -> List[Dict[str, Any]]:
+        """
+        Obtiene las herramientas conocidas de un servidor MCP.
+        
+        Args:
+            server_name: Nombre del servidor MCP
+            
+        Returns:
+            Nombre, descripción y esquema de entrada de cada herramienta
+        """
+        return self.tools.list_tools(server_name)
+    
+    def set_operation_timeout(self, server_name: str, operation: str, timeout: float):
+        """
+        Configura el plazo de respuesta de una operación concreta.
+        
+        Args:
+            server_name: Nombre del servidor MCP
+            operation: Nombre de la herramienta (o método JSON-RPC)
+            timeout: Plazo en segundos
+        """
+        self.operation_timeouts[(server_name, operation)] = timeout
+    
+    def resolve_timeout(self, server_name: str, request: Dict[str, Any], timeout: float = None) -> float:
+        """
+        Determina el plazo de una solicitud: explícito, por operación o del servidor.
+        
+        Args:
+            server_name: Nombre del servidor MCP
+            request: Solicitud en formato MCP
+            timeout: Plazo explícito de la llamada
+            
+        Returns:
+            Plazo en segundos
+        """
+        if timeout is not None:
+            return timeout
+        
+        message = build_jsonrpc_message(request)
+        operation = message.get("method")
+        if operation == "tools/call":
+            operation = message.get("params", {}).get("name")
+        
+        if (server_name, operation) in self.operation_timeouts:
+            return self.operation_timeouts[(server_name, operation)]
+        return self.servers[server_name].request_timeout
+    
+    async def send_request(self, 
+                          server_name: str, 
+                          request: Dict[str, Any],
+                          env_vars: Dict[str, str] = None,
+                          command: List[str] = None,
+                          timeout: float = None,
+                          on_progress: Callable[[Dict[str, Any]], Any] = None) -> Dict[str, Any]:
         """
         Envía una solicitud a un servidor MCP específico.
         
+        Si se indican credenciales (`env_vars`), la solicitud se ejecuta en un
+        proceso del pool reservado para esas credenciales; si no, en el proceso
+        compartido del servidor registrado.
+        
         Args:
             server_name: Nombre del servidor MCP
             request: Solicitud en formato MCP
+            env_vars: Variables de entorno con las credenciales del usuario
+            command: Comando alternativo para el proceso del usuario
+            timeout: Plazo en segundos (por defecto el de la operación o del servidor)
+            on_progress: Función que recibe los resultados parciales del servidor
             
         Returns:
             Respuesta del servidor MCP
+            
+        Raises:
+            MCPTimeoutError: Si la respuesta no llega dentro del plazo
+            MCPServerQuarantinedError: Si el servidor está en cuarentena
+            MCPServerBusyError: Si el servidor tiene la cola de espera llena
         """
         if server_name not in self.servers:
             raise ValueError(f"Servidor MCP '{server_name}' no está registrado")
         
+        template = self.servers[server_name]
+        timeout = self.resolve_timeout(server_name, request, timeout)
+        
+        # Rechazo inmediato sin arrancar procesos si el servidor está en cuarentena
+        if template.quarantine.active:
+            raise MCPServerQuarantinedError(
+                f"Servidor MCP '{server_name}' en cuarentena por timeouts "
+                f"({template.quarantine.remaining:.0f}s restantes)"
+            )
+        
+        # El tiempo en cola se descuenta del plazo de la solicitud
+        async with self.admission[server_name].slot(timeout) as waited:
+            return await self._dispatch_request(
+                server_name, request, env_vars, command, max(timeout - waited, 0.001), on_progress
+            )
+    
+    async def _dispatch_request(self,
+                                server_name: str,
+                                request: Dict[str, Any],
+                                env_vars: Optional[Dict[str, str]],
+                                command: Optional[List[str]],
+                                timeout: float,
+                                on_progress: Optional[Callable[[Dict[str, Any]], Any]]) -> Dict[str, Any]:
+        """
+        Ejecuta una solicitud ya admitida en el proceso que le corresponde.
+        
+        El plazo cubre también la obtención del proceso (arranque en frío y
+        handshake incluidos); la solicitud recibe lo que quede de él.
+        """
+        deadline = time.monotonic() + timeout
+        template = self.servers[server_name]
+        if env_vars is not None:
+            async with self.pool.lease(template, env_vars, command, timeout=timeout) as server:
+                return await server.send_request(request, timeout=_remaining(deadline), on_progress=on_progress)
+        
         server = self.servers[server_name]
+        if server.status == STATUS_FAILED:
+            # Agotó su presupuesto de reinicios: solo un start_server explícito lo recupera
+            raise RuntimeError(f"Servidor MCP '{server_name}' deshabilitado tras fallos repetidos: {server.last_error}")
         if not server.running:
-            await server.start()
+            # El arranque es compartido: al vencer el plazo sigue para los demás
+            try:
+                await asyncio.wait_for(asyncio.shield(self.start_server(server_name)), timeout)
+            except asyncio.TimeoutError:
+                raise MCPTimeoutError(
+                    f"Servidor MCP '{server_name}' no estuvo listo en {timeout:.2f}s"
+                ) from None
         
-        return await server.send_request(request)
+        return await server.send_request(request, timeout=_remaining(deadline), on_progress=on_progress)
     
-    def save_user_tokens(self, user_id: str, tokens: Dict[str, str]) -> bool:
+    async def call_tool(self,
+                        server_name: str,
+                        operation: str,
+                        arguments: Dict[str, Any] = None,
+                        user_id: str = None,
+                        env_vars: Dict[str, str] = None,
+                        command: List[str] = None,
+                        timeout: float = None,
+                        use_cache: bool = True) -> Dict[str, Any]:
         """
-        Guarda los tokens de un usuario para diferentes servicios.
+        Ejecuta una herramienta de un servidor MCP pasando por la caché de lectura.
+        
+        La herramienta y sus argumentos se validan antes contra el catálogo del
+        servidor. Las operaciones de lectura con TTL se responden desde memoria
+        mientras estén vigentes; las de escritura invalidan la caché del servicio.
+        
+        Args:
+            server_name: Nombre del servidor MCP
+            operation: Nombre de la herramienta
+            arguments: Argumentos de la herramienta
+            user_id: ID del usuario (forma parte de la clave de caché)
+            env_vars: Variables de entorno con las credenciales del usuario
+            command: Comando alternativo para el proceso del usuario
+            timeout: Plazo en segundos
+            use_cache: False para ignorar la respuesta cacheada y refrescarla
+            
+        Returns:
+            Respuesta del servidor MCP
+            
+        Raises:
+            MCPUnknownToolError: Si el servidor no ofrece la herramienta
+            MCPToolValidationError: Si los argumentos no cumplen su esquema
+        """
+        # Rechazo local, sin arrancar procesos ni ir al servidor
+        self.tools.validate(server_name, operation, arguments)
+        
+        request = {
+            "type": "function",
+            "function": {
+                "name": operation,
+                "arguments": arguments or {}
+            }
+        }
+        
+        async def call() -> Dict[str, Any]:
+            return await self.send_request(
+                server_name, request, env_vars=env_vars, command=command, timeout=timeout
+            )
+        
+        return await self.cache.get_or_call(
+            server_name, operation, arguments, user_id, call, refresh=not use_cache
+        )
+    
+    async def save_user_tokens(self, user_id: str, tokens: Dict[str, str], service: str) -> bool:
+        """
+        Guarda los tokens de un usuario para un servicio.
         
         Args:
             user_id: ID único del usuario
-            tokens: Diccionario de tokens por servicio
+            tokens: Diccionario de tokens del servicio
+            service: Servicio al que pertenecen los tokens; debe ser el
+                `token_service` del servicio MCP, que es donde se buscan
             
         Returns:
             True si el guardado fue exitoso, False en caso contrario
         """
         try:
-            # Guardar en memoria
-            self.user_tokens[user_id] = tokens
+            await self.token_store.set(user_id, service, tokens)
             
-            # Guardar en archivo
-            file_path = os.path.join(self.config_dir, f"user_{user_id}_tokens.json")
-            with open(file_path, 'w') as f:
-                json.dump(tokens, f)
+            # Las respuestas cacheadas con las credenciales anteriores ya no valen
+            self.cache.invalidate_user(user_id)
             
-            logger.info(f"Tokens guardados para usuario {user_id}")
+            logger.info(f"Tokens de {service} guardados para usuario {user_id}")
             return True
         
         except Exception as e:
             logger.error(f"Error al guardar tokens para usuario {user_id}: {e}")
             return False
     
-    def load_user_tokens(self, user_id: str) -> Optional[Dict[str, str]]:
+    async def load_user_tokens(self, user_id: str, service: str = None) -> Optional[Dict[str, str]]:
         """
         Carga los tokens de un usuario.
         
         Args:
             user_id: ID único del usuario
+            service: Servicio concreto; sin él se combinan los de todos los servicios
             
         Returns:
-            Diccionario de tokens por servicio, o None si no se encontraron
+            Diccionario de tokens, o None si no se encontraron
         """
-        # Verificar si ya están en memoria
-        if user_id in self.user_tokens:
-            return self.user_tokens[user_id]
-        
         try:
-            # Intentar cargar desde archivo
-            file_path = os.path.join(self.config_dir, f"user_{user_id}_tokens.json")
-            if not os.path.exists(file_path):
-                logger.warning(f"No se encontraron tokens para usuario {user_id}")
-                return None
-            
-            with open(file_path, 'r') as f:
-                tokens = json.load(f)
-            
-            # Guardar en memoria para futuras consultas
-            self.user_tokens[user_id] = tokens
-            
-            logger.info(f"Tokens cargados para usuario {user_id}")
+            tokens = await self.token_store.get(user_id, service)
+            if tokens is None:
+                logger.debug(f"No se encontraron tokens para usuario {user_id}")
             return tokens
         
         except Exception as e:
             logger.error(f"Error al cargar tokens para usuario {user_id}: {e}")
             return None
     
+    async def delete_user_tokens(self, user_id: str, service: str = None) -> bool:
+        """
+        Elimina los tokens de un usuario.
+        
+        Args:
+            user_id: ID único del usuario
+            service: Servicio concreto; sin él se eliminan todos
+            
+        Returns:
+            True si la eliminación fue exitosa, False en caso contrario
+        """
+        try:
+            await self.token_store.delete(user_id, service)
+            self.cache.invalidate_user(user_id)
+            logger.info(f"Tokens de {service or 'todos los servicios'} eliminados para usuario {user_id}")
+            return True
+        
+        except Exception as e:
+            logger.error(f"Error al eliminar tokens para usuario {user_id}: {e}")
+            return False
+    
     def get_server_status(self) -> Dict[str, Dict[str, Any]]:
         """
         Obtiene el estado de todos los servidores MCP registrados.
@@ -369,10 +1228,78 @@ class MCPOrchestrator:
         for name, server in self.servers.items():
             status[name] = {
                 "running": server.running,
+                "status": server.status,
                 "server_type": server.server_type,
+                "pid": server.pid,
+                "uptime": server.uptime,
+                "restarts": server.restart_count,
+                "crashes": server.crash_count,
+                "last_exit_code": server.last_exit_code,
+                "spares": len([spare for spare in self.spares.get(name, []) if spare.running]),
+                "output": server.output.get_stats(),
+                "quarantined": server.quarantine.active,
+                "quarantine_remaining": server.quarantine.remaining,
+                "timeouts": server.quarantine.total_timeouts,
+                "in_flight": self.admission[name].in_flight if name in self.admission else 0,
+                "queue_depth": self.admission[name].queue_depth if name in self.admission else 0,
                 "last_error": server.last_error
             }
         return status
+    
+    def get_server_logs(self, name: str, lines: int = 100) -> List[Dict[str, Any]]:
+        """
+        Obtiene las últimas líneas de salida de un servidor MCP.
+        
+        Incluye la salida de todos sus procesos (compartido, reservas y pool).
+        
+        Args:
+            name: Nombre del servidor MCP
+            lines: Número de líneas a devolver
+            
+        Returns:
+            Lista de líneas, de la más antigua a la más reciente
+        """
+        if name not in self.servers:
+            raise ValueError(f"Servidor MCP '{name}' no está registrado")
+        
+        return self.servers[name].output.tail(lines)
+    
+    def get_pool_metrics(self) -> Dict[str, Any]:
+        """
+        Obtiene las métricas del pool de procesos por credencial.
+        
+        Returns:
+            Diccionario con aciertos, fallos, arranques y expulsiones del pool
+        """
+        return self.pool.get_metrics()
+    
+    def get_cache_metrics(self) -> Dict[str, Any]:
+        """
+        Obtiene las métricas de la caché de lectura.
+        
+        Returns:
+            Diccionario con aciertos, fallos, expulsiones, invalidaciones y ratio de aciertos
+        """
+        return self.cache.get_metrics()
+    
+    def get_admission_metrics(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Obtiene las métricas de admisión de cada servidor.
+        
+        Returns:
+            Diccionario con plazas ocupadas, profundidad de cola, rechazos y
+            tiempos de espera por servidor
+        """
+        return {name: queue.get_metrics() for name, queue in self.admission.items()}
+    
+    def get_tool_metrics(self) -> Dict[str, Any]:
+        """
+        Obtiene las métricas del catálogo de herramientas.
+        
+        Returns:
+            Llamadas validadas y rechazadas, y herramientas conocidas por servidor
+        """
+        return self.tools.get_metrics()
 
 # Configuraciones predefinidas para servidores MCP comunes
 GITHUB_MCP_CONFIG = {
@@ -12,14 +12,177 @@ import os
 import json
 import logging
 import asyncio
+import shutil
+import threading
 import subprocess
 from typing import Dict, Any, List, Optional, Tuple
 from pathlib import Path
 
+from .mcp_orchestrator import MCPServer, MCP_REQUEST_TIMEOUT
+
 # Configurar logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("mcp_orchestrator_google_calendar")
 
+# Tiempo máximo de espera del handshake `initialize` del servidor
+GOOGLE_CALENDAR_MCP_READY_TIMEOUT = float(os.environ.get("GOOGLE_CALENDAR_MCP_READY_TIMEOUT", "30"))
+
+# Plazo por defecto de cada operación del servidor
+GOOGLE_CALENDAR_MCP_REQUEST_TIMEOUT = float(
+    os.environ.get("GOOGLE_CALENDAR_MCP_REQUEST_TIMEOUT", str(MCP_REQUEST_TIMEOUT))
+)
+
+# Argumento con el que el servidor (compartido) identifica al usuario y su
+# directorio de credenciales dentro de GOOGLE_CALENDAR_CREDENTIALS_DIR
+GOOGLE_CALENDAR_USER_ARGUMENT = "user_id"
+
+# Caché en disco de los comandos y versiones de Python y UV, por PATH
+GOOGLE_CALENDAR_TOOLCHAIN_CACHE = os.environ.get("GOOGLE_CALENDAR_TOOLCHAIN_CACHE") or os.path.join(
+    os.path.dirname(__file__), "config", "toolchain.json"
+)
+
+# Herramientas descubiertas en este proceso
+_toolchain: Optional[Dict[str, Any]] = None
+_toolchain_lock = threading.Lock()
+
+def _probe_python() -> Tuple[str, str]:
+    """
+    Busca un comando de Python 3.13+ en el sistema.
+    
+    Returns:
+        Comando de Python a utilizar y su versión
+    """
+    # Intentar con diferentes versiones de Python
+    python_cmds = ["python3.13", "python3.14", "python3.15", "python3"]
+    versions = {}
+    
+    for cmd in python_cmds:
+        try:
+            # Verificar versión
+            result = subprocess.run(
+                [cmd, "--version"], 
+                capture_output=True, 
+                text=True
+            )
+            version = (result.stdout or result.stderr).strip()
+            versions[cmd] = version
+            logger.info(f"Versión de Python encontrada: {version}")
+            
+            # Extraer número de versión
+            import re
+            match = re.search(r"(\d+\.\d+\.\d+)", version)
+            if match:
+                version_num = match.group(1)
+                major, minor, _ = map(int, version_num.split("."))
+                
+                # Verificar si es 3.13+
+                if major == 3 and minor >= 13:
+                    logger.info(f"Usando {cmd} (versión {version_num})")
+                    return cmd, version
+        except Exception as e:
+            logger.debug(f"Error al verificar {cmd}: {e}")
+            continue
+    
+    # Si llegamos aquí, no se encontró Python 3.13+
+    logger.warning("No se encontró Python 3.13+. El servidor Google Calendar MCP requiere Python 3.13+")
+    logger.warning("Usando python3 por defecto, pero puede haber problemas de compatibilidad")
+    return "python3", versions.get("python3", "unknown")
+
+def _probe_uv() -> Tuple[str, str]:
+    """
+    Verifica si UV Package Manager está instalado.
+    
+    Returns:
+        Comando de UV a utilizar y su versión
+    """
+    try:
+        result = subprocess.run(
+            ["uv", "--version"], 
+            capture_output=True, 
+            text=True
+        )
+        version = (result.stdout or result.stderr).strip()
+        logger.info(f"UV Package Manager encontrado: {version}")
+        return "uv", version
+    except Exception as e:
+        logger.warning(f"UV Package Manager no encontrado: {e}")
+        logger.warning("El servidor Google Calendar MCP requiere UV Package Manager")
+        return "uv", "unknown"  # Devolvemos el comando de todas formas para intentar usarlo
+
+def _fingerprint(cmd: str) -> Optional[List[Any]]:
+    """Ruta y fecha de modificación del ejecutable de un comando (None si no está)."""
+    path = shutil.which(cmd)
+    if path is None:
+        return None
+    try:
+        return [path, os.stat(path).st_mtime]
+    except OSError:
+        return None
+
+def get_toolchain(refresh: bool = False) -> Dict[str, Any]:
+    """
+    Obtiene los comandos y versiones de Python y UV.
+    
+    El sistema se sondea (lanzando `--version`) como mucho una vez por
+    proceso. El resultado se guarda en GOOGLE_CALENDAR_TOOLCHAIN_CACHE bajo
+    el PATH actual, y otros procesos lo reutilizan mientras los ejecutables
+    elegidos sigan en la misma ruta y no hayan cambiado.
+    
+    Args:
+        refresh: True para volver a sondear el sistema
+    
+    Returns:
+        Diccionario con python_cmd, python_version, uv_cmd y uv_version
+    """
+    global _toolchain
+    
+    if _toolchain is not None and not refresh:
+        return _toolchain
+    
+    with _toolchain_lock:
+        if _toolchain is not None and not refresh:
+            return _toolchain
+        
+        path_key = os.environ.get("PATH", "")
+        try:
+            with open(GOOGLE_CALENDAR_TOOLCHAIN_CACHE, "r") as f:
+                cache = json.load(f)
+            if not isinstance(cache, dict):
+                cache = {}
+        except (OSError, ValueError):
+            cache = {}
+        
+        entry = cache.get(path_key)
+        if (not refresh and isinstance(entry, dict)
+                and entry.get("python_fingerprint") == _fingerprint(entry.get("python_cmd", ""))
+                and entry.get("uv_fingerprint") == _fingerprint(entry.get("uv_cmd", ""))):
+            _toolchain = entry
+            return _toolchain
+        
+        python_cmd, python_version = _probe_python()
+        uv_cmd, uv_version = _probe_uv()
+        entry = {
+            "python_cmd": python_cmd,
+            "python_version": python_version,
+            "python_fingerprint": _fingerprint(python_cmd),
+            "uv_cmd": uv_cmd,
+            "uv_version": uv_version,
+            "uv_fingerprint": _fingerprint(uv_cmd)
+        }
+        cache[path_key] = entry
+        
+        try:
+            os.makedirs(os.path.dirname(GOOGLE_CALENDAR_TOOLCHAIN_CACHE), exist_ok=True)
+            temp_path = f"{GOOGLE_CALENDAR_TOOLCHAIN_CACHE}.{os.getpid()}.tmp"
+            with open(temp_path, "w") as f:
+                json.dump(cache, f, indent=2)
+            os.replace(temp_path, GOOGLE_CALENDAR_TOOLCHAIN_CACHE)
+        except OSError as e:
+            logger.warning(f"No se pudo guardar la caché de herramientas: {e}")
+        
+        _toolchain = entry
+        return _toolchain
+
 class MCPOrchestratorGoogleCalendar:
     """
     Extensión del orquestador MCP para Google Calendar.
@@ -42,21 +205,32 @@ class MCPOrchestratorGoogleCalendar:
         self.supabase_key = supabase_key or os.environ.get("SUPABASE_KEY")
         self.supabase_jwt_secret = os.environ.get("SUPABASE_JWT_SECRET")
         
-        # Proceso del servidor MCP
-        self.process = None
-        self.running = False
-        self.start_time = None
-        
-        # Verificar Python 3.13+
+        # Python 3.13+ y UV Package Manager (descubiertos una vez por proceso)
         self.python_cmd = self._get_python_cmd()
-        
-        # Verificar UV Package Manager
         self.uv_cmd = self._get_uv_cmd()
         
         # Configuración de credenciales
         self.credentials_dir = os.path.join(self.base_dir, "credentials")
         os.makedirs(self.credentials_dir, exist_ok=True)
         
+        # Sesión stdio persistente con `calendar_mcp.py`: MCPServer aporta el
+        # handshake, las solicitudes concurrentes por id, los plazos y la
+        # supervisión con reinicio automático
+        env_vars = {
+            "SUPABASE_URL": self.supabase_url,
+            "SUPABASE_KEY": self.supabase_key,
+            "SUPABASE_JWT_SECRET": self.supabase_jwt_secret,
+            "GOOGLE_CALENDAR_CREDENTIALS_DIR": self.credentials_dir
+        }
+        self.server = MCPServer(
+            "google_calendar",
+            [self.uv_cmd, "--directory", self.base_dir, "run", "calendar_mcp.py"],
+            {key: value for key, value in env_vars.items() if value is not None},
+            ready_timeout=GOOGLE_CALENDAR_MCP_READY_TIMEOUT,
+            request_timeout=GOOGLE_CALENDAR_MCP_REQUEST_TIMEOUT,
+            cwd=self.base_dir
+        )
+        
         logger.info(f"Orquestador de Google Calendar MCP inicializado en {self.base_dir}")
     
     def _get_python_cmd(self) -> str:
@@ -66,60 +240,31 @@ class MCPOrchestratorGoogleCalendar:
         Returns:
             Comando de Python a utilizar
         """
-        # Intentar con diferentes versiones de Python
-        python_cmds = ["python3.13", "python3.14", "python3.15", "python3"]
-        
-        for cmd in python_cmds:
-            try:
-                # Verificar versión
-                result = subprocess.run(
-                    [cmd, "--version"], 
-                    capture_output=True, 
-                    text=True
-                )
-                version = result.stdout.strip()
-                logger.info(f"Versión de Python encontrada: {version}")
-                
-                # Extraer número de versión
-                import re
-                match = re.search(r"(\d+\.\d+\.\d+)", version)
-                if match:
-                    version_num = match.group(1)
-                    major, minor, _ = map(int, version_num.split("."))
-                    
-                    # Verificar si es 3.13+
-                    if major == 3 and minor >= 13:
-                        logger.info(f"Usando {cmd} (versión {version_num})")
-                        return cmd
-            except Exception as e:
-                logger.debug(f"Error al verificar {cmd}: {e}")
-                continue
-        
-        # Si llegamos aquí, no se encontró Python 3.13+
-        logger.warning("No se encontró Python 3.13+. El servidor Google Calendar MCP requiere Python 3.13+")
-        logger.warning("Usando python3 por defecto, pero puede haber problemas de compatibilidad")
-        return "python3"
+        return get_toolchain()["python_cmd"]
     
     def _get_uv_cmd(self) -> str:
         """
-        Verifica si UV Package Manager está instalado.
+        Obtiene el comando de UV Package Manager.
         
         Returns:
             Comando de UV a utilizar
         """
-        try:
-            result = subprocess.run(
-                ["uv", "--version"], 
-                capture_output=True, 
-                text=True
-            )
-            version = result.stdout.strip()
-            logger.info(f"UV Package Manager encontrado: {version}")
-            return "uv"
-        except Exception as e:
-            logger.warning(f"UV Package Manager no encontrado: {e}")
-            logger.warning("El servidor Google Calendar MCP requiere UV Package Manager")
-            return "uv"  # Devolvemos el comando de todas formas para intentar usarlo
+        return get_toolchain()["uv_cmd"]
+    
+    @property
+    def process(self):
+        """Proceso del servidor MCP en ejecución (o None)."""
+        return self.server.process
+    
+    @property
+    def running(self) -> bool:
+        """Indica si el servidor MCP está en ejecución."""
+        return self.server.running
+    
+    @property
+    def output(self):
+        """Últimas líneas de salida del servidor."""
+        return self.server.output
     
     async def start_server(self) -> bool:
         """
@@ -128,68 +273,19 @@ class MCPOrchestratorGoogleCalendar:
         Returns:
             True si el servidor se inició correctamente, False en caso contrario
         """
-        if self.running:
-            logger.info("El servidor Google Calendar MCP ya está en ejecución")
-            return True
+        return await self.server.start()
+    
+    def get_logs(self, lines: int = 100) -> List[Dict[str, Any]]:
+        """
+        Obtiene las últimas líneas de salida del servidor MCP de Google Calendar.
         
-        try:
-            # Preparar comando
-            cmd = [
-                self.uv_cmd,
-                "--directory",
-                self.base_dir,
-                "run",
-                "calendar_mcp.py"
-            ]
-            
-            # Configurar variables de entorno
-            env = os.environ.copy()
-            env["SUPABASE_URL"] = self.supabase_url
-            env["SUPABASE_KEY"] = self.supabase_key
-            env["SUPABASE_JWT_SECRET"] = self.supabase_jwt_secret
-            env["GOOGLE_CALENDAR_CREDENTIALS_DIR"] = self.credentials_dir
-            
-            # Iniciar proceso
-            logger.info(f"Iniciando servidor Google Calendar MCP: {' '.join(cmd)}")
-            self.process = await asyncio.create_subprocess_exec(
-                *cmd,
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.PIPE,
-                env=env,
-                cwd=self.base_dir
-            )
-            
-            # Esperar un momento para verificar que el proceso no falle inmediatamente
-            await asyncio.sleep(2)
-            
-            if self.process.returncode is None:
-                self.running = True
-                self.start_time = asyncio.get_event_loop().time()
-                logger.info(f"Servidor Google Calendar MCP iniciado con PID {self.process.pid}")
-                
-                # Iniciar tarea para leer la salida
-                asyncio.create_task(self._read_output())
-                
-                return True
-            else:
-                logger.error(f"Error al iniciar servidor Google Calendar MCP: código de salida {self.process.returncode}")
-                return False
+        Args:
+            lines: Número de líneas a devolver
         
-        except Exception as e:
-            logger.error(f"Error al iniciar servidor Google Calendar MCP: {e}")
-            return False
-    
-    async def _read_output(self):
-        """Lee la salida del proceso del servidor MCP y la registra."""
-        while self.process and not self.process.stdout.at_eof():
-            line = await self.process.stdout.readline()
-            if line:
-                logger.info(f"[Google Calendar MCP] {line.decode().strip()}")
-        
-        while self.process and not self.process.stderr.at_eof():
-            line = await self.process.stderr.readline()
-            if line:
-                logger.error(f"[Google Calendar MCP] {line.decode().strip()}")
+        Returns:
+            Lista de líneas, de la más antigua a la más reciente
+        """
+        return self.output.tail(lines)
     
     async def stop_server(self) -> bool:
         """
@@ -198,33 +294,7 @@ class MCPOrchestratorGoogleCalendar:
         Returns:
             True si el servidor se detuvo correctamente, False en caso contrario
         """
-        if not self.running or not self.process:
-            logger.info("El servidor Google Calendar MCP no está en ejecución")
-            return True
-        
-        try:
-            logger.info(f"Deteniendo servidor Google Calendar MCP (PID {self.process.pid})")
-            
-            # Intentar terminar el proceso de forma limpia
-            self.process.terminate()
-            
-            # Esperar a que termine
-            try:
-                await asyncio.wait_for(self.process.wait(), timeout=5.0)
-                logger.info("Servidor Google Calendar MCP detenido correctamente")
-            except asyncio.TimeoutError:
-                # Si no termina en 5 segundos, forzar la terminación
-                logger.warning("Timeout al esperar que termine el servidor, forzando terminación")
-                self.process.kill()
-                await self.process.wait()
-            
-            self.running = False
-            self.process = None
-            return True
-        
-        except Exception as e:
-            logger.error(f"Error al detener servidor Google Calendar MCP: {e}")
-            return False
+        return await self.server.stop()
     
     async def restart_server(self) -> bool:
         """
@@ -243,17 +313,7 @@ class MCPOrchestratorGoogleCalendar:
         Returns:
             True si el servidor está en ejecución, False en caso contrario
         """
-        if not self.running or not self.process:
-            return False
-        
-        # Verificar si el proceso sigue en ejecución
-        if self.process.returncode is not None:
-            logger.warning(f"El servidor Google Calendar MCP ha terminado con código {self.process.returncode}")
-            self.running = False
-            self.process = None
-            return False
-        
-        return True
+        return self.server.running
     
     async def get_status(self) -> Dict[str, Any]:
         """
@@ -262,18 +322,22 @@ class MCPOrchestratorGoogleCalendar:
         Returns:
             Diccionario con información de estado
         """
-        is_running = await self.is_running()
-        
-        status = {
-            "running": is_running,
-            "pid": self.process.pid if is_running and self.process else None,
-            "uptime": asyncio.get_event_loop().time() - self.start_time if is_running and self.start_time else None,
-            "status": "running" if is_running else "stopped",
+        server = self.server
+        return {
+            "running": server.running,
+            "pid": server.pid,
+            "uptime": server.uptime,
+            "status": server.status,
+            "restarts": server.restart_count,
+            "crashes": server.crash_count,
+            "last_exit_code": server.last_exit_code,
+            "quarantined": server.quarantine.active,
+            "timeouts": server.quarantine.total_timeouts,
+            "in_flight": server.transport.in_flight if server.transport else 0,
+            "last_error": server.last_error,
             "python_version": await self._get_python_version(),
             "uv_version": await self._get_uv_version()
         }
-        
-        return status
     
     async def _get_python_version(self) -> str:
         """
@@ -282,18 +346,7 @@ class MCPOrchestratorGoogleCalendar:
         Returns:
             Versión de Python
         """
-        try:
-            proc = await asyncio.create_subprocess_exec(
-                self.python_cmd, "--version",
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.PIPE
-            )
-            stdout, stderr = await proc.communicate()
-            output = stdout.decode() or stderr.decode()
-            return output.strip()
-        except Exception as e:
-            logger.error(f"Error al obtener versión de Python: {e}")
-            return "unknown"
+        return get_toolchain()["python_version"]
     
     async def _get_uv_version(self) -> str:
         """
@@ -302,18 +355,7 @@ class MCPOrchestratorGoogleCalendar:
         Returns:
             Versión de UV
         """
-        try:
-            proc = await asyncio.create_subprocess_exec(
-                self.uv_cmd, "--version",
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.PIPE
-            )
-            stdout, stderr = await proc.communicate()
-            output = stdout.decode() or stderr.decode()
-            return output.strip()
-        except Exception as e:
-            logger.error(f"Error al obtener versión de UV: {e}")
-            return "unknown"
+        return get_toolchain()["uv_version"]
     
     async def save_user_credentials(self, user_id: str, credentials: Dict[str, Any]) -> bool:
         """
@@ -403,20 +445,40 @@ class MCPOrchestratorGoogleCalendar:
             logger.error(f"Error al eliminar credenciales de Google Calendar para el usuario {user_id}: {e}")
             return False
     
-    async def execute_operation(self, user_id: str, operation: str, arguments: Dict[str, Any]) -> Dict[str, Any]:
+    def has_credentials(self, user_id: str) -> bool:
+        """
+        Indica si el usuario tiene credenciales guardadas (sin leerlas).
+        
+        Args:
+            user_id: ID del usuario
+        
+        Returns:
+            True si existe su fichero de credenciales
+        """
+        return os.path.exists(os.path.join(self.credentials_dir, user_id, "credentials.json"))
+    
+    async def execute_operation(self,
+                                user_id: str,
+                                operation: str,
+                                arguments: Dict[str, Any],
+                                timeout: float = None) -> Dict[str, Any]:
         """
         Ejecuta una operación en el servidor MCP de Google Calendar.
         
+        La operación se envía como `tools/call` por la sesión stdio persistente;
+        varias operaciones pueden estar en vuelo a la vez sobre el mismo proceso.
+        
         Args:
             user_id: ID del usuario
             operation: Nombre de la operación a ejecutar
             arguments: Argumentos para la operación
+            timeout: Plazo en segundos (por defecto GOOGLE_CALENDAR_MCP_REQUEST_TIMEOUT)
         
         Returns:
             Resultado de la operación
         """
         # Verificar si el servidor está en ejecución
-        if not await self.is_running():
+        if not self.server.running:
             logger.info("El servidor Google Calendar MCP no está en ejecución, iniciándolo...")
             if not await self.start_server():
                 return {
@@ -426,80 +488,32 @@ class MCPOrchestratorGoogleCalendar:
         
         try:
             # Verificar si existen credenciales para el usuario
-            credentials = await self.load_user_credentials(user_id)
-            if not credentials:
+            if not self.has_credentials(user_id):
                 return {
                     "status": "error",
                     "error": "No existen credenciales de Google Calendar para el usuario"
                 }
             
-            # Preparar comando para ejecutar la operación
-            # Nota: En una implementación real, esto se haría mediante comunicación directa con el servidor MCP
-            # a través de un socket o API. Aquí simulamos la ejecución para ilustrar el concepto.
-            
-            # Simular respuesta según la operación
-            if operation == "list_events":
-                return {
-                    "status": "success",
-                    "response": {
-                        "result": {
-                            "events": [
-                                {
-                                    "id": "event123",
-                                    "summary": "Reunión de equipo",
-                                    "start": {"dateTime": "2025-05-20T10:00:00Z"},
-                                    "end": {"dateTime": "2025-05-20T11:00:00Z"}
-                                },
-                                {
-                                    "id": "event456",
-                                    "summary": "Almuerzo con cliente",
-                                    "start": {"dateTime": "2025-05-21T13:00:00Z"},
-                                    "end": {"dateTime": "2025-05-21T14:30:00Z"}
-                                }
-                            ]
-                        }
-                    }
-                }
-            elif operation == "create_event":
-                return {
-                    "status": "success",
-                    "response": {
-                        "result": {
-                            "id": "event789",
-                            "summary": arguments.get("summary", "Nuevo evento"),
-                            "start": arguments.get("start", {"dateTime": "2025-05-22T15:00:00Z"}),
-                            "end": arguments.get("end", {"dateTime": "2025-05-22T16:00:00Z"})
-                        }
-                    }
-                }
-            elif operation == "delete_event":
-                return {
-                    "status": "success",
-                    "response": {
-                        "result": {
-                            "deleted": True,
-                            "id": arguments.get("event_id")
-                        }
-                    }
+            request = {
+                "method": "tools/call",
+                "params": {
+                    "name": operation,
+                    "arguments": {**(arguments or {}), GOOGLE_CALENDAR_USER_ARGUMENT: user_id}
                 }
-            elif operation == "update_event":
-                return {
-                    "status": "success",
-                    "response": {
-                        "result": {
-                            "id": arguments.get("event_id"),
-                            "summary": arguments.get("summary", "Evento actualizado"),
-                            "start": arguments.get("start", {"dateTime": "2025-05-22T15:00:00Z"}),
-                            "end": arguments.get("end", {"dateTime": "2025-05-22T16:00:00Z"}),
-                            "updated": True
-                        }
-                    }
-                }
-            else:
+            }
+            response = await self.server.send_request(request, timeout=timeout)
+            
+            if "error" in response:
+                error = response["error"]
                 return {
                     "status": "error",
-                    "error": f"Operación no soportada: {operation}"
+                    "error": error.get("message", str(error)) if isinstance(error, dict) else str(error)
                 }
+            
+            return {
+                "status": "success",
+                "response": response
+            }
         
         except Exception as e:
             logger.error(f"Error al ejecutar operación {operation} en Google Calendar MCP: {e}")
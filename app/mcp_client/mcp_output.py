@@ -0,0 +1,193 @@
+"""
+Captura acotada de la salida de los servidores MCP
+
+Este módulo drena stdout/stderr de los subprocesos MCP de forma concurrente
+hacia un buffer circular de tamaño fijo por servidor y reenvía las líneas al
+log con un límite de velocidad, de modo que un servidor ruidoso no puede
+llenar la tubería y bloquear al proceso hijo ni disparar el volumen de logs.
+
+Autor: GENIA Team
+Fecha: Mayo 2025
+"""
+
+import os
+import time
+import asyncio
+import logging
+from collections import deque
+from datetime import datetime, timezone
+from typing import Dict, List, Any, Optional
+
+# Configurar logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger("mcp_output")
+
+# Líneas conservadas por servidor y longitud máxima de cada línea
+MCP_LOG_BUFFER_LINES = int(os.getenv("MCP_LOG_BUFFER_LINES", "500"))
+MCP_LOG_LINE_MAX = int(os.getenv("MCP_LOG_LINE_MAX", "2000"))
+
+# Líneas por segundo reenviadas al log (con ráfaga) por servidor
+MCP_LOG_RATE = float(os.getenv("MCP_LOG_RATE", "5"))
+MCP_LOG_BURST = int(os.getenv("MCP_LOG_BURST", "20"))
+
+# Tamaño de lectura al drenar las tuberías
+_READ_CHUNK = 4096
+
+class MCPOutputBuffer:
+    """
+    Buffer circular de las últimas líneas de salida de un servidor MCP.
+
+    Las líneas se reenvían al log con un token bucket: por encima de la
+    velocidad configurada se descartan del log (no del buffer) y se informa
+    cuántas se suprimieron cuando vuelve a haber capacidad.
+    """
+
+    def __init__(self,
+                 name: str,
+                 max_lines: int = MCP_LOG_BUFFER_LINES,
+                 rate: float = MCP_LOG_RATE,
+                 burst: int = MCP_LOG_BURST,
+                 level: int = logging.INFO):
+        """
+        Inicializa el buffer.
+
+        Args:
+            name: Nombre del servidor MCP
+            max_lines: Número máximo de líneas conservadas
+            rate: Líneas por segundo reenviadas al log
+            burst: Ráfaga máxima de líneas reenviadas al log
+            level: Nivel de log de las líneas reenviadas
+        """
+        self.name = name
+        self.level = level
+        self.rate = rate
+        self.burst = burst
+        self._lines: deque = deque(maxlen=max_lines)
+        self._tokens = float(burst)
+        self._last_refill = time.monotonic()
+        self.total_lines = 0
+        self.suppressed_lines = 0
+        self._pending_suppressed = 0
+
+    def append(self, stream: str, line: str, pid: Optional[int] = None):
+        """
+        Añade una línea al buffer y la reenvía al log si hay capacidad.
+
+        Args:
+            stream: Flujo de origen (stdout o stderr)
+            line: Línea de texto (se trunca a MCP_LOG_LINE_MAX caracteres)
+            pid: PID del proceso que la emitió
+        """
+        if len(line) > MCP_LOG_LINE_MAX:
+            line = line[:MCP_LOG_LINE_MAX] + "…"
+        self._lines.append((time.time(), pid, stream, line))
+        self.total_lines += 1
+
+        if self._take_token():
+            if self._pending_suppressed:
+                logger.log(self.level, f"[{self.name}] {self._pending_suppressed} líneas de salida suprimidas")
+                self._pending_suppressed = 0
+            logger.log(self.level, f"[{self.name}] {line}")
+        else:
+            self.suppressed_lines += 1
+            self._pending_suppressed += 1
+
+    def _take_token(self) -> bool:
+        """Consume un token del bucket de reenvío al log."""
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._last_refill) * self.rate)
+        self._last_refill = now
+        if self._tokens >= 1:
+            self._tokens -= 1
+            return True
+        return False
+
+    def tail(self, lines: int = 100) -> List[Dict[str, Any]]:
+        """
+        Obtiene las últimas líneas capturadas.
+
+        Args:
+            lines: Número de líneas a devolver
+
+        Returns:
+            Lista de líneas, de la más antigua a la más reciente
+        """
+        if lines <= 0:
+            return []
+        selected = list(self._lines)[-lines:]
+        return [
+            {
+                "timestamp": datetime.fromtimestamp(ts, tz=timezone.utc).isoformat(),
+                "pid": pid,
+                "stream": stream,
+                "line": line
+            }
+            for ts, pid, stream, line in selected
+        ]
+
+    def get_stats(self) -> Dict[str, int]:
+        """
+        Obtiene las estadísticas del buffer.
+
+        Returns:
+            Líneas totales, conservadas y suprimidas del log
+        """
+        return {
+            "total_lines": self.total_lines,
+            "buffered_lines": len(self._lines),
+            "suppressed_lines": self.suppressed_lines
+        }
+
+async def drain_stream(stream: asyncio.StreamReader,
+                       buffer: MCPOutputBuffer,
+                       stream_name: str,
+                       pid: Optional[int] = None):
+    """
+    Drena un flujo del subproceso hacia el buffer hasta EOF.
+
+    Lee en bloques en lugar de `readline()` para que una línea muy larga no
+    detenga el drenado (y con él al proceso hijo); las líneas que superan
+    el máximo se truncan.
+
+    Args:
+        stream: Flujo del subproceso (stdout o stderr)
+        buffer: Buffer de salida del servidor
+        stream_name: Nombre del flujo
+        pid: PID del proceso
+    """
+    pending = bytearray()
+    overflow = False
+    limit = MCP_LOG_LINE_MAX * 4
+    try:
+        while True:
+            chunk = await stream.read(_READ_CHUNK)
+            if not chunk:
+                break
+            pending.extend(chunk)
+            while True:
+                newline = pending.find(b"\n")
+                if newline < 0:
+                    break
+                if not overflow:
+                    _append_line(buffer, stream_name, pending[:newline], pid)
+                overflow = False
+                del pending[:newline + 1]
+            if len(pending) > limit:
+                # Línea sin fin a la vista: conservar el principio y descartar el resto
+                if not overflow:
+                    _append_line(buffer, stream_name, pending, pid)
+                overflow = True
+                pending.clear()
+        if pending and not overflow:
+            _append_line(buffer, stream_name, pending, pid)
+    except Exception as e:
+        logger.debug(f"[{buffer.name}] Drenado de {stream_name} interrumpido: {e}")
+
+def _append_line(buffer: MCPOutputBuffer, stream_name: str, raw: bytes, pid: Optional[int]):
+    """Decodifica una línea y la añade al buffer si no está vacía."""
+    line = bytes(raw).decode('utf-8', errors='replace').strip()
+    if line:
+        buffer.append(stream_name, line, pid)
@@ -0,0 +1,275 @@
+"""
+Pool de procesos MCP por credencial para GENIA
+
+Este módulo mantiene procesos MCP calientes indexados por (servidor, huella de
+credenciales), de forma que los usuarios recurrentes reutilizan un proceso ya
+iniciado y las solicitudes de un usuario nunca se ejecutan con las credenciales
+de otro. El pool es un LRU de tamaño máximo con expulsión por inactividad.
+
+Autor: GENIA Team
+Fecha: Mayo 2025
+"""
+
+import os
+import json
+import time
+import asyncio
+import hashlib
+import logging
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from typing import Dict, List, Any, Optional, Tuple, TYPE_CHECKING
+
+from .mcp_transport import MCPTimeoutError
+
+if TYPE_CHECKING:
+    from .mcp_orchestrator import MCPServer
+
+# Configurar logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger("mcp_pool")
+
+# Configuración por defecto del pool
+MCP_POOL_MAX_SIZE = int(os.getenv("MCP_POOL_MAX_SIZE", "16"))
+MCP_POOL_IDLE_TIMEOUT = float(os.getenv("MCP_POOL_IDLE_TIMEOUT", "600"))
+
+def credential_fingerprint(env_vars: Dict[str, str], command: List[str] = None) -> str:
+    """
+    Calcula la huella de un conjunto de credenciales.
+
+    La huella es un hash SHA-256 del entorno y del comando, por lo que nunca
+    se guardan ni se registran los tokens en claro.
+
+    Args:
+        env_vars: Variables de entorno con las credenciales
+        command: Comando del proceso (algunos servidores reciben el token como argumento)
+
+    Returns:
+        Huella hexadecimal
+    """
+    payload = json.dumps({"env": env_vars or {}, "command": command or []}, sort_keys=True)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+class _PoolEntry:
+    """Proceso del pool, su arranque, su último uso y las reservas activas."""
+
+    __slots__ = ("server", "ready", "last_used", "leases")
+
+    def __init__(self):
+        self.server: Optional["MCPServer"] = None
+        self.ready: Optional[asyncio.Future] = None
+        self.last_used = time.monotonic()
+        self.leases = 0
+
+    @property
+    def warm(self) -> bool:
+        """Indica si el proceso terminó de arrancar y sigue en ejecución."""
+        return (
+            self.ready is not None
+            and self.ready.done()
+            and not self.ready.cancelled()
+            and self.ready.exception() is None
+            and self.server is not None
+            and self.server.running
+        )
+
+    @property
+    def idle(self) -> bool:
+        """Indica si el proceso puede detenerse sin afectar a ninguna solicitud."""
+        return self.leases == 0 and self.ready is not None and self.ready.done()
+
+class MCPProcessPool:
+    """
+    Pool LRU de procesos MCP calientes por (servidor, credenciales).
+
+    Los procesos se crean a partir del servidor registrado en el orquestador,
+    que actúa como plantilla (comando, tipo y límites).
+    """
+
+    def __init__(self,
+                 max_size: int = MCP_POOL_MAX_SIZE,
+                 idle_timeout: float = MCP_POOL_IDLE_TIMEOUT):
+        """
+        Inicializa el pool.
+
+        Args:
+            max_size: Número máximo de procesos calientes
+            idle_timeout: Segundos de inactividad tras los que se detiene un proceso
+        """
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self._entries: "OrderedDict[Tuple[str, str], _PoolEntry]" = OrderedDict()
+        self._reaper_task: Optional[asyncio.Task] = None
+        self.metrics = {
+            "hits": 0,
+            "misses": 0,
+            "spawns": 0,
+            "spawn_failures": 0,
+            "evictions_lru": 0,
+            "evictions_idle": 0
+        }
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @asynccontextmanager
+    async def lease(self,
+                    template: "MCPServer",
+                    env_vars: Dict[str, str],
+                    command: List[str] = None,
+                    timeout: float = None):
+        """
+        Reserva un proceso caliente para las credenciales dadas durante el bloque `async with`.
+
+        Mientras dura la reserva el proceso no puede ser expulsado del pool.
+        Varias solicitudes simultáneas para las mismas credenciales comparten
+        un único arranque.
+
+        Args:
+            template: Servidor registrado que sirve de plantilla
+            env_vars: Variables de entorno con las credenciales del usuario
+            command: Comando alternativo (por defecto el de la plantilla)
+            timeout: Segundos máximos de espera del arranque; al vencer, el
+                arranque sigue para las demás solicitudes que lo comparten
+
+        Yields:
+            Servidor MCP en ejecución exclusivo para esas credenciales
+
+        Raises:
+            MCPTimeoutError: Si el proceso no está listo dentro de `timeout`
+        """
+        entry = self._reserve(template, env_vars, command)
+        try:
+            try:
+                server = await asyncio.wait_for(asyncio.shield(entry.ready), timeout)
+            except asyncio.TimeoutError:
+                raise MCPTimeoutError(
+                    f"Proceso MCP '{template.name}' no estuvo listo en {timeout:.2f}s"
+                ) from None
+            yield server
+        finally:
+            entry.leases -= 1
+            entry.last_used = time.monotonic()
+            if len(self._entries) > self.max_size:
+                # El pool pudo crecer de más mientras todos los procesos estaban reservados
+                await self._evict_lru()
+
+    def _reserve(self,
+                 template: "MCPServer",
+                 env_vars: Dict[str, str],
+                 command: List[str] = None) -> _PoolEntry:
+        """Obtiene (o crea) la entrada del pool para las credenciales y la reserva."""
+        command = command or template.command
+        key = (template.name, credential_fingerprint(env_vars, command))
+        self._ensure_reaper()
+
+        entry = self._entries.get(key)
+        if entry and entry.warm:
+            self.metrics["hits"] += 1
+        else:
+            self.metrics["misses"] += 1
+            if entry is None or entry.ready.done():
+                # Sin proceso o el anterior terminó: iniciar uno nuevo
+                entry = _PoolEntry()
+                entry.ready = asyncio.ensure_future(self._spawn(key, entry, template, env_vars, command))
+                self._entries[key] = entry
+
+        # La reserva se toma antes de cualquier espera para que nunca se expulse
+        entry.leases += 1
+        entry.last_used = time.monotonic()
+        self._entries.move_to_end(key)
+        return entry
+
+    async def _spawn(self,
+                     key: Tuple[str, str],
+                     entry: _PoolEntry,
+                     template: "MCPServer",
+                     env_vars: Dict[str, str],
+                     command: List[str]) -> "MCPServer":
+        """Inicia un proceso nuevo a partir de la plantilla para la entrada dada."""
+        server = template.clone(env_vars=env_vars, command=command)
+        self.metrics["spawns"] += 1
+        if not await server.start():
+            self.metrics["spawn_failures"] += 1
+            if self._entries.get(key) is entry:
+                del self._entries[key]
+            raise RuntimeError(f"No se pudo iniciar servidor MCP '{template.name}': {server.last_error}")
+
+        entry.server = server
+        logger.info(f"Proceso MCP '{template.name}' añadido al pool ({len(self._entries)}/{self.max_size})")
+        await self._evict_lru()
+        return server
+
+    async def _evict_lru(self):
+        """Detiene los procesos menos usados mientras el pool supere su tamaño máximo."""
+        while len(self._entries) > self.max_size:
+            # No interrumpir procesos reservados ni arranques en curso
+            victim = next((key for key, entry in self._entries.items() if entry.idle), None)
+            if victim is None:
+                return
+            entry = self._entries.pop(victim)
+            self.metrics["evictions_lru"] += 1
+            logger.info(f"Expulsando proceso MCP '{victim[0]}' del pool (LRU)")
+            if entry.server:
+                await entry.server.stop()
+
+    async def evict_idle(self):
+        """Detiene los procesos que llevan más de `idle_timeout` segundos sin uso."""
+        now = time.monotonic()
+        expired = [
+            key for key, entry in self._entries.items()
+            if entry.idle and now - entry.last_used > self.idle_timeout
+        ]
+        for key in expired:
+            entry = self._entries.pop(key)
+            self.metrics["evictions_idle"] += 1
+            logger.info(f"Expulsando proceso MCP '{key[0]}' del pool (inactivo)")
+            if entry.server:
+                await entry.server.stop()
+
+    def _ensure_reaper(self):
+        """Inicia la tarea periódica de expulsión por inactividad si no está activa."""
+        if self._reaper_task is None or self._reaper_task.done():
+            self._reaper_task = asyncio.create_task(self._reaper())
+
+    async def _reaper(self):
+        """Revisa periódicamente los procesos inactivos."""
+        interval = max(self.idle_timeout / 4, 1.0)
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.evict_idle()
+            except Exception as e:
+                logger.error(f"Error al expulsar procesos MCP inactivos: {e}")
+
+    async def close(self):
+        """Detiene todos los procesos del pool."""
+        if self._reaper_task and not self._reaper_task.done():
+            self._reaper_task.cancel()
+        self._reaper_task = None
+
+        entries = list(self._entries.values())
+        self._entries.clear()
+        for entry in entries:
+            if entry.ready and not entry.ready.done():
+                entry.ready.cancel()
+        await asyncio.gather(*[entry.server.stop() for entry in entries if entry.server])
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """
+        Obtiene las métricas del pool.
+
+        Returns:
+            Diccionario con aciertos, fallos, arranques, expulsiones y tamaño
+        """
+        lookups = self.metrics["hits"] + self.metrics["misses"]
+        return {
+            **self.metrics,
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "hit_ratio": self.metrics["hits"] / lookups if lookups else 0.0,
+            "servers": [name for name, _ in self._entries.keys()]
+        }
@@ -0,0 +1,478 @@
+"""
+Catálogo de herramientas MCP y validación local de argumentos
+
+Este módulo guarda la lista de herramientas (`tools/list`) de cada servidor
+MCP junto con sus esquemas JSON, la persiste en disco para el siguiente
+arranque y compila un validador por herramienta. Las llamadas a herramientas
+inexistentes o con argumentos que no cumplen el esquema se rechazan antes de
+arrancar ningún proceso ni enviar nada por stdio.
+
+El validador cubre el subconjunto de JSON Schema que usan los servidores MCP
+(type, enum, const, properties, required, additionalProperties, items,
+límites numéricos, de longitud y de elementos, pattern, allOf/anyOf/oneOf y
+$ref locales); las palabras clave no soportadas se ignoran, de modo que un
+esquema desconocido nunca rechaza una llamada válida.
+
+Autor: GENIA Team
+Fecha: Mayo 2025
+"""
+
+import os
+import re
+import json
+import asyncio
+import logging
+from typing import Dict, List, Any, Optional, Callable
+
+# Configurar logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger("mcp_schemas")
+
+# Validación local de las llamadas a herramientas
+MCP_TOOL_VALIDATION = os.getenv("MCP_TOOL_VALIDATION", "true").lower() == "true"
+
+# Errores de validación incluidos como máximo en el mensaje
+_MAX_ERRORS = 5
+
+# Un validador recibe el valor y su ruta y añade los errores a la lista
+Validator = Callable[[Any, str, List[str]], None]
+
+class MCPToolValidationError(ValueError):
+    """Los argumentos de la herramienta no cumplen su esquema."""
+
+    def __init__(self, message: str, errors: List[str] = None):
+        super().__init__(message)
+        self.errors = errors or []
+
+class MCPUnknownToolError(MCPToolValidationError):
+    """El servidor MCP no ofrece la herramienta solicitada."""
+
+_TYPE_CHECKS: Dict[str, Callable[[Any], bool]] = {
+    "object": lambda value: isinstance(value, dict),
+    "array": lambda value: isinstance(value, list),
+    "string": lambda value: isinstance(value, str),
+    "boolean": lambda value: isinstance(value, bool),
+    "null": lambda value: value is None,
+    "number": lambda value: isinstance(value, (int, float)) and not isinstance(value, bool),
+    "integer": lambda value: (
+        isinstance(value, int) and not isinstance(value, bool)
+        or isinstance(value, float) and value.is_integer()
+    ),
+}
+
+def compile_schema(schema: Any, root: Any = None) -> Validator:
+    """
+    Compila un esquema JSON en una función de validación.
+
+    Args:
+        schema: Esquema a compilar
+        root: Esquema raíz contra el que se resuelven los `$ref` locales
+
+    Returns:
+        Validador que añade a una lista los errores del valor
+    """
+    return _SchemaCompiler(schema if root is None else root).compile(schema)
+
+class _SchemaCompiler:
+    """Compila un esquema y sus subesquemas, resolviendo `$ref` una sola vez."""
+
+    def __init__(self, root: Any):
+        self.root = root
+        self.refs: Dict[str, Validator] = {}
+
+    def compile(self, schema: Any) -> Validator:
+        if schema is False:
+            return _reject
+        if schema is True or not isinstance(schema, dict):
+            return _accept
+
+        checks: List[Validator] = []
+        if "$ref" in schema:
+            checks.append(self._ref(schema["$ref"]))
+
+        types = schema.get("type")
+        if types is not None:
+            types = [types] if isinstance(types, str) else list(types)
+            tests = [_TYPE_CHECKS[name] for name in types if name in _TYPE_CHECKS]
+            if len(tests) == len(types):
+                expected = " o ".join(types)
+                def check_type(value, path, errors, tests=tests, expected=expected):
+                    if not any(test(value) for test in tests):
+                        errors.append(f"{path}: se esperaba {expected}")
+                checks.append(check_type)
+
+        if "enum" in schema:
+            allowed = list(schema["enum"])
+            def check_enum(value, path, errors):
+                if value not in allowed:
+                    errors.append(f"{path}: valor no permitido {value!r}")
+            checks.append(check_enum)
+
+        if "const" in schema:
+            const = schema["const"]
+            def check_const(value, path, errors):
+                if value != const:
+                    errors.append(f"{path}: se esperaba {const!r}")
+            checks.append(check_const)
+
+        checks.extend(self._object_checks(schema))
+        checks.extend(self._array_checks(schema))
+        checks.extend(_string_checks(schema))
+        checks.extend(_number_checks(schema))
+        checks.extend(self._combinator_checks(schema))
+
+        if not checks:
+            return _accept
+        if len(checks) == 1:
+            return checks[0]
+
+        def check_all(value, path, errors):
+            for check in checks:
+                check(value, path, errors)
+        return check_all
+
+    def _ref(self, ref: str) -> Validator:
+        """Resuelve un `$ref` local (`#/...`); los externos no se validan."""
+        if ref in self.refs:
+            return self.refs[ref]
+        if not ref.startswith("#"):
+            return _accept
+
+        # Marcador para las referencias recursivas mientras se compila
+        compiled: List[Validator] = []
+        def check_ref(value, path, errors):
+            compiled[0](value, path, errors)
+        self.refs[ref] = check_ref
+
+        target = self.root
+        for part in ref[1:].split("/"):
+            if not part:
+                continue
+            part = part.replace("~1", "/").replace("~0", "~")
+            if isinstance(target, dict) and part in target:
+                target = target[part]
+            elif isinstance(target, list) and part.isdigit() and int(part) < len(target):
+                target = target[int(part)]
+            else:
+                target = True
+                break
+        compiled.append(self.compile(target))
+        return check_ref
+
+    def _object_checks(self, schema: Dict[str, Any]) -> List[Validator]:
+        checks: List[Validator] = []
+        properties = {
+            name: self.compile(subschema)
+            for name, subschema in (schema.get("properties") or {}).items()
+        }
+        required = list(schema.get("required") or [])
+        additional = schema.get("additionalProperties", True)
+        additional_check = None if additional is True else self.compile(additional)
+
+        if not properties and not required and additional_check is None:
+            return checks
+
+        def check_object(value, path, errors):
+            if not isinstance(value, dict):
+                return
+            for name in required:
+                if name not in value:
+                    errors.append(f"{path}: falta el campo obligatorio '{name}'")
+            for name, item in value.items():
+                check = properties.get(name)
+                if check is not None:
+                    check(item, f"{path}.{name}", errors)
+                elif additional is False:
+                    errors.append(f"{path}: campo no permitido '{name}'")
+                elif additional_check is not None:
+                    additional_check(item, f"{path}.{name}", errors)
+        checks.append(check_object)
+        return checks
+
+    def _array_checks(self, schema: Dict[str, Any]) -> List[Validator]:
+        checks: List[Validator] = []
+        items = schema.get("items")
+        if isinstance(items, dict):
+            item_check = self.compile(items)
+            def check_items(value, path, errors):
+                if isinstance(value, list):
+                    for index, item in enumerate(value):
+                        item_check(item, f"{path}[{index}]", errors)
+            checks.append(check_items)
+
+        min_items = schema.get("minItems")
+        max_items = schema.get("maxItems")
+        if min_items is not None or max_items is not None:
+            def check_size(value, path, errors):
+                if not isinstance(value, list):
+                    return
+                if min_items is not None and len(value) < min_items:
+                    errors.append(f"{path}: se esperaban al menos {min_items} elementos")
+                if max_items is not None and len(value) > max_items:
+                    errors.append(f"{path}: se esperaban como máximo {max_items} elementos")
+            checks.append(check_size)
+        return checks
+
+    def _combinator_checks(self, schema: Dict[str, Any]) -> List[Validator]:
+        checks: List[Validator] = []
+        for subschema in schema.get("allOf") or []:
+            checks.append(self.compile(subschema))
+
+        for keyword in ("anyOf", "oneOf"):
+            options = [self.compile(subschema) for subschema in schema.get(keyword) or []]
+            if not options:
+                continue
+            exactly_one = keyword == "oneOf"
+            def check_options(value, path, errors, options=options, exactly_one=exactly_one, keyword=keyword):
+                matches = 0
+                for option in options:
+                    option_errors: List[str] = []
+                    option(value, path, option_errors)
+                    if not option_errors:
+                        matches += 1
+                        if not exactly_one:
+                            return
+                if matches == 0 or (exactly_one and matches > 1):
+                    errors.append(f"{path}: no cumple {keyword}")
+            checks.append(check_options)
+        return checks
+
+def _string_checks(schema: Dict[str, Any]) -> List[Validator]:
+    checks: List[Validator] = []
+    min_length = schema.get("minLength")
+    max_length = schema.get("maxLength")
+    if min_length is not None or max_length is not None:
+        def check_length(value, path, errors):
+            if not isinstance(value, str):
+                return
+            if min_length is not None and len(value) < min_length:
+                errors.append(f"{path}: longitud mínima {min_length}")
+            if max_length is not None and len(value) > max_length:
+                errors.append(f"{path}: longitud máxima {max_length}")
+        checks.append(check_length)
+
+    if "pattern" in schema:
+        try:
+            pattern = re.compile(schema["pattern"])
+        except re.error:
+            # Sintaxis de ECMAScript no soportada por `re`: no se valida
+            pattern = None
+        if pattern is not None:
+            def check_pattern(value, path, errors):
+                if isinstance(value, str) and not pattern.search(value):
+                    errors.append(f"{path}: no cumple el patrón {pattern.pattern!r}")
+            checks.append(check_pattern)
+    return checks
+
+def _number_checks(schema: Dict[str, Any]) -> List[Validator]:
+    bounds = [
+        (schema.get("minimum"), lambda value, bound: value >= bound, "mínimo"),
+        (schema.get("maximum"), lambda value, bound: value <= bound, "máximo"),
+        (schema.get("exclusiveMinimum"), lambda value, bound: value > bound, "mínimo exclusivo"),
+        (schema.get("exclusiveMaximum"), lambda value, bound: value < bound, "máximo exclusivo"),
+    ]
+    bounds = [
+        (bound, test, label) for bound, test, label in bounds
+        if isinstance(bound, (int, float)) and not isinstance(bound, bool)
+    ]
+    if not bounds:
+        return []
+
+    def check_bounds(value, path, errors):
+        if not _TYPE_CHECKS["number"](value):
+            return
+        for bound, test, label in bounds:
+            if not test(value, bound):
+                errors.append(f"{path}: {label} {bound}")
+    return [check_bounds]
+
+def _accept(value, path, errors):
+    pass
+
+def _reject(value, path, errors):
+    errors.append(f"{path}: no se permite ningún valor")
+
+class MCPToolCatalog:
+    """
+    Herramientas de cada servidor MCP con sus validadores compilados.
+
+    El catálogo se carga del disco al crearse y se sustituye por el de cada
+    servidor cuando este responde a `tools/list`. La entrada de un servidor
+    cuyo comando ha cambiado desde que se guardó se descarta.
+    """
+
+    def __init__(self, path: str, enabled: bool = MCP_TOOL_VALIDATION):
+        """
+        Inicializa el catálogo y carga el guardado en el arranque anterior.
+
+        Args:
+            path: Fichero JSON donde se persiste el catálogo
+            enabled: Activa o desactiva la validación local
+        """
+        self.path = path
+        self.enabled = enabled
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        self._validators: Dict[str, Dict[str, Validator]] = {}
+        self._write_lock = asyncio.Lock()
+        # Servidores cuyo catálogo se ha obtenido en este arranque
+        self.refreshed = set()
+        self.metrics = {
+            "validated": 0,
+            "unknown_tool": 0,
+            "invalid_arguments": 0,
+            "unvalidated": 0,
+            "refreshes": 0
+        }
+        self._load()
+
+    def _load(self):
+        """Carga el catálogo persistido, si existe."""
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, 'r') as f:
+                entries = json.load(f)
+            for server_name, entry in entries.items():
+                self._install(server_name, entry)
+            logger.info(f"Catálogo de herramientas MCP cargado para {len(self._entries)} servidores")
+        except Exception as e:
+            logger.warning(f"No se pudo cargar el catálogo de herramientas MCP: {e}")
+
+    def _install(self, server_name: str, entry: Dict[str, Any]):
+        """Compila los validadores de un servidor y los activa."""
+        validators = {}
+        for tool in entry.get("tools", []):
+            name = tool.get("name")
+            if name:
+                schema = tool.get("inputSchema", True)
+                validators[name] = compile_schema(schema)
+        self._entries[server_name] = entry
+        self._validators[server_name] = validators
+
+    def bind(self, server_name: str, command: List[str]):
+        """
+        Descarta la entrada persistida de un servidor si su comando ha cambiado.
+
+        Args:
+            server_name: Nombre del servidor MCP
+            command: Comando con el que se registra el servidor
+        """
+        entry = self._entries.get(server_name)
+        if entry is not None and entry.get("command") != list(command):
+            logger.info(f"Catálogo de herramientas de '{server_name}' descartado: el comando ha cambiado")
+            self.forget(server_name)
+
+    def forget(self, server_name: str):
+        """Elimina de memoria el catálogo de un servidor."""
+        self._entries.pop(server_name, None)
+        self._validators.pop(server_name, None)
+        self.refreshed.discard(server_name)
+
+    def has_catalog(self, server_name: str) -> bool:
+        """Indica si hay catálogo (persistido u obtenido) para un servidor."""
+        return server_name in self._validators
+
+    async def update(self, server_name: str, command: List[str], tools: List[Dict[str, Any]]):
+        """
+        Sustituye el catálogo de un servidor y lo persiste.
+
+        Args:
+            server_name: Nombre del servidor MCP
+            command: Comando del servidor (para detectar cambios de versión)
+            tools: Herramientas devueltas por `tools/list`
+        """
+        entry = {
+            "command": list(command),
+            "tools": [
+                {key: tool[key] for key in ("name", "description", "inputSchema") if key in tool}
+                for tool in tools
+            ]
+        }
+        self._install(server_name, entry)
+        self.refreshed.add(server_name)
+        self.metrics["refreshes"] += 1
+        async with self._write_lock:
+            await asyncio.to_thread(self._save, dict(self._entries))
+
+    def _save(self, entries: Dict[str, Dict[str, Any]]):
+        """Escribe el catálogo de forma atómica (en un hilo)."""
+        try:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, 'w') as f:
+                json.dump(entries, f)
+            os.replace(tmp_path, self.path)
+        except Exception as e:
+            logger.warning(f"No se pudo guardar el catálogo de herramientas MCP: {e}")
+
+    def validate(self, server_name: str, operation: str, arguments: Optional[Dict[str, Any]]):
+        """
+        Comprueba que la herramienta existe y que sus argumentos cumplen el esquema.
+
+        Sin catálogo para el servidor la llamada se deja pasar.
+
+        Args:
+            server_name: Nombre del servidor MCP
+            operation: Nombre de la herramienta
+            arguments: Argumentos de la llamada
+
+        Raises:
+            MCPUnknownToolError: Si el servidor no ofrece la herramienta
+            MCPToolValidationError: Si los argumentos no cumplen el esquema
+        """
+        validators = self._validators.get(server_name)
+        if not self.enabled or validators is None:
+            self.metrics["unvalidated"] += 1
+            return
+
+        validator = validators.get(operation)
+        if validator is None:
+            self.metrics["unknown_tool"] += 1
+            raise MCPUnknownToolError(
+                f"El servidor MCP '{server_name}' no ofrece la operación '{operation}'"
+            )
+
+        errors: List[str] = []
+        validator(arguments or {}, "arguments", errors)
+        if errors:
+            self.metrics["invalid_arguments"] += 1
+            raise MCPToolValidationError(
+                f"Argumentos inválidos para '{operation}' en '{server_name}': "
+                + "; ".join(errors[:_MAX_ERRORS]),
+                errors
+            )
+        self.metrics["validated"] += 1
+
+    def list_tools(self, server_name: str) -> List[Dict[str, Any]]:
+        """
+        Obtiene las herramientas conocidas de un servidor.
+
+        Args:
+            server_name: Nombre del servidor MCP
+
+        Returns:
+            Nombre, descripción y esquema de cada herramienta
+        """
+        return list(self._entries.get(server_name, {}).get("tools", []))
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """
+        Obtiene las métricas del catálogo.
+
+        Returns:
+            Llamadas validadas y rechazadas, y herramientas conocidas por servidor
+        """
+        return {
+            **self.metrics,
+            "enabled": self.enabled,
+            "servers": {
+                server_name: {
+                    "tools": len(validators),
+                    "refreshed": server_name in self.refreshed
+                }
+                for server_name, validators in self._validators.items()
+            }
+        }
@@ -0,0 +1,327 @@
+"""
+Tabla de servicios MCP para GENIA
+
+Este módulo describe de forma declarativa cada servicio MCP integrado: su
+comando, las credenciales que necesita, cómo se traducen a variables de
+entorno y argumentos del proceso, su plazo por defecto, las operaciones
+cacheables y sus límites de concurrencia. Las plantillas se compilan una vez
+al importar el módulo, de modo que ejecutar una operación solo sustituye los
+tokens del usuario en constructores ya preparados.
+
+Autor: GENIA Team
+Fecha: Mayo 2025
+"""
+
+import logging
+from collections import deque
+from string import Template
+from typing import Dict, List, Any, Optional, Tuple
+
+# Configurar logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger("mcp_services")
+
+# Duraciones recientes conservadas por servicio para los percentiles
+_LATENCY_SAMPLES = 512
+
+class MCPUnknownServiceError(ValueError):
+    """El servicio MCP no está en la tabla de servicios."""
+
+class MCPCredentialsError(ValueError):
+    """El usuario no tiene guardadas las credenciales que necesita el servicio."""
+
+class MCPServiceSpec:
+    """
+    Entrada de la tabla de servicios con sus constructores precompilados.
+
+    Las plantillas usan la sintaxis `${clave}` de las configuraciones de los
+    orquestadores, donde `clave` es el nombre del token guardado.
+    """
+
+    def __init__(self,
+                 name: str,
+                 label: str,
+                 command: List[str],
+                 credentials: Tuple[str, ...],
+                 env: Dict[str, str],
+                 token_fields: Dict[str, str] = None,
+                 token_service: str = None,
+                 user_command: List[str] = None,
+                 timeout: float = None,
+                 cache_ttls: Dict[str, float] = None,
+                 max_concurrent: int = None,
+                 max_queued: int = None):
+        """
+        Inicializa la entrada y compila sus plantillas.
+
+        Args:
+            name: Nombre del servicio y de su servidor MCP
+            label: Nombre legible para los mensajes de error
+            command: Comando del servidor compartido (sin credenciales)
+            credentials: Tokens obligatorios del usuario
+            env: Variable de entorno -> plantilla con los tokens
+            token_fields: Campo recibido al conectar la cuenta -> token guardado
+            token_service: Servicio bajo el que se guardan los tokens (por defecto `name`)
+            user_command: Plantilla del comando del proceso de cada usuario
+            timeout: Plazo por defecto de sus solicitudes (por defecto MCP_REQUEST_TIMEOUT)
+            cache_ttls: TTL en segundos de sus operaciones de lectura cacheables
+            max_concurrent: Solicitudes simultáneas permitidas (por defecto MCP_SERVER_MAX_CONCURRENT)
+            max_queued: Solicitudes en espera permitidas (por defecto MCP_SERVER_MAX_QUEUED)
+        """
+        self.name = name
+        self.label = label
+        self.command = command
+        self.credentials = credentials
+        self.token_fields = token_fields or {}
+        self.token_service = token_service or name
+        self.timeout = timeout
+        self.cache_ttls = cache_ttls or {}
+        self.max_concurrent = max_concurrent
+        self.max_queued = max_queued
+
+        self._env = [(var, Template(template)) for var, template in env.items()]
+        self._command = [Template(arg) for arg in user_command] if user_command else None
+        # Los tokens opcionales que falten se sustituyen por cadena vacía
+        identifiers = set()
+        for template in [template for _, template in self._env] + (self._command or []):
+            for _, named, braced, _ in template.pattern.findall(template.template):
+                identifiers.add(named or braced)
+        identifiers.discard("")
+        self._defaults = dict.fromkeys(identifiers - set(credentials), "")
+
+    def check_credentials(self, user_id: str, tokens: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Comprueba que el usuario tiene los tokens obligatorios.
+
+        Args:
+            user_id: ID del usuario
+            tokens: Tokens guardados del usuario
+
+        Returns:
+            Tokens del usuario con los opcionales que falten vacíos
+
+        Raises:
+            MCPCredentialsError: Si falta algún token obligatorio
+        """
+        if not tokens or any(not tokens.get(key) for key in self.credentials):
+            raise MCPCredentialsError(
+                f"No se encontraron credenciales de {self.label} para usuario {user_id}"
+            )
+        if not self._defaults:
+            return tokens
+        values = dict(self._defaults)
+        values.update((key, value) for key, value in tokens.items() if value is not None)
+        return values
+
+    def build_env(self, tokens: Dict[str, Any]) -> Dict[str, str]:
+        """Construye las variables de entorno del proceso del usuario."""
+        return {var: template.substitute(tokens) for var, template in self._env}
+
+    def build_command(self, tokens: Dict[str, Any]) -> Optional[List[str]]:
+        """Construye el comando del proceso del usuario (None si usa el del servidor)."""
+        if self._command is None:
+            return None
+        return [template.substitute(tokens) for template in self._command]
+
+    def map_tokens(self, fields: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Traduce los campos recibidos al conectar la cuenta a los tokens guardados.
+
+        Args:
+            fields: Campos del formulario de conexión (token, api_key...)
+
+        Returns:
+            Tokens del servicio
+        """
+        return {key: fields.get(field) for field, key in self.token_fields.items()}
+
+class MCPOperationStats:
+    """
+    Contadores y latencias de las operaciones ejecutadas por servicio.
+    """
+
+    def __init__(self):
+        """Inicializa las estadísticas."""
+        self._services: Dict[str, Dict[str, Any]] = {}
+        self._durations: Dict[str, deque] = {}
+
+    def record(self, service: str, duration: float, error: Exception = None):
+        """
+        Registra una operación terminada.
+
+        Args:
+            service: Nombre del servicio
+            duration: Duración en segundos
+            error: Excepción producida, si la hubo
+        """
+        stats = self._services.get(service)
+        if stats is None:
+            stats = self._services[service] = {"calls": 0, "errors": 0, "error_types": {}}
+            self._durations[service] = deque(maxlen=_LATENCY_SAMPLES)
+        stats["calls"] += 1
+        if error is not None:
+            stats["errors"] += 1
+            error_type = type(error).__name__
+            stats["error_types"][error_type] = stats["error_types"].get(error_type, 0) + 1
+        self._durations[service].append(duration)
+
+    def get_metrics(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Obtiene las estadísticas por servicio.
+
+        Returns:
+            Llamadas, errores por tipo y latencia media, p95 y máxima
+        """
+        metrics = {}
+        for service, stats in self._services.items():
+            durations = sorted(self._durations[service])
+            metrics[service] = {
+                **stats,
+                "error_types": dict(stats["error_types"]),
+                "latency_avg": sum(durations) / len(durations) if durations else 0.0,
+                "latency_p95": durations[min(int(len(durations) * 0.95), len(durations) - 1)] if durations else 0.0,
+                "latency_max": durations[-1] if durations else 0.0
+            }
+        return metrics
+
+_GOOGLE_ENV = {
+    "GOOGLE_ACCESS_TOKEN": "${google_access_token}",
+    "GOOGLE_CLIENT_ID": "${google_client_id}",
+    "GOOGLE_CLIENT_SECRET": "${google_client_secret}",
+    "GOOGLE_REFRESH_TOKEN": "${google_refresh_token}"
+}
+
+_GOOGLE_TOKEN_FIELDS = {
+    "access_token": "google_access_token",
+    "client_id": "google_client_id",
+    "client_secret": "google_client_secret",
+    "refresh_token": "google_refresh_token"
+}
+
+# Tabla de servicios MCP
+MCP_SERVICES: Dict[str, MCPServiceSpec] = {spec.name: spec for spec in (
+    MCPServiceSpec(
+        name="github",
+        label="GitHub",
+        command=["docker", "run", "-i", "--rm", "-e", "GITHUB_PERSONAL_ACCESS_TOKEN", "ghcr.io/github/github-mcp-server"],
+        credentials=("github",),
+        env={"GITHUB_PERSONAL_ACCESS_TOKEN": "${github}"},
+        token_fields={"token": "github"},
+        cache_ttls={"get_me": 300, "get_my_repos": 60, "search_repositories": 60}
+    ),
+    MCPServiceSpec(
+        name="notion",
+        label="Notion",
+        command=["docker", "run", "-i", "--rm", "-e", "OPENAPI_MCP_HEADERS", "mcp/notion"],
+        credentials=("notion",),
+        env={"OPENAPI_MCP_HEADERS": '{"Authorization": "Bearer ${notion}", "Notion-Version": "2022-06-28" }'},
+        token_fields={"token": "notion"},
+        cache_ttls={"search": 30}
+    ),
+    MCPServiceSpec(
+        name="slack",
+        label="Slack",
+        command=["npx", "-y", "slack-mcp-server@latest", "--transport", "stdio"],
+        credentials=("slack_xoxc", "slack_xoxd"),
+        env={
+            "SLACK_MCP_XOXC_TOKEN": "${slack_xoxc}",
+            "SLACK_MCP_XOXD_TOKEN": "${slack_xoxd}"
+        },
+        token_fields={"xoxc_token": "slack_xoxc", "xoxd_token": "slack_xoxd"},
+        cache_ttls={"get_channels": 120}
+    ),
+    MCPServiceSpec(
+        name="google_workspace",
+        label="Google Workspace",
+        command=["mcp-google", "drive", "--access-token", "placeholder"],
+        credentials=("google_access_token",),
+        env=_GOOGLE_ENV,
+        token_fields=_GOOGLE_TOKEN_FIELDS,
+        user_command=["mcp-google", "drive", "--access-token", "${google_access_token}"],
+        timeout=120,
+        cache_ttls={"list_files": 30}
+    ),
+    MCPServiceSpec(
+        name="google_sheets",
+        label="Google Sheets",
+        command=["mcp-google", "sheets", "--access-token", "placeholder"],
+        credentials=("google_access_token",),
+        env=_GOOGLE_ENV,
+        token_service="google_workspace",
+        user_command=["mcp-google", "sheets", "--access-token", "${google_access_token}"],
+        timeout=120,
+        cache_ttls={"list_spreadsheets": 30}
+    ),
+    MCPServiceSpec(
+        name="instagram",
+        label="Instagram",
+        command=["npx", "-y", "instagram-dm-mcp", "start"],
+        credentials=("instagram_session_id", "instagram_csrf_token", "instagram_ds_user_id"),
+        env={
+            "INSTAGRAM_SESSION_ID": "${instagram_session_id}",
+            "INSTAGRAM_CSRF_TOKEN": "${instagram_csrf_token}",
+            "INSTAGRAM_DS_USER_ID": "${instagram_ds_user_id}"
+        },
+        token_fields={
+            "session_id": "instagram_session_id",
+            "csrf_token": "instagram_csrf_token",
+            "ds_user_id": "instagram_ds_user_id"
+        },
+        cache_ttls={"get_recent_messages": 10},
+        # Sesión web: pocas solicitudes simultáneas para no disparar los límites de Instagram
+        max_concurrent=4
+    ),
+    MCPServiceSpec(
+        name="trello",
+        label="Trello",
+        command=["npx", "-y", "@delorenj/mcp-server-trello"],
+        credentials=("trello_api_key", "trello_token"),
+        env={
+            "TRELLO_API_KEY": "${trello_api_key}",
+            "TRELLO_TOKEN": "${trello_token}",
+            "TRELLO_BOARD_ID": "${trello_board_id}"
+        },
+        token_fields={"api_key": "trello_api_key", "token": "trello_token", "board_id": "trello_board_id"},
+        cache_ttls={"get_boards": 120, "get_lists": 60}
+    ),
+    MCPServiceSpec(
+        name="twitter_x",
+        label="Twitter/X",
+        command=["node", "x-mcp-server/build/index.js"],
+        credentials=("twitter_api_key", "twitter_api_secret", "twitter_access_token", "twitter_access_secret"),
+        env={
+            "TWITTER_API_KEY": "${twitter_api_key}",
+            "TWITTER_API_SECRET": "${twitter_api_secret}",
+            "TWITTER_ACCESS_TOKEN": "${twitter_access_token}",
+            "TWITTER_ACCESS_SECRET": "${twitter_access_secret}"
+        },
+        token_fields={
+            "api_key": "twitter_api_key",
+            "api_secret": "twitter_api_secret",
+            "access_token": "twitter_access_token",
+            "access_secret": "twitter_access_secret"
+        },
+        cache_ttls={"get_home_timeline": 15}
+    ),
+)}
+
+def get_service_spec(service: str) -> MCPServiceSpec:
+    """
+    Obtiene la entrada de un servicio de la tabla.
+
+    Args:
+        service: Nombre del servicio
+
+    Returns:
+        Entrada del servicio
+
+    Raises:
+        MCPUnknownServiceError: Si el servicio no existe
+    """
+    spec = MCP_SERVICES.get(service)
+    if spec is None:
+        raise MCPUnknownServiceError(f"Servicio MCP desconocido: {service}")
+    return spec
@@ -0,0 +1,309 @@
+"""
+Almacén local de credenciales de usuario para los servidores MCP
+
+Este módulo guarda los tokens de cada usuario en una única base SQLite (modo
+WAL) indexada por (user_id, servicio), con una caché LRU con TTL delante de
+las lecturas. Las operaciones sobre la base se ejecutan en un hilo para no
+bloquear el bucle de eventos y cada escritura es una transacción atómica.
+
+Sustituye a los antiguos ficheros `config/user_{id}_tokens.json`, que se
+importan la primera vez que se consulta al usuario.
+
+Autor: GENIA Team
+Fecha: Mayo 2025
+"""
+
+import os
+import json
+import time
+import sqlite3
+import asyncio
+import logging
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, Optional, Tuple
+
+# Configurar logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger("mcp_token_store")
+
+# Caché de lectura: usuarios conservados y segundos de validez
+MCP_TOKEN_CACHE_SIZE = int(os.getenv("MCP_TOKEN_CACHE_SIZE", "10000"))
+MCP_TOKEN_CACHE_TTL = float(os.getenv("MCP_TOKEN_CACHE_TTL", "300"))
+
+# Servicio de cada clave de los ficheros JSON antiguos (por prefijo); las
+# claves desconocidas se importan con LEGACY_SERVICE
+LEGACY_KEY_SERVICES = (
+    ("github", "github"),
+    ("notion", "notion"),
+    ("slack_", "slack"),
+    ("google_", "google_workspace"),
+    ("instagram_", "instagram"),
+    ("trello_", "trello"),
+    ("twitter_", "twitter_x"),
+)
+LEGACY_SERVICE = "legacy"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS user_tokens (
+    user_id TEXT NOT NULL,
+    service TEXT NOT NULL,
+    tokens TEXT NOT NULL,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (user_id, service)
+) WITHOUT ROWID
+"""
+
+class MCPTokenStore:
+    """
+    Tokens de usuario por (user_id, servicio) en SQLite con caché LRU/TTL.
+
+    La caché guarda todas las filas de un usuario (también la ausencia de
+    filas), de modo que la consulta que se hace en cada operación MCP no toca
+    la base mientras la entrada esté vigente.
+    """
+
+    def __init__(self,
+                 db_path: str,
+                 legacy_dir: str = None,
+                 cache_size: int = MCP_TOKEN_CACHE_SIZE,
+                 cache_ttl: float = MCP_TOKEN_CACHE_TTL):
+        """
+        Inicializa el almacén.
+
+        Args:
+            db_path: Ruta de la base SQLite
+            legacy_dir: Directorio de los ficheros `user_{id}_tokens.json` a importar
+            cache_size: Número máximo de usuarios en la caché
+            cache_ttl: Segundos de validez de cada entrada de la caché
+        """
+        self.db_path = db_path
+        self.legacy_dir = legacy_dir
+        self.cache_size = cache_size
+        self.cache_ttl = cache_ttl
+        self._cache: "OrderedDict[str, Tuple[float, Dict[str, Dict[str, Any]]]]" = OrderedDict()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        self._writes = 0
+        self.metrics = {
+            "cache_hits": 0,
+            "cache_misses": 0,
+            "reads": 0,
+            "writes": 0,
+            "migrated_users": 0
+        }
+
+    def _connect(self) -> sqlite3.Connection:
+        """Abre la conexión y crea el esquema (se llama con el candado tomado)."""
+        if self._conn is None:
+            new_db = not os.path.exists(self.db_path)
+            conn = sqlite3.connect(self.db_path, check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA busy_timeout=5000")
+            conn.execute(_SCHEMA)
+            if new_db:
+                # La base contiene secretos: solo legible por el propietario
+                os.chmod(self.db_path, 0o600)
+            self._conn = conn
+        return self._conn
+
+    async def get(self, user_id: str, service: str = None) -> Optional[Dict[str, Any]]:
+        """
+        Obtiene los tokens de un usuario.
+
+        Args:
+            user_id: ID del usuario
+            service: Servicio concreto; sin él se devuelven los tokens de
+                todos los servicios combinados en un único diccionario
+
+        Returns:
+            Diccionario de tokens, o None si no hay ninguno
+        """
+        rows = await self._get_rows(user_id)
+        if service is not None:
+            return rows.get(service)
+        if not rows:
+            return None
+        merged: Dict[str, Any] = {}
+        for tokens in rows.values():
+            merged.update(tokens)
+        return merged
+
+    async def _get_rows(self, user_id: str) -> Dict[str, Dict[str, Any]]:
+        """Obtiene las filas de un usuario por servicio, pasando por la caché."""
+        entry = self._cache.get(user_id)
+        if entry is not None and time.monotonic() < entry[0]:
+            self._cache.move_to_end(user_id)
+            self.metrics["cache_hits"] += 1
+            return entry[1]
+
+        self.metrics["cache_misses"] += 1
+        writes = self._writes
+        rows = await asyncio.to_thread(self._read_rows, user_id)
+        if writes == self._writes:
+            # Sin escrituras durante la lectura: el resultado puede cachearse
+            self._cache_put(user_id, rows)
+        return rows
+
+    def _read_rows(self, user_id: str) -> Dict[str, Dict[str, Any]]:
+        """Lee las filas de un usuario (en un hilo), importando su fichero antiguo si existe."""
+        with self._lock:
+            conn = self._connect()
+            self.metrics["reads"] += 1
+            cursor = conn.execute("SELECT service, tokens FROM user_tokens WHERE user_id = ?", (user_id,))
+            rows = {service: json.loads(tokens) for service, tokens in cursor.fetchall()}
+            if not rows and self._migrate_legacy(conn, user_id):
+                cursor = conn.execute("SELECT service, tokens FROM user_tokens WHERE user_id = ?", (user_id,))
+                rows = {service: json.loads(tokens) for service, tokens in cursor.fetchall()}
+            return rows
+
+    def _migrate_legacy(self, conn: sqlite3.Connection, user_id: str) -> bool:
+        """
+        Importa `user_{id}_tokens.json` a la base y lo renombra.
+
+        La importación es una sola transacción que solo escribe si el usuario
+        no tiene filas: si falla no deja filas a medias (se reintenta en la
+        siguiente consulta) y nunca sobrescribe tokens guardados después.
+
+        Returns:
+            True si se importó el fichero
+        """
+        if not self.legacy_dir:
+            return False
+        file_path = os.path.join(self.legacy_dir, f"user_{user_id}_tokens.json")
+        if not os.path.exists(file_path):
+            return False
+
+        try:
+            with open(file_path, 'r') as f:
+                tokens = json.load(f)
+            rows: Dict[str, Dict[str, Any]] = {}
+            for key, value in tokens.items():
+                service = next(
+                    (service for prefix, service in LEGACY_KEY_SERVICES if key.startswith(prefix)),
+                    LEGACY_SERVICE
+                )
+                rows.setdefault(service, {})[key] = value
+            with conn:
+                conn.execute("BEGIN IMMEDIATE")
+                if conn.execute("SELECT 1 FROM user_tokens WHERE user_id = ? LIMIT 1", (user_id,)).fetchone():
+                    # Ya importado (o con tokens nuevos): el fichero está obsoleto
+                    return False
+                for service, service_tokens in rows.items():
+                    self._upsert_row(conn, user_id, service, service_tokens)
+            self.metrics["writes"] += 1
+            self.metrics["migrated_users"] += 1
+            logger.info(f"Tokens del usuario {user_id} importados del fichero antiguo")
+        except Exception as e:
+            logger.error(f"Error al importar tokens antiguos del usuario {user_id}: {e}")
+            return False
+
+        try:
+            os.replace(file_path, file_path + ".migrated")
+        except OSError as e:
+            logger.warning(f"No se pudo renombrar el fichero antiguo del usuario {user_id}: {e}")
+        return True
+
+    async def set(self, user_id: str, service: str, tokens: Dict[str, Any]):
+        """
+        Guarda (o sustituye) los tokens de un usuario para un servicio.
+
+        Args:
+            user_id: ID del usuario
+            service: Nombre del servicio
+            tokens: Tokens del servicio
+        """
+        self._writes += 1
+        self._cache.pop(user_id, None)
+        await asyncio.to_thread(self._write, user_id, service, tokens)
+        self._cache.pop(user_id, None)
+
+    def _write(self, user_id: str, service: str, tokens: Dict[str, Any]):
+        """Escribe una fila en una transacción (en un hilo)."""
+        with self._lock:
+            conn = self._connect()
+            # Importar antes el fichero antiguo para que no se pierdan sus tokens
+            self._migrate_legacy(conn, user_id)
+            self._upsert(conn, user_id, service, tokens)
+
+    def _upsert(self, conn: sqlite3.Connection, user_id: str, service: str, tokens: Dict[str, Any]):
+        """Inserta o actualiza una fila de forma atómica."""
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            self._upsert_row(conn, user_id, service, tokens)
+        self.metrics["writes"] += 1
+
+    @staticmethod
+    def _upsert_row(conn: sqlite3.Connection, user_id: str, service: str, tokens: Dict[str, Any]):
+        """Inserta o actualiza una fila dentro de la transacción en curso."""
+        conn.execute(
+            "INSERT INTO user_tokens (user_id, service, tokens, updated_at) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT (user_id, service) DO UPDATE SET tokens = excluded.tokens, updated_at = excluded.updated_at",
+            (user_id, service, json.dumps(tokens), time.time())
+        )
+
+    async def delete(self, user_id: str, service: str = None) -> bool:
+        """
+        Elimina los tokens de un usuario.
+
+        Args:
+            user_id: ID del usuario
+            service: Servicio concreto; sin él se eliminan todos
+
+        Returns:
+            True si se eliminó alguna fila
+        """
+        self._writes += 1
+        self._cache.pop(user_id, None)
+        deleted = await asyncio.to_thread(self._delete, user_id, service)
+        self._cache.pop(user_id, None)
+        return deleted
+
+    def _delete(self, user_id: str, service: Optional[str]) -> bool:
+        """Elimina filas en una transacción (en un hilo)."""
+        with self._lock:
+            conn = self._connect()
+            self._migrate_legacy(conn, user_id)
+            with conn:
+                conn.execute("BEGIN IMMEDIATE")
+                if service is None:
+                    cursor = conn.execute("DELETE FROM user_tokens WHERE user_id = ?", (user_id,))
+                else:
+                    cursor = conn.execute(
+                        "DELETE FROM user_tokens WHERE user_id = ? AND service = ?", (user_id, service)
+                    )
+            self.metrics["writes"] += 1
+            return cursor.rowcount > 0
+
+    def _cache_put(self, user_id: str, rows: Dict[str, Dict[str, Any]]):
+        """Guarda las filas de un usuario en la caché respetando su tamaño máximo."""
+        self._cache[user_id] = (time.monotonic() + self.cache_ttl, rows)
+        self._cache.move_to_end(user_id)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    def close(self):
+        """Cierra la conexión con la base."""
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """
+        Obtiene las métricas del almacén.
+
+        Returns:
+            Aciertos y fallos de la caché, lecturas, escrituras y usuarios importados
+        """
+        lookups = self.metrics["cache_hits"] + self.metrics["cache_misses"]
+        return {
+            **self.metrics,
+            "cached_users": len(self._cache),
+            "cache_size": self.cache_size,
+            "cache_hit_ratio": self.metrics["cache_hits"] / lookups if lookups else 0.0
+        }
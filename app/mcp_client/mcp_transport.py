@@ -0,0 +1,439 @@
+"""
+Transporte JSON-RPC multiplexado para servidores MCP stdio
+
+Este módulo implementa el transporte que usan los servidores MCP lanzados como
+subprocesos: cada solicitud se etiqueta con un id, una única tarea lectora
+enruta las respuestas a la solicitud que las espera y se permiten varias
+llamadas concurrentes en vuelo sobre el mismo proceso.
+
+Los mensajes (JSON delimitado por saltos de línea) se leen en bloques y sin el
+límite de 64 KiB de `readline()`: el tamaño máximo es configurable y un
+mensaje que lo supera se descarta a medida que llega, sin acumularlo.
+
+Autor: GENIA Team
+Fecha: Mayo 2025
+"""
+
+import os
+import re
+import json
+import asyncio
+import inspect
+import itertools
+import logging
+from typing import Dict, Any, Optional, Callable, Awaitable, Set
+
+# Configurar logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger("mcp_transport")
+
+# Número máximo de solicitudes en vuelo por proceso por defecto
+DEFAULT_MAX_IN_FLIGHT = 32
+
+# Tamaño máximo de un mensaje JSON-RPC recibido (32 MiB por defecto)
+MCP_MAX_MESSAGE_BYTES = int(os.getenv("MCP_MAX_MESSAGE_BYTES", str(32 * 1024 * 1024)))
+
+# Tamaño de lectura de stdout
+_READ_CHUNK = 64 * 1024
+
+# Bytes conservados del principio y del final de un mensaje descartado,
+# suficientes para localizar su id
+_OVERSIZED_PEEK = 256
+
+# id de primer nivel al principio ({"jsonrpc": "2.0", "id": N, ...}) o al
+# final ({..., "jsonrpc": "2.0", "id": N}) de un mensaje
+_HEAD_ID_RE = re.compile(rb'^\s*\{\s*(?:"jsonrpc"\s*:\s*"2\.0"\s*,\s*)?"id"\s*:\s*(\d+)')
+_TAIL_ID_RE = re.compile(rb'"id"\s*:\s*(\d+)\s*\}\s*$')
+
+# Versión del protocolo MCP anunciada en el handshake
+MCP_PROTOCOL_VERSION = "2024-11-05"
+
+# Identificación del cliente en el handshake
+MCP_CLIENT_INFO = {"name": "genia-backend", "version": "1.0.0"}
+
+class MCPTransportError(RuntimeError):
+    """Error de comunicación con un servidor MCP stdio."""
+
+class MCPTimeoutError(MCPTransportError):
+    """La respuesta de un servidor MCP no llegó dentro del plazo."""
+
+class MCPMessageTooLargeError(MCPTransportError):
+    """La respuesta de un servidor MCP supera el tamaño máximo de mensaje."""
+
+def build_jsonrpc_message(request: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Normaliza una solicitud al formato JSON-RPC de MCP (sin id).
+
+    Acepta tanto mensajes JSON-RPC ({"method": ..., "params": ...}) como el
+    formato heredado {"type": "function", "function": {"name", "arguments"}},
+    que se traduce a una llamada `tools/call`.
+
+    Args:
+        request: Solicitud en formato MCP o heredado
+
+    Returns:
+        Mensaje JSON-RPC listo para enviarse
+    """
+    if "method" in request:
+        message = {k: v for k, v in request.items() if k != "id"}
+        message.setdefault("jsonrpc", "2.0")
+        return message
+
+    if request.get("type") == "function":
+        function = request.get("function", {})
+        arguments = function.get("arguments") or {}
+        if isinstance(arguments, str):
+            arguments = json.loads(arguments) if arguments.strip() else {}
+        return {
+            "jsonrpc": "2.0",
+            "method": "tools/call",
+            "params": {
+                "name": function.get("name"),
+                "arguments": arguments
+            }
+        }
+
+    raise ValueError(f"Formato de solicitud MCP no soportado: {request}")
+
+class StdioJSONRPCTransport:
+    """
+    Transporte JSON-RPC sobre stdin/stdout de un subproceso MCP.
+
+    Cada solicitud recibe un id único y un futuro propio; la tarea lectora
+    resuelve el futuro cuyo id coincide con el de la respuesta, de modo que
+    llamadas concurrentes nunca leen respuestas ajenas.
+    """
+
+    def __init__(self,
+                 name: str,
+                 reader: asyncio.StreamReader,
+                 writer: asyncio.StreamWriter,
+                 max_in_flight: int = DEFAULT_MAX_IN_FLIGHT,
+                 on_output: Callable[[str], None] = None,
+                 max_message_bytes: int = MCP_MAX_MESSAGE_BYTES):
+        """
+        Inicializa el transporte.
+
+        Args:
+            name: Nombre del servidor MCP (para logs)
+            reader: Flujo de salida del subproceso (stdout)
+            writer: Flujo de entrada del subproceso (stdin)
+            max_in_flight: Número máximo de solicitudes concurrentes en vuelo
+            on_output: Función que recibe las líneas de stdout que no son JSON-RPC
+            max_message_bytes: Tamaño máximo de un mensaje recibido
+        """
+        self.name = name
+        self._on_output = on_output
+        self._reader = reader
+        self._writer = writer
+        self._ids = itertools.count(1)
+        self._pending: Dict[int, asyncio.Future] = {}
+        self._progress: Dict[int, Callable[[Dict[str, Any]], Any]] = {}
+        self.max_message_bytes = max_message_bytes
+        self._buffer = bytearray()
+        self._oversized: Optional[Dict[str, Any]] = None
+        self.oversized_messages = 0
+        self._write_lock = asyncio.Lock()
+        self._in_flight = asyncio.Semaphore(max_in_flight)
+        self._reader_task: Optional[asyncio.Task] = None
+        # Tareas en segundo plano (notificaciones de cancelación, progreso asíncrono)
+        self._background: Set[asyncio.Task] = set()
+        self.closed = False
+        self.timeouts = 0
+        self.stale_responses = 0
+
+    @property
+    def in_flight(self) -> int:
+        """Número de solicitudes esperando respuesta."""
+        return len(self._pending)
+
+    def start(self):
+        """Inicia la tarea lectora que enruta las respuestas."""
+        if self._reader_task is None:
+            self._reader_task = asyncio.create_task(self._read_loop())
+
+    async def close(self):
+        """Detiene la tarea lectora y falla las solicitudes pendientes."""
+        self.closed = True
+        if self._reader_task and not self._reader_task.done():
+            self._reader_task.cancel()
+            try:
+                await self._reader_task
+            except asyncio.CancelledError:
+                pass
+        self._fail_pending(MCPTransportError(f"Transporte de '{self.name}' cerrado"))
+        background = list(self._background)
+        for task in background:
+            task.cancel()
+        if background:
+            await asyncio.gather(*background, return_exceptions=True)
+
+    def _run_background(self, coro: Awaitable):
+        """Ejecuta una corrutina en segundo plano conservando la tarea hasta que termine."""
+        task = asyncio.ensure_future(coro)
+        self._background.add(task)
+        task.add_done_callback(self._background_done)
+
+    def _background_done(self, task: asyncio.Task):
+        self._background.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.error(f"[{self.name}] Error en tarea en segundo plano: {task.exception()}")
+
+    async def request(self,
+                      message: Dict[str, Any],
+                      timeout: float = None,
+                      on_progress: Callable[[Dict[str, Any]], Any] = None) -> Dict[str, Any]:
+        """
+        Envía una solicitud JSON-RPC y espera su respuesta.
+
+        Si vence el plazo o se cancela la llamada, la solicitud deja de estar
+        pendiente (su respuesta tardía se descarta) y se notifica al servidor
+        con `notifications/cancelled`.
+
+        Con `on_progress` la solicitud lleva un `progressToken` y cada
+        `notifications/progress` del servidor (resultados parciales) se entrega
+        a esa función a medida que llega.
+
+        Args:
+            message: Mensaje JSON-RPC sin id
+            timeout: Segundos máximos de espera (None para esperar sin límite)
+            on_progress: Función (o corrutina) que recibe los parámetros de cada notificación de progreso
+
+        Returns:
+            Respuesta JSON-RPC completa (incluye `result` o `error`)
+        """
+        async with self._in_flight:
+            if self.closed:
+                raise MCPTransportError(f"Servidor MCP '{self.name}' cerró la conexión")
+
+            request_id = next(self._ids)
+            payload = dict(message)
+            payload.setdefault("jsonrpc", "2.0")
+            payload["id"] = request_id
+            if on_progress is not None:
+                params = dict(payload.get("params") or {})
+                params["_meta"] = {**params.get("_meta", {}), "progressToken": request_id}
+                payload["params"] = params
+                self._progress[request_id] = on_progress
+
+            future = asyncio.get_running_loop().create_future()
+            self._pending[request_id] = future
+            try:
+                await self._write(payload)
+                if timeout is None:
+                    return await future
+                return await asyncio.wait_for(future, timeout)
+            except asyncio.TimeoutError:
+                self.timeouts += 1
+                self._cancel_remote(request_id, "timeout")
+                raise MCPTimeoutError(
+                    f"Servidor MCP '{self.name}' no respondió a '{message.get('method')}' en {timeout}s"
+                ) from None
+            except asyncio.CancelledError:
+                self._cancel_remote(request_id, "cancelled")
+                raise
+            finally:
+                self._pending.pop(request_id, None)
+                self._progress.pop(request_id, None)
+
+    def _cancel_remote(self, request_id: int, reason: str):
+        """Notifica al servidor que ya no se espera la respuesta de una solicitud."""
+        if self.closed:
+            return
+
+        async def _send():
+            try:
+                await self.notify("notifications/cancelled", {"requestId": request_id, "reason": reason})
+            except Exception as e:
+                logger.debug(f"[{self.name}] No se pudo notificar la cancelación de {request_id}: {e}")
+
+        self._run_background(_send())
+
+    async def initialize(self, timeout: float) -> Dict[str, Any]:
+        """
+        Realiza el handshake `initialize` de MCP.
+
+        El servidor solo se considera listo cuando responde a `initialize`;
+        después se le envía la notificación `notifications/initialized`.
+
+        Args:
+            timeout: Segundos máximos de espera por la respuesta
+
+        Returns:
+            Resultado de `initialize` (capacidades e información del servidor)
+        """
+        response = await asyncio.wait_for(
+            self.request({
+                "method": "initialize",
+                "params": {
+                    "protocolVersion": MCP_PROTOCOL_VERSION,
+                    "capabilities": {},
+                    "clientInfo": MCP_CLIENT_INFO
+                }
+            }),
+            timeout=timeout
+        )
+        if "error" in response:
+            raise MCPTransportError(f"Servidor MCP '{self.name}' rechazó initialize: {response['error']}")
+
+        await self.notify("notifications/initialized")
+        return response.get("result", {})
+
+    async def notify(self, method: str, params: Dict[str, Any] = None):
+        """
+        Envía una notificación JSON-RPC (sin respuesta).
+
+        Args:
+            method: Método de la notificación
+            params: Parámetros de la notificación
+        """
+        payload = {"jsonrpc": "2.0", "method": method}
+        if params is not None:
+            payload["params"] = params
+        await self._write(payload)
+
+    async def _write(self, payload: Dict[str, Any]):
+        """Serializa y escribe un mensaje en stdin del subproceso."""
+        data = json.dumps(payload).encode('utf-8') + b"\n"
+        async with self._write_lock:
+            self._writer.write(data)
+            await self._writer.drain()
+
+    async def _read_loop(self):
+        """Lee stdout en bloques y enruta cada respuesta a su solicitud."""
+        error: Exception = MCPTransportError(f"Servidor MCP '{self.name}' cerró la conexión")
+        try:
+            while True:
+                chunk = await self._reader.read(_READ_CHUNK)
+                if not chunk:
+                    break
+                self._feed(chunk)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            error = MCPTransportError(f"Error al leer de servidor MCP '{self.name}': {e}")
+            logger.error(str(error))
+        finally:
+            self.closed = True
+            self._fail_pending(error)
+
+    def _feed(self, chunk: bytes):
+        """Separa un bloque leído en mensajes completos (uno por línea)."""
+        start = 0
+        while True:
+            newline = chunk.find(b"\n", start)
+            if newline < 0:
+                self._accumulate(chunk[start:])
+                return
+            self._accumulate(chunk[start:newline])
+            self._complete_message()
+            start = newline + 1
+
+    def _accumulate(self, data: bytes):
+        """Añade un fragmento al mensaje en curso respetando el tamaño máximo."""
+        if not data:
+            return
+
+        if self._oversized is not None:
+            # Mensaje ya descartado: solo se cuenta y se conserva el final
+            self._oversized["size"] += len(data)
+            self._oversized["tail"] = (self._oversized["tail"] + data)[-_OVERSIZED_PEEK:]
+            return
+
+        if len(self._buffer) + len(data) > self.max_message_bytes:
+            head = bytes(self._buffer[:_OVERSIZED_PEEK]) if self._buffer else data[:_OVERSIZED_PEEK]
+            self._oversized = {
+                "size": len(self._buffer) + len(data),
+                "head": head,
+                "tail": (bytes(self._buffer[-_OVERSIZED_PEEK:]) + data)[-_OVERSIZED_PEEK:]
+            }
+            self._buffer = bytearray()
+            return
+
+        self._buffer.extend(data)
+
+    def _complete_message(self):
+        """Procesa el mensaje acumulado al encontrar el salto de línea."""
+        if self._oversized is not None:
+            oversized, self._oversized = self._oversized, None
+            self._reject_oversized(oversized)
+            return
+
+        line, self._buffer = bytes(self._buffer), bytearray()
+        self._dispatch(line)
+
+    def _reject_oversized(self, oversized: Dict[str, Any]):
+        """Falla la solicitud cuya respuesta superó el tamaño máximo."""
+        self.oversized_messages += 1
+        match = _HEAD_ID_RE.search(oversized["head"]) or _TAIL_ID_RE.search(oversized["tail"])
+        request_id = int(match.group(1)) if match else None
+        logger.error(
+            f"[{self.name}] Mensaje de {oversized['size']} bytes descartado "
+            f"(máximo {self.max_message_bytes}, id {request_id})"
+        )
+
+        future = self._pending.get(request_id)
+        if future is not None and not future.done():
+            future.set_exception(MCPMessageTooLargeError(
+                f"Respuesta de servidor MCP '{self.name}' de {oversized['size']} bytes "
+                f"supera el máximo de {self.max_message_bytes}"
+            ))
+
+    def _dispatch(self, line: bytes):
+        """Procesa una línea recibida del servidor."""
+        text = line.decode('utf-8', errors='replace').strip()
+        if not text:
+            return
+
+        try:
+            message = json.loads(text)
+        except json.JSONDecodeError:
+            # Algunos servidores escriben mensajes de arranque en stdout
+            if self._on_output:
+                self._on_output(text)
+            else:
+                logger.debug(f"[{self.name}] Línea no JSON ignorada: {text[:200]}")
+            return
+
+        if not isinstance(message, dict):
+            logger.debug(f"[{self.name}] Mensaje JSON-RPC inválido ignorado: {text[:200]}")
+            return
+
+        if message.get("method") == "notifications/progress":
+            self._deliver_progress(message.get("params") or {})
+            return
+
+        if "method" in message:
+            # Notificaciones o solicitudes iniciadas por el servidor
+            logger.debug(f"[{self.name}] Mensaje del servidor: {message.get('method')}")
+            return
+
+        future = self._pending.get(message.get("id"))
+        if future is None or future.done():
+            # Respuesta a una solicitud que venció o se canceló
+            self.stale_responses += 1
+            logger.debug(f"[{self.name}] Respuesta descartada para id {message.get('id')}")
+            return
+        future.set_result(message)
+
+    def _deliver_progress(self, params: Dict[str, Any]):
+        """Entrega una notificación de progreso a la solicitud que la pidió."""
+        callback = self._progress.get(params.get("progressToken"))
+        if callback is None:
+            return
+        try:
+            result = callback(params)
+            if inspect.isawaitable(result):
+                self._run_background(result)
+        except Exception as e:
+            logger.error(f"[{self.name}] Error al entregar progreso: {e}")
+
+    def _fail_pending(self, error: Exception):
+        """Falla todas las solicitudes pendientes con el error indicado."""
+        for future in self._pending.values():
+            if not future.done():
+                future.set_exception(error)
+        self._pending.clear()
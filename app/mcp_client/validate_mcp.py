@@ -72,17 +72,20 @@ async def test_orchestrator():
         status = orchestrator.get_server_status()
         logger.info(f"Estado de servidores: {json.dumps(status, indent=2)}")
         
-        # Guardar tokens de usuario
-        result = orchestrator.save_user_tokens(TEST_USER_ID, {
-            "github": "mock_github_token",
-            "notion": "mock_notion_token",
-            "slack_xoxc": "mock_slack_xoxc_token",
-            "slack_xoxd": "mock_slack_xoxd_token"
-        })
+        # Guardar tokens de usuario (cada servicio por separado)
+        results = [
+            await orchestrator.save_user_tokens(TEST_USER_ID, {"github": "mock_github_token"}, service="github"),
+            await orchestrator.save_user_tokens(TEST_USER_ID, {"notion": "mock_notion_token"}, service="notion"),
+            await orchestrator.save_user_tokens(TEST_USER_ID, {
+                "slack_xoxc": "mock_slack_xoxc_token",
+                "slack_xoxd": "mock_slack_xoxd_token"
+            }, service="slack")
+        ]
+        result = all(results)
         logger.info(f"Guardado de tokens: {'Exitoso' if result else 'Fallido'}")
         
         # Cargar tokens de usuario
-        tokens = orchestrator.load_user_tokens(TEST_USER_ID)
+        tokens = await orchestrator.load_user_tokens(TEST_USER_ID)
         logger.info(f"Carga de tokens: {'Exitoso' if tokens else 'Fallido'}")
         if tokens:
             logger.info(f"Tokens cargados: {json.dumps({k: '***' for k in tokens.keys()}, indent=2)}")
@@ -106,9 +106,10 @@ async def test_orchestrator_extended():
         status = orchestrator.get_server_status()
         logger.info(f"Estado de servidores: {json.dumps(status, indent=2)}")
         
-        # Guardar tokens de usuario
-        user_tokens = {}
+        # Guardar tokens de usuario (cada servicio por separado)
+        results = []
         for service, tokens in TEST_TOKENS.items():
+            user_tokens = {}
             if service == "github":
                 user_tokens["github"] = tokens["token"]
             elif service == "notion":
@@ -135,11 +136,13 @@ async def test_orchestrator_extended():
                 user_tokens["twitter_access_token"] = tokens["access_token"]
                 user_tokens["twitter_access_secret"] = tokens["access_secret"]
         
-        result = orchestrator.save_user_tokens(TEST_USER_ID, user_tokens)
+            results.append(await orchestrator.save_user_tokens(TEST_USER_ID, user_tokens, service=service))
+        
+        result = all(results)
         logger.info(f"Guardado de tokens: {'Exitoso' if result else 'Fallido'}")
         
         # Cargar tokens de usuario
-        tokens = orchestrator.load_user_tokens(TEST_USER_ID)
+        tokens = await orchestrator.load_user_tokens(TEST_USER_ID)
         logger.info(f"Carga de tokens: {'Exitoso' if tokens else 'Fallido'}")
         if tokens:
             logger.info(f"Tokens cargados: {json.dumps({k: '***' for k in tokens.keys()}, indent=2)}")
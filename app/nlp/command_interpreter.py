@@ -53,7 +53,8 @@ JSON de respuesta:
 
         interpreted_command = {"command": "unknown", "parameters": {}}
         try:
-            async for response in self.mcp_client.request_mcp_server("openai", request_message):
+            # Clasificación corta y determinista: con hedging frente a respuestas lentas
+            async for response in self.mcp_client.request_mcp_server("openai", request_message, hedge_route="command_interpreter"):
                 if response.role == "assistant" and response.content.text:
                     try:
                         # Limpiar la respuesta de backticks y otros formatos antes de parsear
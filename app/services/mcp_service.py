@@ -0,0 +1,189 @@
+"""
+Servicio MCP para GENIA
+
+Este módulo es el punto de entrada único de los endpoints `/api/mcp/*` para
+ejecutar operaciones en los servidores MCP. Todas las operaciones pasan por
+el despachador de la tabla de servicios del cliente MCP, que registra sus
+llamadas, errores y latencias por servicio.
+
+Autor: GENIA Team
+Fecha: Mayo 2025
+"""
+
+import os
+import time
+import asyncio
+import logging
+from typing import Dict, List, Any
+
+from app.mcp_client.mcp_client_extended import MCPClient, get_mcp_client
+from app.mcp_client.mcp_services import MCPUnknownServiceError
+from app.mcp_client.mcp_schemas import MCPUnknownToolError
+from app.mcp_client.mcp_transport import MCPTimeoutError
+from app.mcp_client.mcp_admission import MCPServerBusyError
+from app.mcp_client.mcp_orchestrator import MCPServerQuarantinedError
+
+# Configurar logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger("mcp_service")
+
+# Operaciones permitidas en una misma solicitud por lotes
+MCP_BATCH_MAX_ITEMS = int(os.getenv("MCP_BATCH_MAX_ITEMS", "20"))
+
+class MCPOperationError(RuntimeError):
+    """El servidor MCP respondió a la operación con un error JSON-RPC."""
+
+    def __init__(self, message: str, code: int = None, data: Any = None):
+        super().__init__(message)
+        self.code = code
+        self.data = data
+
+def error_status_code(error: Exception) -> int:
+    """
+    Obtiene el código HTTP que corresponde al error de una operación MCP.
+
+    Args:
+        error: Excepción producida por la operación
+
+    Returns:
+        Código HTTP (404, 400, 504, 503, 502 o 500)
+    """
+    if isinstance(error, (MCPUnknownServiceError, MCPUnknownToolError)):
+        return 404
+    if isinstance(error, ValueError):
+        return 400
+    if isinstance(error, MCPTimeoutError):
+        return 504
+    if isinstance(error, (MCPServerBusyError, MCPServerQuarantinedError)):
+        return 503
+    if isinstance(error, MCPOperationError):
+        return 502
+    return 500
+
+async def initialize_mcp() -> MCPClient:
+    """
+    Inicializa el cliente MCP global (registro y precalentamiento de servidores).
+
+    Returns:
+        Instancia del cliente MCP
+    """
+    return await get_mcp_client()
+
+async def shutdown_mcp() -> bool:
+    """
+    Detiene el cliente MCP global.
+
+    Returns:
+        True si el apagado fue exitoso, False en caso contrario
+    """
+    client = await get_mcp_client()
+    return await client.shutdown()
+
+async def execute_tool_operation(user_id: str,
+                                 service: str,
+                                 operation: str,
+                                 arguments: Dict[str, Any] = None,
+                                 timeout: float = None,
+                                 use_cache: bool = True) -> Dict[str, Any]:
+    """
+    Ejecuta una operación de un servicio MCP con las credenciales del usuario.
+
+    Args:
+        user_id: ID del usuario
+        service: Nombre del servicio (github, notion, slack, etc.)
+        operation: Nombre de la operación
+        arguments: Argumentos de la operación
+        timeout: Plazo en segundos (por defecto el de la operación o del servicio)
+        use_cache: False para ignorar la respuesta cacheada y refrescarla
+
+    Returns:
+        Diccionario con el servicio, la operación, la respuesta JSON-RPC
+        (`response`) y la duración en segundos
+
+    Raises:
+        MCPUnknownServiceError: Si el servicio no existe
+        MCPCredentialsError: Si el usuario no tiene las credenciales del servicio
+        MCPOperationError: Si el servidor responde con un error
+    """
+    client = await get_mcp_client()
+    started = time.monotonic()
+    response = await client.execute_operation(
+        user_id, service, operation, arguments, timeout=timeout, use_cache=use_cache
+    )
+
+    error = response.get("error") if isinstance(response, dict) else None
+    if error:
+        raise MCPOperationError(
+            f"Error de {service} en {operation}: {error.get('message', error)}",
+            code=error.get("code"),
+            data=error.get("data")
+        )
+
+    return {
+        "service": service,
+        "operation": operation,
+        "response": response,
+        "duration": time.monotonic() - started
+    }
+
+async def execute_tool_batch(user_id: str, operations: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Ejecuta varias operaciones MCP a la vez y devuelve sus resultados en orden.
+
+    Cada operación pasa por el mismo camino que `execute_tool_operation`, de
+    modo que respeta los límites de admisión de su servicio y comparte la
+    caché de lectura; el lote tarda lo que su operación más lenta. El error
+    de una operación no afecta a las demás.
+
+    Args:
+        user_id: ID del usuario
+        operations: Lista de {"service", "operation", "arguments"}
+
+    Returns:
+        Un resultado por operación con su estado, código HTTP, resultado o
+        error y duración en segundos
+
+    Raises:
+        ValueError: Si el lote está vacío o supera MCP_BATCH_MAX_ITEMS
+    """
+    if not operations:
+        raise ValueError("El lote no contiene operaciones")
+    if len(operations) > MCP_BATCH_MAX_ITEMS:
+        raise ValueError(
+            f"El lote contiene {len(operations)} operaciones (máximo {MCP_BATCH_MAX_ITEMS})"
+        )
+
+    async def run(item: Dict[str, Any]) -> Dict[str, Any]:
+        service = item.get("service")
+        operation = item.get("operation")
+        started = time.monotonic()
+        try:
+            response = await execute_tool_operation(
+                user_id=user_id,
+                service=service,
+                operation=operation,
+                arguments=item.get("arguments")
+            )
+            return {
+                "service": service,
+                "operation": operation,
+                "status": "success",
+                "status_code": 200,
+                "result": response["response"].get("result", {}),
+                "duration": response["duration"]
+            }
+        except Exception as e:
+            logger.warning(f"Operación {operation} en {service} del lote fallida: {e}")
+            return {
+                "service": service,
+                "operation": operation,
+                "status": "error",
+                "status_code": error_status_code(e),
+                "error": str(e),
+                "duration": time.monotonic() - started
+            }
+
+    return list(await asyncio.gather(*[run(item) for item in operations]))
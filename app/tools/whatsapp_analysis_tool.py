@@ -78,8 +78,12 @@ class WhatsAppAnalysisTool(BaseTool):
         else:
             raise ValueError(f"Capacidad no soportada: {capability}")
 
-    async def _call_mcp_openai(self, prompt: str, system_message: str = "Eres un asistente útil.", model: str = "gpt-4", max_tokens: int = 500, temperature: float = 0.3) -> str:
-        """Helper function to call OpenAI via MCP client."""
+    async def _call_mcp_openai(self, prompt: str, system_message: str = "Eres un asistente útil.", model: str = "gpt-4", max_tokens: int = 500, temperature: float = 0.3, hedge_route: Optional[str] = None) -> str:
+        """Helper function to call OpenAI via MCP client.
+
+        `hedge_route` activa el hedging del cliente MCP; solo para prompts
+        cortos y deterministas, donde un duplicado es barato.
+        """
         mcp_message = SimpleMessage(
             role="user",
             content=SimpleTextContent(text=prompt),
@@ -92,7 +96,7 @@ class WhatsAppAnalysisTool(BaseTool):
         )
         
         response_text = None
-        async for response_msg in mcp_client_instance.request_mcp_server("openai", mcp_message):
+        async for response_msg in mcp_client_instance.request_mcp_server("openai", mcp_message, hedge_route=hedge_route):
             if response_msg.role == "assistant" and isinstance(response_msg.content, SimpleTextContent):
                 response_text = response_msg.content.text
                 break # Stop after getting the first valid message
@@ -165,7 +169,8 @@ class WhatsAppAnalysisTool(BaseTool):
                 prompt=sentiment_prompt,
                 system_message="Eres un clasificador de sentimiento preciso.",
                 max_tokens=10,
-                temperature=0.1
+                temperature=0.1,
+                hedge_route="whatsapp_sentiment"
             )
             sentiment = sentiment_response_text.strip().upper()
             # Basic validation
@@ -178,7 +183,8 @@ class WhatsAppAnalysisTool(BaseTool):
                 prompt=satisfaction_prompt,
                 system_message="Eres un evaluador preciso de satisfacción del cliente.",
                 max_tokens=10,
-                temperature=0.1
+                temperature=0.1,
+                hedge_route="whatsapp_satisfaction"
             )
             
             try:
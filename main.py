@@ -11,6 +11,8 @@ from app.api.routes import api_router
 from app.webhooks.twilio_webhook import router as twilio_webhook_router
 # Importar settings y la variable CORS_ORIGINS parseada
 from app.core.config import settings, CORS_ORIGINS
+# Cliente de los servidores MCP remotos (OpenAI, Twilio, Stripe)
+from app.mcp_client.client import mcp_client_instance
 
 # Configurar Sentry para monitoreo de errores
 if settings.SENTRY_DSN:
@@ -65,6 +67,16 @@ app.include_router(api_router, prefix=settings.API_V1_STR)
 # Incluir el router del webhook de Twilio
 app.include_router(twilio_webhook_router, prefix="/webhook", tags=["Webhooks"])
 
+# Abrir por adelantado las conexiones con los servidores MCP remotos para que
+# las primeras solicitudes (p. ej. del webhook de WhatsApp) no paguen TCP/TLS
+@app.on_event("startup")
+async def prewarm_mcp_connections():
+    await mcp_client_instance.prewarm()
+
+@app.on_event("shutdown")
+async def close_mcp_connections():
+    await mcp_client_instance.close()
+
 # Ruta de verificación de salud
 @app.get("/health", tags=["Health"])
 async def health_check():
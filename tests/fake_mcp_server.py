@@ -0,0 +1,56 @@
+"""
+Servidor MCP stdio mínimo para las pruebas.
+
+Responde a `initialize` (tras FAKE_MCP_INIT_DELAY segundos), a `tools/list`
+y a `tools/call` con dos herramientas: `echo`, que devuelve sus argumentos, y `sleep`, que
+responde tras `seconds` segundos sin bloquear las demás solicitudes (las
+respuestas pueden llegar desordenadas). Escribe una línea en stderr al
+arrancar.
+"""
+
+import os
+import sys
+import json
+import time
+import threading
+
+_lock = threading.Lock()
+
+def _send(message):
+    with _lock:
+        sys.stdout.write(json.dumps(message) + "\n")
+        sys.stdout.flush()
+
+def _handle(message):
+    method = message.get("method")
+    if "id" not in message:
+        return
+    if method == "initialize":
+        time.sleep(float(os.getenv("FAKE_MCP_INIT_DELAY", "0")))
+        _send({"jsonrpc": "2.0", "id": message["id"], "result": {"serverInfo": {"name": "fake", "pid": os.getpid()}}})
+        return
+    if method == "tools/list":
+        tools = [{"name": name, "inputSchema": {"type": "object"}} for name in ("echo", "sleep")]
+        _send({"jsonrpc": "2.0", "id": message["id"], "result": {"tools": tools}})
+        return
+    params = message.get("params") or {}
+    arguments = params.get("arguments") or {}
+    if params.get("name") == "sleep":
+        time.sleep(float(arguments.get("seconds", 0)))
+    _send({
+        "jsonrpc": "2.0",
+        "id": message["id"],
+        "result": {"content": [{"type": "text", "text": json.dumps(arguments)}], "pid": os.getpid(),
+                   "env": os.getenv("FAKE_MCP_TOKEN")}
+    })
+
+def main():
+    sys.stderr.write("fake mcp server ready\n")
+    sys.stderr.flush()
+    for line in sys.stdin:
+        line = line.strip()
+        if line:
+            threading.Thread(target=_handle, args=(json.loads(line),), daemon=True).start()
+
+if __name__ == "__main__":
+    main()
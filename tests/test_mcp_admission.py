@@ -0,0 +1,75 @@
+import asyncio
+
+import pytest
+
+from app.mcp_client.mcp_admission import MCPAdmissionQueue, MCPServerBusyError
+
+@pytest.mark.asyncio
+async def test_waiters_are_admitted_in_fifo_order():
+    """Las plazas liberadas se entregan por orden de llegada"""
+    queue = MCPAdmissionQueue("fake", max_concurrent=1, max_queued=8)
+    order = []
+    gate = asyncio.Event()
+
+    async def call(n):
+        async with queue.slot():
+            order.append(n)
+            await gate.wait()
+
+    tasks = [asyncio.ensure_future(call(n)) for n in range(5)]
+    await asyncio.sleep(0.01)
+    assert queue.in_flight == 1
+    assert queue.queue_depth == 4
+    gate.set()
+    await asyncio.gather(*tasks)
+    assert order == [0, 1, 2, 3, 4]
+    assert queue.in_flight == 0
+    assert queue.metrics["max_queue_depth"] == 4
+
+@pytest.mark.asyncio
+async def test_full_queue_rejects_immediately():
+    """Con la cola llena la solicitud se rechaza sin esperar"""
+    queue = MCPAdmissionQueue("fake", max_concurrent=1, max_queued=1)
+    await queue.acquire()
+    waiter = asyncio.ensure_future(queue.acquire())
+    await asyncio.sleep(0)
+    with pytest.raises(MCPServerBusyError):
+        await queue.acquire()
+    assert queue.metrics["rejected"] == 1
+
+    queue.release()
+    await waiter
+    assert queue.in_flight == 1
+    queue.release()
+    assert queue.in_flight == 0
+
+@pytest.mark.asyncio
+async def test_queue_timeout_leaves_the_queue():
+    """Al vencer la espera la solicitud sale de la cola y no consume plaza"""
+    queue = MCPAdmissionQueue("fake", max_concurrent=1, max_queued=4)
+    await queue.acquire()
+    with pytest.raises(MCPServerBusyError):
+        await queue.acquire(timeout=0.01)
+    assert queue.queue_depth == 0
+    assert queue.metrics["wait_timeouts"] == 1
+
+    queue.release()
+    assert queue.in_flight == 0
+    assert await queue.acquire(timeout=0.01) == 0.0
+
+@pytest.mark.asyncio
+async def test_cancelled_waiter_does_not_leak_slot():
+    """Una solicitud cancelada en la cola no se queda con la plaza"""
+    queue = MCPAdmissionQueue("fake", max_concurrent=1, max_queued=4)
+    await queue.acquire()
+    cancelled = asyncio.ensure_future(queue.acquire())
+    waiting = asyncio.ensure_future(queue.acquire())
+    await asyncio.sleep(0)
+    cancelled.cancel()
+    await asyncio.sleep(0)
+    queue.release()
+    await waiting
+    assert cancelled.cancelled()
+    assert queue.in_flight == 1
+    queue.release()
+    assert queue.in_flight == 0
@@ -0,0 +1,65 @@
+import asyncio
+
+import pytest
+
+from app.mcp_client.mcp_balancer import MCPLoadBalancer
+
+URLS = ["http://a/mcp", "http://b/mcp", "http://c/mcp"]
+
+def test_least_outstanding_picks_idle_replica():
+    """least_outstanding elige la réplica con menos solicitudes en curso"""
+    balancer = MCPLoadBalancer("openai", URLS, strategy="least_outstanding")
+    busy_a, busy_b, idle = balancer.endpoints
+    balancer.acquire(busy_a)
+    balancer.acquire(busy_b)
+    assert balancer.choose() is idle
+    balancer.release(busy_a)
+    assert busy_a.outstanding == 0
+
+def test_p2c_never_picks_busier_of_two():
+    """Con dos réplicas, p2c siempre elige la menos ocupada"""
+    balancer = MCPLoadBalancer("openai", URLS[:2], strategy="p2c")
+    busy, idle = balancer.endpoints
+    balancer.acquire(busy)
+    assert all(balancer.choose() is idle for _ in range(50))
+
+def test_choose_respects_exclude_and_available():
+    """Se evitan las réplicas excluidas y las no disponibles, con respaldo si no queda ninguna"""
+    balancer = MCPLoadBalancer("openai", URLS)
+    a, b, c = balancer.endpoints
+    assert balancer.choose(exclude=[a, b]) is c
+    assert balancer.choose(exclude=[a], available=lambda endpoint: endpoint is not b) is c
+    assert balancer.choose(exclude=balancer.endpoints) in balancer.endpoints
+
+@pytest.mark.asyncio
+async def test_ejection_and_readmission():
+    """Una réplica con fallos seguidos se expulsa y el sondeo la readmite"""
+    balancer = MCPLoadBalancer("openai", URLS[:2], eject_failures=2, probe_interval=0.01,
+                               probe=lambda url: asyncio.sleep(0, result=True))
+    bad, good = balancer.endpoints
+    balancer.record_failure(bad)
+    assert not bad.ejected
+    balancer.record_failure(bad)
+    assert bad.ejected
+    assert all(balancer.choose() is good for _ in range(20))
+
+    await asyncio.sleep(0.1)
+    assert not bad.ejected
+    assert bad.consecutive_failures == 0
+    await balancer.close()
+
+@pytest.mark.asyncio
+async def test_last_healthy_replica_is_never_ejected():
+    """Aunque todas fallen, siempre queda una réplica sin expulsar"""
+    balancer = MCPLoadBalancer("openai", URLS, eject_failures=1, probe_interval=60)
+    for endpoint in balancer.endpoints:
+        balancer.record_failure(endpoint)
+    assert balancer.healthy_count() == 1
+    assert [endpoint.ejected for endpoint in balancer.endpoints] == [True, True, False]
+    await balancer.close()
+
+def test_single_replica_is_never_ejected():
+    """Un servicio con una sola réplica no la expulsa"""
+    balancer = MCPLoadBalancer("openai", URLS[:1], eject_failures=1)
+    balancer.record_failure(balancer.endpoints[0])
+    assert not balancer.endpoints[0].ejected
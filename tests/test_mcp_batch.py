@@ -0,0 +1,92 @@
+import asyncio
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.api import mcp_routes
+from app.services import mcp_service
+from app.services.mcp_service import MCPOperationError, execute_tool_batch
+from app.mcp_client.mcp_admission import MCPServerBusyError
+from app.mcp_client.mcp_services import MCPUnknownServiceError
+from app.mcp_client.mcp_transport import MCPTimeoutError
+
+ERRORS = {
+    "unknown": MCPUnknownServiceError("Servicio desconocido"),
+    "invalid": ValueError("Faltan credenciales"),
+    "slow": MCPTimeoutError("Sin respuesta"),
+    "busy": MCPServerBusyError("Ocupado"),
+    "remote": MCPOperationError("Error remoto", code=-32000),
+    "broken": KeyError("inesperado")
+}
+
+@pytest.fixture
+def operations(monkeypatch):
+    """Sustituye la ejecución de cada operación; las de ERRORS fallan con su excepción."""
+    calls = []
+
+    async def execute_tool_operation(user_id, service, operation, arguments=None, **kwargs):
+        calls.append((user_id, service, operation))
+        # Las operaciones con `delay` terminan después que las siguientes del lote
+        await asyncio.sleep((arguments or {}).get("delay", 0))
+        if service in ERRORS:
+            raise ERRORS[service]
+        return {
+            "service": service,
+            "operation": operation,
+            "response": {"result": {"echo": arguments}},
+            "duration": 0.01
+        }
+
+    monkeypatch.setattr(mcp_service, "execute_tool_operation", execute_tool_operation)
+    return calls
+
+@pytest.mark.asyncio
+async def test_results_keep_order_and_status_codes(operations):
+    """Un resultado por operación, en orden, con el código HTTP de su error"""
+    items = [{"service": "github", "operation": "get_my_repos", "arguments": {"delay": 0.05}}]
+    items += [{"service": service, "operation": "op"} for service in ERRORS]
+    items.append({"service": "notion", "operation": "search", "arguments": {"q": "x"}})
+
+    results = await execute_tool_batch("u1", items)
+    assert [result["service"] for result in results] == [item["service"] for item in items]
+    assert [result["status_code"] for result in results] == [200, 404, 400, 504, 503, 502, 500, 200]
+    assert results[0]["status"] == "success"
+    assert results[0]["result"] == {"echo": {"delay": 0.05}}
+    assert results[-1]["result"] == {"echo": {"q": "x"}}
+    assert all(result["status"] == "error" and result["error"] for result in results[1:-1])
+    assert {call[0] for call in operations} == {"u1"}
+
+@pytest.mark.asyncio
+async def test_empty_and_oversized_batches_are_rejected(operations, monkeypatch):
+    """Los lotes vacíos o de más de MCP_BATCH_MAX_ITEMS se rechazan sin ejecutar nada"""
+    monkeypatch.setattr(mcp_service, "MCP_BATCH_MAX_ITEMS", 2)
+    with pytest.raises(ValueError):
+        await execute_tool_batch("u1", [])
+    with pytest.raises(ValueError, match="máximo 2"):
+        await execute_tool_batch("u1", [{"service": "github", "operation": "op"}] * 3)
+    assert operations == []
+
+def test_batch_route(operations, monkeypatch):
+    """El endpoint devuelve los resultados por operación y 400 para lotes no válidos"""
+    monkeypatch.setattr(mcp_service, "MCP_BATCH_MAX_ITEMS", 2)
+    app = FastAPI()
+    app.include_router(mcp_routes.router)
+    app.dependency_overrides[mcp_routes.get_current_user_id] = lambda: "u1"
+    client = TestClient(app)
+
+    response = client.post("/api/mcp/batch", json={"operations": [
+        {"service": "github", "operation": "get_my_repos"},
+        {"service": "busy", "operation": "op"}
+    ]})
+    assert response.status_code == 200
+    body = response.json()
+    assert body["status"] == "success"
+    assert [result["status_code"] for result in body["results"]] == [200, 503]
+
+    assert client.post("/api/mcp/batch", json={"operations": []}).status_code == 400
+    response = client.post("/api/mcp/batch", json={"operations": [
+        {"service": "github", "operation": "op"}
+    ] * 3})
+    assert response.status_code == 400
+    assert operations[0] == ("u1", "github", "get_my_repos")
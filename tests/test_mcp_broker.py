@@ -0,0 +1,152 @@
+import os
+import sys
+import asyncio
+import subprocess
+
+import pytest
+import pytest_asyncio
+
+from app.mcp_client import mcp_broker
+from app.mcp_client.mcp_admission import MCPServerBusyError
+from app.mcp_client.mcp_broker import (
+    BROKER_CLIENT, BROKER_OFF, BROKER_SERVER, MCPBrokerOrchestrator, MCPBrokerServer, resolve_broker_mode
+)
+from app.mcp_client.mcp_orchestrator import MCPOrchestrator
+from app.mcp_client.mcp_transport import MCPTimeoutError
+
+FAKE_SERVER = [sys.executable, os.path.join(os.path.dirname(__file__), "fake_mcp_server.py")]
+ECHO = {"type": "function", "function": {"name": "echo", "arguments": {"x": 1}}}
+
+class FakeOrchestrator:
+    """Orquestador simulado: registra las llamadas y puede bloquearse o fallar."""
+
+    def __init__(self):
+        self.calls = []
+        self.gate = asyncio.Event()
+        self.started = asyncio.Event()
+        self.cancelled = asyncio.Event()
+        self.error = None
+
+    async def send_request(self, server_name, request, env_vars=None, command=None, timeout=None):
+        self.calls.append(("send_request", server_name, request, env_vars))
+        if self.error is not None:
+            raise self.error
+        if request.get("block"):
+            self.started.set()
+            try:
+                await self.gate.wait()
+            except asyncio.CancelledError:
+                self.cancelled.set()
+                raise
+        return {"result": {"server": server_name, "request": request}}
+
+    def get_pool_metrics(self):
+        return {"size": 3}
+
+@pytest_asyncio.fixture
+async def broker(tmp_path):
+    """Broker con un orquestador simulado y un cliente conectado por un socket temporal."""
+    orchestrator = FakeOrchestrator()
+    server = MCPBrokerServer(orchestrator, str(tmp_path / "broker.sock"))
+    await server.start()
+    client = MCPBrokerOrchestrator(server.socket_path)
+    yield server, client, orchestrator
+    await client.close()
+    await server.close()
+
+@pytest.mark.asyncio
+async def test_socket_is_private(broker):
+    """El socket se crea solo accesible por el propietario"""
+    server, _, _ = broker
+    assert os.stat(server.socket_path).st_mode & 0o777 == 0o600
+
+@pytest.mark.asyncio
+async def test_requests_are_routed_to_the_orchestrator(broker):
+    """Métodos asíncronos y síncronos llegan al orquestador con sus argumentos"""
+    server, client, orchestrator = broker
+    responses = await asyncio.gather(*[
+        client.send_request("github", {"n": n}, env_vars={"TOKEN": str(n)}) for n in range(5)
+    ])
+    assert [response["result"]["request"]["n"] for response in responses] == list(range(5))
+    assert sorted(call[3]["TOKEN"] for call in orchestrator.calls) == [str(n) for n in range(5)]
+    assert await client.get_pool_metrics() == {"size": 3}
+    assert server.metrics["requests"] == 6
+
+@pytest.mark.asyncio
+async def test_errors_keep_their_type(broker):
+    """Los errores del broker se reconstruyen en el worker con su tipo"""
+    _, client, orchestrator = broker
+    for error in (MCPServerBusyError("ocupado"), MCPTimeoutError("plazo"), ValueError("no registrado")):
+        orchestrator.error = error
+        with pytest.raises(type(error), match=str(error)):
+            await client.send_request("github", {})
+
+    orchestrator.error = KeyError("otro")
+    with pytest.raises(RuntimeError):
+        await client.send_request("github", {})
+    with pytest.raises(ValueError, match="no soportado"):
+        await client._call("stop_all_servers")
+
+@pytest.mark.asyncio
+async def test_cancellation_reaches_the_broker_task(broker):
+    """Si el worker deja de esperar, la solicitud se cancela también en el broker"""
+    _, client, orchestrator = broker
+    request = asyncio.ensure_future(client.send_request("github", {"block": True}))
+    await asyncio.wait_for(orchestrator.started.wait(), 5)
+    request.cancel()
+    await asyncio.wait_for(orchestrator.cancelled.wait(), 5)
+    assert request.cancelled()
+
+    orchestrator.gate.set()
+    response = await client.send_request("github", {"n": 1})
+    assert response["result"]["request"] == {"n": 1}
+
+@pytest.mark.asyncio
+async def test_end_to_end_with_real_orchestrator(tmp_path, monkeypatch):
+    """Un worker ejecuta herramientas y guarda tokens en el orquestador del broker"""
+    monkeypatch.setenv("MCP_TOKEN_DB", str(tmp_path / "tokens.db"))
+    monkeypatch.setenv("MCP_TOOL_SCHEMAS", str(tmp_path / "tool_schemas.json"))
+    orchestrator = MCPOrchestrator()
+    orchestrator.register_server("fake", list(FAKE_SERVER))
+    server = MCPBrokerServer(orchestrator, str(tmp_path / "broker.sock"))
+    await server.start()
+    client = MCPBrokerOrchestrator(server.socket_path)
+    try:
+        response = await client.send_request("fake", ECHO, env_vars={"FAKE_MCP_TOKEN": "a"}, timeout=10)
+        assert response["result"]["env"] == "a"
+        with pytest.raises(ValueError):
+            await client.send_request("missing", ECHO)
+
+        assert await client.save_user_tokens("u1", {"github": "t"}, service="github")
+        assert await client.load_user_tokens("u1", service="github") == {"github": "t"}
+        assert await orchestrator.load_user_tokens("u1", service="github") == {"github": "t"}
+    finally:
+        await client.close()
+        await server.close()
+        await orchestrator.stop_all_servers()
+    assert not os.path.exists(server.socket_path)
+
+def test_auto_mode_elects_one_broker(tmp_path, monkeypatch):
+    """En modo auto solo el proceso con el candado es broker; al soltarlo, otro ocupa su lugar"""
+    monkeypatch.setattr(mcp_broker, "_broker_lock_fd", None)
+    socket_path = str(tmp_path / "broker.sock")
+    probe = [
+        sys.executable, "-c",
+        "import sys; from app.mcp_client.mcp_broker import resolve_broker_mode; "
+        "print(resolve_broker_mode('auto', sys.argv[1]))",
+        socket_path
+    ]
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+    assert resolve_broker_mode("off") == BROKER_OFF
+    assert resolve_broker_mode("client") == BROKER_CLIENT
+    assert resolve_broker_mode("bogus") == BROKER_OFF
+
+    assert resolve_broker_mode("auto", socket_path) == BROKER_SERVER
+    assert resolve_broker_mode("auto", socket_path) == BROKER_SERVER
+    other = subprocess.run(probe, cwd=root, capture_output=True, text=True, timeout=60)
+    assert other.stdout.strip() == BROKER_CLIENT
+
+    os.close(mcp_broker._broker_lock_fd)
+    other = subprocess.run(probe, cwd=root, capture_output=True, text=True, timeout=60)
+    assert other.stdout.strip() == BROKER_SERVER
@@ -0,0 +1,141 @@
+import asyncio
+
+import pytest
+
+from app.mcp_client.mcp_cache import MCPResponseCache, canonical_arguments, is_write_operation
+
+TTLS = {("github", "list_repositories"): 60}
+
+class Upstream:
+    """Operación simulada que cuenta sus llamadas y puede bloquearse hasta `release`."""
+
+    def __init__(self, block: bool = False):
+        self.calls = 0
+        self.gate = asyncio.Event()
+        if not block:
+            self.gate.set()
+
+    async def __call__(self):
+        self.calls += 1
+        await self.gate.wait()
+        return {"result": {"calls": self.calls}}
+
+def _cache(**kwargs) -> MCPResponseCache:
+    return MCPResponseCache(ttls=TTLS, enabled=True, **kwargs)
+
+def test_helpers():
+    """Argumentos canónicos y detección de operaciones de escritura"""
+    assert canonical_arguments({"b": 1, "a": 2}) == canonical_arguments({"a": 2, "b": 1})
+    assert is_write_operation("create_issue")
+    assert is_write_operation("delete-card")
+    assert not is_write_operation("list_repositories")
+
+@pytest.mark.asyncio
+async def test_hit_after_miss_and_per_user_keys():
+    """La segunda llamada se sirve de la caché, pero no a otro usuario"""
+    cache = _cache()
+    upstream = Upstream()
+    first = await cache.get_or_call("github", "list_repositories", {"page": 1}, "u1", upstream)
+    second = await cache.get_or_call("github", "list_repositories", {"page": 1}, "u1", upstream)
+    other = await cache.get_or_call("github", "list_repositories", {"page": 1}, "u2", upstream)
+    assert first is second
+    assert other is not first
+    assert upstream.calls == 2
+    assert cache.metrics["hits"] == 1
+
+@pytest.mark.asyncio
+async def test_uncacheable_operations_and_errors_are_not_stored():
+    """Operaciones sin TTL y respuestas de error no se almacenan"""
+    cache = _cache()
+    upstream = Upstream()
+    await cache.get_or_call("github", "get_profile", None, "u1", upstream)
+    await cache.get_or_call("github", "get_profile", None, "u1", upstream)
+    assert upstream.calls == 2
+
+    async def failing():
+        return {"error": {"message": "boom"}}
+    await cache.get_or_call("github", "list_repositories", None, "u1", failing)
+    assert len(cache) == 0
+
+@pytest.mark.asyncio
+async def test_lru_eviction_and_ttl_expiry():
+    """Se expulsa la entrada menos usada y las caducadas no se sirven"""
+    cache = _cache(max_entries=2)
+    upstream = Upstream()
+    for page in (1, 2):
+        await cache.get_or_call("github", "list_repositories", {"page": page}, "u1", upstream)
+    await cache.get_or_call("github", "list_repositories", {"page": 1}, "u1", upstream)
+    await cache.get_or_call("github", "list_repositories", {"page": 3}, "u1", upstream)
+    assert cache.metrics["evictions"] == 1
+    await cache.get_or_call("github", "list_repositories", {"page": 1}, "u1", upstream)
+    assert upstream.calls == 3
+
+    cache.set_ttl("github", "list_repositories", 0.01)
+    await cache.get_or_call("github", "list_repositories", {"page": 9}, "u1", upstream)
+    await asyncio.sleep(0.02)
+    await cache.get_or_call("github", "list_repositories", {"page": 9}, "u1", upstream)
+    assert cache.metrics["expirations"] == 1
+
+@pytest.mark.asyncio
+async def test_concurrent_calls_are_coalesced():
+    """Las solicitudes simultáneas a la misma clave comparten una llamada"""
+    cache = _cache()
+    upstream = Upstream(block=True)
+    tasks = [
+        asyncio.ensure_future(cache.get_or_call("github", "list_repositories", None, "u1", upstream))
+        for _ in range(5)
+    ]
+    await asyncio.sleep(0.01)
+    upstream.gate.set()
+    results = await asyncio.gather(*tasks)
+    assert upstream.calls == 1
+    assert all(result is results[0] for result in results)
+    assert cache.metrics["coalesced"] == 4
+
+@pytest.mark.asyncio
+async def test_leader_cancellation_does_not_cancel_followers():
+    """Si se cancela la llamada compartida, las demás solicitudes la repiten"""
+    cache = _cache()
+    upstream = Upstream(block=True)
+    leader = asyncio.ensure_future(cache.get_or_call("github", "list_repositories", None, "u1", upstream))
+    await asyncio.sleep(0.01)
+    followers = [
+        asyncio.ensure_future(cache.get_or_call("github", "list_repositories", None, "u1", upstream))
+        for _ in range(3)
+    ]
+    await asyncio.sleep(0.01)
+    leader.cancel()
+    await asyncio.sleep(0.01)
+    upstream.gate.set()
+    results = await asyncio.gather(*followers)
+    assert leader.cancelled()
+    assert upstream.calls == 2
+    assert all(result is results[0] for result in results)
+
+@pytest.mark.asyncio
+async def test_write_invalidates_service_and_in_flight_reads():
+    """Una escritura invalida la caché del servicio y las lecturas en curso no se almacenan"""
+    cache = _cache()
+    await cache.get_or_call("github", "list_repositories", None, "u1", Upstream())
+    assert len(cache) == 1
+
+    upstream = Upstream(block=True)
+    read = asyncio.ensure_future(cache.get_or_call("github", "list_repositories", {"page": 2}, "u1", upstream))
+    await asyncio.sleep(0.01)
+    await cache.get_or_call("github", "create_repository", None, "u1", Upstream())
+    upstream.gate.set()
+    await read
+    assert len(cache) == 0
+
+@pytest.mark.asyncio
+async def test_invalidate_user_discards_in_flight_reads():
+    """Las lecturas en curso con los tokens anteriores no se almacenan tras invalidate_user"""
+    cache = _cache()
+    upstream = Upstream(block=True)
+    read = asyncio.ensure_future(cache.get_or_call("github", "list_repositories", None, "u1", upstream))
+    other = asyncio.ensure_future(cache.get_or_call("github", "list_repositories", None, "u2", upstream))
+    await asyncio.sleep(0.01)
+    cache.invalidate_user("u1")
+    upstream.gate.set()
+    await asyncio.gather(read, other)
+    assert [key[3] for key in cache._entries] == ["u2"]
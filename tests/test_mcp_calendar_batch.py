@@ -0,0 +1,118 @@
+import asyncio
+
+import pytest
+
+from app.mcp_client import mcp_client_google_calendar
+from app.mcp_client.mcp_calendar_index import CalendarEventIndex
+from app.mcp_client.mcp_client_google_calendar import GoogleCalendarMCPClient
+
+START = {"dateTime": "2025-05-05T10:00:00Z"}
+END = {"dateTime": "2025-05-05T11:00:00Z"}
+
+class FakeCalendarOrchestrator:
+    """Orquestador simulado: mide la concurrencia y falla los elementos marcados."""
+
+    def __init__(self):
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.calls = []
+
+    async def execute_operation(self, user_id, operation, arguments):
+        self.calls.append((operation, arguments))
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            # Los primeros elementos tardan más: las respuestas llegan desordenadas
+            await asyncio.sleep(0.05 / len(self.calls))
+        finally:
+            self.in_flight -= 1
+        if arguments.get("summary") == "fail" or arguments.get("event_id") == "missing":
+            return {"status": "error", "error": "Not Found"}
+        if operation == "delete_event":
+            return {"status": "success", "response": {"result": {}}}
+        event = {"id": arguments.get("event_id") or f"ev-{arguments['summary']}", **arguments}
+        event.pop("event_id", None)
+        return {"status": "success", "response": {"result": {"structuredContent": event}}}
+
+@pytest.fixture
+def calendar(monkeypatch):
+    """Cliente con orquestador simulado, tokens presentes e índice activo para u1."""
+    client = GoogleCalendarMCPClient(orchestrator=FakeCalendarOrchestrator())
+    client.index = CalendarEventIndex()
+    client.index._get("u1")
+
+    async def load_user_tokens(user_id):
+        return {"token": "t"}
+
+    monkeypatch.setattr(client, "load_user_tokens", load_user_tokens)
+    return client
+
+def _ids(results):
+    return [(result.get("response") or {}).get("result", {}).get("structuredContent", {}).get("id")
+            for result in results]
+
+@pytest.mark.asyncio
+async def test_results_keep_item_order(calendar):
+    """Cada resultado corresponde al evento en la misma posición"""
+    events = [{"summary": str(n), "start": START, "end": END} for n in range(6)]
+    batch = await calendar.create_events("u1", events)
+    assert batch["status"] == "success"
+    assert batch["succeeded"] == 6
+    assert _ids(batch["results"]) == [f"ev-{n}" for n in range(6)]
+
+@pytest.mark.asyncio
+async def test_failed_items_do_not_affect_the_rest(calendar):
+    """Los elementos inválidos o fallidos tienen su error y el resto se ejecuta"""
+    events = [
+        {"summary": "a", "start": START, "end": END},
+        {"summary": "sin fechas"},
+        {"summary": "fail", "start": START, "end": END},
+        {"summary": "b", "start": START, "end": END}
+    ]
+    batch = await calendar.create_events("u1", events)
+    assert batch["status"] == "partial"
+    assert (batch["succeeded"], batch["failed"]) == (2, 2)
+    assert [result["status"] for result in batch["results"]] == ["success", "error", "error", "success"]
+    assert "start" in batch["results"][1]["error"]
+    assert len(calendar.orchestrator.calls) == 3
+
+    batch = await calendar.delete_events("u1", ["missing", ""])
+    assert batch["status"] == "error"
+    assert batch["failed"] == 2
+
+@pytest.mark.asyncio
+async def test_concurrency_is_bounded(calendar, monkeypatch):
+    """No hay más de GOOGLE_CALENDAR_BATCH_CONCURRENCY operaciones en vuelo"""
+    monkeypatch.setattr(mcp_client_google_calendar, "GOOGLE_CALENDAR_BATCH_CONCURRENCY", 3)
+    batch = await calendar.delete_events("u1", [f"e{n}" for n in range(10)])
+    assert batch["succeeded"] == 10
+    assert calendar.orchestrator.max_in_flight == 3
+
+@pytest.mark.asyncio
+async def test_index_gets_one_update_with_successful_writes(calendar, monkeypatch):
+    """El índice se actualiza una sola vez y solo con las escrituras confirmadas"""
+    index = calendar.index
+    await calendar.create_events("u1", [
+        {"summary": "keep", "start": START, "end": END},
+        {"summary": "drop", "start": START, "end": END}
+    ])
+    assert set(index._users["u1"].events) == {"ev-keep", "ev-drop"}
+
+    applied = []
+    apply_writes = index.apply_writes
+    monkeypatch.setattr(index, "apply_writes", lambda user_id, writes: applied.append(writes) or apply_writes(user_id, writes))
+    batch = await calendar.update_events("u1", [
+        {"event_id": "ev-keep", "summary": "renamed"},
+        {"event_id": "missing", "summary": "x"},
+        {"summary": "sin id"}
+    ])
+    assert batch["status"] == "partial"
+    batch = await calendar.delete_events("u1", ["ev-drop", "missing"])
+    assert batch["status"] == "partial"
+
+    assert len(applied) == 2
+    events = index._users["u1"].events
+    assert set(events) == {"ev-keep"}
+    assert events["ev-keep"]["summary"] == "renamed"
+    assert events["ev-keep"]["start"] == START
+    assert index.metrics["write_through"] == 4
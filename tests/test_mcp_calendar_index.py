@@ -0,0 +1,163 @@
+import pytest
+
+from app.mcp_client.mcp_calendar_index import (
+    CalendarEventIndex, UserCalendarIndex, busy_intervals, format_event_time, free_slots, merge_intervals, parse_event_time
+)
+
+HOUR = 3600.0
+BASE = parse_event_time("2025-05-05T00:00:00Z")
+
+def _event(event_id: str, start_hour: float, end_hour: float, **extra):
+    return {
+        "id": event_id,
+        "start": {"dateTime": format_event_time(BASE + start_hour * HOUR)},
+        "end": {"dateTime": format_event_time(BASE + end_hour * HOUR)},
+        **extra
+    }
+
+def _ids(events):
+    return [event["id"] for event in events]
+
+def _at(hour: float) -> float:
+    return BASE + hour * HOUR
+
+def test_parse_event_time():
+    """Fechas con hora, días completos y valores inválidos"""
+    assert parse_event_time({"dateTime": "2025-05-05T01:00:00+01:00"}) == BASE
+    assert parse_event_time({"date": "2025-05-05"}) == BASE
+    assert parse_event_time("2025-05-05T00:00:00Z") == BASE
+    assert parse_event_time({"date": "mañana"}) is None
+    assert parse_event_time(None) is None
+
+def test_query_returns_overlapping_events():
+    """La consulta devuelve los eventos que se solapan con la ventana, ordenados por inicio"""
+    index = UserCalendarIndex()
+    index.upsert(_event("long", 0, 10))
+    index.upsert(_event("a", 2, 3))
+    index.upsert(_event("b", 4, 5))
+    index.upsert(_event("point", 6, 6))
+
+    assert _ids(index.query(_at(2.5), _at(4.5))) == ["long", "a", "b"]
+    assert _ids(index.query(_at(3), _at(4))) == ["long"]
+    assert _ids(index.query(_at(6), _at(7))) == ["long", "point"]
+    assert _ids(index.query(_at(10), _at(12))) == []
+
+def test_upsert_moves_and_remove_deletes():
+    """Sustituir un evento actualiza su intervalo y eliminarlo lo saca de las consultas"""
+    index = UserCalendarIndex()
+    index.upsert(_event("a", 1, 2))
+    index.upsert(_event("a", 5, 6))
+    assert _ids(index.query(_at(0), _at(3))) == []
+    assert _ids(index.query(_at(5), _at(6))) == ["a"]
+    assert index.remove("a")
+    assert not index.remove("a")
+    assert index.query(_at(0), _at(24)) == []
+
+def test_bulk_update_matches_single_updates():
+    """La actualización en bloque deja el mismo índice que las operaciones sueltas"""
+    index = UserCalendarIndex()
+    index.bulk_update([_event("a", 1, 2), _event("b", 3, 4), _event("c", 5, 6)], [])
+    index.bulk_update([_event("a", 7, 8)], ["b"])
+    assert _ids(index.query(_at(0), _at(24))) == ["c", "a"]
+
+def test_replace_window_and_gaps():
+    """Una ventana completa sustituye sus eventos y deja de aparecer como hueco"""
+    index = UserCalendarIndex()
+    index.upsert(_event("old", 1, 2))
+    index.upsert(_event("outside", 30, 31))
+    index.replace_window(_at(0), _at(24), [_event("new", 3, 4)], complete=True)
+    assert _ids(index.query(_at(0), _at(48))) == ["new", "outside"]
+    assert index.gaps(_at(0), _at(48)) == [(_at(24), _at(48))]
+
+    index.replace_window(_at(24), _at(48), [], complete=False)
+    assert index.gaps(_at(12), _at(48)) == [(_at(24), _at(48))]
+
+    index.expire_windows(0)
+    assert index.gaps(_at(0), _at(24)) == [(_at(0), _at(24))]
+
+def test_merge_intervals():
+    """Los intervalos solapados o contiguos se fusionan y el resultado queda ordenado"""
+    assert merge_intervals([(5, 6), (1, 3), (2, 4), (4, 4.5), (8, 9)]) == [(1, 4.5), (5, 6), (8, 9)]
+    assert merge_intervals([(1, 10), (2, 3)]) == [(1, 10)]
+    assert merge_intervals([]) == []
+
+def test_busy_intervals_skip_free_events_and_clip_to_window():
+    """Cancelados, disponibles y rechazados no ocupan; el resto se recorta a la ventana"""
+    declined = {"attendees": [{"self": True, "responseStatus": "declined"}]}
+    events = [
+        _event("before", -2, 1),
+        _event("cancelled", 2, 3, status="cancelled"),
+        _event("transparent", 2, 3, transparency="transparent"),
+        _event("declined", 2, 3, **declined),
+        _event("a", 4, 5),
+        _event("b", 4.5, 6),
+        _event("after", 7, 12)
+    ]
+    assert busy_intervals(events, _at(0), _at(8)) == [(_at(0), _at(1)), (_at(4), _at(6)), (_at(7), _at(8))]
+
+def test_free_slots():
+    """Solo se devuelven los huecos de la duración mínima, incluidos los extremos"""
+    busy = [(_at(1), _at(2)), (_at(2.25), _at(4)), (_at(7), _at(9))]
+    assert free_slots(busy, _at(0), _at(8), HOUR) == [(_at(0), _at(1)), (_at(4), _at(7))]
+    assert free_slots(busy, _at(0), _at(8), 0.25 * HOUR) == [
+        (_at(0), _at(1)), (_at(2), _at(2.25)), (_at(4), _at(7))
+    ]
+    assert free_slots([], _at(0), _at(1), HOUR) == [(_at(0), _at(1))]
+    assert free_slots([(_at(0), _at(8))], _at(0), _at(8), 60) == []
+
+class FakeCalendar:
+    """Servidor de calendario simulado con sync tokens (una versión por cambio)."""
+
+    def __init__(self, events):
+        self.version = 0
+        self.events = {}
+        self.changes = {}
+        for event in events:
+            self.put(event)
+
+    def put(self, event):
+        self.version += 1
+        self.events[event["id"]] = event
+        self.changes[event["id"]] = self.version
+
+    def delete(self, event_id):
+        self.version += 1
+        self.events[event_id] = {"id": event_id, "status": "cancelled"}
+        self.changes[event_id] = self.version
+
+    async def __call__(self, operation, arguments):
+        if "sync_token" in arguments:
+            since = int(arguments["sync_token"])
+            events = [self.events[event_id] for event_id, version in self.changes.items() if version > since]
+        else:
+            start = parse_event_time(arguments["time_min"])
+            end = parse_event_time(arguments["time_max"])
+            events = [
+                event for event in self.events.values()
+                if event.get("status") != "cancelled"
+                and parse_event_time(event["start"]) < end and parse_event_time(event["end"]) > start
+            ]
+        payload = {"events": events, "nextSyncToken": str(self.version)}
+        return {"status": "success", "response": {"result": {"structuredContent": payload}}}
+
+async def _listed(index, calendar, start_hour, end_hour):
+    result = await index.list_events("u1", format_event_time(_at(start_hour)), format_event_time(_at(end_hour)),
+                                     None, calendar)
+    return {event["id"]: event for event in result["response"]["result"]["events"]}
+
+@pytest.mark.asyncio
+async def test_sync_covers_windows_fetched_before_a_new_gap():
+    """Los cambios en una ventana ya indexada llegan con la sincronización aunque luego se descarguen otras"""
+    calendar = FakeCalendar([_event("a", 1, 2, summary="antes"), _event("gone", 3, 4), _event("b", 49, 50)])
+    index = CalendarEventIndex(sync_interval=3600)
+
+    assert set(await _listed(index, calendar, 0, 24)) == {"a", "gone"}
+    calendar.put(_event("a", 1, 2, summary="después"))
+    calendar.delete("gone")
+    assert set(await _listed(index, calendar, 48, 72)) == {"b"}
+
+    index.sync_interval = 0
+    events = await _listed(index, calendar, 0, 24)
+    assert set(events) == {"a"}
+    assert events["a"]["summary"] == "después"
+    assert index.metrics["incremental_syncs"] == 1
@@ -0,0 +1,126 @@
+import asyncio
+
+import httpx
+import pytest
+
+from app.mcp_client import client as client_module
+from app.mcp_client.client import MCPClient, MCPHttpPool, SimpleMessage, SimpleTextContent
+from app.mcp_client.mcp_circuit import (
+    MCPCircuitBreaker, MCPCircuitOpenError, STATE_CLOSED, STATE_OPEN, STATE_HALF_OPEN, retry_delays
+)
+
+def _open_breaker(**kwargs) -> MCPCircuitBreaker:
+    """Circuit breaker abierto cuyo tiempo de apertura ya ha vencido."""
+    breaker = MCPCircuitBreaker("http://replica/mcp", min_calls=2, open_seconds=0, half_open_calls=2, **kwargs)
+    breaker.record_failure("boom")
+    breaker.record_failure("boom")
+    assert breaker.state == STATE_OPEN
+    return breaker
+
+def test_breaker_opens_on_failure_rate():
+    """El circuito se abre al superar la tasa de errores y rechaza solicitudes"""
+    breaker = MCPCircuitBreaker("http://replica/mcp", min_calls=4, failure_rate=0.5, open_seconds=60)
+    breaker.record_success(0.1)
+    breaker.record_failure("boom")
+    breaker.record_success(0.1)
+    assert breaker.state == STATE_CLOSED
+    breaker.record_failure("boom")
+    assert breaker.state == STATE_OPEN
+    with pytest.raises(MCPCircuitOpenError) as error:
+        breaker.before_call()
+    assert error.value.retry_after > 0
+    assert breaker.get_status()["rejected"] == 1
+
+def test_breaker_opens_on_slow_calls():
+    """Las llamadas lentas también abren el circuito"""
+    breaker = MCPCircuitBreaker("http://replica/mcp", min_calls=2, slow_rate=0.5, slow_call_seconds=1)
+    breaker.record_success(2.0)
+    breaker.record_success(2.0)
+    assert breaker.state == STATE_OPEN
+
+def test_breaker_half_open_closes_after_successful_probes():
+    """Tras el tiempo abierto, las pruebas correctas cierran el circuito"""
+    breaker = _open_breaker()
+    assert breaker.before_call() is True
+    assert breaker.state == STATE_HALF_OPEN
+    assert breaker.before_call() is True
+    with pytest.raises(MCPCircuitOpenError):
+        breaker.before_call()
+    breaker.record_success(0.1)
+    breaker.record_success(0.1)
+    assert breaker.state == STATE_CLOSED
+    assert breaker.before_call() is False
+
+def test_breaker_half_open_reopens_on_failed_probe():
+    """Una prueba fallida vuelve a abrir el circuito"""
+    breaker = _open_breaker()
+    breaker.before_call()
+    breaker.record_failure("boom")
+    assert breaker.state == STATE_OPEN
+    assert breaker.opened == 2
+
+def test_breaker_released_probes_do_not_block_half_open():
+    """Las pruebas que terminan sin resultado liberan su plaza"""
+    breaker = _open_breaker()
+    breaker.before_call()
+    breaker.before_call()
+    breaker.release_probe()
+    breaker.release_probe()
+    assert breaker.before_call() is True
+    breaker.record_success(0.1)
+    assert breaker.before_call() is True
+    breaker.record_success(0.1)
+    assert breaker.state == STATE_CLOSED
+
+def test_retry_delays_are_bounded():
+    """Las esperas de reintento respetan el mínimo, el máximo y el número de intentos"""
+    delays = list(retry_delays(attempts=50, base=0.1, cap=1.0))
+    assert len(delays) == 50
+    assert all(0.1 <= delay <= 1.0 for delay in delays)
+
+def _client(monkeypatch, urls, handler) -> MCPClient:
+    """MCPClient con un pool propio cuyo transporte es `handler`."""
+    monkeypatch.setitem(client_module.SERVER_URLS, "openai", urls)
+    pool = MCPHttpPool()
+    pool.get("openai")
+    pool._clients["openai"] = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    client = MCPClient(timeout=5)
+    client._pool = pool
+    return client
+
+def _message() -> SimpleMessage:
+    return SimpleMessage(role="user", content=SimpleTextContent(text="hola"))
+
+@pytest.mark.asyncio
+async def test_cancelled_half_open_probes_release_their_slot(monkeypatch):
+    """Cancelar solicitudes de prueba no deja el circuito bloqueado en half_open"""
+    url = "http://replica-a/mcp"
+    blocked = asyncio.Event()
+
+    async def handler(request):
+        if blocked.is_set():
+            return httpx.Response(200, content=b'data: {"role": "assistant", "content": {"text": "ok"}}\n\n')
+        await asyncio.sleep(60)
+
+    client = _client(monkeypatch, [url], handler)
+    breaker = client._pool.breaker(url)
+    breaker.min_calls, breaker.open_seconds = 1, 0
+    breaker.record_failure("boom")
+
+    async def consume():
+        return [message async for message in client.request_mcp_server("openai", _message(), idempotent=False)]
+
+    for _ in range(breaker.half_open_calls + 1):
+        task = asyncio.ensure_future(consume())
+        await asyncio.sleep(0.01)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+    assert breaker.state == STATE_HALF_OPEN
+
+    blocked.set()
+    for _ in range(breaker.half_open_calls):
+        messages = await consume()
+        assert messages[0].content.text == "ok"
+    assert breaker.state == STATE_CLOSED
+    await client.close()
@@ -0,0 +1,139 @@
+import asyncio
+import json
+import time
+
+import httpx
+import pytest
+
+from app.mcp_client import client as client_module
+from app.mcp_client.client import MCPClient, MCPHttpPool, SimpleMessage, SimpleTextContent
+from app.mcp_client.mcp_hedging import MCPHedgePolicy
+
+URLS = ["http://replica-a/mcp", "http://replica-b/mcp"]
+
+class SlowFirstServer:
+    """Transporte simulado: el primer envío de cada solicitud tarda `delay`, los demás responden al momento."""
+
+    def __init__(self, delay: float):
+        self.delay = delay
+        self.seen = set()
+        self.calls = []
+        self.cancelled = []
+
+    async def __call__(self, request: httpx.Request) -> httpx.Response:
+        text = json.loads(request.content)["content"]["text"]
+        host = request.url.host
+        self.calls.append(host)
+        if text not in self.seen:
+            self.seen.add(text)
+            try:
+                await asyncio.sleep(self.delay)
+            except asyncio.CancelledError:
+                self.cancelled.append(host)
+                raise
+        body = f'data: {{"role": "assistant", "content": {{"text": "{text}@{host}"}}}}\n\n'
+        return httpx.Response(200, content=body.encode())
+
+def _client(monkeypatch, urls, server, **policy) -> MCPClient:
+    """MCPClient con un pool y una política de hedging propios."""
+    monkeypatch.setitem(client_module.SERVER_URLS, "openai", urls)
+    pool = MCPHttpPool()
+    pool.get("openai")
+    pool._clients["openai"] = httpx.AsyncClient(transport=httpx.MockTransport(server))
+    pool._hedge_policies["openai"] = MCPHedgePolicy("openai", default_delay=0.05, **policy)
+    client = MCPClient(timeout=5)
+    client._pool = pool
+    return client
+
+async def _request(client: MCPClient, text: str):
+    message = SimpleMessage(role="user", content=SimpleTextContent(text=text))
+    started = time.monotonic()
+    messages = [m async for m in client.request_mcp_server("openai", message, hedge_route="test")]
+    return time.monotonic() - started, [m.content.text for m in messages]
+
+@pytest.mark.asyncio
+async def test_hedge_wins_and_loser_is_cancelled(monkeypatch):
+    """El duplicado a la otra réplica gana y el primario lento se cancela"""
+    server = SlowFirstServer(delay=5)
+    client = _client(monkeypatch, URLS, server, budget=1, burst=1)
+
+    elapsed, texts = await _request(client, "r1")
+    await asyncio.sleep(0)
+
+    assert elapsed < 1
+    assert len(texts) == 1
+    primary, hedge = server.calls
+    assert primary != hedge
+    assert texts[0] == f"r1@{hedge}"
+    assert server.cancelled == [primary]
+    assert all(endpoint.outstanding == 0 for endpoint in client._pool.balancer("openai").endpoints)
+    metrics = client.get_remote_status()["openai"]["hedging"]
+    assert metrics["hedges"] == 1 and metrics["hedge_wins"] == 1
+    await client.close()
+
+@pytest.mark.asyncio
+async def test_fast_primary_is_not_hedged(monkeypatch):
+    """Si el primario responde dentro del umbral no se envía duplicado"""
+    server = SlowFirstServer(delay=0)
+    client = _client(monkeypatch, URLS, server, budget=1, burst=1)
+
+    _, texts = await _request(client, "r1")
+
+    assert len(server.calls) == 1
+    assert client._pool.hedge_policy("openai").metrics["hedges"] == 0
+    await client.close()
+
+@pytest.mark.asyncio
+async def test_budget_limits_hedges(monkeypatch):
+    """Sin presupuesto, la solicitud espera al primario en lugar de duplicarse"""
+    server = SlowFirstServer(delay=0.3)
+    client = _client(monkeypatch, URLS, server, budget=0, burst=1)
+
+    first, _ = await _request(client, "r1")
+    second, _ = await _request(client, "r2")
+
+    assert first < 0.3 <= second
+    metrics = client._pool.hedge_policy("openai").metrics
+    assert metrics["hedges"] == 1
+    assert metrics["budget_exhausted"] == 1
+    await client.close()
+
+@pytest.mark.asyncio
+async def test_single_replica_is_not_hedged(monkeypatch):
+    """Con una sola réplica no se duplica ni se gasta presupuesto"""
+    server = SlowFirstServer(delay=0.2)
+    client = _client(monkeypatch, URLS[:1], server, budget=0, burst=1)
+
+    elapsed, texts = await _request(client, "r1")
+
+    assert elapsed >= 0.2
+    assert len(server.calls) == 1
+    policy = client._pool.hedge_policy("openai")
+    assert policy.metrics["hedges"] == 0
+    assert policy.metrics["no_replica"] == 1
+    assert policy.get_metrics()["budget_tokens"] == 1
+    await client.close()
+
+@pytest.mark.asyncio
+async def test_ejected_replica_is_not_used_for_hedge(monkeypatch):
+    """Una réplica expulsada no cuenta como alternativa para el duplicado"""
+    server = SlowFirstServer(delay=0.2)
+    client = _client(monkeypatch, URLS, server, budget=1, burst=1)
+    balancer = client._pool.balancer("openai")
+    ejected = balancer.endpoints[1]
+    ejected.ejected = True
+
+    await _request(client, "r1")
+
+    assert server.calls == ["replica-a"]
+    assert client._pool.hedge_policy("openai").metrics["no_replica"] == 1
+    await client.close()
+
+def test_policy_threshold_uses_route_percentile():
+    """El umbral es el percentil de la ruta una vez hay muestras suficientes"""
+    policy = MCPHedgePolicy("openai", percentile=0.9, min_samples=10, default_delay=2, min_delay=0.01)
+    assert policy.threshold("route") == 2
+    for latency in range(1, 11):
+        policy.record("route", latency / 10, hedge_won=False)
+    assert policy.threshold("route") == 1.0
+    assert policy.threshold("other") == 2
@@ -0,0 +1,79 @@
+import os
+import sys
+import time
+
+import pytest
+
+from app.mcp_client import mcp_orchestrator
+from app.mcp_client import mcp_client_extended
+from app.mcp_client.mcp_broker import BROKER_OFF
+from app.mcp_client.mcp_orchestrator import MCPOrchestrator, PREWARM_LAZY, PREWARM_SPARES
+from app.mcp_client.mcp_transport import MCPTimeoutError
+
+FAKE_SERVER = [sys.executable, os.path.join(os.path.dirname(__file__), "fake_mcp_server.py")]
+
+@pytest.fixture
+def orchestrator(tmp_path, monkeypatch):
+    """Orquestador con la base de tokens y el catálogo en un directorio temporal."""
+    monkeypatch.setenv("MCP_TOKEN_DB", str(tmp_path / "tokens.db"))
+    monkeypatch.setenv("MCP_TOOL_SCHEMAS", str(tmp_path / "tool_schemas.json"))
+    return MCPOrchestrator()
+
+ECHO = {"type": "function", "function": {"name": "echo", "arguments": {"x": 1}}}
+
+@pytest.mark.asyncio
+async def test_deadline_covers_cold_per_credential_spawn(orchestrator):
+    """El plazo de la solicitud incluye el arranque en frío del proceso del usuario"""
+    orchestrator.register_server("fake", list(FAKE_SERVER))
+    started = time.monotonic()
+    with pytest.raises(MCPTimeoutError):
+        await orchestrator.send_request("fake", ECHO, env_vars={"FAKE_MCP_INIT_DELAY": "2"}, timeout=0.3)
+    assert time.monotonic() - started < 1.5
+    await orchestrator.stop_all_servers()
+
+@pytest.mark.asyncio
+async def test_deadline_covers_shared_server_start(orchestrator):
+    """El plazo de la solicitud incluye el arranque del servidor compartido"""
+    orchestrator.register_server("fake", list(FAKE_SERVER), env_vars={"FAKE_MCP_INIT_DELAY": "2"})
+    started = time.monotonic()
+    with pytest.raises(MCPTimeoutError):
+        await orchestrator.send_request("fake", ECHO, timeout=0.3)
+    assert time.monotonic() - started < 1.5
+    await orchestrator.stop_all_servers()
+
+@pytest.mark.asyncio
+async def test_request_gets_remaining_budget_after_spawn(orchestrator):
+    """Tras un arranque en frío la solicitud se completa con el plazo restante"""
+    orchestrator.register_server("fake", list(FAKE_SERVER))
+    response = await orchestrator.send_request("fake", ECHO, env_vars={"FAKE_MCP_TOKEN": "a"}, timeout=10)
+    assert response["result"]["env"] == "a"
+    await orchestrator.stop_all_servers()
+
+@pytest.mark.asyncio
+async def test_shared_request_adopts_prewarmed_spare(orchestrator):
+    """Una solicitud sin credenciales usa el proceso precalentado y se repone la reserva"""
+    orchestrator.register_server("fake", list(FAKE_SERVER), prewarm_policy=PREWARM_SPARES, spares=1)
+    orchestrator.register_server("lazy", list(FAKE_SERVER), prewarm_policy=PREWARM_LAZY)
+    assert await orchestrator.prewarm() == {"fake": True}
+    assert orchestrator.servers["fake"].running
+    assert not orchestrator.servers["lazy"].running
+    await orchestrator._spare_tasks["fake"]
+    assert len(orchestrator.spares["fake"]) == 1
+
+    response = await orchestrator.send_request("fake", ECHO, timeout=10)
+    assert response["result"]["pid"] == orchestrator.servers["fake"].process.pid
+    await orchestrator.stop_all_servers()
+
+@pytest.mark.asyncio
+async def test_credential_services_are_not_prewarmed(tmp_path, monkeypatch):
+    """Los servicios que siempre se usan con credenciales se registran como `lazy`"""
+    monkeypatch.setenv("MCP_TOKEN_DB", str(tmp_path / "tokens.db"))
+    monkeypatch.setenv("MCP_TOOL_SCHEMAS", str(tmp_path / "tool_schemas.json"))
+    monkeypatch.setattr(mcp_orchestrator, "MCP_PREWARM_POLICY", PREWARM_SPARES)
+    monkeypatch.setattr(mcp_client_extended, "resolve_broker_mode", lambda: BROKER_OFF)
+    client = mcp_client_extended.MCPClient()
+    assert await client.initialize()
+    orchestrator = client.orchestrator
+    assert {policy for policy, _ in orchestrator.prewarm_policies.values()} == {PREWARM_LAZY}
+    assert not any(server.running for server in orchestrator.servers.values())
+    assert not orchestrator.spares
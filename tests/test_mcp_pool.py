@@ -0,0 +1,82 @@
+import os
+import sys
+import asyncio
+
+import pytest
+
+from app.mcp_client.mcp_orchestrator import MCPServer
+from app.mcp_client.mcp_pool import MCPProcessPool, credential_fingerprint
+
+FAKE_SERVER = [sys.executable, os.path.join(os.path.dirname(__file__), "fake_mcp_server.py")]
+
+def _template() -> MCPServer:
+    return MCPServer("fake", list(FAKE_SERVER), ready_timeout=10)
+
+def _user(token: str):
+    return {"FAKE_MCP_TOKEN": token}
+
+def test_fingerprint_depends_on_env_and_command():
+    """La huella cambia con las credenciales o el comando, no con el orden"""
+    assert credential_fingerprint({"a": "1", "b": "2"}) == credential_fingerprint({"b": "2", "a": "1"})
+    assert credential_fingerprint({"a": "1"}) != credential_fingerprint({"a": "2"})
+    assert credential_fingerprint({"a": "1"}, ["x"]) != credential_fingerprint({"a": "1"}, ["y"])
+    assert "secret" not in credential_fingerprint({"a": "secret"})
+
+@pytest.mark.asyncio
+async def test_same_credentials_reuse_process():
+    """Las mismas credenciales reutilizan el proceso y las simultáneas comparten arranque"""
+    pool = MCPProcessPool(max_size=4)
+    template = _template()
+
+    async def pid(token):
+        async with pool.lease(template, _user(token)) as server:
+            return server.process.pid
+
+    first, second = await asyncio.gather(pid("a"), pid("a"))
+    assert first == second
+    assert await pid("a") == first
+    assert await pid("b") != first
+    assert pool.metrics["spawns"] == 2
+    assert pool.metrics["hits"] == 1
+    await pool.close()
+
+@pytest.mark.asyncio
+async def test_lru_eviction_spares_leased_processes():
+    """Al superar el tamaño se expulsa el menos usado, nunca uno reservado"""
+    pool = MCPProcessPool(max_size=2)
+    template = _template()
+
+    async with pool.lease(template, _user("a")) as held:
+        for token in ("b", "c"):
+            async with pool.lease(template, _user(token)):
+                pass
+        assert held.running
+        assert pool.metrics["evictions_lru"] == 1
+        assert len(pool) == 2
+
+    async with pool.lease(template, _user("c")):
+        pass
+    assert pool.metrics["hits"] == 1
+    async with pool.lease(template, _user("b")):
+        pass
+    assert pool.metrics["spawns"] == 4
+    assert not held.running
+    await pool.close()
+
+@pytest.mark.asyncio
+async def test_idle_processes_are_evicted():
+    """Los procesos inactivos más allá del plazo se detienen y los reservados no"""
+    pool = MCPProcessPool(max_size=4, idle_timeout=0.05)
+    template = _template()
+
+    async with pool.lease(template, _user("a")) as idle:
+        pass
+    async with pool.lease(template, _user("b")) as busy:
+        await asyncio.sleep(0.1)
+        await pool.evict_idle()
+        assert not idle.running
+        assert busy.running
+    assert pool.metrics["evictions_idle"] == 1
+    assert len(pool) == 1
+    await pool.close()
+    assert not busy.running
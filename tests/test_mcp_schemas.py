@@ -0,0 +1,61 @@
+import pytest
+
+from app.mcp_client.mcp_schemas import (
+    MCPToolCatalog, MCPToolValidationError, MCPUnknownToolError, compile_schema
+)
+
+def _errors(schema, value):
+    errors = []
+    compile_schema(schema)(value, "arguments", errors)
+    return errors
+
+def test_boolean_schemas():
+    """`true` acepta cualquier valor y `false` rechaza cualquiera, también como subesquema"""
+    assert _errors(True, {"x": 1}) == []
+    assert _errors(False, {}) != []
+    assert _errors({"properties": {"x": False}}, {"x": 1}) != []
+    assert _errors({"properties": {"x": False}}, {"y": 1}) == []
+    assert _errors({"additionalProperties": False, "properties": {"x": {}}}, {"y": 1}) != []
+
+def test_object_and_type_checks():
+    """Tipos, requeridos y límites básicos"""
+    schema = {
+        "type": "object",
+        "required": ["title"],
+        "properties": {
+            "title": {"type": "string", "minLength": 1},
+            "count": {"type": "integer", "minimum": 0}
+        }
+    }
+    assert _errors(schema, {"title": "a", "count": 2}) == []
+    assert _errors(schema, {"count": 2})
+    assert _errors(schema, {"title": "", "count": -1})
+    assert _errors(schema, {"title": "a", "count": True})
+
+def test_local_refs():
+    """Los `$ref` locales se resuelven contra el esquema raíz"""
+    schema = {
+        "$defs": {"id": {"type": "string", "pattern": "^[0-9]+$"}},
+        "properties": {"id": {"$ref": "#/$defs/id"}}
+    }
+    assert _errors(schema, {"id": "42"}) == []
+    assert _errors(schema, {"id": "x"})
+
+@pytest.mark.asyncio
+async def test_catalog_validation(tmp_path):
+    """El catálogo rechaza herramientas desconocidas y argumentos inválidos"""
+    catalog = MCPToolCatalog(str(tmp_path / "tools.json"))
+    catalog.validate("github", "anything", {})
+    await catalog.update("github", ["github-mcp"], [
+        {"name": "get_repo", "inputSchema": {"type": "object", "required": ["repo"]}}
+    ])
+    catalog.validate("github", "get_repo", {"repo": "genia"})
+    with pytest.raises(MCPUnknownToolError):
+        catalog.validate("github", "drop_repo", {})
+    with pytest.raises(MCPToolValidationError):
+        catalog.validate("github", "get_repo", {})
+
+    reloaded = MCPToolCatalog(str(tmp_path / "tools.json"))
+    assert reloaded.has_catalog("github")
+    reloaded.bind("github", ["github-mcp", "--v2"])
+    assert not reloaded.has_catalog("github")
@@ -0,0 +1,111 @@
+import os
+import sys
+import asyncio
+
+import pytest
+
+from app.mcp_client import mcp_orchestrator
+from app.mcp_client.mcp_orchestrator import (
+    MCPServer, STATUS_CRASHED, STATUS_FAILED, STATUS_RESTARTING, STATUS_RUNNING, STATUS_STOPPED
+)
+
+FAKE_SERVER = [sys.executable, os.path.join(os.path.dirname(__file__), "fake_mcp_server.py")]
+
+def _server(**kwargs) -> MCPServer:
+    return MCPServer("fake", list(FAKE_SERVER), ready_timeout=10, **kwargs)
+
+async def _wait_status(server: MCPServer, *statuses: str, timeout: float = 5.0):
+    for _ in range(int(timeout / 0.02)):
+        if server.status in statuses:
+            return
+        await asyncio.sleep(0.02)
+    raise AssertionError(f"estado {server.status}, se esperaba {statuses}")
+
+@pytest.fixture
+def fast_backoff(monkeypatch):
+    """Backoff de reinicio corto para las pruebas."""
+    monkeypatch.setattr(mcp_orchestrator, "MCP_RESTART_BACKOFF_BASE", 0.05)
+    monkeypatch.setattr(mcp_orchestrator, "MCP_RESTART_BACKOFF_MAX", 0.2)
+
+@pytest.mark.asyncio
+async def test_stop_finishes_stderr_drain():
+    """Al detener el servidor, el drenado de stderr termina y no queda tarea suelta"""
+    server = _server()
+    assert await server.start()
+    drain = server._drain_task
+    assert drain is not None and not drain.done()
+
+    assert await server.stop()
+    assert server._drain_task is None
+    assert drain.done()
+    assert any(line["line"] == "fake mcp server ready" for line in server.output.tail())
+
+@pytest.mark.asyncio
+async def test_crash_finishes_stderr_drain():
+    """Si el proceso termina solo, el supervisor recoge el drenado de stderr"""
+    server = _server(auto_restart=False)
+    assert await server.start()
+    drain = server._drain_task
+    server.process.kill()
+    for _ in range(100):
+        if server.status == STATUS_CRASHED:
+            break
+        await asyncio.sleep(0.05)
+    assert server.status == STATUS_CRASHED
+    assert server._drain_task is None
+    assert drain.done()
+
+@pytest.mark.asyncio
+async def test_adopt_takes_over_spare_drain():
+    """El servidor que adopta un proceso de reserva también adopta su drenado"""
+    server = _server()
+    spare = server.clone()
+    assert await spare.start()
+    drain = spare._drain_task
+    server.adopt(spare)
+    assert server._drain_task is drain and spare._drain_task is None
+    assert await server.stop()
+    assert drain.done()
+
+@pytest.mark.asyncio
+async def test_crash_restarts_with_backoff(fast_backoff):
+    """Tras una caída el supervisor reinicia el proceso tras el backoff"""
+    server = _server()
+    assert await server.start()
+    first = server.process.pid
+    server.process.kill()
+    await _wait_status(server, STATUS_RESTARTING)
+    await _wait_status(server, STATUS_RUNNING)
+    assert server.process.pid != first
+    assert server.restart_count == 1
+    assert server.crash_count == 1
+    assert await server.stop()
+
+@pytest.mark.asyncio
+async def test_restart_budget_marks_server_failed(fast_backoff, monkeypatch):
+    """Agotado el presupuesto de reinicios el servidor queda fallido"""
+    monkeypatch.setattr(mcp_orchestrator, "MCP_RESTART_MAX", 1)
+    server = _server()
+    assert await server.start()
+    server.process.kill()
+    await _wait_status(server, STATUS_RESTARTING)
+    await _wait_status(server, STATUS_RUNNING)
+    server.process.kill()
+    await _wait_status(server, STATUS_FAILED)
+    assert server.restart_count == 1
+    assert not server.running
+    await server.stop()
+
+@pytest.mark.asyncio
+async def test_stop_cancels_pending_restart(monkeypatch):
+    """Una parada explícita durante el backoff cancela el reinicio"""
+    monkeypatch.setattr(mcp_orchestrator, "MCP_RESTART_BACKOFF_BASE", 0.5)
+    server = _server()
+    assert await server.start()
+    server.process.kill()
+    await _wait_status(server, STATUS_RESTARTING)
+    assert await server.stop()
+    await asyncio.sleep(0.7)
+    assert server.status == STATUS_STOPPED
+    assert server.process is None
+    assert server.restart_count == 0
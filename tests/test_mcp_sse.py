@@ -0,0 +1,61 @@
+import json
+
+from app.mcp_client.client import MCPClient, SSEDecoder
+
+def _message(text: str, role: str = "assistant") -> bytes:
+    return json.dumps({"role": role, "content": {"type": "text", "text": text}}).encode()
+
+def _feed_all(decoder: SSEDecoder, chunks):
+    events = []
+    for chunk in chunks:
+        events.extend(decoder.feed(chunk))
+    return events + decoder.flush()
+
+def test_events_split_across_chunks():
+    """Un evento partido en cualquier punto, incluso dentro de un carácter UTF-8, se recompone"""
+    stream = b"event: message\ndata: " + _message("¡Hola, señor! 😀") + b"\n\n"
+    for size in (1, 2, 3, 7):
+        chunks = [stream[i:i + size] for i in range(0, len(stream), size)]
+        events = _feed_all(SSEDecoder(), chunks)
+        assert len(events) == 1
+        event, data = events[0]
+        assert event == "message"
+        assert json.loads(data)["content"]["text"] == "¡Hola, señor! 😀"
+
+def test_crlf_line_endings():
+    """Los finales de línea CRLF se tratan igual que LF"""
+    decoder = SSEDecoder()
+    events = decoder.feed(b"event: error\r\ndata: {\"a\": 1}\r\n\r\n: comentario\r\nid: 7\r\ndata: 2\r\n\r\n")
+    assert events == [("error", b"{\"a\": 1}"), (None, b"2")]
+
+def test_multi_line_data_is_joined():
+    """Las líneas `data:` de un mismo evento se unen con saltos de línea en un único evento"""
+    decoder = SSEDecoder()
+    events = decoder.feed(b"data: {\"role\": \"assistant\",\ndata: \"content\": {\"type\": \"text\", \"text\": \"hi\"}}\n\n")
+    assert events == [(None, b"{\"role\": \"assistant\",\n\"content\": {\"type\": \"text\", \"text\": \"hi\"}}")]
+    message = MCPClient._decode_event("openai", *events[0])
+    assert message.content.text == "hi"
+
+    # Eventos separados siguen produciendo un mensaje cada uno
+    events = decoder.feed(b"data: " + _message("a") + b"\n\ndata: " + _message("b") + b"\n\n")
+    assert [MCPClient._decode_event("openai", *event).content.text for event in events] == ["a", "b"]
+
+def test_flush_emits_trailing_event():
+    """Al terminar el stream se entrega el evento sin línea en blanco final"""
+    decoder = SSEDecoder()
+    assert decoder.feed(b"event: message\ndata: " + _message("fin")) == []
+    events = decoder.flush()
+    assert len(events) == 1 and events[0][0] == "message"
+    assert decoder.flush() == []
+
+def test_events_without_name_are_resolved_by_role():
+    """Sin línea `event:` el rol decide entre mensaje y error; `end` y desconocidos se ignoran"""
+    message = MCPClient._decode_event("openai", None, _message("ok"))
+    assert message.role == "assistant"
+    error = MCPClient._decode_event("openai", None, _message("fallo", role="error"))
+    assert error.role == "error" and error.content.text == "fallo"
+
+    assert MCPClient._decode_event("openai", None, b"no es json") is None
+    assert MCPClient._decode_event("openai", "end", b"") is None
+    assert MCPClient._decode_event("openai", "ping", _message("x")) is None
+    assert MCPClient._decode_event("openai", "message", b"") is None
@@ -0,0 +1,133 @@
+import os
+import json
+import asyncio
+import threading
+
+import pytest
+
+from app.mcp_client.mcp_token_store import MCPTokenStore
+
+LEGACY = {"github": "gh-old", "notion": "nt-old", "slack_xoxc": "c", "slack_xoxd": "d", "misc": "x"}
+
+def _store(tmp_path, **kwargs) -> MCPTokenStore:
+    return MCPTokenStore(str(tmp_path / "tokens.db"), legacy_dir=str(tmp_path), **kwargs)
+
+def _write_legacy(tmp_path, user_id="u1", tokens=LEGACY) -> str:
+    path = tmp_path / f"user_{user_id}_tokens.json"
+    path.write_text(json.dumps(tokens))
+    return str(path)
+
+@pytest.mark.asyncio
+async def test_set_get_delete(tmp_path):
+    """Tokens por servicio, combinados sin servicio, y borrado por servicio o completo"""
+    store = _store(tmp_path)
+    assert await store.get("u1") is None
+    await store.set("u1", "github", {"github": "a"})
+    await store.set("u1", "notion", {"notion": "b"})
+    assert await store.get("u1", "github") == {"github": "a"}
+    assert await store.get("u1") == {"github": "a", "notion": "b"}
+    assert await store.get("u2") is None
+
+    await store.set("u1", "github", {"github": "c"})
+    assert await store.get("u1", "github") == {"github": "c"}
+
+    assert await store.delete("u1", "github")
+    assert not await store.delete("u1", "github")
+    assert await store.get("u1") == {"notion": "b"}
+    assert await store.delete("u1")
+    assert await store.get("u1") is None
+    assert os.stat(store.db_path).st_mode & 0o777 == 0o600
+    store.close()
+
+@pytest.mark.asyncio
+async def test_reads_are_cached_until_a_write(tmp_path):
+    """Las lecturas repetidas salen de la caché y una escritura la invalida"""
+    store = _store(tmp_path)
+    await store.set("u1", "github", {"github": "a"})
+    await store.get("u1")
+    await store.get("u1")
+    assert store.metrics["reads"] == 1
+    assert store.metrics["cache_hits"] == 1
+    await store.set("u1", "github", {"github": "b"})
+    assert await store.get("u1", "github") == {"github": "b"}
+    assert store.metrics["reads"] == 2
+    store.close()
+
+@pytest.mark.asyncio
+async def test_write_during_read_is_not_hidden_by_the_cache(tmp_path):
+    """Una lectura que coincide con una escritura no guarda su resultado en la caché"""
+    store = _store(tmp_path)
+    await store.set("u1", "github", {"github": "old"})
+    read_rows = store._read_rows
+    gate = threading.Event()
+
+    def slow_read(user_id):
+        rows = read_rows(user_id)
+        gate.wait(5)
+        return rows
+
+    store._read_rows = slow_read
+    read = asyncio.ensure_future(store.get("u1", "github"))
+    await asyncio.sleep(0.05)
+    await store.set("u1", "github", {"github": "new"})
+    gate.set()
+    assert await read == {"github": "old"}
+
+    store._read_rows = read_rows
+    assert await store.get("u1", "github") == {"github": "new"}
+    store.close()
+
+@pytest.mark.asyncio
+async def test_legacy_file_is_imported_by_service(tmp_path):
+    """El fichero antiguo se reparte por servicio y se renombra"""
+    path = _write_legacy(tmp_path)
+    store = _store(tmp_path)
+    assert await store.get("u1", "slack") == {"slack_xoxc": "c", "slack_xoxd": "d"}
+    assert await store.get("u1", "legacy") == {"misc": "x"}
+    assert await store.get("u1") == LEGACY
+    assert not os.path.exists(path)
+    assert os.path.exists(path + ".migrated")
+    assert store.metrics["migrated_users"] == 1
+    store.close()
+
+@pytest.mark.asyncio
+async def test_failed_legacy_import_leaves_no_rows(tmp_path, monkeypatch):
+    """Si la importación falla a medias no queda ninguna fila y se reintenta"""
+    path = _write_legacy(tmp_path)
+    store = _store(tmp_path, cache_ttl=0)
+    upsert_row = MCPTokenStore._upsert_row
+    calls = []
+
+    def failing(conn, *args):
+        calls.append(args)
+        if len(calls) == 2:
+            raise RuntimeError("disco lleno")
+        upsert_row(conn, *args)
+
+    monkeypatch.setattr(store, "_upsert_row", failing)
+    assert await store.get("u1") is None
+    assert os.path.exists(path)
+
+    monkeypatch.setattr(store, "_upsert_row", upsert_row)
+    assert await store.get("u1") == LEGACY
+    assert not os.path.exists(path)
+    store.close()
+
+@pytest.mark.asyncio
+async def test_legacy_file_never_overwrites_newer_tokens(tmp_path):
+    """Un fichero antiguo que sigue en su sitio no pisa los tokens guardados después"""
+    _write_legacy(tmp_path)
+    store = _store(tmp_path)
+    await store.set("u1", "notion", {"notion": "nt-new"})
+    assert await store.get("u1", "notion") == {"notion": "nt-new"}
+    assert await store.get("u1", "github") == {"github": "gh-old"}
+
+    # El renombrado falló: el fichero vuelve a estar presente
+    _write_legacy(tmp_path)
+    await store.set("u1", "github", {"github": "gh-new"})
+    assert await store.delete("u1", "slack")
+    assert await store.get("u1", "notion") == {"notion": "nt-new"}
+    assert await store.get("u1", "github") == {"github": "gh-new"}
+    assert await store.get("u1", "slack") is None
+    assert store.metrics["migrated_users"] == 1
+    store.close()
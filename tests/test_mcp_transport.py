@@ -0,0 +1,140 @@
+import asyncio
+import json
+
+import pytest
+
+from app.mcp_client.mcp_transport import StdioJSONRPCTransport
+
+class FakeWriter:
+    """stdin simulado: guarda los mensajes escritos."""
+
+    def __init__(self):
+        self.messages = []
+        self.written = asyncio.Event()
+
+    def write(self, data: bytes):
+        self.messages.append(json.loads(data))
+        self.written.set()
+
+    async def drain(self):
+        pass
+
+def _transport(**kwargs):
+    reader = asyncio.StreamReader()
+    writer = FakeWriter()
+    transport = StdioJSONRPCTransport("fake", reader, writer, **kwargs)
+    transport.start()
+    return transport, reader, writer
+
+def _respond(reader: asyncio.StreamReader, request_id: int, result):
+    reader.feed_data(json.dumps({"jsonrpc": "2.0", "id": request_id, "result": result}).encode() + b"\n")
+
+async def _sent(writer: FakeWriter, count: int):
+    while len(writer.messages) < count:
+        writer.written.clear()
+        await writer.written.wait()
+
+@pytest.mark.asyncio
+async def test_close_cancels_background_progress_callbacks():
+    """Las corrutinas de progreso en curso se cancelan al cerrar el transporte"""
+    transport, reader, writer = _transport()
+    started = asyncio.Event()
+    cancelled = asyncio.Event()
+
+    async def on_progress(params):
+        started.set()
+        try:
+            await asyncio.sleep(60)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    request = asyncio.ensure_future(transport.request({"method": "tools/call"}, on_progress=on_progress))
+    await _sent(writer, 1)
+    token = writer.messages[0]["params"]["_meta"]["progressToken"]
+    reader.feed_data(json.dumps({
+        "jsonrpc": "2.0", "method": "notifications/progress", "params": {"progressToken": token, "progress": 1}
+    }).encode() + b"\n")
+    await started.wait()
+    assert len(transport._background) == 1
+
+    await transport.close()
+    assert cancelled.is_set()
+    assert not transport._background
+    with pytest.raises(Exception):
+        await request
+
+@pytest.mark.asyncio
+async def test_cancellation_notice_is_tracked_until_sent():
+    """La notificación de cancelación se envía en una tarea conservada hasta terminar"""
+    transport, reader, writer = _transport()
+    with pytest.raises(Exception):
+        await transport.request({"method": "tools/call"}, timeout=0.01)
+    assert len(transport._background) == 1
+    await _sent(writer, 2)
+    await asyncio.sleep(0)
+    assert writer.messages[1]["method"] == "notifications/cancelled"
+    assert not transport._background
+    await transport.close()
+
+@pytest.mark.asyncio
+async def test_out_of_order_responses_reach_their_requests():
+    """Cada respuesta se entrega a la solicitud con su id, aunque lleguen desordenadas"""
+    transport, reader, writer = _transport()
+    requests = [
+        asyncio.ensure_future(transport.request({"method": "tools/call", "params": {"n": n}}))
+        for n in range(3)
+    ]
+    await _sent(writer, 3)
+    ids = {message["params"]["n"]: message["id"] for message in writer.messages}
+    assert len(set(ids.values())) == 3
+
+    for n in (2, 0, 1):
+        _respond(reader, ids[n], {"n": n})
+    results = await asyncio.gather(*requests)
+    assert [result["result"]["n"] for result in results] == [0, 1, 2]
+    assert transport.in_flight == 0
+    await transport.close()
+
+@pytest.mark.asyncio
+async def test_split_chunks_and_stdout_noise():
+    """Los mensajes partidos en varios bloques se recomponen y las líneas no JSON se apartan"""
+    output = []
+    transport, reader, writer = _transport(on_output=output.append)
+    request = asyncio.ensure_future(transport.request({"method": "tools/call"}))
+    await _sent(writer, 1)
+    data = json.dumps({"jsonrpc": "2.0", "id": writer.messages[0]["id"], "result": {"ok": True}}).encode()
+    reader.feed_data(b"starting server\n" + data[:10])
+    await asyncio.sleep(0)
+    reader.feed_data(data[10:] + b"\n")
+    assert (await request)["result"] == {"ok": True}
+    assert output == ["starting server"]
+    await transport.close()
+
+@pytest.mark.asyncio
+async def test_late_response_is_discarded():
+    """La respuesta de una solicitud vencida se descarta sin afectar a las demás"""
+    transport, reader, writer = _transport()
+    with pytest.raises(Exception):
+        await transport.request({"method": "tools/call"}, timeout=0.01)
+    expired = writer.messages[0]["id"]
+    request = asyncio.ensure_future(transport.request({"method": "tools/call"}))
+    await _sent(writer, 3)
+    current = [message["id"] for message in writer.messages if "id" in message][-1]
+    _respond(reader, expired, {"late": True})
+    _respond(reader, current, {"late": False})
+    assert (await request)["result"] == {"late": False}
+    assert transport.stale_responses == 1
+    await transport.close()
+
+@pytest.mark.asyncio
+async def test_eof_fails_pending_requests():
+    """Si el servidor cierra stdout, las solicitudes pendientes fallan"""
+    transport, reader, writer = _transport()
+    request = asyncio.ensure_future(transport.request({"method": "tools/call"}))
+    await _sent(writer, 1)
+    reader.feed_eof()
+    with pytest.raises(Exception):
+        await request
+    assert transport.closed
+    await transport.close()